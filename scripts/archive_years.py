@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Move closed years of transactions to Parquet files in PESA_PLAN_ARCHIVE_DIR, or bring
+one back (see services/archive.py). Each archived year leaves a summary journal on
+31 December so ledger balances are unchanged, and reports that need the year's
+entries read them back from its file, so their output is the same as before. Postings
+dated in an archived year are refused until it is restored.
+
+Every user-year is archived in its own database transaction, so the script can be
+interrupted and re-run; years already archived are skipped. On PostgreSQL, --vacuum
+runs VACUUM ANALYZE on the transaction tables afterwards so the space is reused.
+
+Usage:
+    python scripts/archive_years.py --before 2023
+    python scripts/archive_years.py --before 2023 --users 12 34 --vacuum
+    python scripts/archive_years.py --restore 2019 --users 12
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+# Add server directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+from sqlalchemy import func, select
+
+from core.database import SessionLocal, engine
+from models.archive import ArchivedYear
+from models.finance import Transaction
+from models.user import User
+from services.archive import ArchiveError, archive_path, archive_year, restore_year
+
+
+def _first_year(db, user_id: int, before: int):
+    first = db.scalar(
+        select(func.min(Transaction.transaction_date)).where(
+            Transaction.user_id == user_id, Transaction.transaction_date < date(before, 1, 1)
+        )
+    )
+    return first.year if first else None
+
+
+def archive_users(db, user_ids, before: int) -> None:
+    archived_years = transactions = items = 0
+    started = time.perf_counter()
+    for user_id in user_ids:
+        first = _first_year(db, user_id, before)
+        if first is None:
+            continue
+        done = set(db.scalars(select(ArchivedYear.year).where(ArchivedYear.user_id == user_id)))
+        for year in range(first, before):
+            if year in done:
+                continue
+            try:
+                # Leaves no file behind when it fails
+                archived = archive_year(db, user_id, year)
+            except Exception as e:
+                db.rollback()
+                print(f"✗ User {user_id}, {year}: {e}")
+                continue
+            path = archive_path(archived.file_name) if archived is not None else None
+            try:
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                if path is not None:
+                    os.remove(path)
+                print(f"✗ User {user_id}, {year}: {e}")
+                continue
+            if archived is None:
+                continue
+            archived_years += 1
+            transactions += archived.transaction_count
+            items += archived.item_count
+            size = os.path.getsize(archive_path(archived.file_name))
+            print(
+                f"  User {user_id}, {year}: {archived.transaction_count:,} transactions, "
+                f"{archived.item_count:,} items -> {archived.file_name} ({size / 1024:,.0f} KiB)"
+            )
+    elapsed = time.perf_counter() - started
+    print(f"✓ Archived {archived_years} years: {transactions:,} transactions, {items:,} items in {elapsed:.1f}s")
+
+
+def restore_users(db, user_ids, year: int) -> None:
+    for user_id in user_ids:
+        try:
+            archived = restore_year(db, user_id, year)
+            db.commit()
+        except ArchiveError:
+            db.rollback()
+            continue
+        os.remove(archive_path(archived.file_name))
+        print(f"✓ User {user_id}, {year}: restored {archived.transaction_count:,} transactions")
+
+
+def vacuum() -> None:
+    if engine.dialect.name != "postgresql":
+        print("--vacuum only applies to PostgreSQL; skipped")
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for table in ("transaction_items", "transactions"):
+            connection.exec_driver_sql(f"VACUUM (ANALYZE) {table}")
+    print("✓ Vacuumed transactions and transaction_items")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--before", type=int, help="Archive every year before this one")
+    action.add_argument("--restore", type=int, help="Restore this year")
+    parser.add_argument("--users", type=int, nargs="+", help="Only these user ids (default: all users)")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM ANALYZE the transaction tables afterwards")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user_ids = args.users or list(db.scalars(select(User.id).order_by(User.id)))
+        if args.before is not None:
+            archive_users(db, user_ids, args.before)
+        else:
+            restore_users(db, user_ids, args.restore)
+    except Exception as e:
+        print(f"Error: {e}")
+        db.rollback()
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        db.close()
+    if args.vacuum:
+        vacuum()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Fill in transactions.fingerprint (duplicate detection, see services/fingerprints.py)
+for transactions that do not have one: rows written before the column was added,
+or loaded around the API. Works in batches of transactions and commits after each,
+so it can be interrupted and re-run.
+
+Usage:
+    python scripts/backfill_fingerprints.py
+    python scripts/backfill_fingerprints.py --users 12 34 --recompute
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add server directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+from core.database import SessionLocal
+from services.fingerprints import backfill_fingerprints
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", help="Only these user ids (default: all users)")
+    parser.add_argument("--recompute", action="store_true", help="Also recompute existing fingerprints")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Transactions per batch")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        updated = backfill_fingerprints(db, args.users, recompute=args.recompute, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"✓ Fingerprinted {updated:,} transactions in {elapsed:.1f}s ({updated / max(elapsed, 1e-9):,.0f}/s)")
+    except Exception as e:
+        print(f"Error: {e}")
+        db.rollback()
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Benchmark the integer-cents loops (core.money) against the Decimal loops they
+replaced, and check that they give exactly the same amounts.
+Loads synthetic transactions into a scratch Postgres database, cloned from an empty
+migrated template next to PESA_PLAN_DATABASE_URL (or --database-url) and dropped
+afterwards (every transaction posts to one bank ledger), and reports CPU time for:
+  - the trial balance (GET /reports/trial-balance)
+  - the double-entry check of create/update_transaction, over every posted item
+It also checks the bank ledger's daily balance history against Decimal running sums.
+
+Usage: python scripts/bench_money.py [--rows 100000] [--ledgers 1000] [--repeat 3] [--database-url URL]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+# Add server directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+from sqlalchemy import and_, case, func, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from api.v1.endpoints.transactions import _double_entry_total
+from core.config import settings
+from models.finance import (
+    EntryType,
+    Ledger,
+    LedgerGroup,
+    LedgerGroupCategory,
+    ParentLedgerGroup,
+    Transaction,
+    TransactionItem,
+    TransactionType,
+)
+from models.user import User
+from schemas.finance import TransactionItemCreate
+from services import read_models
+from services.chart_of_accounts import ChartOfAccounts
+from services.date_buckets import Interval
+from tests.database import scratch_database
+
+START_DATE = date(2024, 1, 1)
+REPORT_START, REPORT_END = date(2024, 4, 1), date(2024, 12, 31)
+
+
+def populate(db: Session, rows: int, ledgers: int) -> list:
+    """Load the data set; returns every posted item as (ledger_id, entry_type, amount)."""
+    db.add(User(id=1, email="bench@example.com", first_name="Bench", hashed_password="x"))
+    db.add(ParentLedgerGroup(id=1, name="Current Assets", sort_order=2))
+    db.add(ParentLedgerGroup(id=2, name="Expenditure", sort_order=7))
+    db.add(LedgerGroup(id=1, name="Bank Accounts", parent_ledger_group_id=1, category=LedgerGroupCategory.BANK_ACCOUNTS))
+    db.add(LedgerGroup(id=2, name="Expenditure", parent_ledger_group_id=2, category=LedgerGroupCategory.EXPENSES))
+    db.flush()
+    db.execute(
+        insert(Ledger),
+        [{"id": i + 1, "user_id": 1, "name": f"Ledger {i:05d}", "ledger_group_id": 1 if i == 0 else 2} for i in range(ledgers)],
+    )
+
+    rng = random.Random(42)
+    amounts = [Decimal(rng.randrange(1, 10_000_000)).scaleb(-2) for _ in range(rows)]
+    db.execute(
+        insert(Transaction),
+        [
+            {
+                "id": i + 1,
+                "user_id": 1,
+                "transaction_date": START_DATE + timedelta(days=i % 365),
+                "reference": f"INV-{i:06d}",
+                "transaction_type": TransactionType.MONEY_PAID,
+                "total_amount": amount,
+            }
+            for i, amount in enumerate(amounts)
+        ],
+    )
+    items = []
+    for i, amount in enumerate(amounts):
+        # Mostly payments out of the bank, with a refund every tenth transaction
+        bank_side, other_side = (EntryType.DEBIT, EntryType.CREDIT) if i % 10 == 0 else (EntryType.CREDIT, EntryType.DEBIT)
+        items.append({"transaction_id": i + 1, "ledger_id": 1, "entry_type": bank_side, "amount": amount})
+        items.append({"transaction_id": i + 1, "ledger_id": rng.randrange(2, ledgers + 1), "entry_type": other_side, "amount": amount})
+    db.execute(insert(TransactionItem), items)
+    db.commit()
+    return [TransactionItemCreate(**{key: item[key] for key in ("ledger_id", "entry_type", "amount")}) for item in items]
+
+
+def _decimal_sums():
+    return (
+        func.sum(case((TransactionItem.entry_type == EntryType.DEBIT, TransactionItem.amount), else_=0)),
+        func.sum(case((TransactionItem.entry_type == EntryType.CREDIT, TransactionItem.amount), else_=0)),
+    )
+
+
+def decimal_trial_balance(db: Session, coa: ChartOfAccounts) -> list:
+    """The trial balance loop as it was before core.money: Decimal sums and arithmetic."""
+    sums = (
+        select(TransactionItem.ledger_id, *_decimal_sums())
+        .join(Transaction, Transaction.id == TransactionItem.transaction_id)
+        .where(Transaction.user_id == 1)
+        .group_by(TransactionItem.ledger_id)
+    )
+    opening = {row[0]: row[1:] for row in db.execute(sums.where(Transaction.transaction_date < REPORT_START))}
+    period = {
+        row[0]: row[1:]
+        for row in db.execute(
+            sums.where(and_(Transaction.transaction_date >= REPORT_START, Transaction.transaction_date <= REPORT_END))
+        )
+    }
+    ledgers = db.execute(select(Ledger.id, Ledger.name, Ledger.ledger_group_id).where(Ledger.user_id == 1)).all()
+    ledgers.sort(key=lambda ledger: coa.report_sort_key(ledger[2], ledger[1]))
+
+    zero = Decimal("0")
+    items = []
+    for ledger_id, _, ledger_group_id in ledgers:
+        opening_debit_raw, opening_credit_raw = opening.get(ledger_id, (zero, zero))
+        period_debit, period_credit = period.get(ledger_id, (zero, zero))
+        if not (opening_debit_raw > 0 or opening_credit_raw > 0 or period_debit > 0 or period_credit > 0):
+            continue
+        if coa.get_group(ledger_group_id).is_debit_normal:
+            opening_balance = opening_debit_raw - opening_credit_raw
+            closing_balance = opening_balance + period_debit - period_credit
+            opening_debit, opening_credit = (opening_balance, zero) if opening_balance >= 0 else (zero, -opening_balance)
+            closing_debit, closing_credit = (closing_balance, zero) if closing_balance >= 0 else (zero, -closing_balance)
+        else:
+            opening_balance = opening_credit_raw - opening_debit_raw
+            closing_balance = opening_balance + period_credit - period_debit
+            opening_debit, opening_credit = (zero, opening_balance) if opening_balance >= 0 else (-opening_balance, zero)
+            closing_debit, closing_credit = (zero, closing_balance) if closing_balance >= 0 else (-closing_balance, zero)
+        items.append((ledger_id, opening_debit, opening_credit, period_debit, period_credit, closing_debit, closing_credit))
+    return items
+
+
+def decimal_double_entry(items: list) -> None:
+    """The double-entry check as it was before core.money, over consecutive item pairs."""
+    for i in range(0, len(items), 2):
+        pair = items[i : i + 2]
+        total_debits = sum(Decimal(str(item.amount)) for item in pair if item.entry_type == EntryType.DEBIT)
+        total_credits = sum(Decimal(str(item.amount)) for item in pair if item.entry_type == EntryType.CREDIT)
+        assert total_debits == total_credits
+
+
+def cents_double_entry(items: list) -> None:
+    for i in range(0, len(items), 2):
+        _double_entry_total(items[i : i + 2])
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def check_exact(db: Session, coa: ChartOfAccounts) -> None:
+    trial = read_models.trial_balance(db, coa, 1, REPORT_START, REPORT_END)
+    cents_items = [
+        (
+            item["ledger_id"],
+            item["opening_debit"],
+            item["opening_credit"],
+            item["period_debit"],
+            item["period_credit"],
+            item["closing_debit"],
+            item["closing_credit"],
+        )
+        for item in trial["items"]
+    ]
+    # Decimal equality compares values, so 0 == 0.00
+    assert cents_items == decimal_trial_balance(db, coa), "trial balance differs"
+
+    history = read_models.balance_history(db, coa, 1, REPORT_START, REPORT_END, Interval.DAY, ledger_ids=[1])
+    points = history["series"][0]["points"]
+    daily = {}
+    for transaction_date, entry_type, amount in db.execute(
+        select(Transaction.transaction_date, TransactionItem.entry_type, TransactionItem.amount)
+        .join(TransactionItem, TransactionItem.transaction_id == Transaction.id)
+        .where(TransactionItem.ledger_id == 1)
+    ):
+        daily[transaction_date] = daily.get(transaction_date, Decimal("0")) + (amount if entry_type == EntryType.DEBIT else -amount)
+    balance = sum((change for day, change in daily.items() if day < REPORT_START), Decimal("0"))
+    for point in points:
+        balance += daily.get(point["date"], Decimal("0"))
+        assert point["balance"] == balance, f"balance history differs on {point['date']}"
+    print(f"Exact: {len(cents_items)} trial balance lines and {len(points)} daily balances match the Decimal results")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Transactions to load (two items each)")
+    parser.add_argument("--ledgers", type=int, default=1000, help="Ledgers the transactions are spread over")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument(
+        "--database-url", default=settings.DATABASE_URL, help="Postgres server to run on (in a scratch database)"
+    )
+    args = parser.parse_args()
+
+    with scratch_database(args.database_url) as engine, sessionmaker(bind=engine)() as db:
+        items = populate(db, args.rows, args.ledgers)
+        coa = ChartOfAccounts.load(db)
+
+        check_exact(db, coa)
+
+        cases = [
+            (
+                "trial balance",
+                lambda: decimal_trial_balance(db, coa),
+                lambda: read_models.trial_balance(db, coa, 1, REPORT_START, REPORT_END),
+            ),
+            ("double-entry check", lambda: decimal_double_entry(items), lambda: cents_double_entry(items)),
+        ]
+
+        print(f"Money arithmetic benchmark (CPU ms, {args.rows} transactions, best of {args.repeat})")
+        print("-" * 60)
+        print(f"{'loop':<20}{'Decimal':>14}{'cents':>14}{'speedup':>10}")
+        for name, before, after in cases:
+            before_time = timed(before, args.repeat)
+            after_time = timed(after, args.repeat)
+            print(f"{name:<20}{before_time * 1000:>14.1f}{after_time * 1000:>14.1f}{before_time / after_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Benchmark the row-tuple read models against the ORM + Pydantic path they replaced.
+Loads synthetic ledgers and transactions into a scratch Postgres database, cloned from
+an empty migrated template next to PESA_PLAN_DATABASE_URL (or --database-url) and
+dropped afterwards, and reports CPU time per 10k rows for query + shaping + JSON
+rendering of:
+  - the ledger list (GET /accounts/)
+  - the transaction list (GET /transactions/)
+  - the ledger report entries (GET /reports/ledger)
+
+Usage: python scripts/bench_read_models.py [--rows 10000] [--repeat 3] [--database-url URL]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List
+
+# Add server directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, joinedload, sessionmaker
+
+from api.v1.endpoints.reports import LedgerEntry
+from core.config import settings
+from core.responses import FastJSONResponse
+from models.finance import (
+    EntryType,
+    Ledger,
+    LedgerGroup,
+    LedgerGroupCategory,
+    ParentLedgerGroup,
+    SpendingType,
+    Transaction,
+    TransactionItem,
+    TransactionType,
+)
+from models.user import User
+from schemas.finance import LedgerWithGroup, TransactionResponse
+from services import read_models
+from services.chart_of_accounts import ChartOfAccounts
+from tests.database import scratch_database
+
+
+def populate(db: Session, rows: int):
+    db.add(User(id=1, email="bench@example.com", first_name="Bench", hashed_password="x"))
+    db.add(ParentLedgerGroup(id=1, name="Expenditure", sort_order=7))
+    db.add(ParentLedgerGroup(id=2, name="Current Assets", sort_order=2))
+    db.add(LedgerGroup(id=1, name="Expenditure", parent_ledger_group_id=1, category=LedgerGroupCategory.EXPENSES))
+    db.add(LedgerGroup(id=2, name="Bank Accounts", parent_ledger_group_id=2, category=LedgerGroupCategory.BANK_ACCOUNTS))
+    # Flushed in dependency order; the unit of work only orders rows linked by relationships
+    db.flush()
+    db.add(SpendingType(id=1, user_id=1, name="Household"))
+    db.flush()
+
+    db.execute(
+        insert(Ledger),
+        [
+            {"id": i + 1, "user_id": 1, "name": f"Ledger {i:05d}", "ledger_group_id": 1 + i % 2, "spending_type_id": 1 if i % 2 == 0 else None}
+            for i in range(rows)
+        ],
+    )
+    start = date(2024, 1, 1)
+    db.execute(
+        insert(Transaction),
+        [
+            {
+                "id": i + 1,
+                "user_id": 1,
+                "transaction_date": start + timedelta(days=i % 365),
+                "reference": f"INV-{i:06d}",
+                "transaction_type": TransactionType.MONEY_PAID,
+                "total_amount": Decimal(i % 1000) + Decimal("0.50"),
+            }
+            for i in range(rows)
+        ],
+    )
+    db.execute(
+        insert(TransactionItem),
+        [
+            {"transaction_id": i + 1, "ledger_id": 2, "entry_type": EntryType.CREDIT, "amount": Decimal(i % 1000) + Decimal("0.50")}
+            for i in range(rows)
+        ],
+    )
+    db.commit()
+
+
+def orm_ledger_list(db: Session, adapter: TypeAdapter) -> bytes:
+    ledgers = (
+        db.query(Ledger)
+        .options(
+            joinedload(Ledger.ledger_group).joinedload(LedgerGroup.parent_ledger_group),
+            joinedload(Ledger.spending_type),
+        )
+        .filter(Ledger.user_id == 1, Ledger.is_active == True)
+        .order_by(Ledger.ledger_group_id, Ledger.name)
+        .all()
+    )
+    body = adapter.dump_json(adapter.validate_python(ledgers, from_attributes=True))
+    db.expunge_all()
+    return body
+
+
+def orm_transaction_list(db: Session, adapter: TypeAdapter, rows: int) -> bytes:
+    transactions = (
+        db.query(Transaction)
+        .filter(Transaction.user_id == 1)
+        .order_by(Transaction.transaction_date.desc(), Transaction.created_at.desc())
+        .limit(rows)
+        .all()
+    )
+    body = adapter.dump_json(adapter.validate_python(transactions, from_attributes=True))
+    db.expunge_all()
+    return body
+
+
+def pydantic_ledger_entries(db: Session, adapter: TypeAdapter) -> bytes:
+    rows = (
+        db.query(
+            Transaction.id.label("transaction_id"),
+            Transaction.transaction_date,
+            Transaction.reference,
+            Transaction.transaction_type,
+            TransactionItem.entry_type,
+            TransactionItem.amount,
+        )
+        .join(TransactionItem, TransactionItem.transaction_id == Transaction.id)
+        .filter(Transaction.user_id == 1, TransactionItem.ledger_id == 2)
+        .order_by(Transaction.transaction_date, Transaction.id)
+        .all()
+    )
+    running_balance = Decimal("0")
+    entries = []
+    for row in rows:
+        amount = Decimal(str(row.amount))
+        running_balance -= amount
+        entries.append(
+            LedgerEntry(
+                transaction_id=row.transaction_id,
+                transaction_date=row.transaction_date,
+                reference=row.reference,
+                transaction_type=row.transaction_type.value,
+                entry_type=row.entry_type.value,
+                amount=amount,
+                running_balance=running_balance,
+            )
+        )
+    return adapter.dump_json(adapter.validate_python(entries))
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="Ledgers, transactions and ledger entries to load")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument(
+        "--database-url", default=settings.DATABASE_URL, help="Postgres server to run on (in a scratch database)"
+    )
+    args = parser.parse_args()
+
+    with scratch_database(args.database_url) as engine, sessionmaker(bind=engine)() as db:
+        populate(db, args.rows)
+        coa = ChartOfAccounts.load(db)
+        far_past, far_future = date(2000, 1, 1), date(2100, 1, 1)
+
+        cases = [
+            (
+                "ledger list",
+                lambda: orm_ledger_list(db, TypeAdapter(List[LedgerWithGroup])),
+                lambda: FastJSONResponse(read_models.ledger_list(db, coa, 1)).body,
+            ),
+            (
+                "transaction list",
+                lambda: orm_transaction_list(db, TypeAdapter(List[TransactionResponse]), args.rows),
+                lambda: FastJSONResponse(read_models.transaction_list(db, 1, limit=args.rows)).body,
+            ),
+            (
+                "ledger report",
+                lambda: pydantic_ledger_entries(db, TypeAdapter(List[LedgerEntry])),
+                lambda: FastJSONResponse(read_models.ledger_report(db, coa, 1, 2, far_past, far_future)).body,
+            ),
+        ]
+
+        scale = 10000 / args.rows
+        print(f"Read model benchmark (CPU ms per 10k rows, {args.rows} rows loaded, best of {args.repeat})")
+        print("-" * 60)
+        print(f"{'endpoint':<20}{'ORM/Pydantic':>14}{'row tuples':>14}{'speedup':>10}")
+        for name, before, after in cases:
+            before_time = timed(before, args.repeat) * scale
+            after_time = timed(after, args.repeat) * scale
+            print(f"{name:<20}{before_time * 1000:>14.1f}{after_time * 1000:>14.1f}{before_time / after_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
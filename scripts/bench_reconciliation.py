@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Benchmark statement auto-matching (services.reconciliation) and check its accuracy.
+Loads synthetic M-Pesa style postings to one bank ledger into a scratch Postgres
+database (cloned from an empty migrated template next to PESA_PLAN_DATABASE_URL, or
+--database-url, and dropped afterwards), imports a statement with one line per posting (dates shifted by up to a
+few days, receipt number in the description, shuffled) plus lines with no posting,
+and reports:
+  - wall time of auto_match, the work behind POST /reconciliation/statements/{id}/auto-match
+  - how many lines were matched, and how many to the posting they were generated from
+  - for comparison, the time of scoring every (line, item) pair on a sample of lines
+
+Amounts are drawn from a small set of round values, as with real M-Pesa usage, so
+many postings share an amount and only the reference tells them apart.
+
+Usage: python scripts/bench_reconciliation.py [--lines 10000] [--noise 0.05] [--window 5] [--database-url URL]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+# Add server directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from core.config import settings
+from models.finance import (
+    EntryType,
+    Ledger,
+    LedgerGroup,
+    LedgerGroupCategory,
+    ParentLedgerGroup,
+    Transaction,
+    TransactionItem,
+    TransactionType,
+)
+from models.reconciliation import BankStatement, StatementLine
+from models.user import User
+from services import reconciliation
+from tests.database import scratch_database
+
+START_DATE = date(2024, 1, 1)
+ROUND_AMOUNTS = [Decimal(value) for value in (50, 100, 200, 250, 500, 1000, 1500, 2000, 5000)]
+
+
+def _receipt(rng: random.Random) -> str:
+    return "".join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ0123456789") for _ in range(10))
+
+
+def populate(db: Session, lines: int, noise: float) -> dict:
+    """Load postings and a statement; returns {line_id: item_id it was generated from}."""
+    db.add(User(id=1, email="bench@example.com", first_name="Bench", hashed_password="x"))
+    db.add(ParentLedgerGroup(id=1, name="Current Assets", sort_order=2))
+    db.add(ParentLedgerGroup(id=2, name="Expenditure", sort_order=7))
+    db.add(LedgerGroup(id=1, name="Bank Accounts", parent_ledger_group_id=1, category=LedgerGroupCategory.BANK_ACCOUNTS))
+    db.add(LedgerGroup(id=2, name="Expenditure", parent_ledger_group_id=2, category=LedgerGroupCategory.EXPENSES))
+    db.add(Ledger(id=1, user_id=1, name="M-Pesa", ledger_group_id=1))
+    db.add(Ledger(id=2, user_id=1, name="Spending", ledger_group_id=2))
+    # Flushed in dependency order; the unit of work only orders rows linked by relationships
+    db.flush()
+    db.add(BankStatement(id=1, user_id=1, ledger_id=1, name="Bench statement"))
+    db.flush()
+
+    rng = random.Random(42)
+    postings = []
+    for i in range(lines):
+        amount = rng.choice(ROUND_AMOUNTS) if rng.random() < 0.7 else Decimal(rng.randrange(100, 500_000)).scaleb(-2)
+        # Mostly money out, with money in every fifth posting
+        money_in = i % 5 == 0
+        postings.append((START_DATE + timedelta(days=i * 365 // lines), _receipt(rng), amount, money_in))
+
+    db.execute(
+        insert(Transaction),
+        [
+            {
+                "id": i + 1,
+                "user_id": 1,
+                "transaction_date": posted_on,
+                "reference": receipt,
+                "transaction_type": TransactionType.MONEY_RECEIVED if money_in else TransactionType.MONEY_PAID,
+                "total_amount": amount,
+            }
+            for i, (posted_on, receipt, amount, money_in) in enumerate(postings)
+        ],
+    )
+    items = []
+    for i, (_, _, amount, money_in) in enumerate(postings):
+        bank_side, other_side = (EntryType.DEBIT, EntryType.CREDIT) if money_in else (EntryType.CREDIT, EntryType.DEBIT)
+        items.append({"id": 2 * i + 1, "transaction_id": i + 1, "ledger_id": 1, "entry_type": bank_side, "amount": amount})
+        items.append({"id": 2 * i + 2, "transaction_id": i + 1, "ledger_id": 2, "entry_type": other_side, "amount": amount})
+    db.execute(insert(TransactionItem), items)
+
+    statement_lines = []
+    for i, (posted_on, receipt, amount, money_in) in enumerate(postings):
+        statement_lines.append(
+            {
+                "line_date": posted_on + timedelta(days=rng.randrange(0, 4)),
+                "description": f"{'Received from' if money_in else 'Pay Bill to'} {rng.randrange(10**5, 10**6)} {receipt}",
+                "amount": amount if money_in else -amount,
+                "item_id": 2 * i + 1,
+            }
+        )
+    for _ in range(int(lines * noise)):
+        statement_lines.append(
+            {
+                "line_date": START_DATE + timedelta(days=rng.randrange(0, 365)),
+                "description": f"Charge {_receipt(rng)}",
+                "amount": -rng.choice(ROUND_AMOUNTS),
+                "item_id": None,
+            }
+        )
+    rng.shuffle(statement_lines)
+    for line_id, line in enumerate(statement_lines, start=1):
+        line["id"] = line_id
+    db.execute(
+        insert(StatementLine),
+        [
+            {key: line[key] for key in ("id", "line_date", "description", "amount")} | {"statement_id": 1, "ledger_id": 1}
+            for line in statement_lines
+        ],
+    )
+    db.commit()
+    return {line["id"]: line["item_id"] for line in statement_lines}
+
+
+def pairwise_seconds(db: Session, sample: int, window_days: int) -> float:
+    """Time to score every (line, item) pair for sample lines, the naive approach."""
+    lines = [
+        (line_id, line_date.toordinal(), cents, reconciliation.reference_tokens(reference, description))
+        for line_id, line_date, cents, reference, description in db.execute(
+            reconciliation._UNMATCHED_LINES, {"statement_id": 1}
+        )
+    ][:sample]
+    items = [
+        (item_id, transaction_date.toordinal(), cents, reconciliation.reference_tokens(reference))
+        for item_id, transaction_date, cents, reference in db.execute(
+            reconciliation._CANDIDATE_ITEMS,
+            {"ledger_id": 1, "user_id": 1, "start_date": date.min, "end_date": date.max},
+        )
+    ]
+    start = time.perf_counter()
+    for _, line_day, line_cents, line_tokens in lines:
+        for _, item_day, item_cents, item_tokens in items:
+            gap = abs(line_day - item_day)
+            if item_cents == line_cents and gap <= window_days:
+                reconciliation.score(line_tokens, item_tokens, gap, window_days)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=10000, help="Statement lines with a matching posting")
+    parser.add_argument("--noise", type=float, default=0.05, help="Extra lines with no posting, as a share of --lines")
+    parser.add_argument("--window", type=int, default=5, help="Date window in days")
+    parser.add_argument("--sample", type=int, default=200, help="Lines scored pairwise for the comparison")
+    parser.add_argument(
+        "--database-url", default=settings.DATABASE_URL, help="Postgres server to run on (in a scratch database)"
+    )
+    args = parser.parse_args()
+
+    with scratch_database(args.database_url) as engine, sessionmaker(bind=engine)() as db:
+        expected = populate(db, args.lines, args.noise)
+
+        naive = pairwise_seconds(db, args.sample, args.window) * len(expected) / args.sample
+
+        start = time.perf_counter()
+        matched = reconciliation.auto_match(db, 1, 1, 1, args.window)
+        db.commit()
+        elapsed = time.perf_counter() - start
+
+        actual = dict(db.execute(select(StatementLine.id, StatementLine.matched_item_id)).all())
+        correct = sum(1 for line_id, item_id in expected.items() if item_id is not None and actual[line_id] == item_id)
+        false_matches = sum(
+            1 for line_id, item_id in expected.items() if item_id is None and actual[line_id] is not None
+        )
+
+        print(f"Statement auto-match ({len(expected)} lines, {args.lines} postings, {args.window}-day window)")
+        print("-" * 60)
+        print(f"auto_match:               {elapsed * 1000:>10.0f} ms")
+        print(f"pairwise (extrapolated):  {naive * 1000:>10.0f} ms")
+        print(f"matched:                  {matched:>10}")
+        print(f"matched to own posting:   {correct:>10} ({correct / args.lines:.1%})")
+        print(f"lines with no posting matched: {false_matches:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Benchmark report, listing and posting paths against a real database at several data sizes.
+
+For each size a benchmark user with that many transactions is generated (once; later
+runs reuse it) with scripts/generate_bench_data.py, then the suite times:
+  - trial balance for the latest year and for the whole data range
+  - ledger report for the busiest bank ledger over the latest year
+  - transaction listing: first page and a deep page
+  - posting: creating transactions through the endpoint function (removed afterwards)
+
+Run it against a local Postgres (PESA_PLAN_DATABASE_URL or --database-url). Results are
+written to bench_results/reports-<timestamp>.json; pass --compare with an earlier file
+to print the change per case.
+
+Usage:
+    python scripts/bench_reports.py --sizes 10000,100000,1000000 --repeat 5
+    python scripts/bench_reports.py --compare bench_results/reports-20240101-120000.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+# Add server directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+from sqlalchemy import create_engine, delete, func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from api.v1.endpoints.transactions import create_transaction
+from core.config import settings
+from core.responses import FastJSONResponse
+from generate_bench_data import email_for, generate_dataset
+from models.finance import (
+    EntryType,
+    Ledger,
+    LedgerGroup,
+    LedgerGroupCategory,
+    Transaction,
+    TransactionItem,
+    TransactionType,
+)
+from models.user import User
+from schemas.finance import TransactionCreate
+from services import read_models
+from services.chart_of_accounts import ChartOfAccounts
+from services.ledger_balances import rebuild_ledger_balances
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "..", "bench_results")
+PREFIX = "bench-reports"
+
+
+def ensure_dataset(db: Session, size: int, seed: int) -> User:
+    """Return the benchmark user for this size, generating its data if needed."""
+    prefix = f"{PREFIX}-{size}"
+    user = db.query(User).filter(User.email == email_for(prefix, 0)).first()
+    if user is not None:
+        return user
+    print(f"Generating {size:,} transactions for {prefix}...")
+    generate_dataset(db, prefix, users=1, transactions_per_user=size, seed=seed)
+    return db.query(User).filter(User.email == email_for(prefix, 0)).one()
+
+
+def measure(fn: Callable[[], object], repeat: int) -> dict:
+    """Run fn once to warm up, then repeat times. Wall-clock milliseconds."""
+    fn()
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - start) * 1000)
+    runs.sort()
+    return {
+        "runs_ms": [round(run, 3) for run in runs],
+        "min_ms": round(runs[0], 3),
+        "median_ms": round(statistics.median(runs), 3),
+        "p95_ms": round(runs[min(len(runs) - 1, int(len(runs) * 0.95))], 3),
+    }
+
+
+def render(content) -> bytes:
+    # Include JSON rendering so the numbers match what a client waits for
+    return FastJSONResponse(content).body
+
+
+def bench_posting(db: Session, user: User, bank_id: int, expense_id: int, count: int) -> float:
+    """Post count two-line transactions through the endpoint; returns milliseconds per posting."""
+    payloads = [
+        TransactionCreate(
+            transaction_date=date.today(),
+            reference=f"BENCH-{i:06d}",
+            transaction_type=TransactionType.MONEY_PAID,
+            total_amount=Decimal("125.50"),
+            items=[
+                {"ledger_id": expense_id, "entry_type": EntryType.DEBIT, "amount": Decimal("125.50")},
+                {"ledger_id": bank_id, "entry_type": EntryType.CREDIT, "amount": Decimal("125.50")},
+            ],
+        )
+        for i in range(count)
+    ]
+
+    async def post_all():
+        for payload in payloads:
+            await create_transaction(payload, current_user=user, db=db, allow_duplicate=False)
+
+    start = time.perf_counter()
+    asyncio.run(post_all())
+    elapsed = (time.perf_counter() - start) * 1000
+
+    # Leave the dataset as it was for the next run
+    posted = select(Transaction.id).where(Transaction.user_id == user.id, Transaction.reference.like("BENCH-%"))
+    db.execute(delete(TransactionItem).where(TransactionItem.transaction_id.in_(posted)))
+    db.execute(delete(Transaction).where(Transaction.user_id == user.id, Transaction.reference.like("BENCH-%")))
+    rebuild_ledger_balances(db, [user.id])
+    db.commit()
+    return elapsed / count
+
+
+def bench_size(db: Session, size: int, repeat: int, postings: int, seed: int) -> Dict[str, dict]:
+    user = ensure_dataset(db, size, seed)
+    coa = ChartOfAccounts.load(db)
+
+    first_date, last_date = db.execute(
+        select(func.min(Transaction.transaction_date), func.max(Transaction.transaction_date)).where(
+            Transaction.user_id == user.id
+        )
+    ).one()
+    year_start = date(last_date.year, 1, 1)
+
+    busiest_bank = db.execute(
+        select(TransactionItem.ledger_id)
+        .join(Ledger, Ledger.id == TransactionItem.ledger_id)
+        .join(LedgerGroup, LedgerGroup.id == Ledger.ledger_group_id)
+        .where(Ledger.user_id == user.id, LedgerGroup.category == LedgerGroupCategory.BANK_ACCOUNTS)
+        .group_by(TransactionItem.ledger_id)
+        .order_by(func.count().desc())
+        .limit(1)
+    ).scalar_one()
+    expense_id = db.execute(
+        select(Ledger.id)
+        .join(LedgerGroup, LedgerGroup.id == Ledger.ledger_group_id)
+        .where(Ledger.user_id == user.id, LedgerGroup.category == LedgerGroupCategory.EXPENSES)
+        .limit(1)
+    ).scalar_one()
+
+    cases = {
+        "trial_balance_year": lambda: render(read_models.trial_balance(db, coa, user.id, year_start, last_date)),
+        "trial_balance_all": lambda: render(read_models.trial_balance(db, coa, user.id, first_date, last_date)),
+        "ledger_report_year": lambda: render(
+            read_models.ledger_report(db, coa, user.id, busiest_bank, year_start, last_date)
+        ),
+        "transactions_first_page": lambda: render(read_models.transaction_list(db, user.id, limit=100, offset=0)),
+        "transactions_deep_page": lambda: render(
+            read_models.transaction_list(db, user.id, limit=100, offset=max(0, size - 200))
+        ),
+    }
+
+    results = {}
+    for name, fn in cases.items():
+        results[name] = measure(fn, repeat)
+        db.rollback()
+        print(f"  {name:<26}{results[name]['median_ms']:>10.1f} ms (median)")
+
+    if postings:
+        per_posting = bench_posting(db, user, busiest_bank, expense_id, postings)
+        results["posting"] = {"count": postings, "mean_ms": round(per_posting, 3)}
+        print(f"  {'posting':<26}{per_posting:>10.1f} ms (mean of {postings})")
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, previous_path: str) -> None:
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nChange vs {previous_path} ({previous.get('git_commit')})")
+    print("-" * 60)
+    for size, cases in current["sizes"].items():
+        for name, result in cases.items():
+            before = previous["sizes"].get(size, {}).get(name)
+            if not before:
+                continue
+            key = "median_ms" if "median_ms" in result else "mean_ms"
+            change = (result[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            print(f"{size:>10} {name:<26}{before[key]:>10.1f} ->{result[key]:>10.1f} ms ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma separated transaction counts")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (after one warm-up)")
+    parser.add_argument("--postings", type=int, default=200, help="Transactions to post per size (0 to skip)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for generated datasets")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL, help="Database to run against")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--output", help="Results file (default: bench_results/reports-<timestamp>.json)")
+    args = parser.parse_args()
+
+    sizes: List[int] = [int(size) for size in args.sizes.split(",") if size]
+    engine = create_engine(args.database_url)
+    db = sessionmaker(bind=engine)()
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "database": engine.url.render_as_string(hide_password=True),
+        "repeat": args.repeat,
+        "sizes": {},
+    }
+    try:
+        for size in sizes:
+            print(f"\nSize {size:,} transactions")
+            print("-" * 60)
+            results["sizes"][str(size)] = bench_size(db, size, args.repeat, args.postings, args.seed)
+    finally:
+        db.close()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"reports-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Results written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
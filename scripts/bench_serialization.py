@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON serialization and compression of the large report payloads.
+Compares FastAPI's default response path (response_model validation + json.dumps)
+with FastJSONResponse, and reports bytes on the wire for identity, gzip and brotli.
+No database is needed: payloads are synthetic.
+
+Usage: python scripts/bench_serialization.py [--rows 50000] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import zlib
+from datetime import date, timedelta
+from decimal import Decimal
+
+# Add server directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+import brotli
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from api.v1.endpoints.reports import (
+    LedgerEntry,
+    LedgerReportResponse,
+    TrialBalanceItem,
+    TrialBalanceResponse,
+)
+from core.responses import FastJSONResponse
+
+
+def build_ledger_report(rows: int) -> LedgerReportResponse:
+    start = date(2024, 1, 1)
+    running = Decimal("0")
+    entries = []
+    for i in range(rows):
+        amount = Decimal(i % 5000) + Decimal("0.75")
+        running += amount if i % 3 else -amount
+        entries.append(
+            LedgerEntry(
+                transaction_id=i + 1,
+                transaction_date=start + timedelta(days=i % 365),
+                reference=f"INV-{i:06d}",
+                transaction_type="MONEY_PAID" if i % 3 else "MONEY_RECEIVED",
+                entry_type="DEBIT" if i % 3 else "CREDIT",
+                amount=amount,
+                running_balance=running,
+            )
+        )
+    return LedgerReportResponse(
+        ledger_id=1,
+        ledger_name="Bank",
+        ledger_group_name="Bank Accounts",
+        parent_group_name="Current Assets",
+        start_date=start,
+        end_date=date(2024, 12, 31),
+        opening_balance=Decimal("0"),
+        closing_balance=running,
+        entries=entries,
+        total_debit=Decimal("0"),
+        total_credit=Decimal("0"),
+    )
+
+
+def build_trial_balance(rows: int) -> TrialBalanceResponse:
+    items = [
+        TrialBalanceItem(
+            ledger_id=i + 1,
+            ledger_name=f"Ledger {i}",
+            ledger_group_name="Expenditure",
+            parent_group_name="Expenditure",
+            opening_debit=Decimal(i) + Decimal("0.10"),
+            opening_credit=Decimal("0"),
+            period_debit=Decimal(i * 3) + Decimal("0.25"),
+            period_credit=Decimal(i) + Decimal("0.05"),
+            closing_debit=Decimal(i * 3) + Decimal("0.30"),
+            closing_credit=Decimal("0"),
+        )
+        for i in range(rows)
+    ]
+    zero = Decimal("0")
+    return TrialBalanceResponse(
+        start_date=date(2024, 1, 1),
+        end_date=date(2024, 12, 31),
+        items=items,
+        total_opening_debit=zero,
+        total_opening_credit=zero,
+        total_period_debit=zero,
+        total_period_credit=zero,
+        total_closing_debit=zero,
+        total_closing_credit=zero,
+        is_balanced=True,
+    )
+
+
+def default_path(model, field) -> bytes:
+    """What FastAPI does for an endpoint with response_model and the stock JSONResponse."""
+    content = asyncio.run(serialize_response(field=field, response_content=model))
+    return JSONResponse(content).body
+
+
+def fast_path(model) -> bytes:
+    return FastJSONResponse(model).body
+
+
+def _gzip(body: bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000, help="Entries/items per payload")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    payloads = [
+        ("ledger report", build_ledger_report(args.rows), LedgerReportResponse),
+        ("trial balance", build_trial_balance(args.rows), TrialBalanceResponse),
+    ]
+
+    print(f"Serialization benchmark ({args.rows} rows, best of {args.repeat})")
+    print("-" * 60)
+    for name, model, model_class in payloads:
+        field = create_response_field(name="response", type_=model_class)
+        default_time, default_body = timed(lambda: default_path(model, field), args.repeat)
+        fast_time, fast_body = timed(lambda: fast_path(model), args.repeat)
+        gzip_time, gzip_body = timed(lambda: _gzip(fast_body), args.repeat)
+        br_time, br_body = timed(lambda: brotli.compress(fast_body, quality=4), args.repeat)
+
+        print(f"{name}:")
+        print(f"  default encoder   {default_time * 1000:9.1f} ms  {len(default_body):>12,} bytes")
+        print(f"  FastJSONResponse  {fast_time * 1000:9.1f} ms  {len(fast_body):>12,} bytes")
+        print(f"  + gzip (level 6)  {gzip_time * 1000:9.1f} ms  {len(gzip_body):>12,} bytes")
+        print(f"  + brotli (q 4)    {br_time * 1000:9.1f} ms  {len(br_body):>12,} bytes")
+        print(f"  speedup {default_time / fast_time:.1f}x, wire size {len(br_body) / len(default_body):.1%} of original")
+
+
+if __name__ == "__main__":
+    main()
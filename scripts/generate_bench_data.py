@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Generate reproducible synthetic ledger data for benchmarks and load tests.
+
+Creates N users, each with realistic ledgers (bank, cash, incomes, expenses, bank
+charges) under the default ledger groups, a handful of spending types and a
+configurable number of balanced transactions spread over a date range. Rows are
+written with batched bulk INSERTs, so millions of transaction items load in minutes.
+
+Generated users have emails of the form <prefix>-<n>@pesaplan-bench.example.com and the
+password "benchmark". Re-running with --reset removes the users for that prefix first.
+
+Usage:
+    python scripts/generate_bench_data.py --users 10 --transactions 100000
+    python scripts/generate_bench_data.py --prefix bench-large --users 1 --transactions 2000000 --reset
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+# Add server directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from core.security import get_password_hash
+from create_default_ledger_groups import create_default_ledger_groups
+from models.archive import ArchivedYear
+from models.finance import (
+    EntryType,
+    Ledger,
+    LedgerBalance,
+    LedgerGroup,
+    LedgerGroupCategory,
+    SpendingType,
+    Transaction,
+    TransactionItem,
+    TransactionType,
+)
+from models.reconciliation import BankStatement, StatementLine
+from models.user import User
+from services.archive import archive_path
+from services.fingerprints import transaction_fingerprint
+from services.ledger_balances import rebuild_ledger_balances
+
+BENCH_PASSWORD = "benchmark"
+
+LEDGER_NAMES = {
+    LedgerGroupCategory.BANK_ACCOUNTS: ["Equity Bank", "KCB Current", "M-Pesa"],
+    LedgerGroupCategory.CASH_ACCOUNTS: ["Cash in Hand"],
+    LedgerGroupCategory.INCOMES: ["Salary", "Consulting", "Interest Income", "Rental Income"],
+    LedgerGroupCategory.EXPENSES: [
+        "Rent",
+        "Groceries",
+        "Electricity",
+        "Water",
+        "Internet",
+        "Fuel",
+        "Matatu Fare",
+        "School Fees",
+        "Medical",
+        "Airtime",
+        "Eating Out",
+        "Clothing",
+        "Insurance",
+        "Gifts",
+        "Household Repairs",
+        "Subscriptions",
+    ],
+    LedgerGroupCategory.BANK_CHARGES: ["Bank Charges", "M-Pesa Charges"],
+}
+SPENDING_TYPES = ["Essential", "Discretionary", "Savings", "Family"]
+
+
+def email_for(prefix: str, n: int) -> str:
+    return f"{prefix}-{n}@pesaplan-bench.example.com"
+
+
+def delete_bench_users(db: Session, prefix: str) -> int:
+    """Remove all data for benchmark users with the given prefix."""
+    user_ids = db.scalars(select(User.id).where(User.email.like(f"{prefix}-%@pesaplan-bench.example.com"))).all()
+    if not user_ids:
+        return 0
+    # Imported bank statements and archived years (scripts/archive_years.py) refer to
+    # ledgers, transaction items and transactions, so they go first
+    statement_ids = select(BankStatement.id).where(BankStatement.user_id.in_(user_ids))
+    db.execute(delete(StatementLine).where(StatementLine.statement_id.in_(statement_ids)))
+    db.execute(delete(BankStatement).where(BankStatement.user_id.in_(user_ids)))
+    archive_files = db.scalars(select(ArchivedYear.file_name).where(ArchivedYear.user_id.in_(user_ids))).all()
+    db.execute(delete(ArchivedYear).where(ArchivedYear.user_id.in_(user_ids)))
+
+    transaction_ids = select(Transaction.id).where(Transaction.user_id.in_(user_ids))
+    db.execute(delete(TransactionItem).where(TransactionItem.transaction_id.in_(transaction_ids)))
+    db.execute(delete(Transaction).where(Transaction.user_id.in_(user_ids)))
+    db.execute(delete(LedgerBalance).where(LedgerBalance.user_id.in_(user_ids)))
+    db.execute(delete(Ledger).where(Ledger.user_id.in_(user_ids)))
+    db.execute(delete(SpendingType).where(SpendingType.user_id.in_(user_ids)))
+    db.execute(delete(User).where(User.id.in_(user_ids)))
+    db.commit()
+    for file_name in archive_files:
+        path = archive_path(file_name)
+        if os.path.exists(path):
+            os.remove(path)
+    return len(user_ids)
+
+
+def _group_ids_by_category(db: Session) -> Dict[LedgerGroupCategory, int]:
+    groups = {}
+    for group_id, category in db.execute(
+        select(LedgerGroup.id, LedgerGroup.category).where(LedgerGroup.is_active == True).order_by(LedgerGroup.id)
+    ):
+        groups.setdefault(category, group_id)
+    return groups
+
+
+def create_user_ledgers(db: Session, user_id: int, group_ids: Dict[LedgerGroupCategory, int]) -> Dict[str, List[int]]:
+    """Create spending types and ledgers for a user. Returns ledger ids by category value."""
+    spending_type_ids = db.scalars(
+        insert(SpendingType).returning(SpendingType.id, sort_by_parameter_order=True),
+        [{"user_id": user_id, "name": name} for name in SPENDING_TYPES],
+    ).all()
+
+    ledgers = {}
+    for category, names in LEDGER_NAMES.items():
+        rows = [
+            {
+                "user_id": user_id,
+                "name": name,
+                "ledger_group_id": group_ids[category],
+                "spending_type_id": spending_type_ids[i % len(spending_type_ids)]
+                if category == LedgerGroupCategory.EXPENSES
+                else None,
+            }
+            for i, name in enumerate(names)
+        ]
+        ledgers[category.value] = db.scalars(
+            insert(Ledger).returning(Ledger.id, sort_by_parameter_order=True), rows
+        ).all()
+    return ledgers
+
+
+def _amount(rng: random.Random, low: int, high: int) -> Decimal:
+    return Decimal(rng.randint(low * 100, high * 100)) / 100
+
+
+def generate_transaction(rng: random.Random, ledgers: Dict[str, List[int]]):
+    """Return (transaction_type, reference, items) for one realistic balanced transaction."""
+    banks = ledgers["bank_accounts"] + ledgers["cash_accounts"]
+    roll = rng.random()
+    if roll < 0.70:
+        # Everyday spending paid from a bank, M-Pesa or cash, sometimes with a charge
+        amount = _amount(rng, 50, 15000)
+        source = rng.choice(banks)
+        items = [(rng.choice(ledgers["expenses"]), EntryType.DEBIT, amount)]
+        if rng.random() < 0.3:
+            charge = _amount(rng, 5, 110)
+            items.append((rng.choice(ledgers["bank_charges"]), EntryType.DEBIT, charge))
+            amount += charge
+        items.append((source, EntryType.CREDIT, amount))
+        return TransactionType.MONEY_PAID, f"PV{rng.randint(1, 999999):06d}", items
+    if roll < 0.90:
+        amount = _amount(rng, 1000, 250000)
+        return (
+            TransactionType.MONEY_RECEIVED,
+            f"RV{rng.randint(1, 999999):06d}",
+            [
+                (rng.choice(ledgers["bank_accounts"]), EntryType.DEBIT, amount),
+                (rng.choice(ledgers["incomes"]), EntryType.CREDIT, amount),
+            ],
+        )
+    # Transfer between own accounts
+    amount = _amount(rng, 100, 50000)
+    source, target = rng.sample(banks, 2)
+    return (
+        TransactionType.JOURNAL,
+        f"JV{rng.randint(1, 999999):06d}",
+        [(target, EntryType.DEBIT, amount), (source, EntryType.CREDIT, amount)],
+    )
+
+
+def generate_transactions(
+    db: Session,
+    user_id: int,
+    ledgers: Dict[str, List[int]],
+    count: int,
+    rng: random.Random,
+    start_date: date,
+    end_date: date,
+    batch_size: int = 5000,
+    progress: bool = True,
+) -> int:
+    """Bulk insert count balanced transactions for a user. Returns the number of items written."""
+    span_days = (end_date - start_date).days
+    items_written = 0
+    for batch_start in range(0, count, batch_size):
+        batch = []
+        for _ in range(min(batch_size, count - batch_start)):
+            transaction_type, reference, items = generate_transaction(rng, ledgers)
+            transaction_date = start_date + timedelta(days=rng.randint(0, span_days))
+            batch.append((transaction_date, transaction_type, reference, items))
+
+        transaction_ids = db.scalars(
+            insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id": user_id,
+                    "transaction_date": transaction_date,
+                    "reference": reference,
+                    "transaction_type": transaction_type,
+                    "total_amount": sum(amount for _, entry_type, amount in items if entry_type == EntryType.DEBIT),
+                    "fingerprint": transaction_fingerprint(user_id, transaction_date, reference, items),
+                }
+                for transaction_date, transaction_type, reference, items in batch
+            ],
+        ).all()
+
+        item_rows = [
+            {"transaction_id": transaction_id, "ledger_id": ledger_id, "entry_type": entry_type, "amount": amount}
+            for transaction_id, (_, _, _, items) in zip(transaction_ids, batch)
+            for ledger_id, entry_type, amount in items
+        ]
+        db.execute(insert(TransactionItem), item_rows)
+        db.commit()
+        items_written += len(item_rows)
+
+        if progress:
+            done = batch_start + len(batch)
+            print(f"\r  user {user_id}: {done:,}/{count:,} transactions", end="", flush=True)
+    if progress:
+        print()
+    return items_written
+
+
+def generate_dataset(
+    db: Session,
+    prefix: str,
+    users: int,
+    transactions_per_user: int,
+    seed: int = 42,
+    start_date: Optional[date] = None,
+    years: int = 3,
+    batch_size: int = 5000,
+    progress: bool = True,
+) -> List[int]:
+    """Create benchmark users with ledgers and transactions. Returns the new user ids."""
+    create_default_ledger_groups(db)
+    group_ids = _group_ids_by_category(db)
+    start_date = start_date or date(date.today().year - years + 1, 1, 1)
+    end_date = date(start_date.year + years - 1, 12, 31)
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+
+    user_ids = []
+    for n in range(users):
+        rng = random.Random(f"{seed}-{prefix}-{n}")
+        user_id = db.scalar(
+            insert(User)
+            .values(email=email_for(prefix, n), first_name=f"Bench {n}", hashed_password=hashed_password)
+            .returning(User.id)
+        )
+        ledgers = create_user_ledgers(db, user_id, group_ids)
+        db.commit()
+        generate_transactions(
+            db, user_id, ledgers, transactions_per_user, rng, start_date, end_date, batch_size, progress
+        )
+        # Items were bulk-inserted around the API, so derive the running totals in one pass
+        rebuild_ledger_balances(db, [user_id])
+        db.commit()
+        user_ids.append(user_id)
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prefix", default="bench", help="Email prefix identifying this dataset")
+    parser.add_argument("--users", type=int, default=1, help="Number of users to create")
+    parser.add_argument("--transactions", type=int, default=10000, help="Transactions per user")
+    parser.add_argument("--years", type=int, default=3, help="Number of calendar years the data spans")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (same seed, same data)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Transactions per INSERT batch")
+    parser.add_argument("--reset", action="store_true", help="Delete existing users with this prefix first")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.reset:
+            removed = delete_bench_users(db, args.prefix)
+            print(f"✓ Removed {removed} existing '{args.prefix}' users")
+
+        started = time.perf_counter()
+        user_ids = generate_dataset(
+            db,
+            args.prefix,
+            args.users,
+            args.transactions,
+            seed=args.seed,
+            years=args.years,
+            batch_size=args.batch_size,
+        )
+        elapsed = time.perf_counter() - started
+        total = args.users * args.transactions
+        print(f"\n✓ Generated {total:,} transactions for users {user_ids} in {elapsed:.1f}s ({total / elapsed:,.0f}/s)")
+    except Exception as e:
+        print(f"Error: {e}")
+        db.rollback()
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
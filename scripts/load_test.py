@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+Load-test the API with concurrent mixed traffic and report latency percentiles per route.
+
+Virtual users log in as benchmark users (see scripts/generate_bench_data.py), then
+repeatedly pick a scenario from the configured mix:
+  - login:      POST /auth/login-json
+  - dashboard:  GET /auth/me, GET /accounts/, GET /transactions/?limit=20
+  - post:       POST /transactions/ (a two-line expense payment)
+  - report:     GET /reports/trial-balance or GET /reports/ledger for the current year
+
+By default requests are driven straight into the ASGI app in this process (no server,
+no network), which isolates application, pool and database behaviour. With --url the
+same scenarios run over HTTP/1.1 keep-alive connections against a running uvicorn or
+gunicorn, so worker counts and pool sizes can be compared.
+
+Reports p50/p95/p99/max latency, throughput and error rate per route template.
+
+Usage:
+    python scripts/load_test.py --concurrency 20 --duration 30
+    python scripts/load_test.py --url http://127.0.0.1:8000 --mix dashboard=6,post=2,report=2 --json out.json
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+import brotli
+
+# Add server directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+from generate_bench_data import BENCH_PASSWORD, email_for
+
+API_PREFIX = "/api/v1"
+
+MIXES = {
+    "default": {"login": 1, "dashboard": 5, "post": 2, "report": 2},
+    "read-heavy": {"login": 1, "dashboard": 8, "post": 0, "report": 1},
+    "write-heavy": {"login": 1, "dashboard": 2, "post": 6, "report": 1},
+    "reports": {"login": 0, "dashboard": 1, "post": 0, "report": 9},
+}
+
+
+class Response:
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        encoding = self.headers.get("content-encoding")
+        body = self.body
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "br":
+            body = brotli.decompress(body)
+        return json.loads(body)
+
+
+class ASGIClient:
+    """Call an ASGI app directly, one request per call."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, headers: Dict[str, str], body: bytes = b"") -> Response:
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+        request_sent = False
+        status = 500
+        response_headers: Dict[str, str] = {}
+        chunks: List[bytes] = []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # Block like a client that keeps the connection open
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers.update((k.decode().lower(), v.decode()) for k, v in message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return Response(status, response_headers, b"".join(chunks))
+
+    async def close(self):
+        pass
+
+
+class HTTPClient:
+    """Minimal HTTP/1.1 keep-alive client over asyncio streams (one connection per virtual user)."""
+
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        if parts.scheme != "http":
+            raise ValueError("Only http:// URLs are supported")
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.base_path = parts.path.rstrip("/")
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method: str, path: str, headers: Dict[str, str], body: bytes = b"") -> Response:
+        if self._writer is None:
+            await self._connect()
+        lines = [f"{method} {self.base_path}{path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        lines.extend(f"{k}: {v}" for k, v in headers.items())
+        lines.append(f"Content-Length: {len(body)}")
+        self._writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        try:
+            await self._writer.drain()
+            return await self._read_response()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            raise
+
+    async def _read_response(self) -> Response:
+        status_line = await self._reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding") == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                chunk = await self._reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            body = b"".join(chunks)
+        else:
+            body = await self._reader.readexactly(int(headers.get("content-length", 0)))
+
+        if headers.get("connection") == "close":
+            await self.close()
+        return Response(status, headers, body)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.status_counts: Dict[str, Dict[int, int]] = {}
+
+    def record(self, route: str, seconds: float, status: Optional[int]) -> None:
+        self.latencies.setdefault(route, []).append(seconds)
+        counts = self.status_counts.setdefault(route, {})
+        counts[status or 0] = counts.get(status or 0, 0) + 1
+        if status is None or status >= 400:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile: the smallest value with at least pct% of values at or below it."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct * len(sorted_values) / 100) - 1))
+    return sorted_values[index]
+
+
+class VirtualUser:
+    def __init__(self, client, stats: Stats, email: str, password: str, rng: random.Random, compressed: bool):
+        self.client = client
+        self.stats = stats
+        self.email = email
+        self.password = password
+        self.rng = rng
+        self.base_headers = {"Accept-Encoding": "gzip, br"} if compressed else {}
+        self.token: Optional[str] = None
+        self.bank_ids: List[int] = []
+        self.expense_ids: List[int] = []
+
+    async def call(self, route: str, method: str, path: str, payload=None, params=None) -> Optional[Response]:
+        headers = dict(self.base_headers)
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        body = b""
+        if payload is not None:
+            headers["Content-Type"] = "application/json"
+            body = json.dumps(payload).encode()
+        url = API_PREFIX + path + ("?" + urlencode(params) if params else "")
+
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers, body)
+        except Exception:
+            self.stats.record(route, time.perf_counter() - start, None)
+            return None
+        self.stats.record(route, time.perf_counter() - start, response.status)
+        return response
+
+    async def login(self) -> bool:
+        response = await self.call(
+            "POST /auth/login-json", "POST", "/auth/login-json", {"email": self.email, "password": self.password}
+        )
+        if response is None or response.status != 200:
+            return False
+        self.token = response.json()["access_token"]
+        return True
+
+    async def load_ledgers(self) -> None:
+        response = await self.call("GET /accounts/", "GET", "/accounts/")
+        if response is None or response.status != 200:
+            return
+        for ledger in response.json():
+            category = ledger["ledger_group"]["category"]
+            if category in ("bank_accounts", "cash_accounts"):
+                self.bank_ids.append(ledger["id"])
+            elif category == "expenses":
+                self.expense_ids.append(ledger["id"])
+
+    async def dashboard(self) -> None:
+        await self.call("GET /auth/me", "GET", "/auth/me")
+        await self.call("GET /accounts/", "GET", "/accounts/")
+        await self.call("GET /transactions/", "GET", "/transactions/", params={"limit": 20})
+
+    async def post(self) -> None:
+        if not self.bank_ids or not self.expense_ids:
+            return
+        amount = f"{self.rng.randint(100, 500000) / 100:.2f}"
+        await self.call(
+            "POST /transactions/",
+            "POST",
+            "/transactions/",
+            {
+                "transaction_date": date.today().isoformat(),
+                "reference": f"LOAD-{self.rng.randint(1, 999999):06d}",
+                "transaction_type": "MONEY_PAID",
+                "total_amount": amount,
+                "items": [
+                    {"ledger_id": self.rng.choice(self.expense_ids), "entry_type": "DEBIT", "amount": amount},
+                    {"ledger_id": self.rng.choice(self.bank_ids), "entry_type": "CREDIT", "amount": amount},
+                ],
+            },
+        )
+
+    async def report(self) -> None:
+        today = date.today()
+        params = {"start_date": date(today.year, 1, 1).isoformat(), "end_date": today.isoformat()}
+        if self.bank_ids and self.rng.random() < 0.5:
+            params["ledger_id"] = self.rng.choice(self.bank_ids)
+            await self.call("GET /reports/ledger", "GET", "/reports/ledger", params=params)
+        else:
+            await self.call("GET /reports/trial-balance", "GET", "/reports/trial-balance", params=params)
+
+    async def run(self, mix: Dict[str, int], deadline: float) -> None:
+        if not await self.login():
+            return
+        await self.load_ledgers()
+        scenarios = [name for name, weight in mix.items() if weight > 0]
+        weights = [mix[name] for name in scenarios]
+        while time.perf_counter() < deadline:
+            scenario = self.rng.choices(scenarios, weights)[0]
+            await getattr(self, scenario)()
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    if value in MIXES:
+        return MIXES[value]
+    mix = {name: 0 for name in MIXES["default"]}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in mix:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}' (choose from {', '.join(mix)})")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+class Lifespan:
+    """Run the app's lifespan startup/shutdown so in-process runs match a real server."""
+
+    def __init__(self, app):
+        self.app = app
+        self._messages: asyncio.Queue = asyncio.Queue()
+        self._events: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _send_event(self, message_type: str) -> None:
+        await self._messages.put({"type": f"lifespan.{message_type}"})
+        reply = await self._events.get()
+        if reply["type"].endswith(".failed"):
+            raise RuntimeError(f"Lifespan {message_type} failed: {reply.get('message', '')}")
+
+    async def startup(self) -> None:
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}}
+        self._task = asyncio.create_task(self.app(scope, self._messages.get, self._events.put))
+        await self._send_event("startup")
+
+    async def shutdown(self) -> None:
+        await self._send_event("shutdown")
+        await self._task
+
+
+async def run_load(args) -> Tuple[Stats, float]:
+    app = lifespan = None
+    if not args.url:
+        from main import app
+
+        lifespan = Lifespan(app)
+        await lifespan.startup()
+
+    stats = Stats()
+    users = []
+    for n in range(args.concurrency):
+        client = HTTPClient(args.url) if args.url else ASGIClient(app)
+        email = email_for(args.prefix, n % args.users)
+        users.append(VirtualUser(client, stats, email, args.password, random.Random(args.seed + n), args.compressed))
+
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(user.run(args.mix, deadline) for user in users))
+    elapsed = time.perf_counter() - start
+
+    for user in users:
+        await user.client.close()
+    if lifespan is not None:
+        await lifespan.shutdown()
+    return stats, elapsed
+
+
+def summarize(stats: Stats, elapsed: float) -> dict:
+    routes = {}
+    all_latencies = []
+    for route, latencies in sorted(stats.latencies.items()):
+        ordered = sorted(latencies)
+        all_latencies.extend(ordered)
+        routes[route] = {
+            "requests": len(ordered),
+            "errors": stats.errors.get(route, 0),
+            "error_rate": round(stats.errors.get(route, 0) / len(ordered), 4),
+            "throughput_rps": round(len(ordered) / elapsed, 2),
+            "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+            "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2),
+            "status_counts": {str(k): v for k, v in sorted(stats.status_counts[route].items())},
+        }
+    all_latencies.sort()
+    total_errors = sum(stats.errors.values())
+    return {
+        "duration_s": round(elapsed, 2),
+        "requests": len(all_latencies),
+        "errors": total_errors,
+        "error_rate": round(total_errors / len(all_latencies), 4) if all_latencies else 0.0,
+        "throughput_rps": round(len(all_latencies) / elapsed, 2),
+        "p50_ms": round(percentile(all_latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(all_latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(all_latencies, 99) * 1000, 2),
+        "routes": routes,
+    }
+
+
+def print_summary(summary: dict) -> None:
+    print(f"{'route':<30}{'reqs':>7}{'err%':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    print("-" * 88)
+    for route, r in summary["routes"].items():
+        print(
+            f"{route:<30}{r['requests']:>7}{r['error_rate'] * 100:>6.1f}%{r['throughput_rps']:>8.1f}"
+            f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}"
+        )
+    print("-" * 88)
+    print(
+        f"{'total':<30}{summary['requests']:>7}{summary['error_rate'] * 100:>6.1f}%{summary['throughput_rps']:>8.1f}"
+        f"{summary['p50_ms']:>9.1f}{summary['p95_ms']:>9.1f}{summary['p99_ms']:>9.1f}"
+    )
+    print(f"\nLatencies in ms over {summary['duration_s']}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server (default: drive the ASGI app in-process)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Number of virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=MIXES["default"],
+        help=f"Preset ({', '.join(MIXES)}) or weights such as dashboard=5,post=2,report=2,login=1",
+    )
+    parser.add_argument("--prefix", default="bench", help="Benchmark user email prefix")
+    parser.add_argument("--users", type=int, default=1, help="Benchmark users to spread virtual users over")
+    parser.add_argument("--password", default=BENCH_PASSWORD, help="Benchmark user password")
+    parser.add_argument("--compressed", action="store_true", help="Send Accept-Encoding: gzip, br")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for scenario choice")
+    parser.add_argument("--json", help="Also write the summary to this file")
+    args = parser.parse_args()
+
+    target = args.url or "in-process ASGI app"
+    print(f"Load test: {args.concurrency} virtual users for {args.duration}s against {target}")
+    print(f"Mix: {', '.join(f'{k}={v}' for k, v in args.mix.items())}\n")
+
+    stats, elapsed = asyncio.run(run_load(args))
+    if not stats.latencies:
+        print("No requests completed")
+        sys.exit(1)
+
+    summary = summarize(stats, elapsed)
+    summary["config"] = {
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "mix": args.mix,
+        "compressed": args.compressed,
+    }
+    print_summary(summary)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"✓ Summary written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Rebuild derived data from transactions and transaction_items, for all users or
+selected ones, after a bug fix or migration:
+  - ledger_balances: debit/credit running totals and reconciled totals
+  - transactions.fingerprint: duplicate detection (services/fingerprints.py)
+  - users.ledger_version is bumped so per-process ledger caches drop their copies
+
+Users are split into shards of roughly equal transaction counts, processed by a pool
+of worker processes with one database connection each. A worker makes one pass over
+a shard's items, streamed in transaction order with a server-side cursor, and derives
+the balances and fingerprints together. On PostgreSQL the results are written with
+COPY (balances straight into ledger_balances, fingerprints into a temporary table
+applied with one UPDATE ... FROM); other databases fall back to executemany. Each
+shard is rebuilt in its own database transaction, so a failed shard leaves its
+users' previous data in place and can be re-run with --users. The transaction starts
+by locking the shard's users rows (ledger_balances.lock_users), so it can run while
+the API is serving: postings for those users wait for the shard instead of having
+their balance increments overwritten by totals read before they committed.
+
+Progress (shards, users, items and items/s) is printed as shards finish.
+
+Usage:
+    python scripts/rebuild_derived.py
+    python scripts/rebuild_derived.py --workers 8 --only balances
+    python scripts/rebuild_derived.py --users 12 34
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Add server directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, bindparam, create_engine, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.money import cents_expression, to_decimal
+from models.finance import EntryType, LedgerBalance, Transaction, TransactionItem
+from models.reconciliation import BankStatement, StatementLine
+from models.user import User
+from services.fingerprints import fingerprint_lines, store_fingerprints
+from services.ledger_balances import lock_users
+
+DERIVED = ("balances", "fingerprints")
+
+# Rows fetched per round trip from the server-side cursor
+STREAM_BATCH = 20000
+
+# Fingerprints buffered before each COPY into the temporary table
+COPY_BATCH = 50000
+
+_SHARD_ITEMS = (
+    select(
+        Transaction.id,
+        Transaction.user_id,
+        Transaction.transaction_date,
+        Transaction.reference,
+        TransactionItem.ledger_id,
+        TransactionItem.entry_type,
+        cents_expression(TransactionItem.amount),
+    )
+    # Outer join: a transaction without items still gets a fingerprint
+    .outerjoin(TransactionItem, TransactionItem.transaction_id == Transaction.id)
+    .where(Transaction.user_id.in_(bindparam("user_ids", expanding=True)))
+    .order_by(Transaction.id)
+)
+
+_SHARD_RECONCILED = (
+    select(StatementLine.ledger_id, cents_expression(func.sum(StatementLine.amount)))
+    .join(BankStatement, BankStatement.id == StatementLine.statement_id)
+    .where(BankStatement.user_id.in_(bindparam("user_ids", expanding=True)), StatementLine.matched_item_id.is_not(None))
+    .group_by(StatementLine.ledger_id)
+)
+
+# Per-shard staging table for fingerprints written with COPY (PostgreSQL only)
+_STAGED_FINGERPRINTS = Table(
+    "rebuild_fingerprints",
+    MetaData(),
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("fingerprint", String(32)),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+# Worker process state: one engine holding a single connection
+_engine = None
+
+
+def _init_worker(database_url: str) -> None:
+    global _engine
+    _engine = create_engine(database_url, pool_size=1, max_overflow=0)
+
+
+class _Copier:
+    """Writes rows with COPY FROM STDIN on psycopg 2 or 3, or executemany elsewhere."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.driver = db.get_bind().dialect.driver
+        self.copy = self.driver in ("psycopg2", "psycopg")
+
+    def rows(self, table: Table, columns: Sequence[str], rows: List[tuple]) -> None:
+        if not rows:
+            return
+        if not self.copy:
+            self.db.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+            return
+        sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN"
+        cursor = self.db.connection().connection.cursor()
+        try:
+            if self.driver == "psycopg2":
+                buffer = io.StringIO("".join("\t".join(map(str, row)) + "\n" for row in rows))
+                cursor.copy_expert(sql, buffer)
+            else:
+                with cursor.copy(sql) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+        finally:
+            cursor.close()
+
+
+def _write_fingerprints(db: Session, copier: _Copier, rows: List[Tuple[int, str]]) -> None:
+    if not rows:
+        return
+    if copier.copy:
+        copier.rows(_STAGED_FINGERPRINTS, ("id", "fingerprint"), rows)
+    else:
+        store_fingerprints(db, rows)
+    rows.clear()
+
+
+def rebuild_shard(user_ids: List[int], derived: Sequence[str]) -> Tuple[int, int, int, float]:
+    """Rebuild one shard in one database transaction; returns (users, transactions, items, seconds)."""
+    started = time.perf_counter()
+    transactions = items = 0
+    with Session(_engine) as db:
+        lock_users(db, user_ids)
+        copier = _Copier(db)
+        fingerprinting = "fingerprints" in derived
+        if fingerprinting and copier.copy:
+            _STAGED_FINGERPRINTS.create(db.connection())
+
+        # ledger_id -> [user_id, debit cents, credit cents]
+        balances: Dict[int, List[int]] = {}
+        pending_fingerprints: List[Tuple[int, str]] = []
+        # Fallback writes must not interleave with the open read cursor
+        flush_while_reading = copier.copy
+
+        current_id = None
+        current = None
+        lines: Dict[Tuple[int, str], int] = {}
+        stream = db.execute(
+            _SHARD_ITEMS,
+            {"user_ids": user_ids},
+            execution_options={"stream_results": True, "yield_per": STREAM_BATCH},
+        )
+        for transaction_id, user_id, transaction_date, reference, ledger_id, entry_type, cents in stream:
+            if transaction_id != current_id:
+                if fingerprinting and current is not None:
+                    pending_fingerprints.append((current_id, fingerprint_lines(*current, lines)))
+                    if flush_while_reading and len(pending_fingerprints) >= COPY_BATCH:
+                        _write_fingerprints(db, copier, pending_fingerprints)
+                transactions += 1
+                current_id, current, lines = transaction_id, (user_id, transaction_date, reference), {}
+            if ledger_id is None:
+                continue
+
+            items += 1
+            totals = balances.get(ledger_id)
+            if totals is None:
+                totals = balances[ledger_id] = [user_id, 0, 0]
+            totals[1 if entry_type == EntryType.DEBIT else 2] += cents
+            if fingerprinting:
+                key = (ledger_id, EntryType(entry_type).value)
+                lines[key] = lines.get(key, 0) + cents
+        if fingerprinting and current is not None:
+            pending_fingerprints.append((current_id, fingerprint_lines(*current, lines)))
+
+        if fingerprinting:
+            _write_fingerprints(db, copier, pending_fingerprints)
+            if copier.copy:
+                staged = _STAGED_FINGERPRINTS.c
+                db.execute(
+                    update(Transaction.__table__)
+                    .where(Transaction.id == staged.id, Transaction.fingerprint.is_distinct_from(staged.fingerprint))
+                    # Derived data: keep updated_at for real edits
+                    .values(fingerprint=staged.fingerprint, updated_at=Transaction.updated_at)
+                )
+
+        if "balances" in derived:
+            reconciled = dict(db.execute(_SHARD_RECONCILED, {"user_ids": user_ids}).all())
+            db.execute(delete(LedgerBalance).where(LedgerBalance.user_id.in_(user_ids)))
+            copier.rows(
+                LedgerBalance.__table__,
+                ("ledger_id", "user_id", "debit_total", "credit_total", "reconciled_total"),
+                [
+                    (ledger_id, user_id, to_decimal(debit), to_decimal(credit), to_decimal(reconciled.get(ledger_id, 0)))
+                    for ledger_id, (user_id, debit, credit) in sorted(balances.items())
+                ],
+            )
+
+        db.execute(
+            update(User)
+            .where(User.id.in_(user_ids))
+            .values(ledger_version=User.ledger_version + 1, updated_at=User.updated_at),
+            execution_options={"synchronize_session": False},
+        )
+        db.commit()
+    return len(user_ids), transactions, items, time.perf_counter() - started
+
+
+def plan_shards(db: Session, user_ids: Optional[Sequence[int]], workers: int) -> List[List[int]]:
+    """
+    Split users into shards of about equal transaction counts, largest first, with
+    several shards per worker so one heavy user does not leave the others idle.
+    """
+    counts = select(User.id, func.count(Transaction.id)).outerjoin(Transaction, Transaction.user_id == User.id)
+    if user_ids:
+        counts = counts.where(User.id.in_(user_ids))
+    users = db.execute(counts.group_by(User.id)).all()
+    users.sort(key=lambda user: (-user[1], user[0]))
+
+    target = max(1, sum(count for _, count in users) // (workers * 4))
+    shards: List[List[int]] = []
+    shard: List[int] = []
+    shard_count = 0
+    for user_id, count in users:
+        shard.append(user_id)
+        shard_count += count
+        if shard_count >= target:
+            shards.append(shard)
+            shard, shard_count = [], 0
+    if shard:
+        shards.append(shard)
+    return shards
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", help="Only these user ids (default: all users)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Worker processes")
+    parser.add_argument("--only", choices=DERIVED, action="append", help="Rebuild only this (repeatable)")
+    args = parser.parse_args()
+    derived = tuple(args.only or DERIVED)
+
+    engine = create_engine(settings.DATABASE_URL)
+    with Session(engine) as db:
+        shards = plan_shards(db, args.users, args.workers)
+    engine.dispose()
+    total_users = sum(len(shard) for shard in shards)
+    print(f"Rebuilding {', '.join(derived)} for {total_users:,} users in {len(shards)} shards on {args.workers} workers")
+
+    started = time.perf_counter()
+    done_users = done_transactions = done_items = done_shards = 0
+    failed = []
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(settings.DATABASE_URL,),
+    ) as pool:
+        futures = {pool.submit(rebuild_shard, shard, derived): shard for shard in shards}
+        for future in as_completed(futures):
+            done_shards += 1
+            try:
+                users, transactions, items, _ = future.result()
+            except Exception as e:
+                failed.append(futures[future])
+                print(f"\n✗ Shard of users {futures[future]} failed: {e}")
+                continue
+            done_users += users
+            done_transactions += transactions
+            done_items += items
+            elapsed = time.perf_counter() - started
+            print(
+                f"\r  {done_shards}/{len(shards)} shards, {done_users:,}/{total_users:,} users, "
+                f"{done_items:,} items ({done_items / elapsed:,.0f} items/s)",
+                end="",
+                flush=True,
+            )
+    print()
+
+    elapsed = time.perf_counter() - started
+    print(f"✓ Rebuilt {done_users:,} users, {done_transactions:,} transactions, {done_items:,} items in {elapsed:.1f}s")
+    if failed:
+        print("Re-run the failed shards with --users " + " ".join(str(u) for shard in failed for u in shard))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,12 @@
 """
 Database reset script - Drops and recreates the database.
 This script connects to PostgreSQL and recreates the database from scratch.
+
+With --from-template the database is cloned from a migrated and seeded template
+(built on first use, see server/tests/database.py), so it is ready to use immediately.
 """
 
+import argparse
 import sys
 import os
 from urllib.parse import urlparse, unquote
@@ -107,8 +111,28 @@ def create_database(conn, db_name):
         sys.exit(1)
 
 
+def create_database_from_template(db_name):
+    """Clone the database from the migrated and seeded template, building it if needed."""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+    from core.config import settings
+    from tests.database import TemplateDatabase
+    from create_default_ledger_groups import create_default_ledger_groups
+
+    template = TemplateDatabase(settings.DATABASE_URL, seeds=[create_default_ledger_groups])
+    template.clone(db_name)
+    print(f"✓ Created database '{db_name}' from template '{template.template_name}'")
+
+
 def main():
     """Main function to reset the database."""
+    parser = argparse.ArgumentParser(description="Drop and recreate the database.")
+    parser.add_argument(
+        "--from-template",
+        action="store_true",
+        help="Clone a migrated database with default ledger groups instead of creating an empty one",
+    )
+    args = parser.parse_args()
+
     print("Resetting database...")
 
     # Change to project root directory to load .env file
@@ -132,7 +156,10 @@ def main():
         drop_database(conn, db_name)
 
         # Create database
-        create_database(conn, db_name)
+        if args.from_template:
+            create_database_from_template(db_name)
+        else:
+            create_database(conn, db_name)
 
         print(f"\n✓ Database '{db_name}' has been reset successfully!")
 
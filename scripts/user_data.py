@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Export one user's spending types, ledgers and transactions to a gzip-compressed NDJSON
+file, or import such a file into another (empty) account, on this instance or another
+(see services/user_export.py; the same format as GET/POST /api/v1/data/export|import).
+
+Exports stream from a server-side cursor and imports insert in batches, so memory
+stays flat for users with millions of rows. An import is one database transaction:
+it loads completely or not at all.
+
+Usage:
+    python scripts/user_data.py export --email jane@example.com -o jane.ndjson.gz
+    python scripts/user_data.py import --email jane@example.com jane.ndjson.gz
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import time
+
+# Add server directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+from sqlalchemy import select
+
+from core.database import SessionLocal
+from models.user import User
+from services.user_export import ExportFormatError, export_user, import_user
+
+
+def _user_id(db, email: str) -> int:
+    user_id = db.scalar(select(User.id).where(User.email == email))
+    if user_id is None:
+        print(f"✗ No user with email {email}")
+        sys.exit(1)
+    return user_id
+
+
+def export_command(db, args) -> None:
+    user_id = _user_id(db, args.email)
+    started = time.perf_counter()
+    with open(args.output, "wb") as out:
+        for chunk in export_user(db, user_id):
+            out.write(chunk)
+    size = os.path.getsize(args.output)
+    print(f"✓ Exported user {user_id} to {args.output} ({size / 1024:,.0f} KiB) in {time.perf_counter() - started:.1f}s")
+
+
+def import_command(db, args) -> None:
+    user_id = _user_id(db, args.email)
+    started = time.perf_counter()
+    try:
+        with gzip.open(args.file, "rb") as lines:
+            summary = import_user(db, user_id, lines)
+    except (ExportFormatError, OSError, EOFError) as e:
+        db.rollback()
+        print(f"✗ {args.file}: {e}")
+        sys.exit(1)
+    db.commit()
+    print(
+        f"✓ Imported {summary['spending_types']:,} spending types, {summary['ledgers']:,} ledgers, "
+        f"{summary['transactions']:,} transactions and {summary['items']:,} items into user {user_id} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    if summary["ledger_groups_created"]:
+        print(f"  Created {summary['ledger_groups_created']} ledger groups missing on this instance")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Write a user's data to a file")
+    export_parser.add_argument("--email", required=True, help="User to export")
+    export_parser.add_argument("-o", "--output", required=True, help="Output file (.ndjson.gz)")
+    import_parser = commands.add_parser("import", help="Load a file into an account without ledgers or transactions")
+    import_parser.add_argument("--email", required=True, help="User to import into")
+    import_parser.add_argument("file", help="File written by export")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "export":
+            export_command(db, args)
+        else:
+            import_command(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Verify ledger invariants for all users (or selected ones) and write a JSON report.
+
+Checks, each one set-based SQL per shard of users (amounts compared in cents):
+  unbalanced_transaction    debits != credits within a transaction
+  total_amount_mismatch     transactions.total_amount != sum of its debit items
+  empty_transaction         a transaction with no items
+  foreign_ledger_item       an item on a ledger that belongs to another user
+  inactive_ledger_item      an item on a deleted (inactive) ledger; a warning, since
+                            ledgers can be deleted after they were posted to
+  trial_balance_not_zero    a user's debits != credits over all their postings
+  ledger_balance_drift      ledger_balances (running or reconciled totals) differs
+                            from the items; fix with scripts/rebuild_derived.py
+
+Users are split into shards of about equal transaction counts (the same planner as
+rebuild_derived.py) and checked by a pool of worker processes, each with one
+database connection and read-only queries, so it can run against a replica with
+--replica. On PostgreSQL each shard is checked in one read-only REPEATABLE READ
+transaction, so every check of a shard sees the same snapshot while the API is
+posting. Progress goes to stderr; the report goes to --output or stdout.
+
+Exit status: 0 when there are no errors, 1 when there are (warnings count as errors
+with --strict), 2 when a shard could not be checked.
+
+Usage:
+    python scripts/verify_ledger_integrity.py --output integrity.json
+    python scripts/verify_ledger_integrity.py --users 12 34 --workers 2
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+# Add server directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+from sqlalchemy import bindparam, case, create_engine, func, or_, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.money import cents_expression, to_decimal
+from models.finance import EntryType, Ledger, LedgerBalance, Transaction, TransactionItem
+from models.reconciliation import StatementLine
+from rebuild_derived import plan_shards
+
+CHECKS = {
+    "unbalanced_transaction": "error",
+    "total_amount_mismatch": "error",
+    "empty_transaction": "error",
+    "foreign_ledger_item": "error",
+    "inactive_ledger_item": "warning",
+    "trial_balance_not_zero": "error",
+    "ledger_balance_drift": "error",
+}
+
+_SHARD_USERS = bindparam("user_ids", expanding=True)
+_ITEM_CENTS = cents_expression(TransactionItem.amount)
+_DEBIT_CENTS = func.coalesce(func.sum(case((TransactionItem.entry_type == EntryType.DEBIT, _ITEM_CENTS), else_=0)), 0)
+_CREDIT_CENTS = func.coalesce(func.sum(case((TransactionItem.entry_type == EntryType.CREDIT, _ITEM_CENTS), else_=0)), 0)
+
+_transaction_sums = (
+    select(
+        TransactionItem.transaction_id,
+        _DEBIT_CENTS.label("debit"),
+        _CREDIT_CENTS.label("credit"),
+        func.count().label("item_count"),
+    )
+    .join(Transaction, Transaction.id == TransactionItem.transaction_id)
+    .where(Transaction.user_id.in_(_SHARD_USERS))
+    .group_by(TransactionItem.transaction_id)
+    .subquery()
+)
+_debit = func.coalesce(_transaction_sums.c.debit, 0)
+_credit = func.coalesce(_transaction_sums.c.credit, 0)
+_total = cents_expression(Transaction.total_amount)
+
+# Transactions breaking any of the per-transaction invariants
+_BAD_TRANSACTIONS = (
+    select(
+        Transaction.id,
+        Transaction.user_id,
+        _total,
+        _debit,
+        _credit,
+        func.coalesce(_transaction_sums.c.item_count, 0),
+    )
+    .outerjoin(_transaction_sums, _transaction_sums.c.transaction_id == Transaction.id)
+    .where(
+        Transaction.user_id.in_(_SHARD_USERS),
+        or_(_debit != _credit, _total != _debit, _transaction_sums.c.item_count.is_(None)),
+    )
+    .order_by(Transaction.id)
+)
+
+# Items on another user's ledger or on an inactive one
+_BAD_ITEMS = (
+    select(
+        TransactionItem.id,
+        TransactionItem.transaction_id,
+        Transaction.user_id,
+        TransactionItem.ledger_id,
+        Ledger.user_id,
+        Ledger.is_active,
+    )
+    .join(Transaction, Transaction.id == TransactionItem.transaction_id)
+    .join(Ledger, Ledger.id == TransactionItem.ledger_id)
+    .where(
+        Transaction.user_id.in_(_SHARD_USERS),
+        or_(Ledger.user_id != Transaction.user_id, Ledger.is_active == False),
+    )
+    .order_by(TransactionItem.id)
+)
+
+_UNBALANCED_USERS = (
+    select(Transaction.user_id, _DEBIT_CENTS, _CREDIT_CENTS)
+    .join(TransactionItem, TransactionItem.transaction_id == Transaction.id)
+    .where(Transaction.user_id.in_(_SHARD_USERS))
+    .group_by(Transaction.user_id)
+    .having(_DEBIT_CENTS != _CREDIT_CENTS)
+)
+
+_LEDGER_SUMS = (
+    select(TransactionItem.ledger_id, _DEBIT_CENTS, _CREDIT_CENTS)
+    .join(Transaction, Transaction.id == TransactionItem.transaction_id)
+    .where(Transaction.user_id.in_(_SHARD_USERS))
+    .group_by(TransactionItem.ledger_id)
+)
+
+_LEDGER_RECONCILED = (
+    select(StatementLine.ledger_id, func.sum(cents_expression(StatementLine.amount)))
+    .join(Ledger, Ledger.id == StatementLine.ledger_id)
+    .where(Ledger.user_id.in_(_SHARD_USERS), StatementLine.matched_item_id.is_not(None))
+    .group_by(StatementLine.ledger_id)
+)
+
+_STORED_BALANCES = select(
+    LedgerBalance.ledger_id,
+    LedgerBalance.user_id,
+    cents_expression(LedgerBalance.debit_total),
+    cents_expression(LedgerBalance.credit_total),
+    cents_expression(LedgerBalance.reconciled_total),
+).where(LedgerBalance.user_id.in_(_SHARD_USERS))
+
+# Worker process state: one engine holding a single connection
+_engine = None
+
+
+def _init_worker(database_url: str) -> None:
+    global _engine
+    _engine = create_engine(database_url, pool_size=1, max_overflow=0)
+    if _engine.dialect.name == "postgresql":
+        # Each shard's checks run in one read-only REPEATABLE READ transaction, so they all
+        # see the same snapshot: a posting committing between two queries cannot show up
+        # as drift between the items and ledger_balances
+        _engine = _engine.execution_options(isolation_level="REPEATABLE READ", postgresql_readonly=True)
+
+
+def _amount(cents: int) -> str:
+    return str(to_decimal(cents))
+
+
+def verify_shard(user_ids: List[int]) -> List[dict]:
+    """Run every check for one shard of users; returns its violations."""
+    violations = []
+    params = {"user_ids": user_ids}
+    with Session(_engine) as db:
+        for transaction_id, user_id, total, debit, credit, items in db.execute(_BAD_TRANSACTIONS, params):
+            where = {"user_id": user_id, "transaction_id": transaction_id}
+            if not items:
+                violations.append({"check": "empty_transaction", **where})
+                continue
+            if debit != credit:
+                violations.append(
+                    {"check": "unbalanced_transaction", **where, "debit": _amount(debit), "credit": _amount(credit)}
+                )
+            if total != debit:
+                violations.append(
+                    {"check": "total_amount_mismatch", **where, "total_amount": _amount(total), "debit": _amount(debit)}
+                )
+
+        for item_id, transaction_id, user_id, ledger_id, ledger_user_id, ledger_active in db.execute(_BAD_ITEMS, params):
+            where = {"user_id": user_id, "transaction_id": transaction_id, "item_id": item_id, "ledger_id": ledger_id}
+            if ledger_user_id != user_id:
+                violations.append({"check": "foreign_ledger_item", **where, "ledger_user_id": ledger_user_id})
+            if not ledger_active:
+                violations.append({"check": "inactive_ledger_item", **where})
+
+        for user_id, debit, credit in db.execute(_UNBALANCED_USERS, params):
+            violations.append(
+                {"check": "trial_balance_not_zero", "user_id": user_id, "debit": _amount(debit), "credit": _amount(credit)}
+            )
+
+        # Few rows per user (one per ledger), so compared here rather than with a FULL OUTER JOIN
+        actual: Dict[int, Tuple[int, int, int]] = {
+            ledger_id: (debit, credit, 0) for ledger_id, debit, credit in db.execute(_LEDGER_SUMS, params)
+        }
+        for ledger_id, reconciled in db.execute(_LEDGER_RECONCILED, params):
+            debit, credit, _ = actual.get(ledger_id, (0, 0, 0))
+            actual[ledger_id] = (debit, credit, reconciled)
+        stored = {row[0]: row for row in db.execute(_STORED_BALANCES, params)}
+        unstored = set(actual) - set(stored)
+        ledger_users = (
+            dict(db.execute(select(Ledger.id, Ledger.user_id).where(Ledger.id.in_(unstored))).all()) if unstored else {}
+        )
+        for ledger_id in sorted(set(actual) | set(stored)):
+            expected = actual.get(ledger_id, (0, 0, 0))
+            row = stored.get(ledger_id)
+            found = tuple(row[2:]) if row is not None else (0, 0, 0)
+            if expected != found:
+                violations.append(
+                    {
+                        "check": "ledger_balance_drift",
+                        "user_id": row[1] if row is not None else ledger_users.get(ledger_id),
+                        "ledger_id": ledger_id,
+                        "expected": dict(zip(("debit", "credit", "reconciled"), map(_amount, expected))),
+                        "stored": dict(zip(("debit", "credit", "reconciled"), map(_amount, found))),
+                    }
+                )
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", help="Only these user ids (default: all users)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Worker processes")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--replica", action="store_true", help="Read from PESA_PLAN_REPLICA_DATABASE_URL")
+    parser.add_argument("--strict", action="store_true", help="Fail on warnings too")
+    parser.add_argument("--max-violations", type=int, default=1000, help="Violations listed per check (all are counted)")
+    args = parser.parse_args()
+
+    database_url = settings.REPLICA_DATABASE_URL if args.replica else settings.DATABASE_URL
+    if not database_url:
+        parser.error("PESA_PLAN_REPLICA_DATABASE_URL is not set")
+
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    engine = create_engine(database_url)
+    with Session(engine) as db:
+        shards = plan_shards(db, args.users, args.workers)
+    engine.dispose()
+    total_users = sum(len(shard) for shard in shards)
+    print(f"Verifying {total_users:,} users in {len(shards)} shards on {args.workers} workers", file=sys.stderr)
+
+    counts = {check: 0 for check in CHECKS}
+    listed: List[dict] = []
+    failed_shards = []
+    done_users = 0
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(database_url,),
+    ) as pool:
+        futures = {pool.submit(verify_shard, shard): shard for shard in shards}
+        for done_shards, future in enumerate(as_completed(futures), start=1):
+            shard = futures[future]
+            try:
+                violations = future.result()
+            except Exception as e:
+                failed_shards.append({"user_ids": shard, "error": str(e)})
+                print(f"\n✗ Shard of users {shard} failed: {e}", file=sys.stderr)
+                continue
+            done_users += len(shard)
+            for violation in violations:
+                counts[violation["check"]] += 1
+                if counts[violation["check"]] <= args.max_violations:
+                    listed.append({**violation, "severity": CHECKS[violation["check"]]})
+            print(f"\r  {done_shards}/{len(shards)} shards, {done_users:,}/{total_users:,} users", end="", file=sys.stderr)
+    print(file=sys.stderr)
+
+    errors = sum(count for check, count in counts.items() if CHECKS[check] == "error")
+    warnings = sum(count for check, count in counts.items() if CHECKS[check] == "warning")
+    listed.sort(key=lambda violation: (violation["check"], violation.get("user_id") or 0, violation.get("transaction_id") or 0))
+    report = {
+        "started_at": started_at.isoformat(),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "users_checked": done_users,
+        "ok": errors == 0 and not failed_shards and (warnings == 0 or not args.strict),
+        "errors": errors,
+        "warnings": warnings,
+        "checks": {check: {"severity": severity, "violations": counts[check]} for check, severity in CHECKS.items()},
+        "failed_shards": failed_shards,
+        "violations": listed,
+    }
+
+    body = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(body + "\n")
+    else:
+        print(body)
+    print(
+        f"{'✓' if report['ok'] else '✗'} {done_users:,} users checked in {report['elapsed_seconds']}s: "
+        f"{errors} errors, {warnings} warnings",
+        file=sys.stderr,
+    )
+    if failed_shards:
+        sys.exit(2)
+    if not report["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
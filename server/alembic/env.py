@@ -16,7 +16,9 @@ from core.config import settings
 
 # Import all models here so Alembic can detect them
 from models.user import User
-from models.finance import ParentLedgerGroup, LedgerGroup, Ledger, SpendingType, Transaction, TransactionItem
+from models.finance import ParentLedgerGroup, LedgerGroup, Ledger, SpendingType, Transaction, TransactionItem, LedgerBalance
+from models.reconciliation import BankStatement, StatementLine
+from models.archive import ArchivedYear
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -27,9 +29,9 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
-# Set the database URL from our settings
+# Set the database URL from our settings unless the caller (e.g. tests/database.py) passed one
 # Use attributes to bypass ConfigParser interpolation issues with special characters
-config.attributes["sqlalchemy.url"] = settings.DATABASE_URL
+config.attributes.setdefault("sqlalchemy.url", settings.DATABASE_URL)
 
 # add your model's MetaData object here
 # for 'autogenerate' support
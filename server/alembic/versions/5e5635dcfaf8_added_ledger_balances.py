@@ -0,0 +1,51 @@
+"""added ledger_balances running totals
+
+Revision ID: 5e5635dcfaf8
+Revises: cf38297d2aa3
+Create Date: 2026-10-19 10:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e5635dcfaf8'
+down_revision: Union[str, None] = 'cf38297d2aa3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ledger_balances',
+    sa.Column('ledger_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('debit_total', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('credit_total', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['ledger_id'], ['ledgers.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('ledger_id')
+    )
+    op.create_index(op.f('ix_ledger_balances_user_id'), 'ledger_balances', ['user_id'], unique=False)
+
+    # Backfill from existing postings
+    op.execute(
+        """
+        INSERT INTO ledger_balances (ledger_id, user_id, debit_total, credit_total)
+        SELECT ti.ledger_id,
+               t.user_id,
+               COALESCE(SUM(CASE WHEN ti.entry_type = 'DEBIT' THEN ti.amount END), 0),
+               COALESCE(SUM(CASE WHEN ti.entry_type = 'CREDIT' THEN ti.amount END), 0)
+        FROM transaction_items ti
+        JOIN transactions t ON t.id = ti.transaction_id
+        GROUP BY ti.ledger_id, t.user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ledger_balances_user_id'), table_name='ledger_balances')
+    op.drop_table('ledger_balances')
@@ -0,0 +1,31 @@
+"""added fingerprint to transactions
+
+Revision ID: 6b1f0d84c2a7
+Revises: a3d7c2e9b514
+Create Date: 2026-10-19 17:25:10.640281
+
+Existing transactions are left without a fingerprint; run
+scripts/backfill_fingerprints.py after upgrading.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b1f0d84c2a7'
+down_revision: Union[str, None] = 'a3d7c2e9b514'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('transactions', sa.Column('fingerprint', sa.String(length=32), nullable=True))
+    op.create_index('ix_transactions_user_id_fingerprint', 'transactions', ['user_id', 'fingerprint'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_user_id_fingerprint', table_name='transactions')
+    op.drop_column('transactions', 'fingerprint')
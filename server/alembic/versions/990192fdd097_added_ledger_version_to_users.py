@@ -0,0 +1,26 @@
+"""added ledger_version to users
+
+Revision ID: 990192fdd097
+Revises: 5e5635dcfaf8
+Create Date: 2026-10-19 13:41:07.215934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '990192fdd097'
+down_revision: Union[str, None] = '5e5635dcfaf8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('ledger_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'ledger_version')
@@ -0,0 +1,65 @@
+"""added bank statements and reconciliation
+
+Revision ID: a3d7c2e9b514
+Revises: 990192fdd097
+Create Date: 2026-10-19 16:02:48.530127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d7c2e9b514'
+down_revision: Union[str, None] = '990192fdd097'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('bank_statements',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('ledger_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['ledger_id'], ['ledgers.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_bank_statements_id'), 'bank_statements', ['id'], unique=False)
+    op.create_index(op.f('ix_bank_statements_ledger_id'), 'bank_statements', ['ledger_id'], unique=False)
+    op.create_index(op.f('ix_bank_statements_user_id'), 'bank_statements', ['user_id'], unique=False)
+    op.create_table('statement_lines',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('statement_id', sa.Integer(), nullable=False),
+    sa.Column('ledger_id', sa.Integer(), nullable=False),
+    sa.Column('line_date', sa.Date(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('reference', sa.String(), nullable=True),
+    sa.Column('amount', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('matched_item_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['ledger_id'], ['ledgers.id'], ),
+    sa.ForeignKeyConstraint(['matched_item_id'], ['transaction_items.id'], ),
+    sa.ForeignKeyConstraint(['statement_id'], ['bank_statements.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('matched_item_id')
+    )
+    op.create_index(op.f('ix_statement_lines_id'), 'statement_lines', ['id'], unique=False)
+    op.create_index(op.f('ix_statement_lines_ledger_id'), 'statement_lines', ['ledger_id'], unique=False)
+    op.create_index(op.f('ix_statement_lines_statement_id'), 'statement_lines', ['statement_id'], unique=False)
+    op.add_column('ledger_balances', sa.Column('reconciled_total', sa.Numeric(precision=18, scale=2), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('ledger_balances', 'reconciled_total')
+    op.drop_index(op.f('ix_statement_lines_statement_id'), table_name='statement_lines')
+    op.drop_index(op.f('ix_statement_lines_ledger_id'), table_name='statement_lines')
+    op.drop_index(op.f('ix_statement_lines_id'), table_name='statement_lines')
+    op.drop_table('statement_lines')
+    op.drop_index(op.f('ix_bank_statements_user_id'), table_name='bank_statements')
+    op.drop_index(op.f('ix_bank_statements_ledger_id'), table_name='bank_statements')
+    op.drop_index(op.f('ix_bank_statements_id'), table_name='bank_statements')
+    op.drop_table('bank_statements')
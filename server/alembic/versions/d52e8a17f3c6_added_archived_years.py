@@ -0,0 +1,43 @@
+"""added archived years
+
+Revision ID: d52e8a17f3c6
+Revises: 6b1f0d84c2a7
+Create Date: 2026-10-19 18:40:12.118904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd52e8a17f3c6'
+down_revision: Union[str, None] = '6b1f0d84c2a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('archived_years',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('file_name', sa.String(), nullable=False),
+    sa.Column('transaction_count', sa.Integer(), nullable=False),
+    sa.Column('item_count', sa.Integer(), nullable=False),
+    sa.Column('summary_transaction_id', sa.Integer(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['summary_transaction_id'], ['transactions.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'year', name='uq_archived_years_user_id_year')
+    )
+    op.create_index(op.f('ix_archived_years_id'), 'archived_years', ['id'], unique=False)
+    op.create_index(op.f('ix_archived_years_user_id'), 'archived_years', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_archived_years_user_id'), table_name='archived_years')
+    op.drop_index(op.f('ix_archived_years_id'), table_name='archived_years')
+    op.drop_table('archived_years')
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from api.v1.endpoints import test, auth, accounts, transactions, reports, feedback
+from api.v1.endpoints import test, auth, accounts, transactions, reports, reconciliation, data, feedback
 
 api_router = APIRouter()
 api_router.include_router(test.router, prefix="/test", tags=["test"])
@@ -8,5 +8,7 @@ api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(accounts.router, prefix="/accounts", tags=["accounts"])
 api_router.include_router(transactions.router, prefix="/transactions", tags=["transactions"])
 api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
+api_router.include_router(reconciliation.router, prefix="/reconciliation", tags=["reconciliation"])
+api_router.include_router(data.router, prefix="/data", tags=["data"])
 api_router.include_router(feedback.router, prefix="/feedback", tags=["feedback"])
 
@@ -1,14 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from sqlalchemy.orm import Session
+from typing import List, Union
 from core.database import get_db
+from core.query_budget import query_budget
+from core.replica import read_replica
+from core.responses import FastJSONResponse
 from api.v1.endpoints.auth import get_current_user
 from models.user import User
 from models.finance import Ledger, LedgerGroup, ParentLedgerGroup, SpendingType
+from services import read_models
+from services.chart_of_accounts import (
+    ChartOfAccounts,
+    ensure_groups,
+    ensure_parent_groups,
+    get_chart_of_accounts,
+    not_modified,
+    refresh_chart_of_accounts,
+)
 from schemas.finance import (
     LedgerCreate,
     LedgerResponse,
+    LedgerWithBalance,
     LedgerWithGroup,
     LedgerGroupCreate,
     LedgerGroupResponse,
@@ -23,19 +36,18 @@ router = APIRouter()
 
 
 @router.get("/parent-groups", response_model=List[ParentLedgerGroupResponse])
+@query_budget(3)
 async def get_parent_ledger_groups(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
 ):
     """Get all parent ledger groups (universal), ordered by sort_order."""
-    from sqlalchemy import nullslast
-    groups = (
-        db.query(ParentLedgerGroup)
-        .filter(ParentLedgerGroup.is_active == True)
-        .order_by(nullslast(ParentLedgerGroup.sort_order), ParentLedgerGroup.name)
-        .all()
-    )
-    return groups
+    cached = not_modified(request, response, coa.etag)
+    if cached:
+        return cached
+    return coa.active_parent_groups()
 
 
 @router.post(
@@ -66,27 +78,25 @@ async def create_parent_ledger_group(
     db.add(new_group)
     db.commit()
     db.refresh(new_group)
+    refresh_chart_of_accounts(db)
 
     return new_group
 
 
 @router.get("/groups", response_model=List[LedgerGroupWithParent])
+@query_budget(3)
 async def get_ledger_groups(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
     parent_group_id: int = None,
 ):
     """Get all ledger groups (universal)."""
-    query = db.query(LedgerGroup).filter(LedgerGroup.is_active == True)
-
-    if parent_group_id:
-        query = query.filter(LedgerGroup.parent_ledger_group_id == parent_group_id)
-
-    groups = query.order_by(
-        LedgerGroup.parent_ledger_group_id,
-        LedgerGroup.name,
-    ).all()
-    return groups
+    cached = not_modified(request, response, coa.etag)
+    if cached:
+        return cached
+    return coa.active_groups(parent_group_id)
 
 
 @router.post(
@@ -98,17 +108,12 @@ async def create_ledger_group(
     group_data: LedgerGroupCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
 ):
     """Create a new ledger group (universal)."""
     # Verify parent ledger group exists
-    parent_group = (
-        db.query(ParentLedgerGroup)
-        .filter(
-            ParentLedgerGroup.id == group_data.parent_ledger_group_id,
-            ParentLedgerGroup.is_active == True,
-        )
-        .first()
-    )
+    coa = ensure_parent_groups(coa, db, [group_data.parent_ledger_group_id])
+    parent_group = coa.get_parent_group(group_data.parent_ledger_group_id, active_only=True)
 
     if not parent_group:
         raise HTTPException(
@@ -134,11 +139,13 @@ async def create_ledger_group(
     db.add(new_group)
     db.commit()
     db.refresh(new_group)
+    refresh_chart_of_accounts(db)
 
     return new_group
 
 
 @router.get("/spending-types", response_model=List[SpendingTypeResponse])
+@read_replica
 async def get_spending_types(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -195,21 +202,17 @@ async def create_spending_type(
 
 
 @router.post("/", response_model=LedgerResponse, status_code=status.HTTP_201_CREATED)
+@query_budget(7)
 async def create_ledger(
     ledger_data: LedgerCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
 ):
     """Create a new ledger (account)."""
     # Verify ledger group exists
-    ledger_group = (
-        db.query(LedgerGroup)
-        .filter(
-            LedgerGroup.id == ledger_data.ledger_group_id,
-            LedgerGroup.is_active == True,
-        )
-        .first()
-    )
+    coa = ensure_groups(coa, db, [ledger_data.ledger_group_id])
+    ledger_group = coa.get_group(ledger_data.ledger_group_id, active_only=True)
 
     if not ledger_group:
         raise HTTPException(
@@ -217,27 +220,13 @@ async def create_ledger(
             detail="Ledger group not found",
         )
 
-    # Get parent ledger group to check if it's an expense type
-    parent_group = (
-        db.query(ParentLedgerGroup).filter(ParentLedgerGroup.id == ledger_group.parent_ledger_group_id).first()
-    )
-
     # Validate spending_type is only set for Expenditure, Fixed Assets, or Current Assets
-    # Check if parent group name suggests it's for expenses or assets
     if ledger_data.spending_type_id:
-        if parent_group:
-            parent_name_lower = parent_group.name.lower()
-            allowed_parents = (
-                "expenditure" in parent_name_lower
-                or "expense" in parent_name_lower
-                or "fixed assets" in parent_name_lower
-                or "current assets" in parent_name_lower
+        if not ledger_group.parent_ledger_group.allows_spending_type:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Spending type can only be set for Expenditure, Fixed Assets, or Current Assets accounts",
             )
-            if not allowed_parents:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Spending type can only be set for Expenditure, Fixed Assets, or Current Assets accounts",
-                )
 
         # Verify spending type exists and belongs to user
         spending_type = (
@@ -288,47 +277,33 @@ async def create_ledger(
     return new_ledger
 
 
-@router.get("/", response_model=List[LedgerWithGroup])
+@router.get("/", response_model=List[Union[LedgerWithBalance, LedgerWithGroup]])
+@query_budget(4)
+@read_replica
 async def get_ledgers(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
     group_id: int = None,
+    with_balances: bool = False,
 ):
-    """Get all ledgers (accounts) for the current user."""
-    query = (
-        db.query(Ledger)
-        .options(
-            joinedload(Ledger.ledger_group).joinedload(LedgerGroup.parent_ledger_group),
-            joinedload(Ledger.spending_type)
-        )
-        .filter(Ledger.user_id == current_user.id)
-        .filter(Ledger.is_active == True)
-    )
-
-    if group_id:
-        query = query.filter(Ledger.ledger_group_id == group_id)
-
-    ledgers = query.order_by(Ledger.ledger_group_id, Ledger.name).all()
-
-    return ledgers
+    """
+    Get all ledgers (accounts) for the current user. With with_balances=true each ledger
+    also carries its all-time debit, credit and net (debit - credit) balance.
+    """
+    return FastJSONResponse(read_models.ledger_list(db, coa, current_user.id, group_id, with_balances))
 
 
 @router.get("/{ledger_id}", response_model=LedgerWithGroup)
+@query_budget(4)
 async def get_ledger(
     ledger_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
 ):
     """Get a specific ledger by ID."""
-    ledger = (
-        db.query(Ledger)
-        .options(
-            joinedload(Ledger.ledger_group).joinedload(LedgerGroup.parent_ledger_group),
-            joinedload(Ledger.spending_type)
-        )
-        .filter(Ledger.id == ledger_id, Ledger.user_id == current_user.id)
-        .first()
-    )
+    ledger = read_models.ledger_detail(db, coa, current_user.id, ledger_id)
 
     if not ledger:
         raise HTTPException(
@@ -336,15 +311,17 @@ async def get_ledger(
             detail="Ledger not found",
         )
 
-    return ledger
+    return FastJSONResponse(ledger)
 
 
 @router.put("/{ledger_id}", response_model=LedgerResponse)
+@query_budget(8)
 async def update_ledger(
     ledger_id: int,
     ledger_data: LedgerCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
 ):
     """Update a ledger (account)."""
     ledger = db.query(Ledger).filter(Ledger.id == ledger_id, Ledger.user_id == current_user.id).first()
@@ -356,14 +333,8 @@ async def update_ledger(
         )
 
     # Verify ledger group exists
-    ledger_group = (
-        db.query(LedgerGroup)
-        .filter(
-            LedgerGroup.id == ledger_data.ledger_group_id,
-            LedgerGroup.is_active == True,
-        )
-        .first()
-    )
+    coa = ensure_groups(coa, db, [ledger_data.ledger_group_id])
+    ledger_group = coa.get_group(ledger_data.ledger_group_id, active_only=True)
 
     if not ledger_group:
         raise HTTPException(
@@ -371,27 +342,13 @@ async def update_ledger(
             detail="Ledger group not found",
         )
 
-    # Get parent ledger group to check if spending type is allowed
-    parent_group = (
-        db.query(ParentLedgerGroup).filter(ParentLedgerGroup.id == ledger_group.parent_ledger_group_id).first()
-    )
-
     # Validate spending_type is only set for Expenditure, Fixed Assets, or Current Assets
-    # Check if parent group name suggests it's for expenses or assets
     if ledger_data.spending_type_id:
-        if parent_group:
-            parent_name_lower = parent_group.name.lower()
-            allowed_parents = (
-                "expenditure" in parent_name_lower
-                or "expense" in parent_name_lower
-                or "fixed assets" in parent_name_lower
-                or "current assets" in parent_name_lower
+        if not ledger_group.parent_ledger_group.allows_spending_type:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Spending type can only be set for Expenditure, Fixed Assets, or Current Assets accounts",
             )
-            if not allowed_parents:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Spending type can only be set for Expenditure, Fixed Assets, or Current Assets accounts",
-                )
 
         # Verify spending type exists and belongs to user
         spending_type = (
@@ -465,6 +422,7 @@ async def update_ledger_group(
     group_data: LedgerGroupCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
 ):
     """Update a ledger group (universal)."""
     group = db.query(LedgerGroup).filter(LedgerGroup.id == group_id).first()
@@ -476,14 +434,8 @@ async def update_ledger_group(
         )
 
     # Verify parent ledger group exists
-    parent_group = (
-        db.query(ParentLedgerGroup)
-        .filter(
-            ParentLedgerGroup.id == group_data.parent_ledger_group_id,
-            ParentLedgerGroup.is_active == True,
-        )
-        .first()
-    )
+    coa = ensure_parent_groups(coa, db, [group_data.parent_ledger_group_id])
+    parent_group = coa.get_parent_group(group_data.parent_ledger_group_id, active_only=True)
 
     if not parent_group:
         raise HTTPException(
@@ -507,6 +459,7 @@ async def update_ledger_group(
 
     db.commit()
     db.refresh(group)
+    refresh_chart_of_accounts(db)
 
     return group
 
@@ -528,5 +481,6 @@ async def delete_ledger_group(
 
     group.is_active = False
     db.commit()
+    refresh_chart_of_accounts(db)
 
     return None
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
-from core.database import get_db
+from core.admission import admission
+from core.config import settings
+from core.database import get_db, new_session, route_to_replica
 from core.security import (
     verify_password,
     get_password_hash,
@@ -14,6 +17,9 @@ from schemas.auth import UserSignup, UserLogin, UserResponse, Token
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+# Runs on every authenticated request; built once so its compiled form is cached
+_USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+
 
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
@@ -108,7 +114,7 @@ async def login_json(user_data: UserLogin, db: Session = Depends(get_db)):
 
 
 async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+    request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
 ) -> User:
     """Get the current authenticated user."""
     credentials_exception = HTTPException(
@@ -125,13 +131,42 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    # Reads of @read_replica endpoints move to the replica when it is safe for this user
+    if getattr(getattr(request.scope.get("route"), "endpoint", None), "__read_replica__", False):
+        route_to_replica(db, int(user_id))
+
+    user = db.scalars(_USER_BY_ID, {"user_id": int(user_id)}).first()
+    if user is None and db.info.get("replica"):
+        # The account may be newer than the replica's last replayed transaction
+        with new_session() as primary:
+            user = primary.scalars(_USER_BY_ID, {"user_id": int(user_id)}).first()
     if user is None:
         raise credentials_exception
 
+    # Lets the session attribute its writes to the user (read-your-writes routing)
+    db.info["user_id"] = user.id
     return user
 
 
+async def get_admitted_user(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    get_current_user for expensive endpoints: also takes the route's admission cost
+    from the per-user and global limits (see core.admission) until the response is sent.
+    """
+    if not settings.ADMISSION_ENABLED:
+        yield current_user
+        return
+
+    cost = admission.cost_for(request.method, request.scope.get("route"))
+    # While queued, give the session's connection back to the pool; it is reacquired on next use
+    async with admission.admit(current_user.id, cost, on_queue=db.close):
+        yield current_user
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user information."""
@@ -0,0 +1,78 @@
+import gzip
+import zlib
+from datetime import date
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from core.admission import admission_cost
+from core.database import get_db
+from core.query_budget import query_budget
+from core.replica import read_replica
+from api.v1.endpoints.auth import get_admitted_user
+from models.user import User
+from services.chart_of_accounts import refresh_chart_of_accounts
+from services.ledger_cache import ledger_cache
+from services.user_export import ExportFormatError, export_user, import_user
+from schemas.data import ImportSummary
+
+router = APIRouter()
+
+
+@router.get("/export")
+@query_budget(5)
+@read_replica
+@admission_cost(4)
+async def export_data(
+    current_user: User = Depends(get_admitted_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Download all of the user's spending types, ledgers and transactions as gzip-compressed
+    NDJSON (see services.user_export), streamed from a server-side cursor as it is read.
+    """
+    filename = f"pesa-plan-export-{date.today().isoformat()}.ndjson.gz"
+    return StreamingResponse(
+        export_user(db, current_user.id),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/import", response_model=ImportSummary, status_code=status.HTTP_201_CREATED)
+@query_budget(None)
+@admission_cost(6)
+async def import_data(
+    file: UploadFile = File(..., description="A file from GET /data/export"),
+    current_user: User = Depends(get_admitted_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Load an export into this account, which must not have ledgers or transactions yet.
+    Rows get new ids, ledger groups are matched by name, fingerprints are computed and
+    ledger balances rebuilt. The import is all or nothing.
+    """
+    try:
+        with gzip.GzipFile(fileobj=file.file, mode="rb") as lines:
+            summary = import_user(db, current_user.id, lines)
+    except ExportFormatError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    except (OSError, EOFError, zlib.error):
+        # Not gzip, or cut short
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The file is not a complete gzip-compressed export",
+        )
+
+    db.commit()
+    ledger_cache.invalidate(current_user.id)
+    if summary["ledger_groups_created"]:
+        refresh_chart_of_accounts(db)
+
+    return summary
@@ -0,0 +1,406 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import List
+
+from core.admission import admission_cost
+from core.config import settings
+from core.database import get_db
+from core.money import to_cents, to_decimal
+from core.query_budget import query_budget
+from core.responses import FastJSONResponse
+from api.v1.endpoints.auth import get_admitted_user, get_current_user
+from models.finance import Ledger, LedgerBalance, LedgerGroupCategory
+from models.reconciliation import BankStatement, StatementLine
+from models.user import User
+from services import reconciliation
+from services.chart_of_accounts import ChartOfAccounts, ensure_groups, get_chart_of_accounts
+from services.ledger_balances import lock_users
+from schemas.reconciliation import (
+    AutoMatchResponse,
+    LineMatch,
+    ReconciliationSummary,
+    StatementCreate,
+    StatementLineResponse,
+    StatementResponse,
+    StatementWithLines,
+    UnreconciledItem,
+)
+
+router = APIRouter()
+
+_RECONCILABLE_CATEGORIES = (LedgerGroupCategory.BANK_ACCOUNTS, LedgerGroupCategory.CASH_ACCOUNTS)
+
+_LINE_COLUMNS = (
+    StatementLine.id,
+    StatementLine.line_date,
+    StatementLine.description,
+    StatementLine.reference,
+    StatementLine.amount,
+    StatementLine.matched_item_id,
+)
+
+
+def _get_reconcilable_ledger(db: Session, coa: ChartOfAccounts, user_id: int, ledger_id: int) -> Ledger:
+    ledger = (
+        db.query(Ledger)
+        .filter(Ledger.id == ledger_id, Ledger.user_id == user_id, Ledger.is_active == True)
+        .first()
+    )
+    if not ledger:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ledger not found",
+        )
+
+    coa = ensure_groups(coa, db, [ledger.ledger_group_id])
+    if coa.get_group(ledger.ledger_group_id).category not in _RECONCILABLE_CATEGORIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only bank and cash ledgers can be reconciled",
+        )
+    return ledger
+
+
+def _get_statement(db: Session, user_id: int, statement_id: int) -> BankStatement:
+    statement = (
+        db.query(BankStatement)
+        .filter(BankStatement.id == statement_id, BankStatement.user_id == user_id)
+        .first()
+    )
+    if not statement:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Statement not found",
+        )
+    return statement
+
+
+def _get_line(db: Session, statement_id: int, line_id: int) -> StatementLine:
+    line = (
+        db.query(StatementLine)
+        .filter(StatementLine.id == line_id, StatementLine.statement_id == statement_id)
+        .first()
+    )
+    if not line:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Statement line not found",
+        )
+    return line
+
+
+def _line_counts(db: Session, statement_ids: List[int]) -> dict:
+    """statement_id -> (lines, matched lines)"""
+    if not statement_ids:
+        return {}
+    return {
+        statement_id: (line_count, matched_count)
+        for statement_id, line_count, matched_count in db.execute(
+            select(StatementLine.statement_id, func.count(), func.count(StatementLine.matched_item_id))
+            .where(StatementLine.statement_id.in_(statement_ids))
+            .group_by(StatementLine.statement_id)
+        )
+    }
+
+
+def _statement_dict(statement: BankStatement, counts: dict) -> dict:
+    line_count, matched_count = counts.get(statement.id, (0, 0))
+    return {
+        "id": statement.id,
+        "ledger_id": statement.ledger_id,
+        "name": statement.name,
+        "created_at": statement.created_at,
+        "line_count": line_count,
+        "matched_count": matched_count,
+    }
+
+
+@router.post(
+    "/statements",
+    response_model=StatementResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+@query_budget(8)
+async def create_statement(
+    statement_data: StatementCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
+):
+    """Import a bank or M-Pesa statement for a bank/cash ledger."""
+    if not statement_data.name.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Statement name is required",
+        )
+    if len(statement_data.lines) > settings.RECONCILIATION_MAX_LINES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A statement can have at most {settings.RECONCILIATION_MAX_LINES} lines",
+        )
+    _get_reconcilable_ledger(db, coa, current_user.id, statement_data.ledger_id)
+
+    statement = BankStatement(user_id=current_user.id, ledger_id=statement_data.ledger_id, name=statement_data.name)
+    db.add(statement)
+    db.flush()  # Flush to get the statement ID
+
+    # Create lines in a single batched INSERT
+    if statement_data.lines:
+        db.execute(
+            insert(StatementLine),
+            [
+                {
+                    "statement_id": statement.id,
+                    "ledger_id": statement.ledger_id,
+                    "line_date": line.line_date,
+                    "description": line.description,
+                    "reference": line.reference,
+                    "amount": line.amount,
+                }
+                for line in statement_data.lines
+            ],
+        )
+    db.commit()
+    db.refresh(statement)
+
+    return _statement_dict(statement, {statement.id: (len(statement_data.lines), 0)})
+
+
+@router.get("/statements", response_model=List[StatementResponse])
+@query_budget(4)
+async def get_statements(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    ledger_id: int = None,
+):
+    """Get the current user's statements, newest first."""
+    query = db.query(BankStatement).filter(BankStatement.user_id == current_user.id)
+    if ledger_id:
+        query = query.filter(BankStatement.ledger_id == ledger_id)
+    statements = query.order_by(BankStatement.created_at.desc(), BankStatement.id.desc()).all()
+
+    counts = _line_counts(db, [statement.id for statement in statements])
+    return [_statement_dict(statement, counts) for statement in statements]
+
+
+@router.get("/statements/{statement_id}", response_model=StatementWithLines)
+@query_budget(4)
+async def get_statement(
+    statement_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Get a statement with its lines and their matches."""
+    statement = _get_statement(db, current_user.id, statement_id)
+
+    lines = [
+        dict(row._mapping)
+        for row in db.execute(
+            select(*_LINE_COLUMNS).where(StatementLine.statement_id == statement.id).order_by(StatementLine.id)
+        )
+    ]
+    counts = {statement.id: (len(lines), sum(1 for line in lines if line["matched_item_id"] is not None))}
+    # Statements can have thousands of lines; skip response_model re-validation
+    return FastJSONResponse({**_statement_dict(statement, counts), "lines": lines})
+
+
+@router.post("/statements/{statement_id}/auto-match", response_model=AutoMatchResponse)
+@query_budget(9)
+@admission_cost(4)
+async def auto_match_statement(
+    statement_id: int,
+    current_user: User = Depends(get_admitted_user),
+    db: Session = Depends(get_db),
+    date_window_days: int = Query(None, ge=0, le=90),
+):
+    """
+    Match the statement's unmatched lines to unreconciled transaction items on its ledger.
+    A line matches an item with the same amount dated within date_window_days of it;
+    among those, shared reference numbers win, then the closest date.
+    """
+    statement = _get_statement(db, current_user.id, statement_id)
+    # Serialized with ledger_balances rebuilds, see ledger_balances.lock_users
+    lock_users(db, [current_user.id])
+    if date_window_days is None:
+        date_window_days = settings.RECONCILIATION_DATE_WINDOW_DAYS
+
+    matched = reconciliation.auto_match(db, current_user.id, statement.id, statement.ledger_id, date_window_days)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent match took one of the items first
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Statement is being matched concurrently, try again",
+        )
+
+    unmatched = db.scalar(
+        select(func.count())
+        .select_from(StatementLine)
+        .where(StatementLine.statement_id == statement.id, StatementLine.matched_item_id.is_(None))
+    )
+    return {"statement_id": statement.id, "matched": matched, "unmatched": unmatched}
+
+
+@router.put("/statements/{statement_id}/lines/{line_id}/match", response_model=StatementLineResponse)
+@query_budget(9)
+async def match_line(
+    statement_id: int,
+    line_id: int,
+    match_data: LineMatch,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Manually match a statement line to a transaction item on the same ledger with the same amount."""
+    statement = _get_statement(db, current_user.id, statement_id)
+    # Serialized with ledger_balances rebuilds, see ledger_balances.lock_users
+    lock_users(db, [current_user.id])
+    line = _get_line(db, statement.id, line_id)
+    if line.matched_item_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Statement line is already matched",
+        )
+
+    item = reconciliation.item_for_matching(db, current_user.id, match_data.transaction_item_id)
+    if not item:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Transaction item not found",
+        )
+    item_ledger_id, item_cents, matched_line_id = item
+    if item_ledger_id != line.ledger_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Transaction item is not on the statement's ledger",
+        )
+    if item_cents != to_cents(line.amount):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Transaction item amount ({to_decimal(item_cents)}) does not match the statement line ({line.amount})",
+        )
+    if matched_line_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Transaction item is already reconciled",
+        )
+
+    line.matched_item_id = match_data.transaction_item_id
+    reconciliation.apply_reconciled_deltas(db, {line.ledger_id: line.amount})
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Transaction item is already reconciled",
+        )
+    db.refresh(line)
+
+    return line
+
+
+@router.delete("/statements/{statement_id}/lines/{line_id}/match", response_model=StatementLineResponse)
+@query_budget(7)
+async def unmatch_line(
+    statement_id: int,
+    line_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Remove a statement line's match; the transaction item becomes unreconciled again."""
+    statement = _get_statement(db, current_user.id, statement_id)
+    # Serialized with ledger_balances rebuilds, see ledger_balances.lock_users
+    lock_users(db, [current_user.id])
+    line = _get_line(db, statement.id, line_id)
+
+    if line.matched_item_id is not None:
+        line.matched_item_id = None
+        reconciliation.apply_reconciled_deltas(db, {line.ledger_id: -line.amount})
+        db.commit()
+        db.refresh(line)
+
+    return line
+
+
+@router.delete("/statements/{statement_id}", status_code=status.HTTP_204_NO_CONTENT)
+@query_budget(7)
+async def delete_statement(
+    statement_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Delete a statement and its lines; their matched items become unreconciled again."""
+    statement = _get_statement(db, current_user.id, statement_id)
+    # Serialized with ledger_balances rebuilds, see ledger_balances.lock_users
+    lock_users(db, [current_user.id])
+
+    removed_lines = db.execute(
+        delete(StatementLine)
+        .where(StatementLine.statement_id == statement.id)
+        .returning(StatementLine.amount, StatementLine.matched_item_id),
+        execution_options={"synchronize_session": False},
+    ).all()
+    reconciliation.apply_reconciled_deltas(
+        db, {statement.ledger_id: -sum(amount for amount, matched_item_id in removed_lines if matched_item_id is not None)}
+    )
+
+    db.delete(statement)
+    db.commit()
+
+    return None
+
+
+@router.get("/ledgers/{ledger_id}/summary", response_model=ReconciliationSummary)
+@query_budget(5)
+async def get_reconciliation_summary(
+    ledger_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
+):
+    """Book, reconciled and unreconciled balances of a bank/cash ledger, from its running totals."""
+    _get_reconcilable_ledger(db, coa, current_user.id, ledger_id)
+
+    totals = db.execute(
+        select(LedgerBalance.debit_total, LedgerBalance.credit_total, LedgerBalance.reconciled_total).where(
+            LedgerBalance.ledger_id == ledger_id
+        )
+    ).first()
+    debit_total, credit_total, reconciled_total = totals or (0, 0, 0)
+    book_cents = to_cents(debit_total) - to_cents(credit_total)
+    reconciled_cents = to_cents(reconciled_total)
+
+    unmatched_lines, unmatched_total = db.execute(
+        select(func.count(), func.coalesce(func.sum(StatementLine.amount), 0)).where(
+            StatementLine.ledger_id == ledger_id, StatementLine.matched_item_id.is_(None)
+        )
+    ).one()
+
+    return {
+        "ledger_id": ledger_id,
+        "book_balance": to_decimal(book_cents),
+        "reconciled_balance": to_decimal(reconciled_cents),
+        "unreconciled_balance": to_decimal(book_cents - reconciled_cents),
+        "unmatched_lines": unmatched_lines,
+        "unmatched_lines_total": to_decimal(to_cents(unmatched_total)),
+    }
+
+
+@router.get("/ledgers/{ledger_id}/unreconciled", response_model=List[UnreconciledItem])
+@query_budget(4)
+async def get_unreconciled_items(
+    ledger_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """Transaction items on a bank/cash ledger that no statement line is matched to, oldest first."""
+    _get_reconcilable_ledger(db, coa, current_user.id, ledger_id)
+
+    return FastJSONResponse(reconciliation.unreconciled_items(db, current_user.id, ledger_id, limit, offset))
@@ -1,19 +1,38 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, status
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, case, nullslast
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from decimal import Decimal
 from datetime import date, datetime
+import enum
+import os
 
+from core.admission import admission_cost
+from core.config import settings
 from core.database import get_db
-from api.v1.endpoints.auth import get_current_user
+from core.jobs import FAILED, Job, JobQueueFull
+from core.query_budget import query_budget
+from core.replica import read_replica
+from core.responses import FastJSONResponse
+from api.v1.endpoints.auth import get_admitted_user, get_current_user
+from models.finance import Ledger, LedgerGroupCategory, TransactionType
 from models.user import User
-from models.finance import Transaction, TransactionItem, Ledger, LedgerGroup, ParentLedgerGroup, EntryType
+from services import read_models
+from services.archive import ArchiveError
+from services.chart_of_accounts import ChartOfAccounts, get_chart_of_accounts
+from services.date_buckets import Interval, bucket_count
+from services.pivot import Dimension, Measure, PivotQuery, run_pivot
+from services.report_jobs import report_jobs, submit_report_job
 from pydantic import BaseModel
 
 router = APIRouter()
 
 
+def _archive_conflict(e: ArchiveError) -> HTTPException:
+    # An archived year in the range was restored while the report read it back
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
 class TrialBalanceItem(BaseModel):
     ledger_id: int
     ledger_name: str
@@ -50,11 +69,15 @@ class TrialBalanceResponse(BaseModel):
 
 
 @router.get("/trial-balance", response_model=TrialBalanceResponse)
+@query_budget(7)
+@read_replica
+@admission_cost(4)
 async def get_trial_balance(
     start_date: date = Query(..., description="Start date for the trial balance"),
     end_date: date = Query(..., description="End date for the trial balance"),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_admitted_user),
     db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
 ):
     """
     Get trial balance for a date range.
@@ -66,184 +89,73 @@ async def get_trial_balance(
             detail="Start date must be before or equal to end date",
         )
 
-    # Get all active ledgers for the user (to ensure all ledgers appear in report)
-    # Order by parent group sort_order, then by name for consistency
-    all_ledgers = (
-        db.query(
-            Ledger.id,
-            Ledger.name,
-            LedgerGroup.name.label("ledger_group_name"),
-            ParentLedgerGroup.name.label("parent_group_name"),
-        )
-        .join(LedgerGroup, LedgerGroup.id == Ledger.ledger_group_id)
-        .join(ParentLedgerGroup, ParentLedgerGroup.id == LedgerGroup.parent_ledger_group_id)
-        .filter(Ledger.user_id == current_user.id)
-        .filter(Ledger.is_active == True)
-        .order_by(nullslast(ParentLedgerGroup.sort_order), ParentLedgerGroup.name, LedgerGroup.name, Ledger.name)
-        .all()
-    )
+    try:
+        report = read_models.trial_balance(db, coa, current_user.id, start_date, end_date, current_user.ledger_version)
+    except ArchiveError as e:
+        raise _archive_conflict(e)
+    return FastJSONResponse(report)
 
-    # Efficient query 1: Calculate opening balances (all transactions before start_date)
-    opening_query = (
-        db.query(
-            TransactionItem.ledger_id,
-            func.sum(
-                case(
-                    (TransactionItem.entry_type == EntryType.DEBIT, TransactionItem.amount),
-                    else_=0
-                )
-            ).label("opening_debit"),
-            func.sum(
-                case(
-                    (TransactionItem.entry_type == EntryType.CREDIT, TransactionItem.amount),
-                    else_=0
-                )
-            ).label("opening_credit"),
-        )
-        .join(Transaction, Transaction.id == TransactionItem.transaction_id)
-        .filter(Transaction.user_id == current_user.id)
-        .filter(Transaction.transaction_date < start_date)
-        .group_by(TransactionItem.ledger_id)
-    )
-    opening_results = {row.ledger_id: row for row in opening_query.all()}
-
-    # Efficient query 2: Calculate period transactions (between start_date and end_date)
-    period_query = (
-        db.query(
-            TransactionItem.ledger_id,
-            func.sum(
-                case(
-                    (TransactionItem.entry_type == EntryType.DEBIT, TransactionItem.amount),
-                    else_=0
-                )
-            ).label("period_debit"),
-            func.sum(
-                case(
-                    (TransactionItem.entry_type == EntryType.CREDIT, TransactionItem.amount),
-                    else_=0
-                )
-            ).label("period_credit"),
-        )
-        .join(Transaction, Transaction.id == TransactionItem.transaction_id)
-        .filter(Transaction.user_id == current_user.id)
-        .filter(
-            and_(
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date,
-            )
-        )
-        .group_by(TransactionItem.ledger_id)
-    )
-    period_results = {row.ledger_id: row for row in period_query.all()}
-
-    # Helper function to determine if a parent group is asset/expense type (debit normal)
-    # or liability/capital/income type (credit normal)
-    def is_debit_normal_group(parent_group_name: str) -> bool:
-        """Returns True if the group normally has debit balances (assets/expenses)."""
-        parent_lower = parent_group_name.lower()
-        # Assets and expenses have debit normal balances
-        return (
-            "asset" in parent_lower
-            or "expenditure" in parent_lower
-            or "expense" in parent_lower
-        )
 
-    # Build trial balance items
-    items = []
-    total_opening_debit = Decimal("0")
-    total_opening_credit = Decimal("0")
-    total_period_debit = Decimal("0")
-    total_period_credit = Decimal("0")
-    total_closing_debit = Decimal("0")
-    total_closing_credit = Decimal("0")
-
-    for ledger in all_ledgers:
-        # Get opening balances (default to 0 if no transactions)
-        opening_row = opening_results.get(ledger.id)
-        opening_debit_raw = Decimal(str(opening_row.opening_debit if opening_row else 0))
-        opening_credit_raw = Decimal(str(opening_row.opening_credit if opening_row else 0))
-
-        # Get period transactions (default to 0 if no transactions)
-        period_row = period_results.get(ledger.id)
-        period_debit_raw = Decimal(str(period_row.period_debit if period_row else 0))
-        period_credit_raw = Decimal(str(period_row.period_credit if period_row else 0))
-
-        # Determine balance calculation based on parent group
-        is_debit_normal = is_debit_normal_group(ledger.parent_group_name)
-
-        # Calculate opening balance: for debit-normal (assets/expenses): debit - credit
-        # for credit-normal (liabilities/capital/incomes): credit - debit
-        if is_debit_normal:
-            opening_balance = opening_debit_raw - opening_credit_raw
-        else:
-            opening_balance = opening_credit_raw - opening_debit_raw
-
-        # Period transactions: show actual debit and credit values (not net)
-        period_debit = period_debit_raw
-        period_credit = period_credit_raw
-
-        # Calculate closing balance (opening balance + net period transactions)
-        if is_debit_normal:
-            period_net = period_debit_raw - period_credit_raw
-        else:
-            period_net = period_credit_raw - period_debit_raw
-        
-        closing_balance = opening_balance + period_net
-
-        # Convert opening and closing to single debit/credit representation
-        # For debit-normal: positive = debit, negative = credit
-        # For credit-normal: positive = credit, negative = debit
-        if is_debit_normal:
-            opening_debit = opening_balance if opening_balance >= 0 else Decimal("0")
-            opening_credit = -opening_balance if opening_balance < 0 else Decimal("0")
-            closing_debit = closing_balance if closing_balance >= 0 else Decimal("0")
-            closing_credit = -closing_balance if closing_balance < 0 else Decimal("0")
-        else:
-            # For credit-normal: positive = credit, negative = debit
-            opening_credit = opening_balance if opening_balance >= 0 else Decimal("0")
-            opening_debit = -opening_balance if opening_balance < 0 else Decimal("0")
-            closing_credit = closing_balance if closing_balance >= 0 else Decimal("0")
-            closing_debit = -closing_balance if closing_balance < 0 else Decimal("0")
-
-        # Only include ledgers that have transactions (opening or period)
-        if opening_debit_raw > 0 or opening_credit_raw > 0 or period_debit_raw > 0 or period_credit_raw > 0:
-            items.append(
-                TrialBalanceItem(
-                    ledger_id=ledger.id,
-                    ledger_name=ledger.name,
-                    ledger_group_name=ledger.ledger_group_name,
-                    parent_group_name=ledger.parent_group_name,
-                    opening_debit=opening_debit,
-                    opening_credit=opening_credit,
-                    period_debit=period_debit,
-                    period_credit=period_credit,
-                    closing_debit=closing_debit,
-                    closing_credit=closing_credit,
-                )
-            )
+class TrialBalanceNode(BaseModel):
+    key: str  # "<level>:<id>", e.g. "ledger_group:12"
+    level: str  # "parent_group", "ledger_group" or "ledger"
+    id: int
+    name: str
+    # Subtotals of the ledgers under the node, same columns as TrialBalanceItem
+    opening_debit: Decimal
+    opening_credit: Decimal
+    period_debit: Decimal
+    period_credit: Decimal
+    closing_debit: Decimal
+    closing_credit: Decimal
+    # None while collapsed; expand the node to fetch it
+    children: Optional[List["TrialBalanceNode"]] = None
 
-            total_opening_debit += opening_debit
-            total_opening_credit += opening_credit
-            total_period_debit += period_debit
-            total_period_credit += period_credit
-            total_closing_debit += closing_debit
-            total_closing_credit += closing_credit
 
-    # Trial balance should balance: total closing debits = total closing credits
-    is_balanced = total_closing_debit == total_closing_credit
+class TrialBalanceTreeResponse(BaseModel):
+    start_date: date
+    end_date: date
+    nodes: List[TrialBalanceNode]
+    total_opening_debit: Decimal
+    total_opening_credit: Decimal
+    total_period_debit: Decimal
+    total_period_credit: Decimal
+    total_closing_debit: Decimal
+    total_closing_credit: Decimal
+    is_balanced: bool
 
-    return TrialBalanceResponse(
-        start_date=start_date,
-        end_date=end_date,
-        items=items,
-        total_opening_debit=total_opening_debit,
-        total_opening_credit=total_opening_credit,
-        total_period_debit=total_period_debit,
-        total_period_credit=total_period_credit,
-        total_closing_debit=total_closing_debit,
-        total_closing_credit=total_closing_credit,
-        is_balanced=is_balanced,
-    )
+
+@router.get("/trial-balance/tree", response_model=TrialBalanceTreeResponse)
+@query_budget(7)
+@read_replica
+@admission_cost(4)
+async def get_trial_balance_tree(
+    start_date: date = Query(..., description="Start date for the trial balance"),
+    end_date: date = Query(..., description="End date for the trial balance"),
+    expand_parent_groups: List[int] = Query([], description="Parent groups to expand to their ledger groups"),
+    expand_ledger_groups: List[int] = Query([], description="Ledger groups to expand to their ledgers"),
+    current_user: User = Depends(get_admitted_user),
+    db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
+):
+    """
+    Get the trial balance as a parent group > ledger group > ledger tree with subtotals.
+    All levels are computed by the database in one grouped query (ROLLUP); only the
+    levels of expanded nodes are returned, so a client drills down one level per request.
+    """
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Start date must be before or equal to end date",
+        )
+
+    try:
+        report = read_models.trial_balance_tree(
+            db, coa, current_user.id, start_date, end_date, expand_parent_groups, expand_ledger_groups
+        )
+    except ArchiveError as e:
+        raise _archive_conflict(e)
+    return FastJSONResponse(report)
 
 
 class LedgerEntry(BaseModel):
@@ -274,12 +186,16 @@ class LedgerReportResponse(BaseModel):
 
 
 @router.get("/ledger", response_model=LedgerReportResponse)
+@query_budget(6)
+@read_replica
+@admission_cost(2)
 async def get_ledger_report(
     ledger_id: int = Query(..., description="Ledger ID for the report"),
     start_date: date = Query(..., description="Start date for the ledger report"),
     end_date: date = Query(..., description="End date for the ledger report"),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_admitted_user),
     db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
 ):
     """
     Get ledger report for a specific ledger within a date range.
@@ -291,112 +207,305 @@ async def get_ledger_report(
             detail="Start date must be before or equal to end date",
         )
 
-    # Verify ledger exists and belongs to user
-    ledger = (
-        db.query(Ledger)
-        .join(LedgerGroup, LedgerGroup.id == Ledger.ledger_group_id)
-        .join(ParentLedgerGroup, ParentLedgerGroup.id == LedgerGroup.parent_ledger_group_id)
-        .filter(Ledger.id == ledger_id)
-        .filter(Ledger.user_id == current_user.id)
-        .filter(Ledger.is_active == True)
-        .first()
-    )
+    try:
+        report = read_models.ledger_report(db, coa, current_user.id, ledger_id, start_date, end_date)
+    except ArchiveError as e:
+        raise _archive_conflict(e)
 
-    if not ledger:
+    if not report:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Ledger not found or does not belong to user",
         )
 
-    # Calculate opening balance (all transactions before start_date)
-    opening_query = (
-        db.query(
-            func.sum(
-                case(
-                    (TransactionItem.entry_type == EntryType.DEBIT, TransactionItem.amount),
-                    else_=0
-                )
-            ).label("opening_debit"),
-            func.sum(
-                case(
-                    (TransactionItem.entry_type == EntryType.CREDIT, TransactionItem.amount),
-                    else_=0
-                )
-            ).label("opening_credit"),
+    return FastJSONResponse(report)
+
+
+class BalancePoint(BaseModel):
+    date: date
+    balance: Decimal
+
+
+class BalanceSeries(BaseModel):
+    kind: str  # "ledger", "category" or "net_worth"
+    key: str
+    name: str
+    ledger_id: Optional[int] = None
+    category: Optional[LedgerGroupCategory] = None
+    points: List[BalancePoint]
+
+
+class BalanceHistoryResponse(BaseModel):
+    start_date: date
+    end_date: date
+    interval: Interval
+    series: List[BalanceSeries]
+
+
+@router.get("/balance-history", response_model=BalanceHistoryResponse)
+@query_budget(6)
+@read_replica
+@admission_cost(2)
+async def get_balance_history(
+    start_date: date = Query(..., description="First day of the history"),
+    end_date: date = Query(..., description="Last day of the history"),
+    interval: Interval = Query(Interval.MONTH, description="Bucket size; each point is the balance at the end of its bucket"),
+    ledger_ids: List[int] = Query([], description="Ledgers to chart, one series each"),
+    categories: List[LedgerGroupCategory] = Query([], description="Ledger categories to chart, e.g. bank_accounts"),
+    net_worth: bool = Query(False, description="Include a net worth (assets minus liabilities) series"),
+    current_user: User = Depends(get_admitted_user),
+    db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
+):
+    """
+    Get end-of-bucket balance history for ledgers, ledger categories and net worth.
+    Running balances are computed in SQL with a cumulative window sum, one query for all series.
+    """
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Start date must be before or equal to end date",
         )
-        .join(Transaction, Transaction.id == TransactionItem.transaction_id)
-        .filter(Transaction.user_id == current_user.id)
-        .filter(TransactionItem.ledger_id == ledger_id)
-        .filter(Transaction.transaction_date < start_date)
-    )
-    opening_result = opening_query.first()
-    opening_debit = Decimal(str(opening_result.opening_debit if opening_result.opening_debit else 0))
-    opening_credit = Decimal(str(opening_result.opening_credit if opening_result.opening_credit else 0))
-    opening_balance = opening_debit - opening_credit
-
-    # Get all transaction items for this ledger in the date range
-    entries_query = (
-        db.query(
-            Transaction.id.label("transaction_id"),
-            Transaction.transaction_date,
-            Transaction.reference,
-            Transaction.transaction_type,
-            TransactionItem.entry_type,
-            TransactionItem.amount,
+
+    if not ledger_ids and not categories and not net_worth:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Select at least one of ledger_ids, categories or net_worth",
         )
-        .join(TransactionItem, TransactionItem.transaction_id == Transaction.id)
-        .filter(Transaction.user_id == current_user.id)
-        .filter(TransactionItem.ledger_id == ledger_id)
-        .filter(
-            and_(
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date,
-            )
+
+    if bucket_count(start_date, end_date, interval) > settings.BALANCE_HISTORY_MAX_POINTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many points; use a shorter range or a longer interval (at most {settings.BALANCE_HISTORY_MAX_POINTS})",
         )
-        .order_by(Transaction.transaction_date, Transaction.id)
-        .all()
-    )
 
-    # Build entries with running balance
-    entries = []
-    running_balance = opening_balance
-    total_debit = Decimal("0")
-    total_credit = Decimal("0")
-
-    for row in entries_query:
-        amount = Decimal(str(row.amount))
-        if row.entry_type == EntryType.DEBIT:
-            running_balance += amount
-            total_debit += amount
-        else:
-            running_balance -= amount
-            total_credit += amount
-
-        entries.append(
-            LedgerEntry(
-                transaction_id=row.transaction_id,
-                transaction_date=row.transaction_date,
-                reference=row.reference,
-                transaction_type=row.transaction_type.value if hasattr(row.transaction_type, 'value') else str(row.transaction_type),
-                entry_type=row.entry_type.value if hasattr(row.entry_type, 'value') else str(row.entry_type),
-                amount=amount,
-                running_balance=running_balance,
-            )
+    try:
+        history = read_models.balance_history(
+            db,
+            coa,
+            current_user.id,
+            start_date,
+            end_date,
+            interval,
+            ledger_ids,
+            categories,
+            net_worth,
+            current_user.ledger_version,
         )
+    except ArchiveError as e:
+        raise _archive_conflict(e)
 
-    closing_balance = running_balance
+    if history is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="One or more ledgers not found or do not belong to user",
+        )
+
+    return FastJSONResponse(history)
 
-    return LedgerReportResponse(
-        ledger_id=ledger.id,
-        ledger_name=ledger.name,
-        ledger_group_name=ledger.ledger_group.name,
-        parent_group_name=ledger.ledger_group.parent_ledger_group.name,
+
+class PivotResponse(BaseModel):
+    start_date: date
+    end_date: date
+    dimensions: List[Dimension]
+    measures: List[Measure]
+    interval: Optional[Interval] = None
+    # One row per combination of dimension values: the dimensions' keys (e.g. ledger_id and
+    # ledger_name, category, period) followed by one key per measure
+    rows: List[Dict[str, Any]]
+    # More rows matched than PESA_PLAN_PIVOT_MAX_ROWS; narrow the filters or drop a dimension
+    truncated: bool
+
+
+@router.get("/pivot", response_model=PivotResponse)
+@query_budget(6)
+@read_replica
+@admission_cost(4)
+async def get_pivot(
+    start_date: date = Query(..., description="First transaction date included"),
+    end_date: date = Query(..., description="Last transaction date included"),
+    dimensions: List[Dimension] = Query([], description="Group by these, in order"),
+    measures: List[Measure] = Query([Measure.NET], description="Aggregates to compute per group"),
+    interval: Interval = Query(Interval.MONTH, description="Bucket size for the period dimension"),
+    ledger_ids: List[int] = Query([], description="Only entries on these ledgers"),
+    categories: List[LedgerGroupCategory] = Query([], description="Only entries on ledgers in these categories"),
+    transaction_types: List[TransactionType] = Query([], description="Only these transaction types"),
+    current_user: User = Depends(get_admitted_user),
+    db: Session = Depends(get_db),
+    coa: ChartOfAccounts = Depends(get_chart_of_accounts),
+):
+    """
+    Aggregate transaction entries by any combination of ledger, ledger group, parent group,
+    category, spending type, transaction type and period, in a single GROUP BY query.
+    """
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Start date must be before or equal to end date",
+        )
+
+    if not measures:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Select at least one measure",
+        )
+
+    pivot = PivotQuery(
+        dimensions=dimensions,
+        measures=measures,
         start_date=start_date,
         end_date=end_date,
-        opening_balance=opening_balance,
-        closing_balance=closing_balance,
-        entries=entries,
-        total_debit=total_debit,
-        total_credit=total_credit,
+        interval=interval,
+        ledger_ids=ledger_ids,
+        categories=categories,
+        transaction_types=transaction_types,
     )
+    try:
+        return FastJSONResponse(run_pivot(db, coa, current_user.id, pivot, settings.PIVOT_MAX_ROWS))
+    except ArchiveError as e:
+        raise _archive_conflict(e)
+
+
+class ReportJobKind(str, enum.Enum):
+    TRIAL_BALANCE = "trial_balance"
+    LEDGER_REPORT = "ledger_report"
+    EXPORT = "export"
+
+
+class ReportJobCreate(BaseModel):
+    kind: ReportJobKind
+    start_date: date
+    end_date: date
+    # Required for ledger_report
+    ledger_id: Optional[int] = None
+
+
+class ReportJobResponse(BaseModel):
+    id: str
+    kind: ReportJobKind
+    status: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    # Set once the job has succeeded
+    result_url: Optional[str] = None
+
+
+def _job_response(request: Request, job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "error": job.error,
+        "result_url": (
+            str(request.url_for("get_report_job_result", job_id=job.id)) if job.is_finished and not job.error else None
+        ),
+    }
+
+
+def _get_job_or_404(job_id: str, current_user: User) -> Job:
+    job = report_jobs.get(job_id, current_user.id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report job not found",
+        )
+    return job
+
+
+@router.post("/jobs", response_model=ReportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+@query_budget(4)
+async def create_report_job(
+    job_data: ReportJobCreate,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Queue a trial balance, ledger report or CSV export to run in the background.
+    Poll the returned job and download result_url once it has succeeded.
+    """
+    if job_data.start_date > job_data.end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Start date must be before or equal to end date",
+        )
+
+    params = {"start_date": job_data.start_date.isoformat(), "end_date": job_data.end_date.isoformat()}
+
+    if job_data.kind == ReportJobKind.LEDGER_REPORT:
+        if job_data.ledger_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="ledger_id is required for a ledger report",
+            )
+        ledger = (
+            db.query(Ledger.id)
+            .filter(Ledger.id == job_data.ledger_id)
+            .filter(Ledger.user_id == current_user.id)
+            .filter(Ledger.is_active == True)
+            .first()
+        )
+        if not ledger:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Ledger not found or does not belong to user",
+            )
+        params["ledger_id"] = job_data.ledger_id
+
+    try:
+        job = submit_report_job(current_user.id, job_data.kind.value, params)
+    except JobQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": "30"},
+        )
+
+    return _job_response(request, job)
+
+
+@router.get("/jobs/{job_id}", response_model=ReportJobResponse)
+@query_budget(1)
+async def get_report_job(
+    job_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+):
+    """Get the status of a report job."""
+    return _job_response(request, _get_job_or_404(job_id, current_user))
+
+
+@router.get("/jobs/{job_id}/result")
+@query_budget(1)
+async def get_report_job_result(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """Download the result of a finished report job."""
+    job = _get_job_or_404(job_id, current_user)
+
+    if job.status == FAILED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=job.error,
+        )
+    if not job.is_finished:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Report job has not finished yet",
+        )
+
+    path = report_jobs.result_path(job)
+    if not os.path.exists(path):
+        # Removed by the TTL purge since the job was loaded
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Report job result has expired",
+        )
 
+    return FileResponse(path, media_type=job.media_type, filename=job.filename)
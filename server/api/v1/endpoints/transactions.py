@@ -1,14 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import bindparam, delete, insert, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, Tuple
 from decimal import Decimal
 
+from core.admission import admission_cost
+from core.config import settings
 from core.database import get_db
-from api.v1.endpoints.auth import get_current_user
+from core.metrics import POSTED_ITEMS, POSTINGS
+from core.money import to_cents, to_decimal
+from core.query_budget import query_budget
+from core.replica import read_replica
+from core.responses import FastJSONResponse
+from api.v1.endpoints.auth import get_admitted_user, get_current_user
 from models.user import User
 from models.finance import Transaction, TransactionItem, TransactionType, EntryType, Ledger
+from services import read_models
+from services.archive import closed_years
+from services.fingerprints import find_duplicate, suspected_duplicates, transaction_fingerprint
+from services.ledger_balances import apply_ledger_deltas, bump_ledger_version, item_deltas
+from services.ledger_cache import ledger_cache
+from services.reconciliation import release_transaction_items
 from schemas.finance import (
+    DuplicateGroup,
     TransactionCreate,
+    TransactionCreateResponse,
+    TransactionItemCreate,
     TransactionResponse,
     TransactionWithItems,
     TransactionUpdate,
@@ -16,27 +33,69 @@ from schemas.finance import (
 
 router = APIRouter()
 
+# Built once so postings reuse the compiled statement (expanding IN list per request)
+_USER_ACTIVE_LEDGER_IDS = select(Ledger.id).where(
+    Ledger.id.in_(bindparam("ledger_ids", expanding=True)),
+    Ledger.user_id == bindparam("user_id"),
+    Ledger.is_active == True,
+)
+
+
+def _double_entry_total(items: List[TransactionItemCreate]) -> Decimal:
+    """
+    Check that debits equal credits and return the transaction value (the debit total).
+    Amounts are compared in cents as they will be stored, so sub-cent inputs cannot
+    balance here and then be rounded out of balance by the column.
+    """
+    total_debits = 0
+    total_credits = 0
+    for item in items:
+        if item.entry_type == EntryType.DEBIT:
+            total_debits += to_cents(item.amount)
+        else:
+            total_credits += to_cents(item.amount)
+
+    if total_debits != total_credits:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Double-entry validation failed: Debits ({to_decimal(total_debits)}) must equal Credits ({to_decimal(total_credits)})",
+        )
+    return to_decimal(total_debits)
+
+
+def _ensure_open_years(db: Session, user_id: int, *dates) -> None:
+    """Archived years are closed: their entries live in the archive, not in the database."""
+    closed = closed_years(db, user_id, dates)
+    if closed:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"{closed[0]} is archived; transactions dated in it cannot be added, changed or deleted",
+        )
+
 
 @router.post(
     "/",
-    response_model=TransactionResponse,
+    response_model=TransactionCreateResponse,
     status_code=status.HTTP_201_CREATED,
 )
+@query_budget(12)
 async def create_transaction(
     transaction_data: TransactionCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    allow_duplicate: bool = Query(False, description="Post even if an identical transaction exists"),
 ):
-    """Create a new transaction with double-entry accounting validation."""
+    """
+    Create a new transaction with double-entry accounting validation.
+    A transaction with the same date, reference, ledgers and amounts as an existing
+    one is a likely duplicate: it is reported in duplicate_of, or rejected with 409
+    when PESA_PLAN_DUPLICATE_POLICY is "reject" and allow_duplicate is not set.
+    """
     # Validate that items exist and belong to user
     ledger_ids = [item.ledger_id for item in transaction_data.items]
-    ledgers = (
-        db.query(Ledger)
-        .filter(Ledger.id.in_(ledger_ids))
-        .filter(Ledger.user_id == current_user.id)
-        .filter(Ledger.is_active == True)
-        .all()
-    )
+    ledgers = db.scalars(
+        _USER_ACTIVE_LEDGER_IDS, {"ledger_ids": ledger_ids, "user_id": current_user.id}
+    ).all()
 
     if len(ledgers) != len(set(ledger_ids)):
         raise HTTPException(
@@ -45,27 +104,25 @@ async def create_transaction(
         )
 
     # Validate double-entry: total debits must equal total credits
-    total_debits = sum(
-        Decimal(str(item.amount))
-        for item in transaction_data.items
-        if item.entry_type == EntryType.DEBIT
-    )
-    total_credits = sum(
-        Decimal(str(item.amount))
-        for item in transaction_data.items
-        if item.entry_type == EntryType.CREDIT
+    calculated_total = _double_entry_total(transaction_data.items)
+    _ensure_open_years(db, current_user.id, transaction_data.transaction_date)
+
+    # Check for a likely duplicate with one index probe
+    fingerprint = transaction_fingerprint(
+        current_user.id,
+        transaction_data.transaction_date,
+        transaction_data.reference,
+        ((item.ledger_id, item.entry_type, item.amount) for item in transaction_data.items),
     )
-
-    if total_debits != total_credits:
+    duplicate_of = None
+    if settings.DUPLICATE_POLICY != "off":
+        duplicate_of = find_duplicate(db, current_user.id, fingerprint)
+    if duplicate_of is not None and settings.DUPLICATE_POLICY == "reject" and not allow_duplicate:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Double-entry validation failed: Debits ({total_debits}) must equal Credits ({total_credits})",
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Possible duplicate of transaction {duplicate_of}; set allow_duplicate to post it anyway",
         )
 
-    # Calculate total_amount automatically: use debit total (or credit total, they're equal)
-    # This represents the transaction value, not the sum of all entries
-    calculated_total = total_debits
-
     # Create transaction
     new_transaction = Transaction(
         user_id=current_user.id,
@@ -73,55 +130,80 @@ async def create_transaction(
         reference=transaction_data.reference,
         transaction_type=transaction_data.transaction_type,
         total_amount=calculated_total,
+        fingerprint=fingerprint,
     )
 
     db.add(new_transaction)
     db.flush()  # Flush to get the transaction ID
 
-    # Create transaction items
-    for item_data in transaction_data.items:
-        new_item = TransactionItem(
-            transaction_id=new_transaction.id,
-            ledger_id=item_data.ledger_id,
-            entry_type=item_data.entry_type,
-            amount=item_data.amount,
-        )
-        db.add(new_item)
+    # Create transaction items in a single batched INSERT
+    db.execute(
+        insert(TransactionItem),
+        [
+            {
+                "transaction_id": new_transaction.id,
+                "ledger_id": item_data.ledger_id,
+                "entry_type": item_data.entry_type,
+                "amount": item_data.amount,
+            }
+            for item_data in transaction_data.items
+        ],
+    )
+    # Bumped before ledger_balances are touched, see ledger_balances.lock_users
+    ledger_version = bump_ledger_version(db, current_user.id)
+    apply_ledger_deltas(
+        db,
+        current_user.id,
+        item_deltas((item.ledger_id, item.entry_type, item.amount) for item in transaction_data.items),
+    )
 
     db.commit()
+    ledger_cache.record_posting(
+        current_user.id,
+        ledger_version,
+        [
+            (transaction_data.transaction_date, item.ledger_id, item.entry_type, item.amount)
+            for item in transaction_data.items
+        ],
+    )
     db.refresh(new_transaction)
+    new_transaction.duplicate_of = duplicate_of
+    POSTINGS.inc(1, "create")
+    POSTED_ITEMS.inc(len(transaction_data.items))
 
     return new_transaction
 
 
 @router.get("/", response_model=List[TransactionResponse])
+@query_budget(3)
+@read_replica
+@admission_cost(1)
 async def get_transactions(
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_admitted_user),
     db: Session = Depends(get_db),
     transaction_type: TransactionType = None,
     limit: int = 100,
     offset: int = 0,
 ):
     """Get all transactions for the current user."""
-    query = (
-        db.query(Transaction)
-        .filter(Transaction.user_id == current_user.id)
-    )
+    return FastJSONResponse(read_models.transaction_list(db, current_user.id, transaction_type, limit, offset))
 
-    if transaction_type:
-        query = query.filter(Transaction.transaction_type == transaction_type)
-
-    transactions = (
-        query.order_by(Transaction.transaction_date.desc(), Transaction.created_at.desc())
-        .limit(limit)
-        .offset(offset)
-        .all()
-    )
 
-    return transactions
+@router.get("/duplicates", response_model=List[DuplicateGroup])
+@query_budget(3)
+@read_replica
+async def get_duplicate_transactions(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = 0,
+):
+    """Groups of transactions with the same date, reference, ledgers and amounts (suspected duplicates)."""
+    return FastJSONResponse(suspected_duplicates(db, current_user.id, limit, offset))
 
 
 @router.get("/{transaction_id}", response_model=TransactionWithItems)
+@query_budget(4)
 async def get_transaction(
     transaction_id: int,
     current_user: User = Depends(get_current_user),
@@ -145,6 +227,7 @@ async def get_transaction(
 
 
 @router.put("/{transaction_id}", response_model=TransactionWithItems)
+@query_budget(16)
 async def update_transaction(
     transaction_id: int,
     transaction_data: TransactionUpdate,
@@ -166,17 +249,19 @@ async def update_transaction(
             detail="Transaction not found",
         )
 
+    _ensure_open_years(
+        db, current_user.id, transaction.transaction_date, transaction_data.transaction_date or transaction.transaction_date
+    )
+    # Bumped before ledger_balances are touched, see ledger_balances.lock_users
+    bump_ledger_version(db, current_user.id)
+
     # If items are being updated, validate them
     if transaction_data.items is not None:
         # Validate that items exist and belong to user
         ledger_ids = [item.ledger_id for item in transaction_data.items]
-        ledgers = (
-            db.query(Ledger)
-            .filter(Ledger.id.in_(ledger_ids))
-            .filter(Ledger.user_id == current_user.id)
-            .filter(Ledger.is_active == True)
-            .all()
-        )
+        ledgers = db.scalars(
+            _USER_ACTIVE_LEDGER_IDS, {"ledger_ids": ledger_ids, "user_id": current_user.id}
+        ).all()
 
         if len(ledgers) != len(set(ledger_ids)):
             raise HTTPException(
@@ -185,40 +270,55 @@ async def update_transaction(
             )
 
         # Validate double-entry: total debits must equal total credits
-        total_debits = sum(
-            Decimal(str(item.amount))
-            for item in transaction_data.items
-            if item.entry_type == EntryType.DEBIT
-        )
-        total_credits = sum(
-            Decimal(str(item.amount))
-            for item in transaction_data.items
-            if item.entry_type == EntryType.CREDIT
-        )
-
-        if total_debits != total_credits:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Double-entry validation failed: Debits ({total_debits}) must equal Credits ({total_credits})",
-            )
-
-        # Calculate total_amount automatically
-        calculated_total = total_debits
-
-        # Delete existing items
-        db.query(TransactionItem).filter(
-            TransactionItem.transaction_id == transaction_id
-        ).delete()
-
-        # Create new items
+        calculated_total = _double_entry_total(transaction_data.items)
+
+        # Items whose ledger, side and amount are unchanged stay in place, so statement
+        # lines matched to them stay matched; only the rest are replaced
+        unchanged: Dict[Tuple[int, EntryType, int], List[int]] = {}
+        for item_id, ledger_id, entry_type, amount in db.execute(
+            select(TransactionItem.id, TransactionItem.ledger_id, TransactionItem.entry_type, TransactionItem.amount)
+            .where(TransactionItem.transaction_id == transaction_id)
+            .order_by(TransactionItem.id)
+        ):
+            unchanged.setdefault((ledger_id, entry_type, to_cents(amount)), []).append(item_id)
+        new_items = []
         for item_data in transaction_data.items:
-            new_item = TransactionItem(
-                transaction_id=transaction.id,
-                ledger_id=item_data.ledger_id,
-                entry_type=item_data.entry_type,
-                amount=item_data.amount,
+            kept = unchanged.get((item_data.ledger_id, item_data.entry_type, to_cents(item_data.amount)))
+            if kept:
+                kept.pop(0)
+            else:
+                new_items.append(item_data)
+        removed_ids = [item_id for item_ids in unchanged.values() for item_id in item_ids]
+
+        removed_items = []
+        if removed_ids:
+            # Replaced items lose their statement matches; the lines can be matched again
+            release_transaction_items(db, transaction_id, removed_ids)
+
+            # Delete them, keeping what they contributed to the ledger balances
+            removed_items = db.execute(
+                delete(TransactionItem)
+                .where(TransactionItem.id.in_(removed_ids))
+                .returning(TransactionItem.ledger_id, TransactionItem.entry_type, TransactionItem.amount)
+            ).all()
+
+        if new_items:
+            # Create new items in a single batched INSERT
+            db.execute(
+                insert(TransactionItem),
+                [
+                    {
+                        "transaction_id": transaction.id,
+                        "ledger_id": item_data.ledger_id,
+                        "entry_type": item_data.entry_type,
+                        "amount": item_data.amount,
+                    }
+                    for item_data in new_items
+                ],
             )
-            db.add(new_item)
+        deltas = item_deltas(removed_items, sign=-1)
+        item_deltas(((item.ledger_id, item.entry_type, item.amount) for item in new_items), into=deltas)
+        apply_ledger_deltas(db, current_user.id, deltas)
 
         transaction.total_amount = calculated_total
 
@@ -229,14 +329,35 @@ async def update_transaction(
         transaction.reference = transaction_data.reference
     if transaction_data.transaction_type is not None:
         transaction.transaction_type = transaction_data.transaction_type
+    if (
+        transaction_data.items is not None
+        or transaction_data.transaction_date is not None
+        or transaction_data.reference is not None
+    ):
+        if transaction_data.items is not None:
+            items = [(item.ledger_id, item.entry_type, item.amount) for item in transaction_data.items]
+        else:
+            items = db.execute(
+                select(TransactionItem.ledger_id, TransactionItem.entry_type, TransactionItem.amount).where(
+                    TransactionItem.transaction_id == transaction_id
+                )
+            ).all()
+        transaction.fingerprint = transaction_fingerprint(
+            current_user.id, transaction.transaction_date, transaction.reference, items
+        )
 
     db.commit()
+    ledger_cache.invalidate(current_user.id)
     db.refresh(transaction)
+    POSTINGS.inc(1, "update")
+    if transaction_data.items is not None:
+        POSTED_ITEMS.inc(len(transaction_data.items))
 
     return transaction
 
 
 @router.delete("/{transaction_id}", status_code=status.HTTP_204_NO_CONTENT)
+@query_budget(11)
 async def delete_transaction(
     transaction_id: int,
     current_user: User = Depends(get_current_user),
@@ -256,14 +377,25 @@ async def delete_transaction(
             detail="Transaction not found",
         )
 
+    _ensure_open_years(db, current_user.id, transaction.transaction_date)
+    # Bumped before ledger_balances are touched, see ledger_balances.lock_users
+    bump_ledger_version(db, current_user.id)
+
+    release_transaction_items(db, transaction_id)
+
     # Delete transaction items (cascade should handle this, but being explicit)
-    db.query(TransactionItem).filter(
-        TransactionItem.transaction_id == transaction_id
-    ).delete()
+    removed_items = db.execute(
+        delete(TransactionItem)
+        .where(TransactionItem.transaction_id == transaction_id)
+        .returning(TransactionItem.ledger_id, TransactionItem.entry_type, TransactionItem.amount)
+    ).all()
+    apply_ledger_deltas(db, current_user.id, item_deltas(removed_items, sign=-1))
 
     # Delete transaction
     db.delete(transaction)
     db.commit()
+    ledger_cache.invalidate(current_user.id)
+    POSTINGS.inc(1, "delete")
 
     return None
 
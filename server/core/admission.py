@@ -0,0 +1,183 @@
+"""
+Admission control for expensive endpoints.
+
+Each admitted request holds "cost" units of two weighted semaphores until its
+response has been sent: a per-process global one and one per user. A request that
+would take a user over their share is rejected at once with 429; when the global
+capacity is in use, requests wait in a bounded FIFO queue and get 503 if the queue
+is full or they wait longer than the queue timeout. One user's runaway client then
+saturates only their own share instead of every pooled connection.
+
+Endpoints declare their cost with @admission_cost (placed below the router
+decorator, like @query_budget); PESA_PLAN_ADMISSION_COSTS can override it per
+route, e.g. "GET /api/v1/reports/trial-balance=8".
+"""
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from core.config import settings
+from core.metrics import REGISTRY, Counter, Gauge
+
+ADMISSIONS = REGISTRY.register(
+    Counter("admission_requests_total", "Admission control decisions by result.", ("result",))
+)
+
+
+def admission_cost(cost: int):
+    """
+    Declare an endpoint's admission cost in capacity units. Apply below the router decorator:
+
+        @router.get("/trial-balance")
+        @admission_cost(4)
+        async def get_trial_balance(...):
+    """
+
+    def decorator(func):
+        func.__admission_cost__ = cost
+        return func
+
+    return decorator
+
+
+def parse_costs(value: str) -> Dict[Tuple[str, str], int]:
+    """Parse "METHOD /path=cost,..." into {(method, path): cost}."""
+    costs = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        route, _, cost = entry.rpartition("=")
+        method, _, path = route.strip().partition(" ")
+        costs[(method.upper(), path.strip())] = int(cost)
+    return costs
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        capacity: int,
+        per_user_capacity: int,
+        max_queue: int,
+        queue_timeout_seconds: float,
+        route_costs: Optional[Dict[Tuple[str, str], int]] = None,
+    ):
+        self.capacity = capacity
+        self.per_user_capacity = per_user_capacity
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.route_costs = route_costs or {}
+        self.in_use = 0
+        self._per_user: Dict[int, int] = {}
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+
+        REGISTRY.register(
+            Gauge(
+                "admission_capacity_in_use",
+                "Admission capacity units held by running requests.",
+                lambda: [((), self.in_use)],
+            )
+        )
+        REGISTRY.register(
+            Gauge(
+                "admission_queue_length",
+                "Requests waiting for admission capacity.",
+                lambda: [((), sum(1 for _, future in self._waiters if not future.done()))],
+            )
+        )
+
+    def cost_for(self, method: str, route) -> int:
+        """Cost of a request: the configured override for its route, else the endpoint's declared cost."""
+        path = getattr(route, "path", None)
+        if (method, path) in self.route_costs:
+            return self.route_costs[(method, path)]
+        return getattr(getattr(route, "endpoint", None), "__admission_cost__", 1)
+
+    def _wake(self) -> None:
+        # Strict FIFO: a large request at the head is not overtaken by smaller ones behind it
+        while self._waiters:
+            weight, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+            elif self.in_use + weight <= self.capacity:
+                self._waiters.popleft()
+                self.in_use += weight
+                future.set_result(None)
+            else:
+                break
+
+    def _release_user(self, user_id: int, weight: int) -> None:
+        self._per_user[user_id] -= weight
+        if not self._per_user[user_id]:
+            del self._per_user[user_id]
+
+    def _release(self, user_id: int, weight: int) -> None:
+        self.in_use -= weight
+        self._release_user(user_id, weight)
+        self._wake()
+
+    def _reject(self, status_code: int, result: str, detail: str) -> HTTPException:
+        ADMISSIONS.inc(1, result)
+        return HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": "5"})
+
+    async def _acquire(self, user_id: int, weight: int, on_queue: Optional[Callable[[], None]]) -> None:
+        if self._per_user.get(user_id, 0) + weight > self.per_user_capacity:
+            raise self._reject(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                "rejected_user_limit",
+                "Too many concurrent report requests; please wait for earlier ones to finish",
+            )
+        self._per_user[user_id] = self._per_user.get(user_id, 0) + weight
+
+        if not self._waiters and self.in_use + weight <= self.capacity:
+            self.in_use += weight
+            ADMISSIONS.inc(1, "admitted")
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._release_user(user_id, weight)
+            raise self._reject(
+                status.HTTP_503_SERVICE_UNAVAILABLE, "rejected_queue_full", "Server is busy; please try again shortly"
+            )
+
+        if on_queue is not None:
+            on_queue()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((weight, future))
+        try:
+            await asyncio.wait_for(future, self.queue_timeout_seconds)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Timed out or the client went away; give back capacity if it was granted just before
+            if future.done() and not future.cancelled():
+                self.in_use -= weight
+            self._release_user(user_id, weight)
+            self._wake()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject(
+                status.HTTP_503_SERVICE_UNAVAILABLE, "rejected_timeout", "Server is busy; please try again shortly"
+            )
+        ADMISSIONS.inc(1, "admitted_after_queue")
+
+    @asynccontextmanager
+    async def admit(self, user_id: int, cost: int, on_queue: Optional[Callable[[], None]] = None):
+        """
+        Hold cost units for the duration of the block, waiting in the queue if needed.
+        on_queue runs before waiting (e.g. to return the request's DB connection to the pool).
+        """
+        weight = max(1, min(cost, self.capacity, self.per_user_capacity))
+        await self._acquire(user_id, weight, on_queue)
+        try:
+            yield
+        finally:
+            self._release(user_id, weight)
+
+
+admission = AdmissionController(
+    capacity=settings.ADMISSION_CAPACITY,
+    per_user_capacity=settings.ADMISSION_PER_USER_CAPACITY,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    queue_timeout_seconds=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    route_costs=parse_costs(settings.ADMISSION_COSTS),
+)
@@ -18,5 +18,82 @@ class Settings(BaseSettings):
 
     DATABASE_URL: str = _env_config("PESA_PLAN_DATABASE_URL")
 
+    # Optional streaming replica for reports and list endpoints; empty sends everything to the primary
+    REPLICA_DATABASE_URL: str = _env_config("PESA_PLAN_REPLICA_DATABASE_URL", default="")
+    # Reads fall back to the primary when the replica is further behind than this
+    REPLICA_MAX_LAG_SECONDS: float = _env_config("PESA_PLAN_REPLICA_MAX_LAG_SECONDS", default=5.0, cast=float)
+    REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = _env_config(
+        "PESA_PLAN_REPLICA_LAG_CHECK_INTERVAL_SECONDS", default=1.0, cast=float
+    )
+    # After a user writes, their reads stay on the primary for this long
+    REPLICA_READ_YOUR_WRITES_SECONDS: float = _env_config(
+        "PESA_PLAN_REPLICA_READ_YOUR_WRITES_SECONDS", default=10.0, cast=float
+    )
+    # Shared by all workers on the host; defaults to a directory under the system temp dir
+    REPLICA_WRITE_MARKER_DIR: str = _env_config("PESA_PLAN_REPLICA_WRITE_MARKER_DIR", default="")
+
+    # Seconds before the in-process chart-of-accounts registry is revalidated against the database
+    COA_CACHE_TTL_SECONDS: int = _env_config("PESA_PLAN_COA_CACHE_TTL_SECONDS", default=300, cast=int)
+
+    # Responses smaller than this many bytes are sent uncompressed
+    COMPRESSION_MINIMUM_SIZE: int = _env_config("PESA_PLAN_COMPRESSION_MINIMUM_SIZE", default=1024, cast=int)
+
+    # Bearer token Prometheus must send to scrape /metrics; when empty, /metrics is not served
+    METRICS_TOKEN: str = _env_config("PESA_PLAN_METRICS_TOKEN", default="")
+
+    # Per-request SQL query budgets: "off" (production), "log" (staging) or "raise" (tests/CI)
+    QUERY_BUDGET_MODE: str = _env_config("PESA_PLAN_QUERY_BUDGET_MODE", default="off")
+    # Budget for endpoints without @query_budget, and how often one statement may repeat per request
+    QUERY_BUDGET_DEFAULT: int = _env_config("PESA_PLAN_QUERY_BUDGET_DEFAULT", default=25, cast=int)
+    QUERY_BUDGET_REPEAT_THRESHOLD: int = _env_config("PESA_PLAN_QUERY_BUDGET_REPEAT_THRESHOLD", default=5, cast=int)
+
+    # Background report jobs: worker threads per process, queue limits and how long results are kept
+    REPORT_JOB_WORKERS: int = _env_config("PESA_PLAN_REPORT_JOB_WORKERS", default=2, cast=int)
+    REPORT_JOB_MAX_PENDING: int = _env_config("PESA_PLAN_REPORT_JOB_MAX_PENDING", default=20, cast=int)
+    REPORT_JOB_MAX_PENDING_PER_USER: int = _env_config("PESA_PLAN_REPORT_JOB_MAX_PENDING_PER_USER", default=3, cast=int)
+    REPORT_JOB_RESULT_TTL_SECONDS: int = _env_config("PESA_PLAN_REPORT_JOB_RESULT_TTL_SECONDS", default=3600, cast=int)
+    # Shared by all workers on the host; defaults to a directory under the system temp dir
+    REPORT_JOB_DIR: str = _env_config("PESA_PLAN_REPORT_JOB_DIR", default="")
+
+    # Largest number of buckets (points per series) a balance-history request may ask for
+    BALANCE_HISTORY_MAX_POINTS: int = _env_config("PESA_PLAN_BALANCE_HISTORY_MAX_POINTS", default=1000, cast=int)
+    # Rows returned by /reports/pivot before the result is truncated
+    PIVOT_MAX_ROWS: int = _env_config("PESA_PLAN_PIVOT_MAX_ROWS", default=5000, cast=int)
+
+    # Serve trial balances and balance history from per-process NumPy copies of each user's entries
+    LEDGER_CACHE_ENABLED: bool = _env_config("PESA_PLAN_LEDGER_CACHE_ENABLED", default=False, cast=bool)
+    # Per worker process; least recently used users are evicted beyond this
+    LEDGER_CACHE_MAX_BYTES: int = _env_config("PESA_PLAN_LEDGER_CACHE_MAX_BYTES", default=256 * 1024 * 1024, cast=int)
+
+    # What POST /transactions/ does with a likely duplicate (same fingerprint as an existing
+    # transaction): "flag" returns it in duplicate_of, "reject" answers 409 unless allow_duplicate
+    # is set, "off" skips the check
+    DUPLICATE_POLICY: str = _env_config("PESA_PLAN_DUPLICATE_POLICY", default="flag")
+
+    # Bank reconciliation: most lines per imported statement, and how many days a line's date may
+    # differ from the transaction it is auto-matched to
+    RECONCILIATION_MAX_LINES: int = _env_config("PESA_PLAN_RECONCILIATION_MAX_LINES", default=20000, cast=int)
+    RECONCILIATION_DATE_WINDOW_DAYS: int = _env_config("PESA_PLAN_RECONCILIATION_DATE_WINDOW_DAYS", default=5, cast=int)
+
+    # Parquet files of archived years (scripts/archive_years.py), read back by reports;
+    # must be shared by all app servers and backed up with the database
+    ARCHIVE_DIR: str = _env_config("PESA_PLAN_ARCHIVE_DIR", default=os.path.join(_project_root, "archive"))
+
+    # Admission control for expensive endpoints (capacities are in cost units per worker process)
+    ADMISSION_ENABLED: bool = _env_config("PESA_PLAN_ADMISSION_ENABLED", default=True, cast=bool)
+    ADMISSION_CAPACITY: int = _env_config("PESA_PLAN_ADMISSION_CAPACITY", default=16, cast=int)
+    ADMISSION_PER_USER_CAPACITY: int = _env_config("PESA_PLAN_ADMISSION_PER_USER_CAPACITY", default=6, cast=int)
+    ADMISSION_MAX_QUEUE: int = _env_config("PESA_PLAN_ADMISSION_MAX_QUEUE", default=32, cast=int)
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = _env_config(
+        "PESA_PLAN_ADMISSION_QUEUE_TIMEOUT_SECONDS", default=5.0, cast=float
+    )
+    # Per-route cost overrides, e.g. "GET /api/v1/reports/trial-balance=8,GET /api/v1/transactions/=2"
+    ADMISSION_COSTS: str = _env_config("PESA_PLAN_ADMISSION_COSTS", default="")
+
+    # Connections each worker opens at startup so early requests skip the connection handshake
+    DB_POOL_WARM_CONNECTIONS: int = _env_config("PESA_PLAN_DB_POOL_WARM_CONNECTIONS", default=2, cast=int)
+    # psycopg 3 only: executions of a statement on a connection before it is prepared server-side (0 disables)
+    DB_PREPARE_THRESHOLD: int = _env_config("PESA_PLAN_DB_PREPARE_THRESHOLD", default=5, cast=int)
+
 
 settings = Settings()
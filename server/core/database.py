@@ -1,19 +1,140 @@
-from sqlalchemy import create_engine
+import os
+import tempfile
+from typing import Callable, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from core.config import settings
+from core.metrics import REGISTRY, Counter, Gauge
+from core.replica import ReplicaLagMonitor, WriteTracker
+
+
+def _connect_args(url: str) -> dict:
+    # psycopg 3 prepares a statement server-side once it has run prepare_threshold times
+    # on a connection; psycopg2 has no equivalent
+    if make_url(url).get_driver_name() == "psycopg":
+        return {"prepare_threshold": settings.DB_PREPARE_THRESHOLD or None}
+    return {}
+
 
-engine = create_engine(settings.DATABASE_URL)
+engine = create_engine(settings.DATABASE_URL, connect_args=_connect_args(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional read replica for reports and list endpoints (see core.replica)
+replica_engine = (
+    create_engine(settings.REPLICA_DATABASE_URL, connect_args=_connect_args(settings.REPLICA_DATABASE_URL))
+    if settings.REPLICA_DATABASE_URL
+    else None
+)
+ReplicaSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine) if replica_engine is not None else None
+)
+
 Base = declarative_base()
 
+DB_ROUTING = REGISTRY.register(
+    Counter("db_session_routing_total", "Sessions opened by target database and reason.", ("target", "reason"))
+)
+
+write_tracker: Optional[WriteTracker] = None
+lag_monitor: Optional[ReplicaLagMonitor] = None
+
+if replica_engine is not None:
+    write_tracker = WriteTracker(
+        settings.REPLICA_WRITE_MARKER_DIR or os.path.join(tempfile.gettempdir(), "pesa-plan-write-markers"),
+        window_seconds=settings.REPLICA_READ_YOUR_WRITES_SECONDS,
+    )
+    lag_monitor = ReplicaLagMonitor(
+        replica_engine,
+        max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+        check_interval_seconds=settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+    )
+
+    def _replica_lag_samples():
+        if lag_monitor.lag_seconds is not None:
+            yield (), lag_monitor.lag_seconds
+
+    REGISTRY.register(Gauge("db_replica_lag_seconds", "Last measured replica replay lag.", _replica_lag_samples))
+
+    @event.listens_for(SessionLocal, "after_flush")
+    def _note_write(session, flush_context):
+        session.info["wrote"] = True
+
+    @event.listens_for(SessionLocal, "after_commit")
+    def _mark_user_write(session):
+        # user_id is set by get_current_user; start the user's read-your-writes window
+        if session.info.pop("wrote", False) and session.info.get("user_id") is not None:
+            write_tracker.mark(session.info["user_id"])
+
+    @event.listens_for(SessionLocal, "after_rollback")
+    def _forget_write(session):
+        session.info.pop("wrote", None)
+
+
+# Replaces SessionLocal (and the replica) for every session the app opens, when set.
+# Tests point it at their own connection (tests/database.py) so that sessions opened
+# outside get_db, by report jobs, warm-up or get_current_user, stay inside the test.
+_session_factory: Optional[Callable[[], Session]] = None
+
+
+def set_session_factory(factory: Optional[Callable[[], Session]]) -> Optional[Callable[[], Session]]:
+    """Open sessions with factory from now on (None restores the default); returns the previous one."""
+    global _session_factory
+    previous, _session_factory = _session_factory, factory
+    return previous
+
+
+def new_session() -> Session:
+    """A session on the primary. Use this rather than SessionLocal() in the app."""
+    if _session_factory is not None:
+        return _session_factory()
+    return SessionLocal()
+
+
+def _replica_allowed(user_id: Optional[int]) -> bool:
+    """Whether reads for the user can go to the replica: it is keeping up and the user has not written recently."""
+    if user_id is not None and write_tracker.wrote_recently(user_id):
+        reason = "read_your_writes"
+    elif not lag_monitor.is_healthy():
+        reason = "replica_lag"
+    else:
+        DB_ROUTING.inc(1, "replica", "read")
+        return True
+    DB_ROUTING.inc(1, "primary", reason)
+    return False
+
+
+def read_session(user_id: Optional[int] = None) -> Session:
+    """
+    A session for read-only work: on the replica when one is configured, it is keeping
+    up, and the user has not written recently; otherwise on the primary.
+    """
+    if ReplicaSessionLocal is None or _session_factory is not None or not _replica_allowed(user_id):
+        return new_session()
+    db = ReplicaSessionLocal()
+    db.info["replica"] = True
+    return db
+
+
+def route_to_replica(db: Session, user_id: int) -> None:
+    """
+    Move a request's session to the replica when read_session would use it for the user.
+    get_current_user calls this for @read_replica endpoints once it has the user id,
+    before the session's first query.
+    """
+    if replica_engine is None or _session_factory is not None or db.in_transaction():
+        return
+    if _replica_allowed(user_id):
+        db.bind = replica_engine
+        db.info["replica"] = True
+
 
 def get_db():
-    db = SessionLocal()
+    db = new_session()
     try:
         yield db
     finally:
         db.close()
-
@@ -0,0 +1,257 @@
+"""
+Background job queue for long-running work such as large reports and exports.
+
+Jobs run on a bounded in-process thread pool, so a multi-year report no longer holds
+an HTTP worker (and its DB connection) for the whole computation. Job state and
+results are kept as files in a private (0700) shared directory: any worker process
+on the host can answer status and download requests, whichever worker ran the job.
+Finished jobs are removed by a periodic purge once their TTL expires.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from datetime import datetime, timezone
+from typing import BinaryIO, Callable, Dict, Optional, Tuple
+
+from core.metrics import REGISTRY, Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+_JOB_ID = re.compile(r"^[0-9a-f]{32}$")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+JOBS = REGISTRY.register(Counter("background_jobs_total", "Background jobs by kind and outcome.", ("kind", "status")))
+JOB_DURATION = REGISTRY.register(
+    Histogram(
+        "background_job_duration_seconds",
+        "Background job run time by kind.",
+        ("kind",),
+        buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+    )
+)
+
+# A runner writes its result to the file object and returns (media_type, filename)
+Runner = Callable[[BinaryIO], Tuple[str, str]]
+
+
+class JobQueueFull(Exception):
+    """Raised when a job cannot be accepted because too many are already pending."""
+
+
+class JobError(Exception):
+    """Raised by a runner for a failure the user can act on; the message becomes the job's error."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class Job:
+    id: str
+    user_id: int
+    kind: str
+    params: Dict
+    status: str = QUEUED
+    created_at: datetime = field(default_factory=_now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    media_type: Optional[str] = None
+    filename: Optional[str] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        for key in ("created_at", "started_at", "finished_at"):
+            data[key] = data[key].isoformat() if data[key] else None
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "Job":
+        data = json.loads(raw)
+        for key in ("created_at", "started_at", "finished_at"):
+            data[key] = datetime.fromisoformat(data[key]) if data[key] else None
+        return cls(**data)
+
+
+class JobStore:
+    """Job metadata (<id>.json) and results (<id>.result) in a directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        # Results are users' financial data: only the server's own account may read them
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        os.chmod(directory, 0o700)
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.{suffix}")
+
+    def save(self, job: Job) -> None:
+        # Write then rename so readers in other processes never see a partial file
+        tmp_path = self._path(job.id, f"json.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(job.to_json())
+        os.replace(tmp_path, self._path(job.id, "json"))
+
+    def load(self, job_id: str) -> Optional[Job]:
+        if not _JOB_ID.match(job_id):
+            return None
+        try:
+            with open(self._path(job_id, "json")) as f:
+                return Job.from_json(f.read())
+        except FileNotFoundError:
+            return None
+
+    def result_path(self, job_id: str) -> str:
+        return self._path(job_id, "result")
+
+    def delete(self, job_id: str) -> None:
+        for suffix in ("json", "result"):
+            try:
+                os.remove(self._path(job_id, suffix))
+            except FileNotFoundError:
+                pass
+
+    def purge(self, ttl_seconds: int) -> None:
+        """Remove jobs that finished more than the TTL ago (or were abandoned by a stopped worker)."""
+        cutoff = time.time() - ttl_seconds
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            job = self.load(name[: -len(".json")])
+            if job is not None and (job.finished_at or job.created_at).timestamp() < cutoff:
+                self.delete(job.id)
+
+
+class JobQueue:
+    def __init__(
+        self,
+        store: JobStore,
+        max_workers: int = 2,
+        max_pending: int = 20,
+        max_pending_per_user: int = 3,
+        result_ttl_seconds: int = 3600,
+        purge_interval_seconds: float = 60,
+    ):
+        self.store = store
+        self.max_pending = max_pending
+        self.max_pending_per_user = max_pending_per_user
+        self.result_ttl_seconds = result_ttl_seconds
+        self.purge_interval_seconds = purge_interval_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        # Jobs accepted by this process and not yet finished, by user
+        self._pending: Dict[int, int] = {}
+        # Jobs accepted by this process that have not started, so shutdown can fail them
+        self._queued: Dict[str, Tuple[Job, Future]] = {}
+        self._purger: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def _start_purger(self) -> None:
+        # Started on first use rather than at import, so each (forked) worker process gets its own
+        if self._purger is None:
+            self._purger = threading.Thread(target=self._purge_periodically, name="job-purge", daemon=True)
+            self._purger.start()
+
+    def _purge_periodically(self) -> None:
+        while True:
+            try:
+                self.store.purge(self.result_ttl_seconds)
+            except Exception:
+                logger.exception("Purging expired background jobs failed")
+            if self._stopped.wait(self.purge_interval_seconds):
+                return
+
+    def submit(self, user_id: int, kind: str, params: Dict, runner: Runner) -> Job:
+        """Queue a job. Raises JobQueueFull when this process or the user has too many pending."""
+        with self._lock:
+            if sum(self._pending.values()) >= self.max_pending:
+                raise JobQueueFull("Too many background jobs are pending")
+            if self._pending.get(user_id, 0) >= self.max_pending_per_user:
+                raise JobQueueFull("You already have the maximum number of jobs pending")
+            self._pending[user_id] = self._pending.get(user_id, 0) + 1
+            self._start_purger()
+
+        job = Job(id=uuid.uuid4().hex, user_id=user_id, kind=kind, params=params)
+        try:
+            self.store.save(job)
+            # The worker updates its own copy; the caller gets the job as queued
+            with self._lock:
+                self._queued[job.id] = (job, self._executor.submit(self._run, replace(job), runner))
+        except Exception:
+            self._release(user_id)
+            raise
+        return job
+
+    def get(self, job_id: str, user_id: int) -> Optional[Job]:
+        """The job, or None if it does not exist, has expired or belongs to another user."""
+        job = self.store.load(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    def result_path(self, job: Job) -> str:
+        return self.store.result_path(job.id)
+
+    def _run(self, job: Job, runner: Runner) -> None:
+        with self._lock:
+            self._queued.pop(job.id, None)
+        job.status = RUNNING
+        job.started_at = _now()
+        self.store.save(job)
+        start = time.perf_counter()
+        try:
+            with open(self.store.result_path(job.id), "wb") as out:
+                job.media_type, job.filename = runner(out)
+            job.status = SUCCEEDED
+        except JobError as e:
+            job.status = FAILED
+            job.error = str(e)
+        except Exception:
+            logger.exception("Background job %s (%s) failed", job.id, job.kind)
+            job.status = FAILED
+            job.error = "Job failed; please try again later"
+        finally:
+            job.finished_at = _now()
+            self.store.save(job)
+            JOBS.inc(1, job.kind, job.status)
+            JOB_DURATION.observe(time.perf_counter() - start, job.kind)
+            self._release(job.user_id)
+
+    def _release(self, user_id: int) -> None:
+        with self._lock:
+            self._pending[user_id] -= 1
+            if not self._pending[user_id]:
+                del self._pending[user_id]
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the queue. Unless wait is set, jobs that have not started are cancelled and marked failed."""
+        self._stopped.set()
+        if not wait:
+            with self._lock:
+                queued = list(self._queued.values())
+                self._queued.clear()
+            for job, future in queued:
+                if future.cancel():
+                    job.status = FAILED
+                    job.finished_at = _now()
+                    job.error = "Job was cancelled because the server restarted; please submit it again"
+                    self.store.save(job)
+                    JOBS.inc(1, job.kind, job.status)
+                    self._release(job.user_id)
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
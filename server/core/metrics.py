@@ -0,0 +1,314 @@
+"""
+Prometheus-style metrics.
+
+A small in-process registry of counters, gauges and histograms rendered in the
+Prometheus text exposition format at /metrics, which is only served to scrapers
+sending the METRICS_TOKEN setting as a bearer token. Request latency is recorded per
+route template by MetricsMiddleware; SQLAlchemy cursor events add statement count
+and database time to the current request so slow endpoints can be split into SQL,
+serialization and Python time. Waiting for a pooled connection is recorded apart
+from statement time.
+
+Each worker process keeps its own registry; scrape every worker (or run a single
+worker) to get complete numbers.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, *labelvalues: str) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        if not values and not self.labelnames:
+            values = [((), 0)]
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in values
+        ]
+
+
+class Gauge(_Metric):
+    """Gauge whose samples are read from a callback at scrape time."""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]],
+        labelnames: Sequence[str] = (),
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._callback = callback
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._callback()
+        ]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(labels, list(state[0]), state[1], state[2]) for labels, state in self._values.items()]
+        lines = self.header()
+        for labels, bucket_counts, total, count in values:
+            cumulative = 0
+            for upper, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                le = ("le", _format_value(upper))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        # Re-registering a name replaces the previous metric (e.g. an engine instrumented again)
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(
+    Histogram("http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status"))
+)
+REQUEST_DB_STATEMENTS = REGISTRY.register(
+    Histogram(
+        "http_request_db_statements",
+        "SQL statements executed per HTTP request.",
+        ("method", "route"),
+        buckets=STATEMENT_BUCKETS,
+    )
+)
+REQUEST_DB_TIME = REGISTRY.register(
+    Histogram("http_request_db_seconds", "Time spent executing SQL per HTTP request.", ("method", "route"))
+)
+DB_STATEMENTS = REGISTRY.register(Counter("db_statements_total", "SQL statements executed."))
+DB_POOL_WAIT = REGISTRY.register(
+    Histogram(
+        "db_pool_wait_seconds",
+        "Time spent checking a connection out of the pool, including connecting, by engine.",
+        ("engine",),
+    )
+)
+RESPONSE_SERIALIZATION_TIME = REGISTRY.register(
+    Histogram("response_serialization_seconds", "Time spent rendering JSON response bodies.")
+)
+CACHE_REQUESTS = REGISTRY.register(
+    Counter("cache_requests_total", "In-process cache lookups by cache and result.", ("cache", "result"))
+)
+POSTINGS = REGISTRY.register(
+    Counter("transactions_posted_total", "Transactions written by operation.", ("operation",))
+)
+POSTED_ITEMS = REGISTRY.register(Counter("transaction_items_posted_total", "Transaction items written."))
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    DB_STATEMENTS.inc()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    start_times = context.connection.info.get("query_start_time") if context.connection is not None else None
+    if start_times:
+        start_times.pop()
+
+
+# Instrumented engines by name, for the pool gauge
+_engines: Dict[str, Engine] = {}
+
+
+def _pool_samples():
+    for name, engine in list(_engines.items()):
+        # Read engine.pool each time: dispose() (e.g. after a fork) replaces it
+        for state in ("checkedout", "checkedin", "overflow", "size"):
+            reader = getattr(engine.pool, state, None)
+            if reader is not None:
+                yield (name, state), reader()
+
+
+DB_POOL_CONNECTIONS = REGISTRY.register(
+    Gauge("db_pool_connections", "Connection pool usage by engine and state.", _pool_samples, ("engine", "state"))
+)
+
+
+def instrument_engine(engine: Engine, name: str = "primary") -> None:
+    """
+    Record SQL statement counts and time, how long connection checkouts wait on the
+    pool, and expose connection pool usage, all labelled with name where per engine.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    _engines[name] = engine
+
+    # The pool has no event before a checkout, only after it, so time the call that
+    # waits for one. Statement time starts after this, so a saturated pool shows up
+    # here rather than as slow SQL.
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection():
+        start = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start, name)
+
+    engine.raw_connection = timed_raw_connection
+
+
+class MetricsMiddleware:
+    """Record latency and per-request SQL statistics labelled by route template."""
+
+    def __init__(self, app: ASGIApp, exclude_paths: Sequence[str] = ("/metrics",)) -> None:
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            # Label by route template (not raw path) to keep cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_LATENCY.observe(elapsed, method, route_path, str(status_code))
+            REQUEST_DB_STATEMENTS.observe(stats.statements, method, route_path)
+            REQUEST_DB_TIME.observe(stats.db_seconds, method, route_path)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
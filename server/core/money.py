@@ -0,0 +1,48 @@
+"""
+Fixed-point money arithmetic in integer cents.
+
+Amounts are stored as Numeric(15, 2), so every stored value is a whole number of
+cents. Report loops work on Python ints instead of Decimal: the database converts
+amounts (or their sums) to cents with cents_expression(), the driver returns plain
+ints, and additions and comparisons are int operations. to_decimal() converts back
+at the API boundary; the result is the same value the Decimal arithmetic gave,
+always with two decimal places.
+
+Converting one value between Decimal and cents in Python costs several Decimal
+additions, so loops should get cents from SQL rather than convert row by row.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Union
+
+from sqlalchemy import BigInteger, cast
+
+ZERO = Decimal("0.00")
+
+
+def cents_expression(amount):
+    """SQL: a two-decimal amount (or a sum of them) as integer cents."""
+    # numeric * 100 is exact, so the cast never has a fraction to round
+    return cast(amount * 100, BigInteger)
+
+
+def to_cents(amount: Union[Decimal, int, str, float, None]) -> int:
+    """Amount as integer cents, rounded half away from zero like a Numeric(15, 2) column."""
+    if amount is None:
+        return 0
+    if isinstance(amount, float):
+        # The shortest repr is what the caller meant; Decimal(0.1) is not 0.1
+        amount = repr(amount)
+    scaled = Decimal(amount).scaleb(2)
+    cents = int(scaled)
+    if cents != scaled:
+        # Sub-cent input; int() truncated it
+        cents = int(scaled.to_integral_value(rounding=ROUND_HALF_UP))
+    return cents
+
+
+def to_decimal(cents: int) -> Decimal:
+    """Cents as a two-decimal Decimal (accepts NumPy integers)."""
+    if not cents:
+        return ZERO
+    return Decimal(int(cents)).scaleb(-2)
@@ -0,0 +1,212 @@
+"""
+Per-request SQL query budgets and N+1 detection.
+
+Every statement sent to the database is recorded by a before_cursor_execute hook
+into the active QueryTracker(s). A tracker flags two problems:
+
+- the number of statements exceeds the budget, and
+- the same statement (same SQL text, any parameters) repeats within one unit of
+  work, which is the signature of an N+1 loop.
+
+Endpoints declare their budget with the @query_budget decorator (placed below the
+router decorator). QueryBudgetMiddleware enforces it per request according to
+PESA_PLAN_QUERY_BUDGET_MODE: "off", "log" (staging: warn and carry on) or "raise"
+(tests/CI: fail the statement that breaks the budget). Tests can also wrap any block
+in assert_max_queries().
+"""
+
+import logging
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+# Expanded IN lists differ in length between calls; collapse them so they count as the same statement
+_IN_LIST = re.compile(r"IN \((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+# Transaction control, not queries: tests run every request inside savepoints (tests/database.py)
+_SAVEPOINT = re.compile(r"\s*(?:SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b", re.IGNORECASE)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a unit of work issues more statements than allowed or repeats a statement."""
+
+
+def normalize_statement(statement: str) -> str:
+    return _IN_LIST.sub("IN (...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryTracker:
+    def __init__(
+        self,
+        max_queries: Optional[int] = None,
+        repeat_threshold: Optional[int] = None,
+        name: str = "block",
+        raise_on_violation: bool = True,
+        budget_resolver: Optional[Callable[[], Tuple[Optional[int], Optional[int]]]] = None,
+    ):
+        self.max_queries = max_queries
+        self.repeat_threshold = repeat_threshold
+        self.name = name
+        self.raise_on_violation = raise_on_violation
+        # Lets the middleware resolve the endpoint's budget once routing has happened
+        self._budget_resolver = budget_resolver
+        self.statements: List[str] = []
+        self.counts: Dict[str, int] = {}
+        self.violations: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _resolve_budget(self) -> None:
+        if self._budget_resolver is not None:
+            resolved = self._budget_resolver()
+            if resolved is not None:
+                self.max_queries, self.repeat_threshold = resolved
+                self._budget_resolver = None
+
+    def record(self, statement: str) -> None:
+        self._resolve_budget()
+        normalized = normalize_statement(statement)
+        self.statements.append(normalized)
+        repeats = self.counts[normalized] = self.counts.get(normalized, 0) + 1
+
+        violation = None
+        if self.max_queries is not None and self.count == self.max_queries + 1:
+            violation = f"{self.name}: query budget of {self.max_queries} exceeded"
+        elif self.repeat_threshold is not None and repeats == self.repeat_threshold:
+            violation = f"{self.name}: statement repeated {repeats} times (possible N+1): {normalized[:200]}"
+
+        if violation:
+            self.violations.append(violation)
+            if self.raise_on_violation:
+                raise QueryBudgetExceeded(violation)
+
+    def repeated(self, threshold: int = 2) -> Dict[str, int]:
+        """Statements executed at least threshold times."""
+        return {statement: count for statement, count in self.counts.items() if count >= threshold}
+
+    def report(self) -> str:
+        lines = [f"{self.name}: {self.count} statements"]
+        lines.extend(f"  {count}x {statement[:200]}" for statement, count in self.counts.items())
+        return "\n".join(lines)
+
+
+_active_trackers: ContextVar[Tuple[QueryTracker, ...]] = ContextVar("active_query_trackers", default=())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _SAVEPOINT.match(statement):
+        return
+    for tracker in _active_trackers.get():
+        tracker.record(statement)
+
+
+def install_query_tracking(engine: Engine) -> None:
+    """Send the engine's statements to the active trackers. Safe to call more than once."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+@contextmanager
+def track_queries(tracker: Optional[QueryTracker] = None) -> Iterator[QueryTracker]:
+    """Record every statement executed inside the block (in this context) into a tracker."""
+    tracker = tracker or QueryTracker(raise_on_violation=False)
+    token = _active_trackers.set(_active_trackers.get() + (tracker,))
+    try:
+        yield tracker
+    finally:
+        _active_trackers.reset(token)
+
+
+@contextmanager
+def untracked() -> Iterator[None]:
+    """Leave statements executed inside the block out of every active tracker, e.g. housekeeping queries."""
+    token = _active_trackers.set(())
+    try:
+        yield
+    finally:
+        _active_trackers.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int, repeat_threshold: Optional[int] = None, name: str = "block"):
+    """
+    Test helper: fail if the block runs more than max_queries statements, or any one
+    statement repeat_threshold times.
+
+        with assert_max_queries(5):
+            client.post("/api/v1/accounts/", json=payload, headers=auth)
+    """
+    tracker = QueryTracker(max_queries, repeat_threshold, name=name, raise_on_violation=False)
+    with track_queries(tracker):
+        yield tracker
+    if tracker.violations:
+        raise QueryBudgetExceeded("\n".join(tracker.violations) + "\n" + tracker.report())
+
+
+def query_budget(max_queries: Optional[int], repeat_threshold: Optional[int] = None):
+    """
+    Declare an endpoint's query budget. Apply below the router decorator:
+
+        @router.post("/")
+        @query_budget(5)
+        async def create_ledger(...):
+
+    Bulk endpoints whose statements grow with the size of the upload declare
+    @query_budget(None): they are neither limited nor checked for repeats.
+    """
+
+    def decorator(func):
+        func.__query_budget__ = (max_queries, repeat_threshold)
+        return func
+
+    return decorator
+
+
+class QueryBudgetMiddleware:
+    """Track statements per request and enforce the matched endpoint's budget."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        mode: str = "log",
+        default_max_queries: Optional[int] = None,
+        default_repeat_threshold: Optional[int] = None,
+    ) -> None:
+        self.app = app
+        self.mode = mode
+        self.default_budget = (default_max_queries, default_repeat_threshold)
+
+    def _budget_for(self, scope: Scope) -> Optional[Tuple[Optional[int], Optional[int]]]:
+        route = scope.get("route")
+        if route is None:
+            # Still routing (e.g. middleware or auth before the endpoint is matched)
+            return None
+        max_queries, repeat_threshold = getattr(route.endpoint, "__query_budget__", self.default_budget)
+        if max_queries is None:
+            return None, None
+        return max_queries, repeat_threshold if repeat_threshold is not None else self.default_budget[1]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.mode == "off":
+            await self.app(scope, receive, send)
+            return
+
+        tracker = QueryTracker(
+            name=f"{scope['method']} {scope['path']}",
+            raise_on_violation=self.mode == "raise",
+            budget_resolver=lambda: self._budget_for(scope),
+        )
+        with track_queries(tracker):
+            await self.app(scope, receive, send)
+
+        if tracker.violations and self.mode == "log":
+            logger.warning("%s\n%s", "\n".join(tracker.violations), tracker.report())
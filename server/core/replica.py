@@ -0,0 +1,103 @@
+"""
+Read-replica routing support.
+
+Endpoints marked with @read_replica have their session moved to the replica engine
+once get_current_user knows the user (see core.database.route_to_replica) unless one
+of these keeps them on the primary:
+
+- read-your-writes: the user committed a write within the last few seconds, so the
+  replica may not have it yet. Writes are recorded per user as marker files in a
+  directory shared by all worker processes on the host.
+- replica lag: a periodic check found the replica too far behind, or unreachable.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from core.query_budget import untracked
+
+logger = logging.getLogger(__name__)
+
+_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+def read_replica(func):
+    """
+    Allow an endpoint's reads to be served by the replica. Apply below the router decorator:
+
+        @router.get("/trial-balance")
+        @read_replica
+        async def get_trial_balance(...):
+    """
+    func.__read_replica__ = True
+    return func
+
+
+class WriteTracker:
+    """Remembers when each user last committed a write, across worker processes."""
+
+    def __init__(self, directory: str, window_seconds: float):
+        self.directory = directory
+        self.window_seconds = window_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def mark(self, user_id: int) -> None:
+        path = os.path.join(self.directory, str(user_id))
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            open(path, "a").close()
+
+    def wrote_recently(self, user_id: int) -> bool:
+        try:
+            written_at = os.stat(os.path.join(self.directory, str(user_id))).st_mtime
+        except FileNotFoundError:
+            return False
+        return time.time() - written_at < self.window_seconds
+
+
+class ReplicaLagMonitor:
+    """Caches the replica's replay lag, re-checking at most once per interval."""
+
+    def __init__(self, engine: Engine, max_lag_seconds: float, check_interval_seconds: float):
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        # None until checked, or when the last check failed
+        self.lag_seconds: Optional[float] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _check(self) -> None:
+        try:
+            # Made by whichever request is due for a check; not part of its query budget
+            with untracked(), self.engine.connect() as conn:
+                self.lag_seconds = float(conn.execute(_LAG_QUERY).scalar())
+        except Exception:
+            logger.warning("Replica lag check failed; routing reads to the primary", exc_info=True)
+            self.lag_seconds = None
+
+    def is_healthy(self) -> bool:
+        if time.monotonic() - self._checked_at >= self.check_interval_seconds:
+            # One thread refreshes; the others use the previous result meanwhile
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._check()
+                    self._checked_at = time.monotonic()
+                finally:
+                    self._lock.release()
+        return self.lag_seconds is not None and self.lag_seconds <= self.max_lag_seconds
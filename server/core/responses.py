@@ -0,0 +1,44 @@
+import time
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from core.metrics import RESPONSE_SERIALIZATION_TIME
+
+# Match pydantic's JSON output: UTC datetimes end in "Z", int dict keys are allowed
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Encode types orjson does not handle natively."""
+    if isinstance(obj, Decimal):
+        # Same wire format as pydantic: amounts are sent as strings to keep them exact
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content to JSON bytes."""
+    if isinstance(content, BaseModel):
+        # pydantic-core's encoder handles Decimal/date natively and skips the dict round trip
+        return content.model_dump_json().encode()
+    return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson (or pydantic-core for models).
+    Endpoints with large payloads return it directly to skip FastAPI's response_model
+    re-validation; it is also the app's default response class.
+    """
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        body = dumps(content)
+        RESPONSE_SERIALIZATION_TIME.observe(time.perf_counter() - start)
+        return body
@@ -0,0 +1,86 @@
+"""
+Warm-start helpers run before a worker takes traffic.
+
+Without them each worker pays one-off costs on its first requests: SQLAlchemy mapper
+configuration, loading the bcrypt backend, database connection handshakes and the
+chart-of-accounts load. warm_process() covers the process-wide state and can run in
+the gunicorn master before forking (preload_app); warm_connections() must run in each
+worker, from the app's lifespan hook.
+"""
+
+import logging
+import time
+from typing import Dict
+
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from core.config import settings
+from core.database import engine, new_session, replica_engine
+from core.metrics import REGISTRY, Gauge
+from core.security import create_access_token, decode_access_token, pwd_context
+
+logger = logging.getLogger(__name__)
+
+# Seconds spent in each startup phase of this process
+startup_timings: Dict[str, float] = {}
+
+REGISTRY.register(
+    Gauge(
+        "app_startup_seconds",
+        "Time spent in each startup phase of this worker.",
+        lambda: [((phase,), seconds) for phase, seconds in startup_timings.items()],
+        ("phase",),
+    )
+)
+
+_process_warmed = False
+
+
+def warm_process() -> None:
+    """Configure mappers, load the bcrypt backend and exercise JWT encoding. Idempotent."""
+    global _process_warmed
+    if _process_warmed:
+        return
+    start = time.perf_counter()
+    configure_mappers()
+    # passlib loads and self-tests the bcrypt backend on first use
+    pwd_context.verify("warm-up", pwd_context.hash("warm-up"))
+    decode_access_token(create_access_token({"sub": "0"}))
+    _process_warmed = True
+    startup_timings["warm_process"] = time.perf_counter() - start
+
+
+def _prefill_pool(pool_engine, connections: int) -> None:
+    # Hold the connections open together so the pool really creates that many;
+    # connections beyond the pool size would be discarded on close
+    size = getattr(pool_engine.pool, "size", None)
+    if size is not None:
+        connections = min(connections, size())
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = pool_engine.connect()
+            conn.execute(text("SELECT 1"))
+            opened.append(conn)
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+def warm_connections() -> None:
+    """Open pooled connections and load the chart-of-accounts registry for this worker."""
+    # Imported here: services depend on core, not the other way round
+    from services.chart_of_accounts import refresh_chart_of_accounts
+
+    start = time.perf_counter()
+    _prefill_pool(engine, settings.DB_POOL_WARM_CONNECTIONS)
+    if replica_engine is not None:
+        try:
+            _prefill_pool(replica_engine, settings.DB_POOL_WARM_CONNECTIONS)
+        except Exception:
+            # Reads fall back to the primary until the replica is reachable
+            logger.warning("Could not warm replica connections", exc_info=True)
+    with new_session() as db:
+        refresh_chart_of_accounts(db)
+    startup_timings["warm_connections"] = time.perf_counter() - start
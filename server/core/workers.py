@@ -0,0 +1,15 @@
+from uvicorn.workers import UvicornWorker
+
+
+class PesaPlanWorker(UvicornWorker):
+    """
+    Uvicorn worker for gunicorn with the uvloop event loop and httptools parser
+    (both in requirements.txt). The lifespan hook is required: it runs the warm-up.
+    """
+
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "lifespan": "on",
+        "proxy_headers": True,
+    }
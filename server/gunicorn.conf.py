@@ -0,0 +1,75 @@
+"""
+Gunicorn configuration for production.
+
+Run from the server directory (gunicorn picks this file up automatically):
+
+    gunicorn
+
+In production supervisor runs it as deploy/supervisor/uvi-pesa-plan.conf, which the
+Jenkins deploy installs:
+
+    gunicorn -c gunicorn.conf.py --bind 127.0.0.1:8000 main:app
+
+The app is imported once in the master (preload_app) and forked, so workers share
+its memory and skip the import cost. Each worker then opens its own connections and
+warms its caches in the lifespan hook (see core/warmup.py) before taking traffic.
+
+Every value can be overridden with PESA_PLAN_* environment variables or gunicorn's
+own command-line flags.
+"""
+
+import os
+import time
+
+from decouple import config as _env
+
+wsgi_app = "main:app"
+worker_class = "core.workers.PesaPlanWorker"
+bind = _env("PESA_PLAN_BIND", default="127.0.0.1:8000")
+
+
+def _default_workers() -> int:
+    # Endpoints do blocking database work on the event loop, so run more than one
+    # worker per core; respect CPU affinity/cgroup limits where the OS exposes them
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return 2 * cpus + 1
+
+
+workers = _env("PESA_PLAN_WORKERS", default=_default_workers(), cast=int)
+preload_app = True
+timeout = _env("PESA_PLAN_WORKER_TIMEOUT", default=60, cast=int)
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then to bound memory growth; jitter avoids restarting them all at once
+max_requests = _env("PESA_PLAN_MAX_REQUESTS", default=10000, cast=int)
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+errorlog = "-"
+loglevel = _env("PESA_PLAN_LOG_LEVEL", default="info")
+
+_master_started = time.perf_counter()
+
+
+def when_ready(server):
+    """Master: the app is imported; warm process-wide state once so every fork inherits it."""
+    from core.warmup import startup_timings, warm_process
+
+    warm_process()
+    server.log.info(
+        "App preloaded in %.2fs (import %.2fs, process warm-up %.2fs)",
+        time.perf_counter() - _master_started,
+        startup_timings.get("import", 0.0),
+        startup_timings.get("warm_process", 0.0),
+    )
+
+
+def post_fork(server, worker):
+    """Worker: drop connections inherited from the master; they must not be shared across processes."""
+    from core.database import engine, replica_engine
+
+    engine.dispose(close=False)
+    if replica_engine is not None:
+        replica_engine.dispose(close=False)
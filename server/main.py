@@ -1,10 +1,57 @@
-from fastapi import FastAPI
+import logging
+import os
+import secrets
+import time
+
+# Measured from here so startup reporting includes importing the app and its dependencies
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from api.v1.api import api_router
+from core.compression import CompressionMiddleware
 from core.config import settings
+from core.database import engine, replica_engine
+from core.metrics import MetricsMiddleware, instrument_engine, render_metrics
+from core.query_budget import QueryBudgetMiddleware, install_query_tracking
+from core.responses import FastJSONResponse
+from core.warmup import startup_timings, warm_connections, warm_process
+from services.report_jobs import report_jobs
+
+# Shows up in the uvicorn/gunicorn server log
+logger = logging.getLogger("uvicorn.error")
 
-app = FastAPI(title="Plan Pesa API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pay cold-start costs before the worker accepts its first request
+    start = time.perf_counter()
+    try:
+        warm_process()
+        warm_connections()
+    except Exception:
+        logger.warning("Warm-up failed; continuing with a cold start", exc_info=True)
+    startup_timings["lifespan"] = time.perf_counter() - start
+    logger.info(
+        "Worker %s ready (import %.2fs, warm-up %.2fs)",
+        os.getpid(),
+        startup_timings.get("import", 0.0),
+        startup_timings["lifespan"],
+    )
+    yield
+    # Drop queued report jobs; a running job finishes before the process exits
+    report_jobs.shutdown()
+
+
+app = FastAPI(
+    title="Plan Pesa API",
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
+)
 
 # CORS origins - update these URLs for your production frontend
 CORS_ORIGINS = [
@@ -20,9 +67,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Gzip/brotli for large payloads such as reports and transaction lists
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
+# Query budgets / N+1 detection for tests and staging
+if settings.QUERY_BUDGET_MODE != "off":
+    app.add_middleware(
+        QueryBudgetMiddleware,
+        mode=settings.QUERY_BUDGET_MODE,
+        default_max_queries=settings.QUERY_BUDGET_DEFAULT,
+        default_repeat_threshold=settings.QUERY_BUDGET_REPEAT_THRESHOLD,
+    )
+    install_query_tracking(engine)
+    if replica_engine is not None:
+        install_query_tracking(replica_engine)
+
+# Outermost so latency includes compression; SQL stats come from engine events
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+if replica_engine is not None:
+    instrument_engine(replica_engine, "replica")
+
 app.include_router(api_router, prefix="/api/v1")
 
 
 @app.get("/")
 async def root():
     return {"message": "Plan Pesa API"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus text exposition of the worker's metrics, for scrapers holding METRICS_TOKEN."""
+    # Not found rather than unauthorized, so the endpoint is not advertised
+    token = request.headers.get("authorization", "").removeprefix("Bearer ")
+    if not settings.METRICS_TOKEN or not secrets.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        return Response(status_code=404)
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+startup_timings["import"] = time.perf_counter() - _import_started
@@ -8,7 +8,10 @@ from models.finance import (
     TransactionItem,
     TransactionType,
     EntryType,
+    LedgerBalance,
 )
+from models.reconciliation import BankStatement, StatementLine
+from models.archive import ArchivedYear
 from models.feedback import Feedback, FeedbackType
 
 __all__ = [
@@ -21,6 +24,10 @@ __all__ = [
     "TransactionItem",
     "TransactionType",
     "EntryType",
+    "LedgerBalance",
+    "BankStatement",
+    "StatementLine",
+    "ArchivedYear",
     "Feedback",
     "FeedbackType",
 ]
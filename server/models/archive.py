@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from core.database import Base
+
+
+class ArchivedYear(Base):
+    """
+    A calendar year of one user's transactions moved out of the database into a Parquet
+    file (services.archive). summary_transaction_id is the journal left in its place on
+    the last day of the year, carrying each ledger's debit and credit totals for the year.
+    """
+
+    __tablename__ = "archived_years"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    year = Column(Integer, nullable=False)
+    file_name = Column(String, nullable=False)  # Relative to PESA_PLAN_ARCHIVE_DIR
+    transaction_count = Column(Integer, nullable=False)
+    item_count = Column(Integer, nullable=False)
+    summary_transaction_id = Column(Integer, ForeignKey("transactions.id"), nullable=True)  # None if no items
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (UniqueConstraint("user_id", "year", name="uq_archived_years_user_id_year"),)
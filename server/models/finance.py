@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Boolean, Numeric, Date
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Boolean, Numeric, Date, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy import DateTime
@@ -97,12 +97,15 @@ class Transaction(Base):
     reference = Column(String, nullable=True)  # Voucher number, invoice number, etc.
     transaction_type = Column(Enum(TransactionType), nullable=False)
     total_amount = Column(Numeric(15, 2), nullable=False)  # For quick reference and validation
+    fingerprint = Column(String(32), nullable=True)  # Duplicate detection, see services.fingerprints
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
     items = relationship("TransactionItem", back_populates="transaction", cascade="all, delete-orphan")
 
+    __table_args__ = (Index("ix_transactions_user_id_fingerprint", "user_id", "fingerprint"),)
+
 
 class TransactionItem(Base):
     __tablename__ = "transaction_items"
@@ -117,3 +120,19 @@ class TransactionItem(Base):
     # Relationships
     transaction = relationship("Transaction", back_populates="items")
     ledger = relationship("Ledger", back_populates="transaction_items")
+
+
+class LedgerBalance(Base):
+    """
+    Running debit/credit totals per ledger, maintained by the transaction write paths.
+    reconciled_total is the net (debit - credit) of the items matched to statement lines.
+    """
+
+    __tablename__ = "ledger_balances"
+
+    ledger_id = Column(Integer, ForeignKey("ledgers.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    debit_total = Column(Numeric(18, 2), nullable=False, default=0)
+    credit_total = Column(Numeric(18, 2), nullable=False, default=0)
+    reconciled_total = Column(Numeric(18, 2), nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Numeric, Date, DateTime
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from core.database import Base
+
+
+class BankStatement(Base):
+    """An imported bank or M-Pesa statement for one bank/cash ledger."""
+
+    __tablename__ = "bank_statements"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    ledger_id = Column(Integer, ForeignKey("ledgers.id"), nullable=False, index=True)
+    name = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    lines = relationship(
+        "StatementLine", back_populates="statement", cascade="all, delete-orphan", order_by="StatementLine.id"
+    )
+
+
+class StatementLine(Base):
+    """
+    One statement line. amount is signed from the account holder's side: money in is
+    positive (a debit to the ledger), money out negative. matched_item_id is the
+    transaction item the line reconciles; an item is reconciled by at most one line.
+    """
+
+    __tablename__ = "statement_lines"
+
+    id = Column(Integer, primary_key=True, index=True)
+    statement_id = Column(Integer, ForeignKey("bank_statements.id"), nullable=False, index=True)
+    ledger_id = Column(Integer, ForeignKey("ledgers.id"), nullable=False, index=True)  # Copied from the statement
+    line_date = Column(Date, nullable=False)
+    description = Column(String, nullable=True)
+    reference = Column(String, nullable=True)  # Bank reference, M-Pesa receipt number, etc.
+    amount = Column(Numeric(15, 2), nullable=False)
+    matched_item_id = Column(Integer, ForeignKey("transaction_items.id"), nullable=True, unique=True)
+
+    # Relationships
+    statement = relationship("BankStatement", back_populates="lines")
@@ -13,4 +13,6 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped by every write to the user's transactions; per-process ledger caches compare against it
+    ledger_version = Column(Integer, nullable=False, default=0, server_default="0")
 
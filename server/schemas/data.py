@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+
+# Import Schemas
+class ImportSummary(BaseModel):
+    spending_types: int
+    ledgers: int
+    transactions: int
+    items: int
+    # Shared ledger groups the file used that did not exist on this instance
+    ledger_groups_created: int
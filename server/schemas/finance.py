@@ -99,6 +99,16 @@ class LedgerWithGroup(LedgerResponse):
         from_attributes = True
 
 
+class LedgerBalanceResponse(BaseModel):
+    debit: Decimal
+    credit: Decimal
+    net: Decimal  # debit - credit
+
+
+class LedgerWithBalance(LedgerWithGroup):
+    balance: LedgerBalanceResponse
+
+
 # Transaction Schemas
 class TransactionItemBase(BaseModel):
     ledger_id: int
@@ -147,8 +157,30 @@ class TransactionResponse(TransactionBase):
         from_attributes = True
 
 
+class TransactionCreateResponse(TransactionResponse):
+    duplicate_of: Optional[int] = None  # Existing transaction with the same fingerprint
+
+    class Config:
+        from_attributes = True
+
+
 class TransactionWithItems(TransactionResponse):
     items: list[TransactionItemResponse]
 
     class Config:
         from_attributes = True
+
+
+# Duplicate Detection Schemas
+class DuplicateTransaction(BaseModel):
+    id: int
+    reference: Optional[str] = None
+    transaction_type: TransactionType
+    created_at: Optional[datetime] = None
+
+
+class DuplicateGroup(BaseModel):
+    fingerprint: str
+    transaction_date: date
+    total_amount: Decimal
+    transactions: list[DuplicateTransaction]
@@ -0,0 +1,68 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import date, datetime
+from decimal import Decimal
+
+
+# Statement Schemas
+class StatementLineCreate(BaseModel):
+    line_date: date
+    description: Optional[str] = None
+    reference: Optional[str] = None
+    amount: Decimal  # Money in positive, money out negative
+
+
+class StatementCreate(BaseModel):
+    ledger_id: int
+    name: str
+    lines: List[StatementLineCreate]
+
+
+class StatementLineResponse(StatementLineCreate):
+    id: int
+    matched_item_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class StatementResponse(BaseModel):
+    id: int
+    ledger_id: int
+    name: str
+    created_at: datetime
+    line_count: int
+    matched_count: int
+
+
+class StatementWithLines(StatementResponse):
+    lines: List[StatementLineResponse]
+
+
+# Matching Schemas
+class AutoMatchResponse(BaseModel):
+    statement_id: int
+    matched: int  # Lines matched by this run
+    unmatched: int  # Lines still unmatched
+
+
+class LineMatch(BaseModel):
+    transaction_item_id: int
+
+
+# Ledger Reconciliation Schemas
+class ReconciliationSummary(BaseModel):
+    ledger_id: int
+    book_balance: Decimal  # debit - credit of all items
+    reconciled_balance: Decimal  # debit - credit of items matched to statement lines
+    unreconciled_balance: Decimal
+    unmatched_lines: int
+    unmatched_lines_total: Decimal
+
+
+class UnreconciledItem(BaseModel):
+    transaction_item_id: int
+    transaction_id: int
+    transaction_date: date
+    reference: Optional[str] = None
+    amount: Decimal  # Signed: debits positive
@@ -0,0 +1,522 @@
+"""
+Cold storage for closed years.
+
+archive_year() moves one calendar year of a user's transactions and items out of
+the hot tables into a zstd-compressed Parquet file under PESA_PLAN_ARCHIVE_DIR
+(user_<id>/<year>.parquet): one row per item with its transaction's columns, sorted
+by ledger and date, so a reader filtering on one ledger only decodes the row groups
+whose ledger_id statistics cover it. In their place it posts a summary journal on
+31 December with, per ledger, one debit and one credit item holding the year's
+totals, so ledger_balances and the ledger caches are unchanged.
+
+Reports that aggregate transaction_items see an archived year as that one journal,
+which is right wherever they split their figures at the year's end. Where a trial
+balance, balance history or pivot splits an archived year anywhere else
+(split_archived_years), or a pivot tells entries apart by period, transaction type
+or count, the year's items are read back from its file as corrections: its entries
+at their own dates, less its summary journal (archived_range_corrections,
+archived_balance_corrections, archived_pivot_rows). Ledger reports read the archived
+entries back (archived_ledger_entries) and show them in place of the summary journal.
+Either way a report's output does not change when a year is archived. An archived
+year is closed: postings dated in it are refused (closed_years) until restore_year()
+moves it back into the database.
+"""
+
+import os
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import and_, bindparam, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.money import to_cents, to_decimal
+from models.archive import ArchivedYear
+from models.finance import EntryType, Transaction, TransactionItem, TransactionType
+from models.reconciliation import StatementLine
+from services.fingerprints import fingerprint_lines
+from services.ledger_balances import bump_ledger_version
+from services.reconciliation import release_transaction_items
+
+# Rows fetched per round trip while writing, and read per batch while restoring
+BATCH_ROWS = 20000
+
+# Smaller row groups let a one-ledger read skip more of the file
+ROW_GROUP_ROWS = 10000
+
+_TRANSACTION_FIELDS = (
+    ("transaction_id", pa.int64()),
+    ("transaction_date", pa.date32()),
+    ("reference", pa.string()),
+    ("transaction_type", pa.string()),
+    ("total_amount", pa.decimal128(15, 2)),
+    ("fingerprint", pa.string()),
+    ("created_at", pa.timestamp("us", tz="UTC")),
+    ("updated_at", pa.timestamp("us", tz="UTC")),
+)
+_ITEM_FIELDS = (
+    # Null for a transaction without items
+    ("item_id", pa.int64()),
+    ("ledger_id", pa.int64()),
+    ("entry_type", pa.string()),
+    ("amount", pa.decimal128(15, 2)),
+    ("item_created_at", pa.timestamp("us", tz="UTC")),
+)
+ARCHIVE_SCHEMA = pa.schema(_TRANSACTION_FIELDS + _ITEM_FIELDS)
+
+_ENUM_COLUMNS = {"transaction_type", "entry_type"}
+
+_in_year = and_(
+    Transaction.user_id == bindparam("user_id"),
+    Transaction.transaction_date >= bindparam("first_day"),
+    Transaction.transaction_date <= bindparam("last_day"),
+)
+_YEAR_TRANSACTION_IDS = select(Transaction.id).where(_in_year)
+_YEAR_TRANSACTION_COUNT = select(func.count()).select_from(Transaction).where(_in_year)
+_YEAR_MATCHED_LINES = (
+    select(func.count())
+    .select_from(StatementLine)
+    .join(TransactionItem, TransactionItem.id == StatementLine.matched_item_id)
+    .join(Transaction, Transaction.id == TransactionItem.transaction_id)
+    .where(_in_year)
+)
+_YEAR_ROWS = (
+    select(
+        Transaction.id,
+        Transaction.transaction_date,
+        Transaction.reference,
+        Transaction.transaction_type,
+        Transaction.total_amount,
+        Transaction.fingerprint,
+        Transaction.created_at,
+        Transaction.updated_at,
+        TransactionItem.id,
+        TransactionItem.ledger_id,
+        TransactionItem.entry_type,
+        TransactionItem.amount,
+        TransactionItem.created_at,
+    )
+    .outerjoin(TransactionItem, TransactionItem.transaction_id == Transaction.id)
+    .where(_in_year)
+    .order_by(TransactionItem.ledger_id, Transaction.transaction_date, Transaction.id, TransactionItem.id)
+)
+
+_ARCHIVED_YEAR = select(ArchivedYear).where(
+    ArchivedYear.user_id == bindparam("user_id"), ArchivedYear.year == bindparam("year")
+)
+_CLOSED_YEARS = select(ArchivedYear.year).where(
+    ArchivedYear.user_id == bindparam("user_id"), ArchivedYear.year.in_(bindparam("years", expanding=True))
+)
+_ARCHIVED_YEARS_BETWEEN = (
+    select(ArchivedYear.year, ArchivedYear.file_name, ArchivedYear.summary_transaction_id)
+    .where(
+        ArchivedYear.user_id == bindparam("user_id"),
+        ArchivedYear.year >= bindparam("first_year"),
+        ArchivedYear.year <= bindparam("last_year"),
+    )
+    .order_by(ArchivedYear.year)
+)
+
+
+class ArchiveError(Exception):
+    """A year cannot be archived or restored as asked."""
+
+
+def archive_path(file_name: str) -> str:
+    return os.path.join(settings.ARCHIVE_DIR, file_name)
+
+
+def _year_params(user_id: int, year: int) -> dict:
+    return {"user_id": user_id, "first_day": date(year, 1, 1), "last_day": date(year, 12, 31)}
+
+
+def _batch_table(rows: Sequence[tuple]) -> pa.Table:
+    columns = []
+    for index, field in enumerate(ARCHIVE_SCHEMA):
+        values = [row[index] for row in rows]
+        if field.name in _ENUM_COLUMNS:
+            values = [value.value if value is not None else None for value in values]
+        columns.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(columns, schema=ARCHIVE_SCHEMA)
+
+
+def archive_year(db: Session, user_id: int, year: int) -> Optional[ArchivedYear]:
+    """
+    Move one year of the user's transactions to Parquet and post the summary journal
+    in their place; returns the ArchivedYear, or None if the year has no transactions.
+    The file is complete before any row is deleted, and the delete must remove exactly
+    the rows written, so a posting that lands meanwhile aborts the archive. The file
+    is written under a temporary name and only moved into place once every change is
+    made, so on error nothing is left behind; the caller commits, and removes the file
+    if the commit fails.
+    """
+    params = _year_params(user_id, year)
+    if db.scalar(_ARCHIVED_YEAR, {"user_id": user_id, "year": year}) is not None:
+        raise ArchiveError(f"{year} is already archived")
+    if not db.scalar(_YEAR_TRANSACTION_COUNT, params):
+        return None
+    matched = db.scalar(_YEAR_MATCHED_LINES, params)
+    if matched:
+        raise ArchiveError(f"{matched} statement lines are matched to transactions in {year}; unmatch them first")
+
+    file_name = os.path.join(f"user_{user_id}", f"{year}.parquet")
+    path = archive_path(file_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + ".partial"
+    try:
+        archived = _archive_rows(db, user_id, year, file_name, partial)
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return archived
+
+
+def _archive_rows(db: Session, user_id: int, year: int, file_name: str, partial: str) -> ArchivedYear:
+    """archive_year's work: write the year to partial, then replace its rows with the summary journal."""
+    params = _year_params(user_id, year)
+    # (ledger_id, "DEBIT"/"CREDIT") -> cents, for the summary journal
+    totals: Dict[Tuple[int, str], int] = {}
+    transaction_ids = set()
+    item_count = 0
+    rows_written = 0
+    with pq.ParquetWriter(partial, ARCHIVE_SCHEMA, compression="zstd") as writer:
+        stream = db.execute(_YEAR_ROWS, params, execution_options={"stream_results": True, "yield_per": BATCH_ROWS})
+        for batch in stream.partitions():
+            writer.write_table(_batch_table(batch), row_group_size=ROW_GROUP_ROWS)
+            rows_written += len(batch)
+            for row in batch:
+                transaction_ids.add(row[0])
+                if row[8] is None:
+                    continue
+                item_count += 1
+                key = (row[9], EntryType(row[10]).value)
+                totals[key] = totals.get(key, 0) + to_cents(row[11])
+    if pq.read_metadata(partial).num_rows != rows_written:
+        raise ArchiveError(f"Archive file for {year} is incomplete")
+
+    removed_items = db.execute(
+        delete(TransactionItem).where(TransactionItem.transaction_id.in_(_YEAR_TRANSACTION_IDS)),
+        params,
+        execution_options={"synchronize_session": False},
+    ).rowcount
+    removed_transactions = db.execute(
+        delete(Transaction).where(_in_year), params, execution_options={"synchronize_session": False}
+    ).rowcount
+    if removed_items != item_count or removed_transactions != len(transaction_ids):
+        raise ArchiveError(f"Transactions in {year} changed while archiving; try again")
+
+    summary_id = None
+    if totals:
+        reference = f"ARCHIVED-{year}"
+        summary = Transaction(
+            user_id=user_id,
+            transaction_date=params["last_day"],
+            reference=reference,
+            transaction_type=TransactionType.JOURNAL,
+            total_amount=to_decimal(sum(cents for (_, side), cents in totals.items() if side == EntryType.DEBIT.value)),
+            fingerprint=fingerprint_lines(user_id, params["last_day"], reference, totals),
+        )
+        db.add(summary)
+        db.flush()
+        summary_id = summary.id
+        db.execute(
+            insert(TransactionItem),
+            [
+                {"transaction_id": summary_id, "ledger_id": ledger_id, "entry_type": EntryType(side), "amount": to_decimal(cents)}
+                for (ledger_id, side), cents in sorted(totals.items())
+                if cents
+            ],
+        )
+
+    archived = ArchivedYear(
+        user_id=user_id,
+        year=year,
+        file_name=file_name,
+        transaction_count=len(transaction_ids),
+        item_count=item_count,
+        summary_transaction_id=summary_id,
+    )
+    db.add(archived)
+    db.flush()
+    # ledger_balances are unchanged: the summary items add up to the items they replace
+    bump_ledger_version(db, user_id)
+    return archived
+
+
+def restore_year(db: Session, user_id: int, year: int) -> ArchivedYear:
+    """
+    Put an archived year's transactions and items back, with their original ids, and
+    remove its summary journal. The caller commits, then may delete the file.
+    """
+    archived = db.scalar(_ARCHIVED_YEAR, {"user_id": user_id, "year": year})
+    if archived is None:
+        raise ArchiveError(f"{year} is not archived")
+    parquet = pq.ParquetFile(archive_path(archived.file_name))
+
+    summary_id = archived.summary_transaction_id
+    db.delete(archived)
+    db.flush()
+    if summary_id is not None:
+        release_transaction_items(db, summary_id)
+        db.execute(delete(TransactionItem).where(TransactionItem.transaction_id == summary_id))
+        db.execute(delete(Transaction).where(Transaction.id == summary_id))
+
+    # Rows are per item, so a transaction with several items appears several times
+    restored = set()
+    transaction_columns = [name for name, _ in _TRANSACTION_FIELDS]
+    for batch in parquet.iter_batches(batch_size=BATCH_ROWS, columns=transaction_columns):
+        rows = []
+        for row in batch.to_pylist():
+            if row["transaction_id"] in restored:
+                continue
+            restored.add(row["transaction_id"])
+            rows.append(
+                {
+                    "id": row["transaction_id"],
+                    "user_id": user_id,
+                    "transaction_date": row["transaction_date"],
+                    "reference": row["reference"],
+                    "transaction_type": TransactionType(row["transaction_type"]),
+                    "total_amount": row["total_amount"],
+                    "fingerprint": row["fingerprint"],
+                    "created_at": row["created_at"],
+                    "updated_at": row["updated_at"],
+                }
+            )
+        if rows:
+            db.execute(insert(Transaction), rows)
+
+    item_columns = ["transaction_id"] + [name for name, _ in _ITEM_FIELDS]
+    for batch in parquet.iter_batches(batch_size=BATCH_ROWS, columns=item_columns):
+        rows = [
+            {
+                "id": row["item_id"],
+                "transaction_id": row["transaction_id"],
+                "ledger_id": row["ledger_id"],
+                "entry_type": EntryType(row["entry_type"]),
+                "amount": row["amount"],
+                "created_at": row["item_created_at"],
+            }
+            for row in batch.to_pylist()
+            if row["item_id"] is not None
+        ]
+        if rows:
+            db.execute(insert(TransactionItem), rows)
+
+    bump_ledger_version(db, user_id)
+    return archived
+
+
+def closed_years(db: Session, user_id: int, dates: Sequence[date]) -> List[int]:
+    """The archived years among the dates' years, for refusing postings to them."""
+    return list(db.scalars(_CLOSED_YEARS, {"user_id": user_id, "years": sorted({day.year for day in dates})}))
+
+
+def period_last_days(start_date: date, end_date: date) -> List[date]:
+    """The days a report on start_date..end_date splits its figures after: the day before start_date and end_date."""
+    if start_date == date.min:
+        return [end_date]
+    return [start_date - timedelta(days=1), end_date]
+
+
+def split_archived_years(db: Session, user_id: int, last_days: Sequence[date]) -> list:
+    """
+    (year, file_name, summary_transaction_id) of the archived years that a report
+    splitting its figures at the end of each of last_days (before its start date, at
+    its end date, at the end of each bucket) splits anywhere but at 31 December, where
+    their summary journals are dated.
+    """
+    years = {day.year for day in last_days if (day.month, day.day) != (12, 31)}
+    if not years:
+        return []
+    return [row for row in archived_years_between(db, user_id, min(years), max(years)) if row.year in years]
+
+
+def archived_years_between(db: Session, user_id: int, first_year: int, last_year: int) -> list:
+    """(year, file_name, summary_transaction_id) of the user's archived years in the range."""
+    return db.execute(
+        _ARCHIVED_YEARS_BETWEEN, {"user_id": user_id, "first_year": first_year, "last_year": last_year}
+    ).all()
+
+
+def _read_archive(file_name: str, **kwargs) -> pa.Table:
+    """
+    pq.read_table on an archive file. Raises ArchiveError if the file is gone, as it is
+    once the year has been restored since it was looked up.
+    """
+    try:
+        return pq.read_table(archive_path(file_name), **kwargs)
+    except FileNotFoundError:
+        raise ArchiveError("An archived year in the range was restored while reading it; try again")
+
+
+def _archived_items(file_name: str) -> pa.Table:
+    """
+    An archived year's items as (ledger_id, transaction_date, transaction_type, debit,
+    credit), amounts in cents.
+    """
+    table = _read_archive(file_name, columns=["ledger_id", "transaction_date", "transaction_type", "entry_type", "amount"])
+    table = table.filter(pc.is_valid(table["ledger_id"]))
+    # decimal(15, 2) * 100 is exact, so the cast to cents cannot truncate
+    cents = pc.cast(pc.multiply(table["amount"], pa.scalar(Decimal(100), pa.decimal128(3, 0))), pa.int64())
+    is_debit = pc.equal(table["entry_type"], EntryType.DEBIT.value)
+    zero = pa.scalar(0, pa.int64())
+    return pa.table(
+        {
+            "ledger_id": table["ledger_id"],
+            "transaction_date": table["transaction_date"],
+            "transaction_type": table["transaction_type"],
+            "debit": pc.if_else(is_debit, cents, zero),
+            "credit": pc.if_else(is_debit, zero, cents),
+        }
+    )
+
+
+def _between(items: pa.Table, first_day: date, last_day: date) -> pa.Table:
+    dates = items["transaction_date"]
+    return items.filter(
+        pc.and_(
+            pc.greater_equal(dates, pa.scalar(first_day, pa.date32())),
+            pc.less_equal(dates, pa.scalar(last_day, pa.date32())),
+        )
+    )
+
+
+def _rows(table: pa.Table, columns: Sequence[str]) -> Iterator[tuple]:
+    return zip(*(table[column].to_pylist() for column in columns))
+
+
+def _add_ledger_sums(sums: Dict[int, Tuple[int, int]], items: pa.Table, sign: int) -> None:
+    """Add sign times each ledger's (debit, credit) totals in items to sums."""
+    totals = items.group_by("ledger_id").aggregate([("debit", "sum"), ("credit", "sum")])
+    for ledger_id, debit, credit in _rows(totals, ["ledger_id", "debit_sum", "credit_sum"]):
+        before_debit, before_credit = sums.get(ledger_id, (0, 0))
+        sums[ledger_id] = (before_debit + sign * debit, before_credit + sign * credit)
+
+
+def archived_range_corrections(
+    years: Sequence[tuple], start_date: date, end_date: date
+) -> Tuple[Dict[int, Tuple[int, int]], Dict[int, Tuple[int, int]]]:
+    """
+    What to add to per-ledger (debit, credit) cents summed from transaction_items
+    before start_date and from start_date to end_date so that the archived years
+    count their entries at their own dates rather than as their summary journal.
+    """
+    before: Dict[int, Tuple[int, int]] = {}
+    between: Dict[int, Tuple[int, int]] = {}
+    for year, file_name, _ in years:
+        items = _archived_items(file_name)
+        earlier = pc.less(items["transaction_date"], pa.scalar(start_date, pa.date32()))
+        _add_ledger_sums(before, items.filter(earlier), 1)
+        _add_ledger_sums(between, _between(items, start_date, end_date), 1)
+        # The summary journal holds the year's totals, on its last day
+        if date(year, 12, 31) < start_date:
+            _add_ledger_sums(before, items, -1)
+        elif date(year, 12, 31) <= end_date:
+            _add_ledger_sums(between, items, -1)
+    return before, between
+
+
+def archived_balance_corrections(years: Sequence[tuple], point_dates: Sequence[date]) -> Dict[int, List[int]]:
+    """
+    What to add to each ledger's debit - credit cents at each of point_dates (in
+    order), summed from transaction_items, for the archived years: their entries up to
+    the points inside them, which their summary journal only counts from 31 December.
+    """
+    corrections: Dict[int, List[int]] = {}
+    for year, file_name, _ in years:
+        points = [
+            (index, day) for index, day in enumerate(point_dates) if day.year == year and day != date(year, 12, 31)
+        ]
+        if not points:
+            continue
+        daily = (
+            _archived_items(file_name)
+            .group_by(["transaction_date", "ledger_id"])
+            .aggregate([("debit", "sum"), ("credit", "sum")])
+            .sort_by("transaction_date")
+        )
+        rows = _rows(daily, ["transaction_date", "ledger_id", "debit_sum", "credit_sum"])
+        running: Dict[int, int] = {}
+        row = next(rows, None)
+        for index, day in points:
+            while row is not None and row[0] <= day:
+                running[row[1]] = running.get(row[1], 0) + row[2] - row[3]
+                row = next(rows, None)
+            for ledger_id, net in running.items():
+                corrections.setdefault(ledger_id, [0] * len(point_dates))[index] += net
+    return corrections
+
+
+def archived_pivot_rows(years: Sequence[tuple], start_date: date, end_date: date) -> List[tuple]:
+    """
+    Rows that, added to the transaction items from start_date to end_date, show the
+    archived years entry by entry: (ledger_id, transaction_type, transaction_date,
+    debit, credit, entries), amounts in cents. The archived entries in the range are
+    summed per ledger, type and day, and the summary journal's items are taken back out
+    with negative amounts and entry counts.
+    """
+    rows = []
+    for year, file_name, _ in years:
+        items = _archived_items(file_name)
+        daily = (
+            _between(items, start_date, end_date)
+            .group_by(["ledger_id", "transaction_type", "transaction_date"])
+            .aggregate([("debit", "sum"), ("credit", "sum"), ("debit", "count")])
+        )
+        columns = ["ledger_id", "transaction_type", "transaction_date", "debit_sum", "credit_sum", "debit_count"]
+        rows.extend(_rows(daily, columns))
+        if start_date <= date(year, 12, 31) <= end_date:
+            totals: Dict[int, Tuple[int, int]] = {}
+            _add_ledger_sums(totals, items, 1)
+            for ledger_id, (debit, credit) in totals.items():
+                # One summary item per side with a non-zero total
+                entries = (debit != 0) + (credit != 0)
+                if entries:
+                    rows.append(
+                        (ledger_id, TransactionType.JOURNAL.value, date(year, 12, 31), -debit, -credit, -entries)
+                    )
+    return rows
+
+
+def archived_ledger_entries(file_name: str, ledger_id: int, end_date: date) -> List[tuple]:
+    """
+    One ledger's archived entries up to end_date, in date order, as
+    (transaction_id, transaction_date, reference, transaction_type, entry_type, amount)
+    like the rows of read_models._LEDGER_ENTRIES.
+    """
+    table = _read_archive(
+        file_name,
+        columns=["transaction_id", "transaction_date", "reference", "transaction_type", "entry_type", "amount"],
+        filters=[("ledger_id", "=", ledger_id), ("transaction_date", "<=", end_date)],
+    )
+    columns = [column.to_pylist() for column in table.columns]
+    columns[3] = [TransactionType(value) for value in columns[3]]
+    columns[4] = [EntryType(value) for value in columns[4]]
+    return list(zip(*columns))
+
+
+def archived_transaction_rows(file_name: str) -> Iterator[tuple]:
+    """
+    An archived year's rows in transaction and item order, as (transaction_id,
+    transaction_date, reference, transaction_type, total_amount, created_at, updated_at,
+    ledger_id, entry_type, amount, item_created_at), with None item columns for a
+    transaction without items. The file is sorted by ledger, so the year is read and
+    re-sorted in memory, one file at a time.
+    """
+    columns = [name for name, _ in _TRANSACTION_FIELDS if name != "fingerprint"]
+    columns += ["ledger_id", "entry_type", "amount", "item_created_at"]
+    table = _read_archive(file_name, columns=columns + ["item_id"]).sort_by(
+        [("transaction_id", "ascending"), ("item_id", "ascending")]
+    )
+    for batch in table.select(columns).to_batches(max_chunksize=BATCH_ROWS):
+        values = [column.to_pylist() for column in batch.columns]
+        values[3] = [TransactionType(value) for value in values[3]]
+        values[8] = [EntryType(value) if value is not None else None for value in values[8]]
+        yield from zip(*values)
@@ -0,0 +1,252 @@
+"""
+In-process chart-of-accounts registry.
+
+Parent ledger groups and ledger groups are universal (shared by all users) and
+almost never change, so they are loaded once per process and served from memory.
+The registry is reloaded whenever a group is created, updated or deleted through
+the API, and revalidated after COA_CACHE_TTL_SECONDS so that changes made by other
+worker processes are eventually picked up.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import Depends, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.database import get_db
+from core.metrics import CACHE_REQUESTS
+from models.finance import LedgerGroup, LedgerGroupCategory, ParentLedgerGroup
+
+# An entity-tag in an If-None-Match list (RFC 9110 section 8.8.3): optional weak
+# prefix, then a quoted opaque-tag, which may itself contain commas. Empty list
+# elements are allowed.
+_ENTITY_TAG = re.compile(r'[\s,]*(?:W/)?("[^"]*")\s*(?:,|$)')
+
+
+@dataclass(frozen=True)
+class ParentGroupEntry:
+    id: int
+    name: str
+    sort_order: Optional[int]
+    is_active: bool
+    created_at: datetime
+
+    @property
+    def is_debit_normal(self) -> bool:
+        """Assets and expenses normally carry debit balances."""
+        name_lower = self.name.lower()
+        return "asset" in name_lower or "expenditure" in name_lower or "expense" in name_lower
+
+    @property
+    def is_balance_sheet(self) -> bool:
+        """Assets and liabilities: the groups that make up net worth."""
+        name_lower = self.name.lower()
+        return "asset" in name_lower or "liabilit" in name_lower
+
+    @property
+    def allows_spending_type(self) -> bool:
+        """Spending types only apply to Expenditure, Fixed Assets and Current Assets accounts."""
+        name_lower = self.name.lower()
+        return (
+            "expenditure" in name_lower
+            or "expense" in name_lower
+            or "fixed assets" in name_lower
+            or "current assets" in name_lower
+        )
+
+
+@dataclass(frozen=True)
+class GroupEntry:
+    id: int
+    name: str
+    parent_ledger_group_id: int
+    category: LedgerGroupCategory
+    is_active: bool
+    created_at: datetime
+    parent_ledger_group: ParentGroupEntry
+
+    @property
+    def is_debit_normal(self) -> bool:
+        return self.parent_ledger_group.is_debit_normal
+
+
+def _parent_sort_key(parent: ParentGroupEntry):
+    # Mirrors ORDER BY sort_order NULLS LAST, name
+    return (parent.sort_order is None, parent.sort_order or 0, parent.name)
+
+
+class ChartOfAccounts:
+    """Immutable snapshot of all parent groups and ledger groups (active and inactive)."""
+
+    def __init__(self, parent_groups: List[ParentGroupEntry], groups: List[GroupEntry]):
+        self.parent_groups: Dict[int, ParentGroupEntry] = {p.id: p for p in parent_groups}
+        self.groups: Dict[int, GroupEntry] = {g.id: g for g in groups}
+        self.loaded_at = time.monotonic()
+
+        digest = hashlib.sha256()
+        for parent in sorted(parent_groups, key=lambda p: p.id):
+            digest.update(repr(parent).encode())
+        for group in sorted(groups, key=lambda g: g.id):
+            digest.update(repr(group).encode())
+        self.etag = f'"{digest.hexdigest()[:32]}"'
+
+    @classmethod
+    def load(cls, db: Session) -> "ChartOfAccounts":
+        parents = {
+            row.id: ParentGroupEntry(
+                id=row.id,
+                name=row.name,
+                sort_order=row.sort_order,
+                is_active=bool(row.is_active),
+                created_at=row.created_at,
+            )
+            for row in db.query(
+                ParentLedgerGroup.id,
+                ParentLedgerGroup.name,
+                ParentLedgerGroup.sort_order,
+                ParentLedgerGroup.is_active,
+                ParentLedgerGroup.created_at,
+            )
+        }
+        groups = [
+            GroupEntry(
+                id=row.id,
+                name=row.name,
+                parent_ledger_group_id=row.parent_ledger_group_id,
+                category=row.category,
+                is_active=bool(row.is_active),
+                created_at=row.created_at,
+                parent_ledger_group=parents[row.parent_ledger_group_id],
+            )
+            for row in db.query(
+                LedgerGroup.id,
+                LedgerGroup.name,
+                LedgerGroup.parent_ledger_group_id,
+                LedgerGroup.category,
+                LedgerGroup.is_active,
+                LedgerGroup.created_at,
+            )
+        ]
+        return cls(list(parents.values()), groups)
+
+    def get_parent_group(self, parent_group_id: int, active_only: bool = False) -> Optional[ParentGroupEntry]:
+        parent = self.parent_groups.get(parent_group_id)
+        if parent is None or (active_only and not parent.is_active):
+            return None
+        return parent
+
+    def get_group(self, group_id: int, active_only: bool = False) -> Optional[GroupEntry]:
+        group = self.groups.get(group_id)
+        if group is None or (active_only and not group.is_active):
+            return None
+        return group
+
+    def active_parent_groups(self) -> List[ParentGroupEntry]:
+        """Active parent groups ordered by sort_order (nulls last), then name."""
+        return sorted((p for p in self.parent_groups.values() if p.is_active), key=_parent_sort_key)
+
+    def active_groups(self, parent_group_id: Optional[int] = None) -> List[GroupEntry]:
+        """Active ledger groups ordered by parent group id, then name."""
+        groups = (
+            g
+            for g in self.groups.values()
+            if g.is_active and (not parent_group_id or g.parent_ledger_group_id == parent_group_id)
+        )
+        return sorted(groups, key=lambda g: (g.parent_ledger_group_id, g.name))
+
+    def parent_sort_key(self, parent_group_id: int):
+        """Sort key for parent group rows in reports: sort_order (nulls last), then name."""
+        return _parent_sort_key(self.parent_groups[parent_group_id])
+
+    def report_sort_key(self, group_id: int, ledger_name: str):
+        """Sort key for report rows: parent sort_order (nulls last), parent name, group name, ledger name."""
+        group = self.groups[group_id]
+        return (*_parent_sort_key(group.parent_ledger_group), group.name, ledger_name)
+
+
+_lock = threading.Lock()
+_registry: Optional[ChartOfAccounts] = None
+
+
+def refresh_chart_of_accounts(db: Session) -> ChartOfAccounts:
+    """Reload the registry from the database. Call after any change to ledger groups."""
+    global _registry
+    registry = ChartOfAccounts.load(db)
+    with _lock:
+        _registry = registry
+    return registry
+
+
+def get_chart_of_accounts(db: Session = Depends(get_db)) -> ChartOfAccounts:
+    """Return the cached registry, loading it on first use or once the TTL has expired."""
+    registry = _registry
+    if registry is None or time.monotonic() - registry.loaded_at > settings.COA_CACHE_TTL_SECONDS:
+        CACHE_REQUESTS.inc(1, "chart_of_accounts", "miss")
+        return refresh_chart_of_accounts(db)
+    CACHE_REQUESTS.inc(1, "chart_of_accounts", "hit")
+    return registry
+
+
+def _reload_on_miss(coa: ChartOfAccounts, db: Session, model, missing) -> ChartOfAccounts:
+    """
+    A miss means the row was created by another worker since our last load, or the id
+    does not exist at all (a stale or bogus client id). Probe the ids first so that only
+    the former costs a reload; otherwise every request with a bad id would reload.
+    """
+    if not missing or db.scalar(select(model.id).where(model.id.in_(missing)).limit(1)) is None:
+        return coa
+    CACHE_REQUESTS.inc(1, "chart_of_accounts", "stale")
+    return refresh_chart_of_accounts(db)
+
+
+def ensure_groups(coa: ChartOfAccounts, db: Session, group_ids) -> ChartOfAccounts:
+    """Return a registry that knows every existing group in group_ids, reloading once on a miss."""
+    return _reload_on_miss(coa, db, LedgerGroup, {group_id for group_id in group_ids if group_id not in coa.groups})
+
+
+def ensure_parent_groups(coa: ChartOfAccounts, db: Session, parent_group_ids) -> ChartOfAccounts:
+    """Return a registry that knows every existing parent group in parent_group_ids, reloading once on a miss."""
+    return _reload_on_miss(
+        coa, db, ParentLedgerGroup, {parent_id for parent_id in parent_group_ids if parent_id not in coa.parent_groups}
+    )
+
+
+def _if_none_match(header: str, etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches etag (RFC 9110 section 13.1.2): "*" matches
+    any current representation, otherwise a listed tag must match by weak comparison,
+    i.e. with any W/ prefix ignored. A malformed list matches nothing.
+    """
+    if header.strip() == "*":
+        return True
+    opaque_tag = etag[2:] if etag.startswith("W/") else etag
+    position = 0
+    while position < len(header):
+        match = _ENTITY_TAG.match(header, position)
+        if match is None:
+            return False
+        if match.group(1) == opaque_tag:
+            return True
+        position = match.end()
+    return False
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Set caching headers for a registry-backed response.
+    Returns a 304 response when the client's If-None-Match already matches the ETag.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _if_none_match(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,70 @@
+"""
+Calendar buckets for time-series reports.
+
+bucket_expression() truncates a date column to the start of its day, ISO week
+(Monday), month or year in SQL, so reports can GROUP BY the bucket. The pure-Python
+helpers produce the same bucket starts, letting a report emit a point for every
+bucket in a range, including buckets without activity.
+"""
+
+import enum
+from datetime import date, timedelta
+from typing import List
+
+from sqlalchemy import Date, cast, func
+
+
+class Interval(str, enum.Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+    YEAR = "year"
+
+
+def bucket_expression(column, interval: Interval):
+    """SQL expression for the first day of column's bucket, typed as a Date."""
+    if interval == Interval.DAY:
+        return column
+    return cast(func.date_trunc(interval.value, column), Date)
+
+
+def bucket_start(day: date, interval: Interval) -> date:
+    if interval == Interval.WEEK:
+        return day - timedelta(days=day.weekday())
+    if interval == Interval.MONTH:
+        return day.replace(day=1)
+    if interval == Interval.YEAR:
+        return day.replace(month=1, day=1)
+    return day
+
+
+def next_bucket_start(start: date, interval: Interval) -> date:
+    if interval == Interval.WEEK:
+        return start + timedelta(days=7)
+    if interval == Interval.MONTH:
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    if interval == Interval.YEAR:
+        return date(start.year + 1, 1, 1)
+    return start + timedelta(days=1)
+
+
+def bucket_count(start_date: date, end_date: date, interval: Interval) -> int:
+    """Number of buckets touching the range, without building them."""
+    first, last = bucket_start(start_date, interval), bucket_start(end_date, interval)
+    if interval == Interval.WEEK:
+        return (last - first).days // 7 + 1
+    if interval == Interval.MONTH:
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    if interval == Interval.YEAR:
+        return last.year - first.year + 1
+    return (last - first).days + 1
+
+
+def bucket_starts(start_date: date, end_date: date, interval: Interval) -> List[date]:
+    """Start of every bucket touching start_date..end_date, in order."""
+    starts = []
+    current = bucket_start(start_date, interval)
+    while current <= end_date:
+        starts.append(current)
+        current = next_bucket_start(current, interval)
+    return starts
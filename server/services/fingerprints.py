@@ -0,0 +1,190 @@
+"""
+Transaction fingerprints for duplicate detection.
+
+A fingerprint hashes what makes two postings the same entry: the user, the date,
+the reference (case and punctuation ignored) and the set of (ledger, side, amount)
+lines, with amounts in cents merged per ledger and side so item order and splitting
+do not matter. The transaction type is left out on purpose: an expense entered from
+the expenses page (MONEY_PAID) and again as a journal is still the same entry.
+
+Fingerprints are stored in transactions.fingerprint, indexed with user_id, so
+checking a new posting is a single index probe (find_duplicate), and a batch from a
+bulk loader is one IN probe (find_duplicates). Transactions written before the
+column existed, or around the API, get theirs from backfill_fingerprints().
+"""
+
+import hashlib
+import re
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from core.money import to_cents, to_decimal
+from models.finance import EntryType, Transaction, TransactionItem
+
+# Anything but letters and digits is ignored in references: "INV-001" == "inv 001"
+_REFERENCE_NOISE = re.compile(r"[^0-9A-Z]")
+
+_transactions = Transaction.__table__
+# executemany over {"b_id", "b_fingerprint"} rows; derived data, so updated_at is kept
+_SET_FINGERPRINT = (
+    update(_transactions)
+    .where(_transactions.c.id == bindparam("b_id"))
+    .values(fingerprint=bindparam("b_fingerprint"), updated_at=_transactions.c.updated_at)
+)
+
+_DUPLICATE_OF = (
+    select(Transaction.id)
+    .where(Transaction.user_id == bindparam("user_id"), Transaction.fingerprint == bindparam("fingerprint"))
+    .order_by(Transaction.id)
+    .limit(1)
+)
+
+
+def normalize_reference(reference: Optional[str]) -> str:
+    return _REFERENCE_NOISE.sub("", reference.upper()) if reference else ""
+
+
+def transaction_fingerprint(
+    user_id: int,
+    transaction_date: date,
+    reference: Optional[str],
+    items: Iterable[Tuple[int, EntryType, object]],
+) -> str:
+    """Fingerprint of a posting from its (ledger_id, entry_type, amount) items."""
+    lines: Dict[Tuple[int, str], int] = {}
+    for ledger_id, entry_type, amount in items:
+        key = (ledger_id, EntryType(entry_type).value)
+        lines[key] = lines.get(key, 0) + to_cents(amount)
+    return fingerprint_lines(user_id, transaction_date, reference, lines)
+
+
+def fingerprint_lines(
+    user_id: int, transaction_date: date, reference: Optional[str], lines: Dict[Tuple[int, str], int]
+) -> str:
+    """Fingerprint from lines already merged as {(ledger_id, "DEBIT"/"CREDIT"): cents}."""
+    payload = "|".join(
+        [
+            str(user_id),
+            transaction_date.isoformat(),
+            normalize_reference(reference),
+            ";".join(f"{ledger_id}:{side}:{cents}" for (ledger_id, side), cents in sorted(lines.items())),
+        ]
+    )
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def find_duplicate(db: Session, user_id: int, fingerprint: str) -> Optional[int]:
+    """Id of the user's oldest transaction with this fingerprint, if any."""
+    return db.scalar(_DUPLICATE_OF, {"user_id": user_id, "fingerprint": fingerprint})
+
+
+def find_duplicates(db: Session, user_id: int, fingerprints: Sequence[str]) -> Dict[str, int]:
+    """fingerprint -> oldest existing transaction id, for the fingerprints already posted (one query)."""
+    if not fingerprints:
+        return {}
+    return dict(
+        db.execute(
+            select(Transaction.fingerprint, func.min(Transaction.id))
+            .where(Transaction.user_id == user_id, Transaction.fingerprint.in_(set(fingerprints)))
+            .group_by(Transaction.fingerprint)
+        ).all()
+    )
+
+
+def store_fingerprints(db: Session, rows: Sequence[Tuple[int, str]]) -> None:
+    """Write (transaction_id, fingerprint) pairs in one executemany."""
+    if rows:
+        db.execute(_SET_FINGERPRINT, [{"b_id": transaction_id, "b_fingerprint": fp} for transaction_id, fp in rows])
+
+
+def backfill_fingerprints(
+    db: Session, user_ids: Optional[Sequence[int]] = None, recompute: bool = False, batch_size: int = 5000
+) -> int:
+    """
+    Fill in transactions.fingerprint for the given users (all users if None), in
+    batches of transactions by id; recompute=True also redoes existing ones.
+    Commits after each batch and returns the number of transactions updated.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        batch = select(Transaction.id, Transaction.user_id, Transaction.transaction_date, Transaction.reference).where(
+            Transaction.id > last_id
+        )
+        if user_ids is not None:
+            batch = batch.where(Transaction.user_id.in_(user_ids))
+        if not recompute:
+            batch = batch.where(Transaction.fingerprint.is_(None))
+        transactions = db.execute(batch.order_by(Transaction.id).limit(batch_size)).all()
+        if not transactions:
+            return updated
+
+        items: Dict[int, List[tuple]] = {}
+        for transaction_id, ledger_id, entry_type, amount in db.execute(
+            select(
+                TransactionItem.transaction_id, TransactionItem.ledger_id, TransactionItem.entry_type, TransactionItem.amount
+            ).where(TransactionItem.transaction_id.in_([row.id for row in transactions]))
+        ):
+            items.setdefault(transaction_id, []).append((ledger_id, entry_type, amount))
+
+        store_fingerprints(
+            db,
+            [
+                (row.id, transaction_fingerprint(row.user_id, row.transaction_date, row.reference, items.get(row.id, ())))
+                for row in transactions
+            ],
+        )
+        db.commit()
+        updated += len(transactions)
+        last_id = transactions[-1].id
+
+
+def suspected_duplicates(db: Session, user_id: int, limit: int, offset: int) -> List[dict]:
+    """Groups of the user's transactions sharing a fingerprint, most recent date first."""
+    groups = (
+        select(Transaction.fingerprint)
+        .where(Transaction.user_id == user_id, Transaction.fingerprint.is_not(None))
+        .group_by(Transaction.fingerprint)
+        .having(func.count() > 1)
+        .order_by(func.max(Transaction.transaction_date).desc(), Transaction.fingerprint)
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            Transaction.fingerprint,
+            Transaction.id,
+            Transaction.transaction_date,
+            Transaction.reference,
+            Transaction.transaction_type,
+            Transaction.total_amount,
+            Transaction.created_at,
+        )
+        .join(groups, groups.c.fingerprint == Transaction.fingerprint)
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.transaction_date.desc(), Transaction.fingerprint, Transaction.id)
+    ).all()
+
+    result: Dict[str, dict] = {}
+    for row in rows:
+        group = result.get(row.fingerprint)
+        if group is None:
+            group = result[row.fingerprint] = {
+                "fingerprint": row.fingerprint,
+                "transaction_date": row.transaction_date,
+                "total_amount": to_decimal(to_cents(row.total_amount)),
+                "transactions": [],
+            }
+        group["transactions"].append(
+            {
+                "id": row.id,
+                "reference": row.reference,
+                "transaction_type": row.transaction_type,
+                "created_at": row.created_at,
+            }
+        )
+    return list(result.values())
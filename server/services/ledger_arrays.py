@@ -0,0 +1,189 @@
+"""
+One user's ledger entries as NumPy arrays, for the ledger cache (services.ledger_cache).
+
+Every transaction item is held sorted by (ledger, date): a combined int64 key
+(ledger index * KEY_STRIDE + date ordinal) and prefix sums of the debit and credit
+amounts in integer cents. Any per-ledger date-range aggregate is then two
+searchsorted calls and a subtraction on the prefix sums, vectorized across all
+ledgers.
+
+Only imported once the cache is enabled and first used, so NumPy is not loaded by
+processes that run without it.
+"""
+
+from datetime import date
+from typing import Dict, Iterable, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
+
+from core.money import cents_expression, to_cents
+from models.finance import EntryType, Transaction, TransactionItem
+from models.user import User
+from services.ledger_cache import Entry
+
+# Larger than any date ordinal (date.max.toordinal() < 2**22), so keys sort by ledger, then date
+KEY_STRIDE = 1 << 22
+
+# Rows fetched per round trip while building an entry
+_BUILD_BATCH_SIZE = 50000
+
+_ENTRIES = (
+    select(
+        Transaction.user_id,
+        Transaction.transaction_date,
+        TransactionItem.ledger_id,
+        TransactionItem.entry_type,
+        cents_expression(TransactionItem.amount).label("cents"),
+    )
+    .join(Transaction, Transaction.id == TransactionItem.transaction_id)
+    .where(Transaction.user_id == bindparam("user_id"))
+    .subquery("entries")
+)
+
+# The user's ledger_version on every row (one row with NULL entry columns if they have
+# none). One statement reads from one snapshot, so the version is exactly the one the
+# entries are at, even if a posting commits while the entry is being built.
+_USER_ENTRIES = (
+    select(
+        User.ledger_version,
+        _ENTRIES.c.transaction_date,
+        _ENTRIES.c.ledger_id,
+        _ENTRIES.c.entry_type,
+        _ENTRIES.c.cents,
+    )
+    .select_from(User)
+    .outerjoin(_ENTRIES, _ENTRIES.c.user_id == User.id)
+    .where(User.id == bindparam("user_id"))
+)
+
+# ledger_id -> (debit, credit) in cents
+Sums = Dict[int, Tuple[int, int]]
+
+
+class UserLedgerCache:
+    """One user's entries as sorted columnar arrays with prefix sums. Not changed after construction."""
+
+    def __init__(self, version: int, ledger_ids: np.ndarray, keys: np.ndarray, debits: np.ndarray, credits: np.ndarray):
+        self.version = version
+        self.ledger_ids = ledger_ids  # sorted; a ledger's index is its position here
+        self.keys = keys
+        self.debits = debits
+        self.credits = credits
+        self.debit_sums = np.concatenate(([0], np.cumsum(self.debits)))
+        self.credit_sums = np.concatenate(([0], np.cumsum(self.credits)))
+        # First key of every ledger's block
+        self.ledger_keys = np.arange(len(self.ledger_ids), dtype=np.int64) * KEY_STRIDE
+
+    @classmethod
+    def from_columns(cls, version: int, ordinals, ledger_ids, debits, credits) -> "UserLedgerCache":
+        unique_ids, ledger_index = np.unique(np.asarray(ledger_ids, dtype=np.int64), return_inverse=True)
+        keys = ledger_index.astype(np.int64) * KEY_STRIDE + np.asarray(ordinals, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        return cls(
+            version,
+            unique_ids,
+            keys[order],
+            np.asarray(debits, dtype=np.int64)[order],
+            np.asarray(credits, dtype=np.int64)[order],
+        )
+
+    @classmethod
+    def load(cls, db: Session, user_id: int) -> "UserLedgerCache":
+        """The user's entries, tagged with the ledger_version they were read at."""
+        version = None
+        columns = ([], [], [], [])
+        result = db.execute(_USER_ENTRIES, {"user_id": user_id}, execution_options={"yield_per": _BUILD_BATCH_SIZE})
+        for rows in result.partitions():
+            ordinals, ledger_ids, debits, credits = columns
+            for version, transaction_date, ledger_id, entry_type, cents in rows:
+                if ledger_id is None:
+                    continue
+                ordinals.append(transaction_date.toordinal())
+                ledger_ids.append(ledger_id)
+                if entry_type == EntryType.DEBIT:
+                    debits.append(cents)
+                    credits.append(0)
+                else:
+                    debits.append(0)
+                    credits.append(cents)
+        return cls.from_columns(version, *columns)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            array.nbytes
+            for array in (self.ledger_ids, self.keys, self.debits, self.credits, self.debit_sums, self.credit_sums)
+        )
+
+    def with_entries(self, version: int, entries: Iterable[Entry]) -> "UserLedgerCache":
+        """
+        A new entry at version with newly posted entries inserted. Readers may still be
+        using this one outside the cache's lock, so it is left unchanged.
+        """
+        entries = list(entries)
+        new_ids = np.array([ledger_id for _, ledger_id, _, _ in entries], dtype=np.int64)
+        ledger_ids = np.union1d(self.ledger_ids, new_ids)
+        keys = self.keys
+        if len(ledger_ids) != len(self.ledger_ids):
+            # A ledger's first entry: renumber existing keys (the mapping is monotonic, so order holds)
+            remap = np.searchsorted(ledger_ids, self.ledger_ids).astype(np.int64)
+            keys = remap[keys // KEY_STRIDE] * KEY_STRIDE + keys % KEY_STRIDE
+
+        new_keys = np.searchsorted(ledger_ids, new_ids).astype(np.int64) * KEY_STRIDE + np.array(
+            [entry_date.toordinal() for entry_date, _, _, _ in entries], dtype=np.int64
+        )
+        cents = [to_cents(amount) for _, _, _, amount in entries]
+        new_debits = np.array([c if e == EntryType.DEBIT else 0 for (_, _, e, _), c in zip(entries, cents)], dtype=np.int64)
+        new_credits = np.array([c if e == EntryType.CREDIT else 0 for (_, _, e, _), c in zip(entries, cents)], dtype=np.int64)
+
+        positions = np.searchsorted(keys, new_keys, side="right")
+        return UserLedgerCache(
+            version,
+            ledger_ids,
+            np.insert(keys, positions, new_keys),
+            np.insert(self.debits, positions, new_debits),
+            np.insert(self.credits, positions, new_credits),
+        )
+
+    def _positions(self, ordinal: int, side: str) -> np.ndarray:
+        """Per ledger, the array position of its first entry on/after (left) or after (right) the date."""
+        return np.searchsorted(self.keys, self.ledger_keys + ordinal, side=side)
+
+    def range_sums(self, start_date: date, end_date: date) -> Tuple[Sums, Sums]:
+        """
+        (before, between): debit and credit totals in cents per ledger for entries
+        before start_date and for entries within start_date..end_date. Like the SQL GROUP BY,
+        a ledger appears only if it has entries in that range.
+        """
+        block_starts = self._positions(0, "left")
+        starts = self._positions(start_date.toordinal(), "left")
+        ends = self._positions(end_date.toordinal(), "right")
+
+        def sums(lo: np.ndarray, hi: np.ndarray) -> Sums:
+            present = np.flatnonzero(hi > lo)
+            debits = (self.debit_sums[hi] - self.debit_sums[lo])[present].tolist()
+            credits = (self.credit_sums[hi] - self.credit_sums[lo])[present].tolist()
+            return dict(zip(self.ledger_ids[present].tolist(), zip(debits, credits)))
+
+        return sums(block_starts, starts), sums(starts, ends)
+
+    def balances_at(self, ledger_ids: Sequence[int], dates: Sequence[date]) -> Dict[int, np.ndarray]:
+        """All-time debit - credit in cents of each ledger at the end of each date."""
+        ordinals = np.array([day.toordinal() for day in dates], dtype=np.int64)
+        positions = {int(ledger_id): index for index, ledger_id in enumerate(self.ledger_ids)}
+        balances = {ledger_id: np.zeros(len(ordinals), dtype=np.int64) for ledger_id in ledger_ids}
+        known = [ledger_id for ledger_id in ledger_ids if ledger_id in positions]
+        if not known:
+            return balances
+
+        # One searchsorted over every (ledger, date) pair
+        bases = np.array([positions[ledger_id] for ledger_id in known], dtype=np.int64) * KEY_STRIDE
+        block_starts = np.searchsorted(self.keys, bases, side="left")
+        ends = np.searchsorted(self.keys, (bases[:, None] + ordinals[None, :]).ravel(), side="right")
+        net_sums = self.debit_sums - self.credit_sums
+        values = net_sums[ends].reshape(len(known), len(ordinals)) - net_sums[block_starts][:, None]
+        for ledger_id, row in zip(known, values):
+            balances[ledger_id] = row
+        return balances
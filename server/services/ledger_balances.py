@@ -0,0 +1,139 @@
+"""
+Incrementally maintained per-ledger balances.
+
+ledger_balances holds each ledger's all-time debit and credit totals. The
+transaction write paths apply the change in their items with one upsert in the
+same database transaction as the items themselves, so the totals commit or roll
+back together with the posting and GET /accounts/?with_balances=true never has to
+aggregate transaction_items. Increments are done by the database
+(debit_total = debit_total + excluded.debit_total), so concurrent postings to the
+same ledger do not lose updates.
+
+Every write also bumps users.ledger_version (bump_ledger_version), which tells
+the per-process ledger caches (services.ledger_cache) that their copy is stale.
+The bump comes before the write touches ledger_balances, so it also takes the
+user's row lock that rebuilds wait on (lock_users).
+
+Anything that writes transaction_items or statement matches around the API (bulk
+loaders, cleanup scripts) must call rebuild_ledger_balances() for the affected
+users afterwards; it bumps their versions too.
+"""
+
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as upsert
+from sqlalchemy.orm import Session
+
+from models.finance import EntryType, LedgerBalance, Transaction, TransactionItem
+from models.reconciliation import StatementLine
+from models.user import User
+
+# ledger_id -> (debit change, credit change)
+Deltas = Dict[int, Tuple[Decimal, Decimal]]
+
+
+def item_deltas(items: Iterable[Tuple[int, EntryType, Decimal]], sign: int = 1, into: Optional[Deltas] = None) -> Deltas:
+    """Add (ledger_id, entry_type, amount) items to a deltas map; sign=-1 removes them."""
+    deltas = {} if into is None else into
+    for ledger_id, entry_type, amount in items:
+        debit, credit = deltas.get(ledger_id, (Decimal("0"), Decimal("0")))
+        if entry_type == EntryType.DEBIT:
+            debit += sign * Decimal(amount)
+        else:
+            credit += sign * Decimal(amount)
+        deltas[ledger_id] = (debit, credit)
+    return deltas
+
+
+def apply_ledger_deltas(db: Session, user_id: int, deltas: Deltas) -> None:
+    """Add the deltas to the ledgers' running totals, creating rows as needed (one statement)."""
+    # Sorted so concurrent postings lock shared ledgers in the same order
+    rows = [
+        {"ledger_id": ledger_id, "user_id": user_id, "debit_total": debit, "credit_total": credit}
+        for ledger_id, (debit, credit) in sorted(deltas.items())
+        if debit or credit
+    ]
+    if not rows:
+        return
+    stmt = upsert(LedgerBalance).values(rows)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[LedgerBalance.ledger_id],
+            set_={
+                "debit_total": LedgerBalance.debit_total + stmt.excluded.debit_total,
+                "credit_total": LedgerBalance.credit_total + stmt.excluded.credit_total,
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+def bump_ledger_version(db: Session, user_id: int) -> int:
+    """Mark the user's ledger data as changed; returns the new version."""
+    return db.execute(
+        update(User)
+        .where(User.id == user_id)
+        # Keep updated_at for profile changes
+        .values(ledger_version=User.ledger_version + 1, updated_at=User.updated_at)
+        .returning(User.ledger_version)
+    ).scalar_one()
+
+
+def _totals_query(user_ids: Optional[Sequence[int]] = None):
+    query = (
+        select(
+            TransactionItem.ledger_id,
+            Transaction.user_id,
+            func.coalesce(func.sum(case((TransactionItem.entry_type == EntryType.DEBIT, TransactionItem.amount))), 0),
+            func.coalesce(func.sum(case((TransactionItem.entry_type == EntryType.CREDIT, TransactionItem.amount))), 0),
+        )
+        .join(Transaction, Transaction.id == TransactionItem.transaction_id)
+        .group_by(TransactionItem.ledger_id, Transaction.user_id)
+    )
+    if user_ids is not None:
+        query = query.where(Transaction.user_id.in_(user_ids))
+    return query
+
+
+def lock_users(db: Session, user_ids: Optional[Sequence[int]] = None) -> None:
+    """
+    Lock the users' rows (all users if None) until the transaction ends. Postings update
+    the row first (bump_ledger_version) and statement matching locks it, so once this
+    returns no write to these users' balances is in flight and none can commit until the
+    caller does: a rebuild reading the items and replacing the balances cannot lose a
+    concurrent increment.
+    """
+    locked = select(User.id).order_by(User.id).with_for_update()
+    if user_ids is not None:
+        locked = locked.where(User.id.in_(user_ids))
+    db.execute(locked).all()
+
+
+def rebuild_ledger_balances(db: Session, user_ids: Optional[Sequence[int]] = None) -> None:
+    """Recompute running totals from transaction_items for the given users (all users if None)."""
+    lock_users(db, user_ids)
+    stale = delete(LedgerBalance)
+    if user_ids is not None:
+        stale = stale.where(LedgerBalance.user_id.in_(user_ids))
+    db.execute(stale)
+    db.execute(
+        insert(LedgerBalance).from_select(
+            [LedgerBalance.ledger_id, LedgerBalance.user_id, LedgerBalance.debit_total, LedgerBalance.credit_total],
+            _totals_query(user_ids),
+        )
+    )
+    reconciled = (
+        select(func.coalesce(func.sum(StatementLine.amount), 0))
+        .where(StatementLine.ledger_id == LedgerBalance.ledger_id, StatementLine.matched_item_id.is_not(None))
+        .scalar_subquery()
+    )
+    reconciled_totals = update(LedgerBalance).values(reconciled_total=reconciled)
+    if user_ids is not None:
+        reconciled_totals = reconciled_totals.where(LedgerBalance.user_id.in_(user_ids))
+    db.execute(reconciled_totals, execution_options={"synchronize_session": False})
+    versions = update(User).values(ledger_version=User.ledger_version + 1, updated_at=User.updated_at)
+    if user_ids is not None:
+        versions = versions.where(User.id.in_(user_ids))
+    db.execute(versions, execution_options={"synchronize_session": False})
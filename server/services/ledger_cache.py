@@ -0,0 +1,123 @@
+"""
+Optional per-process cache of each user's ledger entries as NumPy arrays
+(services.ledger_arrays), so per-ledger date-range aggregates are searchsorted
+lookups on prefix sums instead of GROUP BY scans. The trial balance and balance
+history read models use it when PESA_PLAN_LEDGER_CACHE_ENABLED is set; NumPy is
+only imported once an entry is first built.
+
+Freshness: users.ledger_version is bumped in the same database transaction as
+every write (services.ledger_balances). An entry is only used when its version
+equals the user's current one, which get_current_user has already loaded, so the
+check costs no query. An entry is tagged with the version read in the same statement
+as its entries (UserLedgerCache.load), not the caller's, so a posting that commits
+while it is built is never counted twice. The process that made a posting swaps in a
+copy of its entry that includes it (record_posting); entries are never changed once
+stored, because readers use them outside the lock. Other processes see the new
+version and rebuild lazily.
+
+Memory is bounded by PESA_PLAN_LEDGER_CACHE_MAX_BYTES: least recently used users
+are evicted first, so inactive users drop out on their own.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+from typing import TYPE_CHECKING, Iterable, Optional, Tuple
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.metrics import CACHE_REQUESTS, REGISTRY, Gauge
+from models.finance import EntryType
+from models.user import User
+
+if TYPE_CHECKING:
+    from services.ledger_arrays import UserLedgerCache
+
+_USER_VERSION = select(User.ledger_version).where(User.id == bindparam("user_id"))
+
+# (date, ledger_id, entry_type, amount) as posted
+Entry = Tuple[date, int, EntryType, Decimal]
+
+
+class LedgerCache:
+    """LRU of UserLedgerCache entries bounded by total array size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[int, UserLedgerCache]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        REGISTRY.register(
+            Gauge("ledger_cache_bytes", "Bytes held by the per-process ledger cache.", lambda: [((), self._bytes)])
+        )
+        REGISTRY.register(
+            Gauge("ledger_cache_users", "Users held by the per-process ledger cache.", lambda: [((), len(self._entries))])
+        )
+
+    def _discard(self, user_id: int) -> None:
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+
+    def _store(self, user_id: int, entry: "UserLedgerCache") -> None:
+        self._discard(user_id)
+        if entry.nbytes > self.max_bytes:
+            return
+        self._entries[user_id] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def get(self, db: Session, user_id: int, version: Optional[int] = None) -> "UserLedgerCache":
+        """The user's entry at their current version, building it if missing or stale."""
+        if version is None:
+            version = db.execute(_USER_VERSION, {"user_id": user_id}).scalar_one()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(user_id)
+                CACHE_REQUESTS.inc(1, "ledger", "hit")
+                return entry
+        CACHE_REQUESTS.inc(1, "ledger", "miss" if entry is None else "stale")
+
+        from services.ledger_arrays import UserLedgerCache
+
+        # Built outside the lock. It may be newer than version if a posting committed since
+        # the caller read it; that is still a consistent snapshot, so it is returned as well.
+        entry = UserLedgerCache.load(db, user_id)
+        with self._lock:
+            current = self._entries.get(user_id)
+            # A concurrent build or posting may have stored a newer one meanwhile
+            if current is None or current.version < entry.version:
+                self._store(user_id, entry)
+        return entry
+
+    def record_posting(self, user_id: int, version: int, entries: Iterable[Entry]) -> None:
+        """Apply a committed posting to the user's entry if it is exactly one version behind."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is None or entry.version >= version:
+            # Nothing to update, or built after the posting committed and so already includes it
+            return
+        # Built outside the lock, like a load; readers keep the old entry until the swap
+        updated = entry.with_entries(version, entries) if entry.version == version - 1 else None
+        with self._lock:
+            if self._entries.get(user_id) is not entry:
+                # Replaced or evicted meanwhile
+                return
+            if updated is None:
+                self._discard(user_id)
+            else:
+                self._store(user_id, updated)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._discard(user_id)
+
+
+ledger_cache = LedgerCache(settings.LEDGER_CACHE_MAX_BYTES)
@@ -0,0 +1,266 @@
+"""
+Pivot (group-by) analytics over a user's transaction items.
+
+A pivot request names dimensions and measures from fixed whitelists; compile_pivot()
+turns them into one parameterized GROUP BY over transaction_items joined to their
+transaction, ledger and ledger group. No client text reaches the SQL: dimensions
+and measures map to predefined column expressions and every value is bound.
+
+The query filters on transactions.user_id and transaction_date and joins on
+transaction_id/ledger_id, so it uses the same indexes as the trial balance.
+Group and parent-group names come from the chart-of-accounts registry rather
+than the query.
+
+An archived year is only in transaction_items as its summary journal (see
+services.archive): one debit and one credit item per ledger on 31 December. That
+gives the right totals per ledger, group and spending type over the whole year.
+Where the range splits an archived year, or the pivot groups by period (other than
+by year) or transaction type, filters on transaction type or counts entries, the
+year's entries are read back from its file and added to the items as correction
+rows, less its summary journal, so the result is the same as before archiving.
+"""
+
+import enum
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    Integer,
+    Numeric,
+    String,
+    bindparam,
+    case,
+    cast,
+    func,
+    literal,
+    select,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from models.finance import (
+    EntryType,
+    Ledger,
+    LedgerGroup,
+    LedgerGroupCategory,
+    SpendingType,
+    Transaction,
+    TransactionItem,
+    TransactionType,
+)
+from core.money import to_decimal
+from services.archive import archived_pivot_rows, archived_years_between, period_last_days, split_archived_years
+from services.chart_of_accounts import ChartOfAccounts, ensure_groups, refresh_chart_of_accounts
+from services.date_buckets import Interval, bucket_expression
+
+
+class Dimension(str, enum.Enum):
+    LEDGER = "ledger"
+    LEDGER_GROUP = "ledger_group"
+    PARENT_GROUP = "parent_group"
+    CATEGORY = "category"
+    SPENDING_TYPE = "spending_type"
+    TRANSACTION_TYPE = "transaction_type"
+    PERIOD = "period"
+
+
+class Measure(str, enum.Enum):
+    DEBIT = "debit"
+    CREDIT = "credit"
+    NET = "net"  # debit - credit
+    COUNT = "count"  # number of entries (transaction items)
+
+
+@dataclass
+class PivotQuery:
+    dimensions: Sequence[Dimension]
+    measures: Sequence[Measure]
+    start_date: date
+    end_date: date
+    interval: Interval = Interval.MONTH
+    ledger_ids: Sequence[int] = ()
+    categories: Sequence[LedgerGroupCategory] = ()
+    transaction_types: Sequence[TransactionType] = ()
+
+
+def _dimension_columns(dimension: Dimension, interval: Interval, postings) -> Dict[str, object]:
+    """Output key -> column expression for a dimension. Names resolved from the registry are added later."""
+    if dimension == Dimension.LEDGER:
+        return {"ledger_id": Ledger.id, "ledger_name": Ledger.name}
+    if dimension == Dimension.LEDGER_GROUP:
+        return {"ledger_group_id": Ledger.ledger_group_id}
+    if dimension == Dimension.PARENT_GROUP:
+        return {"parent_group_id": LedgerGroup.parent_ledger_group_id}
+    if dimension == Dimension.CATEGORY:
+        return {"category": LedgerGroup.category}
+    if dimension == Dimension.SPENDING_TYPE:
+        return {"spending_type_id": Ledger.spending_type_id, "spending_type_name": SpendingType.name}
+    if dimension == Dimension.TRANSACTION_TYPE:
+        return {"transaction_type": postings.c.transaction_type}
+    return {"period": bucket_expression(postings.c.transaction_date, interval)}
+
+
+def _postings(pivot: PivotQuery, user_id: int, archived_rows: Sequence[tuple]):
+    """
+    (ledger_id, transaction_type, transaction_date, debit_amount, credit_amount, entries)
+    for each of the user's transaction items in the range, followed by archived_rows
+    (archived_pivot_rows), whose amounts are in cents.
+    """
+    signed_debit = case((TransactionItem.entry_type == EntryType.DEBIT, TransactionItem.amount), else_=0)
+    signed_credit = case((TransactionItem.entry_type == EntryType.CREDIT, TransactionItem.amount), else_=0)
+    postings = (
+        select(
+            TransactionItem.ledger_id,
+            Transaction.transaction_type,
+            Transaction.transaction_date,
+            signed_debit.label("debit_amount"),
+            signed_credit.label("credit_amount"),
+            literal(1).label("entries"),
+        )
+        .select_from(TransactionItem)
+        .join(Transaction, Transaction.id == TransactionItem.transaction_id)
+        .where(
+            Transaction.user_id == user_id,
+            Transaction.transaction_date >= pivot.start_date,
+            Transaction.transaction_date <= pivot.end_date,
+        )
+    )
+    if archived_rows:
+        ledger_ids, transaction_types, dates, debits, credits, entries = zip(*archived_rows)
+        archived = func.unnest(
+            bindparam("archived_ledger_ids", list(ledger_ids), type_=ARRAY(BigInteger)),
+            bindparam("archived_transaction_types", list(transaction_types), type_=ARRAY(String)),
+            bindparam("archived_dates", list(dates), type_=ARRAY(Date)),
+            bindparam("archived_debits", [to_decimal(cents) for cents in debits], type_=ARRAY(Numeric(15, 2))),
+            bindparam("archived_credits", [to_decimal(cents) for cents in credits], type_=ARRAY(Numeric(15, 2))),
+            bindparam("archived_entries", list(entries), type_=ARRAY(Integer)),
+        ).table_valued(
+            "ledger_id", "transaction_type", "transaction_date", "debit_amount", "credit_amount", "entries"
+        ).render_derived()
+        postings = union_all(
+            postings,
+            select(
+                archived.c.ledger_id,
+                cast(archived.c.transaction_type, Transaction.transaction_type.type),
+                archived.c.transaction_date,
+                archived.c.debit_amount,
+                archived.c.credit_amount,
+                archived.c.entries,
+            ),
+        )
+    return postings.subquery("pivot_postings")
+
+
+def compile_pivot(
+    pivot: PivotQuery, user_id: int, limit: int, archived_rows: Sequence[tuple] = ()
+) -> Tuple[object, List[str]]:
+    """
+    Build the statement and return it with the output keys of its dimension columns.
+    Dimension values are computed in a subquery and grouped on in the outer query, so
+    expressions such as the period bucket appear only once. archived_rows
+    (archived_pivot_rows) are added to the transaction items.
+    """
+    dimensions = list(dict.fromkeys(pivot.dimensions))
+    measures = list(dict.fromkeys(pivot.measures))
+    postings = _postings(pivot, user_id, archived_rows)
+    columns: Dict[str, object] = {}
+    for dimension in dimensions:
+        columns.update(_dimension_columns(dimension, pivot.interval, postings))
+
+    items = (
+        select(
+            *(column.label(key) for key, column in columns.items()),
+            postings.c.debit_amount,
+            postings.c.credit_amount,
+            postings.c.entries,
+        )
+        .select_from(postings)
+        .join(Ledger, Ledger.id == postings.c.ledger_id)
+    )
+    if Dimension.PARENT_GROUP in dimensions or Dimension.CATEGORY in dimensions or pivot.categories:
+        items = items.join(LedgerGroup, LedgerGroup.id == Ledger.ledger_group_id)
+    if Dimension.SPENDING_TYPE in dimensions:
+        items = items.outerjoin(SpendingType, SpendingType.id == Ledger.spending_type_id)
+    if pivot.ledger_ids:
+        items = items.where(postings.c.ledger_id.in_(list(pivot.ledger_ids)))
+    if pivot.categories:
+        items = items.where(LedgerGroup.category.in_(list(pivot.categories)))
+    if pivot.transaction_types:
+        items = items.where(postings.c.transaction_type.in_(list(pivot.transaction_types)))
+    items = items.subquery("pivot_items")
+
+    debit = func.coalesce(func.sum(items.c.debit_amount), 0)
+    credit = func.coalesce(func.sum(items.c.credit_amount), 0)
+    measure_columns = {
+        Measure.DEBIT: debit,
+        Measure.CREDIT: credit,
+        Measure.NET: debit - credit,
+        Measure.COUNT: func.coalesce(func.sum(items.c.entries), 0),
+    }
+    group_columns = [items.c[key] for key in columns]
+    stmt = (
+        select(*group_columns, *(measure_columns[measure].label(measure.value) for measure in measures))
+        .group_by(*group_columns)
+        .order_by(*group_columns)
+        # One extra row tells the caller the result was cut off
+        .limit(limit + 1)
+    )
+    if archived_rows and group_columns:
+        # Groups that only held summary journal items, taken back out by the archived rows
+        stmt = stmt.having(func.sum(items.c.entries) != 0)
+    return stmt, list(columns)
+
+
+def _needs_archived_detail(pivot: PivotQuery) -> bool:
+    """Whether the pivot tells archived entries apart in a way their summary journal cannot, in any range."""
+    return (
+        (Dimension.PERIOD in pivot.dimensions and pivot.interval != Interval.YEAR)
+        or Dimension.TRANSACTION_TYPE in pivot.dimensions
+        or Measure.COUNT in pivot.measures
+        or bool(pivot.transaction_types)
+    )
+
+
+def run_pivot(db: Session, coa: ChartOfAccounts, user_id: int, pivot: PivotQuery, limit: int) -> dict:
+    """
+    Execute a pivot (PivotResponse shape). At most limit rows are returned; truncated says if
+    more exist. Archived years the summary journal cannot answer for are read back from their files.
+    """
+    dimensions = list(dict.fromkeys(pivot.dimensions))
+    measures = list(dict.fromkeys(pivot.measures))
+    if _needs_archived_detail(pivot):
+        archived = archived_years_between(db, user_id, pivot.start_date.year, pivot.end_date.year)
+    else:
+        archived = split_archived_years(db, user_id, period_last_days(pivot.start_date, pivot.end_date))
+    archived_rows = archived_pivot_rows(archived, pivot.start_date, pivot.end_date) if archived else []
+    stmt, dimension_keys = compile_pivot(pivot, user_id, limit, archived_rows)
+    rows = db.execute(stmt).all()
+    truncated = len(rows) > limit
+
+    keys = dimension_keys + [measure.value for measure in measures]
+    results = [dict(zip(keys, row)) for row in rows[:limit]]
+
+    if Dimension.LEDGER_GROUP in dimensions:
+        coa = ensure_groups(coa, db, {result["ledger_group_id"] for result in results})
+        for result in results:
+            result["ledger_group_name"] = coa.get_group(result["ledger_group_id"]).name
+    if Dimension.PARENT_GROUP in dimensions:
+        if any(result["parent_group_id"] not in coa.parent_groups for result in results):
+            # Created by another worker since our last load
+            coa = refresh_chart_of_accounts(db)
+        for result in results:
+            result["parent_group_name"] = coa.get_parent_group(result["parent_group_id"]).name
+
+    return {
+        "start_date": pivot.start_date,
+        "end_date": pivot.end_date,
+        "dimensions": dimensions,
+        "measures": measures,
+        "interval": pivot.interval if Dimension.PERIOD in dimensions else None,
+        "rows": results,
+        "truncated": truncated,
+    }
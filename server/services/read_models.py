@@ -0,0 +1,927 @@
+"""
+Read models for list and report endpoints.
+
+These queries select only the columns a response needs and shape the row tuples
+straight into JSON-ready dicts, skipping ORM identity-map bookkeeping and per-row
+Pydantic validation. Endpoints keep their response_model for the OpenAPI schema and
+return the dicts through FastJSONResponse.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import BigInteger, Date, and_, bindparam, case, cast, func, null, or_, select, union_all
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from models.finance import (
+    EntryType,
+    Ledger,
+    LedgerBalance,
+    LedgerGroup,
+    LedgerGroupCategory,
+    SpendingType,
+    Transaction,
+    TransactionItem,
+    TransactionType,
+)
+from core.config import settings
+from core.money import ZERO, cents_expression, to_decimal
+from services.archive import (
+    archived_balance_corrections,
+    archived_ledger_entries,
+    archived_range_corrections,
+    archived_years_between,
+    period_last_days,
+    split_archived_years,
+)
+from services.chart_of_accounts import ChartOfAccounts, GroupEntry, ensure_groups, refresh_chart_of_accounts
+from services.date_buckets import Interval, bucket_expression, bucket_starts, next_bucket_start
+from services.ledger_cache import ledger_cache
+
+_LEDGER_COLUMNS = (
+    Ledger.id,
+    Ledger.name,
+    Ledger.ledger_group_id,
+    Ledger.spending_type_id,
+    Ledger.user_id,
+    Ledger.is_active,
+    Ledger.created_at,
+    SpendingType.name,
+    SpendingType.is_active,
+    SpendingType.created_at,
+)
+
+
+def _group_dict(group: GroupEntry) -> dict:
+    """Matches LedgerGroupResponse."""
+    return {
+        "name": group.name,
+        "parent_ledger_group_id": group.parent_ledger_group_id,
+        "category": group.category,
+        "id": group.id,
+        "is_active": group.is_active,
+        "created_at": group.created_at,
+    }
+
+
+def _ledger_dicts(rows, coa: ChartOfAccounts) -> List[dict]:
+    """Shape ledger rows (see _LEDGER_COLUMNS) into LedgerWithGroup dicts."""
+    group_dicts = {}
+    ledgers = []
+    for (
+        ledger_id,
+        name,
+        ledger_group_id,
+        spending_type_id,
+        user_id,
+        is_active,
+        created_at,
+        spending_type_name,
+        spending_type_is_active,
+        spending_type_created_at,
+    ) in rows:
+        group_dict = group_dicts.get(ledger_group_id)
+        if group_dict is None:
+            group_dict = group_dicts[ledger_group_id] = _group_dict(coa.get_group(ledger_group_id))
+        ledgers.append(
+            {
+                "name": name,
+                "ledger_group_id": ledger_group_id,
+                "spending_type_id": spending_type_id,
+                "id": ledger_id,
+                "user_id": user_id,
+                "is_active": is_active,
+                "created_at": created_at,
+                "ledger_group": group_dict,
+                "spending_type": (
+                    {
+                        "name": spending_type_name,
+                        "id": spending_type_id,
+                        "user_id": user_id,
+                        "is_active": spending_type_is_active,
+                        "created_at": spending_type_created_at,
+                    }
+                    if spending_type_id is not None
+                    else None
+                ),
+            }
+        )
+    return ledgers
+
+
+# Hot-path statements are built once at import with bound parameters. Each execution
+# then skips statement construction, and SQLAlchemy's compiled cache skips compilation.
+_USER_LEDGER_ROWS = (
+    select(*_LEDGER_COLUMNS)
+    .outerjoin(SpendingType, SpendingType.id == Ledger.spending_type_id)
+    .where(Ledger.user_id == bindparam("user_id"))
+)
+_ACTIVE_LEDGER_ROWS = _USER_LEDGER_ROWS.where(Ledger.is_active == True).order_by(Ledger.ledger_group_id, Ledger.name)
+_ACTIVE_LEDGER_ROWS_IN_GROUP = _ACTIVE_LEDGER_ROWS.where(Ledger.ledger_group_id == bindparam("group_id"))
+_LEDGER_ROW = _USER_LEDGER_ROWS.where(Ledger.id == bindparam("ledger_id"))
+
+
+def _with_balances(stmt):
+    # Running totals from ledger_balances; ledgers that were never posted to have no row
+    return stmt.add_columns(LedgerBalance.debit_total, LedgerBalance.credit_total).outerjoin(
+        LedgerBalance, LedgerBalance.ledger_id == Ledger.id
+    )
+
+
+_ACTIVE_LEDGER_BALANCE_ROWS = _with_balances(_ACTIVE_LEDGER_ROWS)
+_ACTIVE_LEDGER_BALANCE_ROWS_IN_GROUP = _with_balances(_ACTIVE_LEDGER_ROWS_IN_GROUP)
+
+
+def _balance_dict(debit: Optional[Decimal], credit: Optional[Decimal]) -> dict:
+    """Matches LedgerBalanceResponse; net is debit minus credit."""
+    debit, credit = debit or Decimal("0"), credit or Decimal("0")
+    return {"debit": debit, "credit": credit, "net": debit - credit}
+
+
+def ledger_list(
+    db: Session, coa: ChartOfAccounts, user_id: int, group_id: Optional[int] = None, with_balances: bool = False
+) -> List[dict]:
+    """
+    Active ledgers for a user with their group and spending type (LedgerWithGroup shape),
+    plus each ledger's all-time balance when with_balances is set (LedgerWithBalance shape).
+    """
+    if group_id:
+        stmt = _ACTIVE_LEDGER_BALANCE_ROWS_IN_GROUP if with_balances else _ACTIVE_LEDGER_ROWS_IN_GROUP
+        rows = db.execute(stmt, {"user_id": user_id, "group_id": group_id}).all()
+    else:
+        stmt = _ACTIVE_LEDGER_BALANCE_ROWS if with_balances else _ACTIVE_LEDGER_ROWS
+        rows = db.execute(stmt, {"user_id": user_id}).all()
+    coa = ensure_groups(coa, db, {row[2] for row in rows})
+    if not with_balances:
+        return _ledger_dicts(rows, coa)
+
+    ledgers = _ledger_dicts([row[:-2] for row in rows], coa)
+    for ledger, row in zip(ledgers, rows):
+        ledger["balance"] = _balance_dict(row[-2], row[-1])
+    return ledgers
+
+
+def ledger_detail(db: Session, coa: ChartOfAccounts, user_id: int, ledger_id: int) -> Optional[dict]:
+    """A single ledger (LedgerWithGroup shape), or None if it does not belong to the user."""
+    row = db.execute(_LEDGER_ROW, {"user_id": user_id, "ledger_id": ledger_id}).first()
+    if row is None:
+        return None
+    coa = ensure_groups(coa, db, [row[2]])
+    return _ledger_dicts([row], coa)[0]
+
+
+_TRANSACTION_ROWS = (
+    select(
+        Transaction.transaction_date,
+        Transaction.reference,
+        Transaction.transaction_type,
+        Transaction.total_amount,
+        Transaction.id,
+        Transaction.user_id,
+        Transaction.created_at,
+        Transaction.updated_at,
+    )
+    .where(Transaction.user_id == bindparam("user_id"))
+    .order_by(Transaction.transaction_date.desc(), Transaction.created_at.desc())
+    .limit(bindparam("limit"))
+    .offset(bindparam("offset"))
+)
+_TRANSACTION_ROWS_OF_TYPE = _TRANSACTION_ROWS.where(Transaction.transaction_type == bindparam("transaction_type"))
+_TRANSACTION_KEYS = (
+    "transaction_date",
+    "reference",
+    "transaction_type",
+    "total_amount",
+    "id",
+    "user_id",
+    "created_at",
+    "updated_at",
+)
+
+
+def transaction_list(
+    db: Session,
+    user_id: int,
+    transaction_type: Optional[TransactionType] = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> List[dict]:
+    """A page of transactions for a user (TransactionResponse shape)."""
+    params = {"user_id": user_id, "limit": limit, "offset": offset}
+    if transaction_type:
+        rows = db.execute(_TRANSACTION_ROWS_OF_TYPE, {**params, "transaction_type": transaction_type})
+    else:
+        rows = db.execute(_TRANSACTION_ROWS, params)
+    return [dict(zip(_TRANSACTION_KEYS, row)) for row in rows]
+
+
+def _debit_credit_sums():
+    """Debit and credit totals in cents (NULL when there are no items)."""
+    return (
+        cents_expression(func.sum(case((TransactionItem.entry_type == EntryType.DEBIT, TransactionItem.amount), else_=0))),
+        cents_expression(func.sum(case((TransactionItem.entry_type == EntryType.CREDIT, TransactionItem.amount), else_=0))),
+    )
+
+
+_ACTIVE_LEDGERS = select(Ledger.id, Ledger.name, Ledger.ledger_group_id).where(
+    Ledger.user_id == bindparam("user_id"), Ledger.is_active == True
+)
+_USER_ITEMS = (
+    select(TransactionItem.ledger_id, *_debit_credit_sums())
+    .join(Transaction, Transaction.id == TransactionItem.transaction_id)
+    .where(Transaction.user_id == bindparam("user_id"))
+    .group_by(TransactionItem.ledger_id)
+)
+_LEDGER_SUMS_BEFORE = _USER_ITEMS.where(Transaction.transaction_date < bindparam("start_date"))
+_LEDGER_SUMS_BETWEEN = _USER_ITEMS.where(
+    and_(
+        Transaction.transaction_date >= bindparam("start_date"),
+        Transaction.transaction_date <= bindparam("end_date"),
+    )
+)
+
+_ACTIVE_LEDGER = _ACTIVE_LEDGERS.where(Ledger.id == bindparam("ledger_id"))
+_LEDGER_OPENING = (
+    select(*_debit_credit_sums())
+    .select_from(TransactionItem)
+    .join(Transaction, Transaction.id == TransactionItem.transaction_id)
+    .where(
+        Transaction.user_id == bindparam("user_id"),
+        TransactionItem.ledger_id == bindparam("ledger_id"),
+        Transaction.transaction_date < bindparam("start_date"),
+    )
+)
+_LEDGER_ENTRIES = (
+    select(
+        Transaction.id,
+        Transaction.transaction_date,
+        Transaction.reference,
+        Transaction.transaction_type,
+        TransactionItem.entry_type,
+        TransactionItem.amount,
+    )
+    .join(TransactionItem, TransactionItem.transaction_id == Transaction.id)
+    .where(
+        Transaction.user_id == bindparam("user_id"),
+        TransactionItem.ledger_id == bindparam("ledger_id"),
+        and_(
+            Transaction.transaction_date >= bindparam("start_date"),
+            Transaction.transaction_date <= bindparam("end_date"),
+        ),
+    )
+    .order_by(Transaction.transaction_date, Transaction.id)
+)
+
+
+def trial_balance(
+    db: Session,
+    coa: ChartOfAccounts,
+    user_id: int,
+    start_date: date,
+    end_date: date,
+    ledger_version: Optional[int] = None,
+) -> dict:
+    """
+    Trial balance for a date range (TrialBalanceResponse shape).
+    Debit and credit totals per ledger are aggregated in SQL, or by the ledger cache
+    when it is enabled (ledger_version saves looking up the user's current version);
+    only ledgers with activity before or during the period are included. An archived
+    year the range starts or ends inside is read back from its file.
+    """
+    # Get all active ledgers for the user (to ensure all ledgers appear in report)
+    # Group metadata comes from the chart-of-accounts registry; order by parent group
+    # sort_order, then by name for consistency
+    all_ledgers = db.execute(_ACTIVE_LEDGERS, {"user_id": user_id}).all()
+    coa = ensure_groups(coa, db, {ledger_group_id for _, _, ledger_group_id in all_ledgers})
+    all_ledgers.sort(key=lambda ledger: coa.report_sort_key(ledger[2], ledger[1]))
+
+    if settings.LEDGER_CACHE_ENABLED:
+        opening_results, period_results = ledger_cache.get(db, user_id, ledger_version).range_sums(start_date, end_date)
+    else:
+        # Query 1: opening balances (all transactions before start_date)
+        opening_results = {
+            ledger_id: (debit, credit)
+            for ledger_id, debit, credit in db.execute(
+                _LEDGER_SUMS_BEFORE, {"user_id": user_id, "start_date": start_date}
+            )
+        }
+
+        # Query 2: period transactions (between start_date and end_date)
+        period_results = {
+            ledger_id: (debit, credit)
+            for ledger_id, debit, credit in db.execute(
+                _LEDGER_SUMS_BETWEEN, {"user_id": user_id, "start_date": start_date, "end_date": end_date}
+            )
+        }
+
+    split = split_archived_years(db, user_id, period_last_days(start_date, end_date))
+    if split:
+        for results, corrections in zip(
+            (opening_results, period_results), archived_range_corrections(split, start_date, end_date)
+        ):
+            for ledger_id, (debit, credit) in corrections.items():
+                summed_debit, summed_credit = results.get(ledger_id, (0, 0))
+                results[ledger_id] = (summed_debit + debit, summed_credit + credit)
+
+    # All amounts below are integer cents (core.money), converted when the item is built
+    no_activity = (0, 0)
+    items = []
+    total_opening_debit = 0
+    total_opening_credit = 0
+    total_period_debit = 0
+    total_period_credit = 0
+    total_closing_debit = 0
+    total_closing_credit = 0
+
+    for ledger_id, ledger_name, ledger_group_id in all_ledgers:
+        opening_debit_raw, opening_credit_raw = opening_results.get(ledger_id, no_activity)
+        period_debit, period_credit = period_results.get(ledger_id, no_activity)
+
+        # Only include ledgers that have transactions (opening or period)
+        if not (opening_debit_raw > 0 or opening_credit_raw > 0 or period_debit > 0 or period_credit > 0):
+            continue
+
+        ledger_group = coa.get_group(ledger_group_id)
+
+        # Debit-normal (assets/expenses): balance = debit - credit, positive shown as debit.
+        # Credit-normal (liabilities/capital/incomes): balance = credit - debit, positive shown as credit.
+        if ledger_group.is_debit_normal:
+            opening_balance = opening_debit_raw - opening_credit_raw
+            closing_balance = opening_balance + period_debit - period_credit
+            opening_debit, opening_credit = (opening_balance, 0) if opening_balance >= 0 else (0, -opening_balance)
+            closing_debit, closing_credit = (closing_balance, 0) if closing_balance >= 0 else (0, -closing_balance)
+        else:
+            opening_balance = opening_credit_raw - opening_debit_raw
+            closing_balance = opening_balance + period_credit - period_debit
+            opening_debit, opening_credit = (0, opening_balance) if opening_balance >= 0 else (-opening_balance, 0)
+            closing_debit, closing_credit = (0, closing_balance) if closing_balance >= 0 else (-closing_balance, 0)
+
+        items.append(
+            {
+                "ledger_id": ledger_id,
+                "ledger_name": ledger_name,
+                "ledger_group_name": ledger_group.name,
+                "parent_group_name": ledger_group.parent_ledger_group.name,
+                "opening_debit": to_decimal(opening_debit),
+                "opening_credit": to_decimal(opening_credit),
+                "period_debit": to_decimal(period_debit),
+                "period_credit": to_decimal(period_credit),
+                "closing_debit": to_decimal(closing_debit),
+                "closing_credit": to_decimal(closing_credit),
+            }
+        )
+
+        total_opening_debit += opening_debit
+        total_opening_credit += opening_credit
+        total_period_debit += period_debit
+        total_period_credit += period_credit
+        total_closing_debit += closing_debit
+        total_closing_credit += closing_credit
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "items": items,
+        "total_opening_debit": to_decimal(total_opening_debit),
+        "total_opening_credit": to_decimal(total_opening_credit),
+        "total_period_debit": to_decimal(total_period_debit),
+        "total_period_credit": to_decimal(total_period_credit),
+        "total_closing_debit": to_decimal(total_closing_debit),
+        "total_closing_credit": to_decimal(total_closing_credit),
+        # Trial balance should balance: total closing debits = total closing credits
+        "is_balanced": total_closing_debit == total_closing_credit,
+    }
+
+
+# Trial balance columns, in cents
+_TRIAL_BALANCE_COLUMNS = (
+    "opening_debit",
+    "opening_credit",
+    "period_debit",
+    "period_credit",
+    "closing_debit",
+    "closing_credit",
+)
+# The debit and credit sums the trial balance columns are computed from
+_SUM_COLUMNS = ("opening_debit", "opening_credit", "period_debit", "period_credit")
+# GROUPING(parent_group_id, ledger_group_id, ledger_id) of each tree level
+_GRAND_TOTAL, _PARENT_GROUP_LEVEL, _LEDGER_GROUP_LEVEL, _LEDGER_LEVEL = 7, 3, 1, 0
+
+
+def _trial_balance_lines(corrected: bool):
+    """
+    One row per active ledger with activity up to end_date: its group, parent group and
+    trial balance columns in cents. A ledger's balance is shown on the debit side when
+    debit - credit is positive and on the credit side otherwise, whatever its normal
+    side, so the split can be done here rather than per ledger in Python. If corrected,
+    the per-ledger cents in the :corrections_* arrays (archived_range_corrections) are
+    added to the sums.
+    """
+    before = Transaction.transaction_date < bindparam("start_date")
+    is_debit = TransactionItem.entry_type == EntryType.DEBIT
+    is_credit = TransactionItem.entry_type == EntryType.CREDIT
+    opening_debit = cents_expression(func.sum(case((and_(before, is_debit), TransactionItem.amount), else_=0)))
+    opening_credit = cents_expression(func.sum(case((and_(before, is_credit), TransactionItem.amount), else_=0)))
+    period_debit = cents_expression(func.sum(case((and_(~before, is_debit), TransactionItem.amount), else_=0)))
+    period_credit = cents_expression(func.sum(case((and_(~before, is_credit), TransactionItem.amount), else_=0)))
+    sums = (
+        select(
+            TransactionItem.ledger_id,
+            opening_debit.label("opening_debit"),
+            opening_credit.label("opening_credit"),
+            period_debit.label("period_debit"),
+            period_credit.label("period_credit"),
+        )
+        .join(Transaction, Transaction.id == TransactionItem.transaction_id)
+        .where(
+            Transaction.user_id == bindparam("user_id"),
+            Transaction.transaction_date <= bindparam("end_date"),
+        )
+        .group_by(TransactionItem.ledger_id)
+    )
+    if corrected:
+        corrections = func.unnest(
+            bindparam("corrections_ledger_ids", type_=ARRAY(BigInteger)),
+            *(bindparam(f"corrections_{column}", type_=ARRAY(BigInteger)) for column in _SUM_COLUMNS),
+        ).table_valued("ledger_id", *_SUM_COLUMNS).render_derived()
+        both = union_all(sums, select(corrections)).subquery()
+        sums = select(
+            both.c.ledger_id, *(cast(func.sum(both.c[column]), BigInteger).label(column) for column in _SUM_COLUMNS)
+        ).group_by(both.c.ledger_id)
+    sums = sums.subquery("trial_balance_sums")
+    opening_net = sums.c.opening_debit - sums.c.opening_credit
+    closing_net = opening_net + sums.c.period_debit - sums.c.period_credit
+    return (
+        select(
+            sums.c.ledger_id,
+            Ledger.name.label("ledger_name"),
+            Ledger.ledger_group_id,
+            LedgerGroup.parent_ledger_group_id,
+            case((opening_net > 0, opening_net), else_=0).label("opening_debit"),
+            case((opening_net < 0, -opening_net), else_=0).label("opening_credit"),
+            sums.c.period_debit,
+            sums.c.period_credit,
+            case((closing_net > 0, closing_net), else_=0).label("closing_debit"),
+            case((closing_net < 0, -closing_net), else_=0).label("closing_credit"),
+        )
+        .join(Ledger, Ledger.id == sums.c.ledger_id)
+        .join(LedgerGroup, LedgerGroup.id == Ledger.ledger_group_id)
+        .where(
+            Ledger.user_id == bindparam("user_id"),
+            Ledger.is_active == True,
+            # Same filter as the flat trial balance: some opening or period activity
+            or_(sums.c.opening_debit > 0, sums.c.opening_credit > 0, sums.c.period_debit > 0, sums.c.period_credit > 0),
+        )
+        .cte("trial_balance_lines")
+    )
+
+
+def _trial_balance_tree_statement(corrected: bool):
+    """
+    Grand total, parent group, ledger group and ledger subtotals in one statement, as
+    (grouping, parent_ledger_group_id, ledger_group_id, ledger_id, ledger_name, *columns)
+    rows. Ledger group rows are only returned for the parent groups in :parent_group_ids
+    and ledger rows only for the groups in :ledger_group_ids, so collapsed levels are
+    never sent. Every level is computed in one pass with ROLLUP.
+    """
+    lines = _trial_balance_lines(corrected)
+    totals = [
+        cast(func.coalesce(func.sum(lines.c[column]), 0), BigInteger).label(column) for column in _TRIAL_BALANCE_COLUMNS
+    ]
+    expanded_parents = lines.c.parent_ledger_group_id.in_(bindparam("parent_group_ids", expanding=True))
+    expanded_groups = lines.c.ledger_group_id.in_(bindparam("ledger_group_ids", expanding=True))
+    levels = (lines.c.parent_ledger_group_id, lines.c.ledger_group_id, lines.c.ledger_id)
+    return (
+        select(func.grouping(*levels), *levels, func.max(lines.c.ledger_name), *totals)
+        .group_by(func.rollup(*levels))
+        .having(
+            or_(
+                func.grouping(lines.c.ledger_group_id) == 1,
+                and_(func.grouping(lines.c.ledger_id) == 1, expanded_parents),
+                and_(func.grouping(lines.c.ledger_id) == 0, expanded_groups),
+            )
+        )
+    )
+
+
+_TRIAL_BALANCE_TREE = _trial_balance_tree_statement(corrected=False)
+# For ranges that split an archived year
+_TRIAL_BALANCE_TREE_CORRECTED = _trial_balance_tree_statement(corrected=True)
+
+
+def trial_balance_tree(
+    db: Session,
+    coa: ChartOfAccounts,
+    user_id: int,
+    start_date: date,
+    end_date: date,
+    parent_group_ids: Sequence[int] = (),
+    ledger_group_ids: Sequence[int] = (),
+) -> dict:
+    """
+    Hierarchical trial balance (TrialBalanceTreeResponse shape): parent group nodes with
+    subtotals, expanded to their ledger groups for parent_group_ids and to ledgers for
+    ledger_group_ids. Collapsed nodes have children None. Expanding a ledger group also
+    expands its parent group, so the node is reachable from the root. An archived year
+    the range starts or ends inside is read back from its file.
+    """
+    coa = ensure_groups(coa, db, ledger_group_ids)
+    ledger_group_ids = [group_id for group_id in ledger_group_ids if group_id in coa.groups]
+    parent_group_ids = {*parent_group_ids, *(coa.get_group(group_id).parent_ledger_group_id for group_id in ledger_group_ids)}
+
+    params = {
+        "user_id": user_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "parent_group_ids": sorted(parent_group_ids),
+        "ledger_group_ids": sorted(set(ledger_group_ids)),
+    }
+    split = split_archived_years(db, user_id, period_last_days(start_date, end_date))
+    if split:
+        before, between = archived_range_corrections(split, start_date, end_date)
+        ledger_ids = sorted({*before, *between})
+        params["corrections_ledger_ids"] = ledger_ids
+        for column, corrections in (("opening", before), ("period", between)):
+            params[f"corrections_{column}_debit"] = [corrections.get(ledger_id, (0, 0))[0] for ledger_id in ledger_ids]
+            params[f"corrections_{column}_credit"] = [corrections.get(ledger_id, (0, 0))[1] for ledger_id in ledger_ids]
+        rows = db.execute(_TRIAL_BALANCE_TREE_CORRECTED, params).all()
+    else:
+        rows = db.execute(_TRIAL_BALANCE_TREE, params).all()
+    if any(row[1] is not None and row[1] not in coa.parent_groups for row in rows):
+        # Created by another worker since our last load
+        coa = refresh_chart_of_accounts(db)
+    coa = ensure_groups(coa, db, {row[2] for row in rows if row[2] is not None})
+
+    def node(level: str, node_id: int, name: str, amounts, expanded: bool) -> dict:
+        entry = {"key": f"{level}:{node_id}", "level": level, "id": node_id, "name": name}
+        entry.update(zip(_TRIAL_BALANCE_COLUMNS, map(to_decimal, amounts)))
+        entry["children"] = [] if expanded else None
+        return entry
+
+    totals = (0,) * len(_TRIAL_BALANCE_COLUMNS)
+    parents: Dict[int, dict] = {}
+    groups: Dict[int, dict] = {}
+    ledgers = []
+    for grouping, parent_id, group_id, ledger_id, ledger_name, *amounts in rows:
+        if grouping == _GRAND_TOTAL:
+            totals = amounts
+        elif grouping == _PARENT_GROUP_LEVEL:
+            name = coa.get_parent_group(parent_id).name
+            parents[parent_id] = node("parent_group", parent_id, name, amounts, parent_id in parent_group_ids)
+        elif grouping == _LEDGER_GROUP_LEVEL:
+            groups[group_id] = node("ledger_group", group_id, coa.get_group(group_id).name, amounts, group_id in ledger_group_ids)
+        else:
+            ledgers.append((coa.report_sort_key(group_id, ledger_name), group_id, node("ledger", ledger_id, ledger_name, amounts, False)))
+
+    # Rows arrive in no particular order; attach children in report order
+    for _, group_id, entry in sorted(ledgers, key=lambda ledger: ledger[0]):
+        groups[group_id]["children"].append(entry)
+    for group_id in sorted(groups, key=lambda group_id: coa.report_sort_key(group_id, "")):
+        parents[coa.get_group(group_id).parent_ledger_group_id]["children"].append(groups[group_id])
+
+    totals = dict(zip(_TRIAL_BALANCE_COLUMNS, totals))
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "nodes": [parents[parent_id] for parent_id in sorted(parents, key=coa.parent_sort_key)],
+        **{f"total_{column}": to_decimal(amount) for column, amount in totals.items()},
+        "is_balanced": totals["closing_debit"] == totals["closing_credit"],
+    }
+
+
+def ledger_report(
+    db: Session,
+    coa: ChartOfAccounts,
+    user_id: int,
+    ledger_id: int,
+    start_date: date,
+    end_date: date,
+) -> Optional[dict]:
+    """
+    Ledger report (LedgerReportResponse shape): every entry on the ledger within the
+    date range with a running balance. Returns None if the ledger is not an active
+    ledger of the user.
+    """
+    params = {"user_id": user_id, "ledger_id": ledger_id, "start_date": start_date, "end_date": end_date}
+    ledger = db.execute(_ACTIVE_LEDGER, params).first()
+    if not ledger:
+        return None
+
+    # Opening balance (all transactions before start_date)
+    opening_debit, opening_credit = db.execute(_LEDGER_OPENING, params).one()
+    opening_balance = to_decimal((opening_debit or 0) - (opening_credit or 0))
+
+    rows = db.execute(_LEDGER_ENTRIES, params).all()
+
+    # Archived years in the range are read back from their files in place of their summary journals
+    archived = archived_years_between(db, user_id, start_date.year, end_date.year)
+    if archived:
+        summaries = {year.summary_transaction_id for year in archived}
+        rows = [row for row in rows if row[0] not in summaries]
+        for year in archived:
+            for row in archived_ledger_entries(year.file_name, ledger_id, end_date):
+                if row[1] >= start_date:
+                    rows.append(row)
+                elif row[4] == EntryType.DEBIT:
+                    opening_balance += row[5]
+                else:
+                    opening_balance -= row[5]
+        rows.sort(key=lambda row: (row[1], row[0]))
+
+    # Build entries with running balance. Every row's amount and balance is output, so
+    # this loop stays in Decimal: converting each from cents would cost more than it saves
+    entries = []
+    running_balance = opening_balance
+    total_debit = ZERO
+    total_credit = ZERO
+
+    for transaction_id, transaction_date, reference, transaction_type, entry_type, amount in rows:
+        if entry_type == EntryType.DEBIT:
+            running_balance += amount
+            total_debit += amount
+        else:
+            running_balance -= amount
+            total_credit += amount
+
+        entries.append(
+            {
+                "transaction_id": transaction_id,
+                "transaction_date": transaction_date,
+                "reference": reference,
+                "transaction_type": transaction_type.value,
+                "entry_type": entry_type.value,
+                "amount": amount,
+                "running_balance": running_balance,
+            }
+        )
+
+    coa = ensure_groups(coa, db, [ledger.ledger_group_id])
+    ledger_group = coa.get_group(ledger.ledger_group_id)
+
+    return {
+        "ledger_id": ledger.id,
+        "ledger_name": ledger.name,
+        "ledger_group_name": ledger_group.name,
+        "parent_group_name": ledger_group.parent_ledger_group.name,
+        "start_date": start_date,
+        "end_date": end_date,
+        "opening_balance": opening_balance,
+        "closing_balance": running_balance,
+        "entries": entries,
+        "total_debit": total_debit,
+        "total_credit": total_credit,
+    }
+
+
+_ACTIVE_LEDGERS_BY_ID = _ACTIVE_LEDGERS.where(Ledger.id.in_(bindparam("ledger_ids", expanding=True)))
+
+
+def _history_statement(interval: Interval, group_ids: Sequence[int], ledger_ids: Sequence[int]):
+    """
+    Cumulative debit - credit in cents per ledger group and per ledger at the end of every
+    bucket with activity, as (ledger_group_id, ledger_id, bucket, balance) rows: a group row has
+    ledger_id NULL and a ledger row has ledger_group_id NULL.
+
+    Activity before start_date is folded into the first bucket, so the running
+    SUM() OVER (... ORDER BY bucket) starts from the opening balance.
+    """
+    bucket = case(
+        (Transaction.transaction_date < bindparam("start_date"), bindparam("start_bucket", type_=Date)),
+        else_=bucket_expression(Transaction.transaction_date, interval),
+    )
+    signed_amount = case(
+        (TransactionItem.entry_type == EntryType.DEBIT, TransactionItem.amount), else_=-TransactionItem.amount
+    )
+    items = (
+        select(
+            Ledger.ledger_group_id,
+            TransactionItem.ledger_id,
+            bucket.label("bucket"),
+            signed_amount.label("amount"),
+        )
+        .select_from(TransactionItem)
+        .join(Transaction, Transaction.id == TransactionItem.transaction_id)
+        .join(Ledger, Ledger.id == TransactionItem.ledger_id)
+        .where(
+            Transaction.user_id == bindparam("user_id"),
+            Transaction.transaction_date <= bindparam("end_date"),
+            Ledger.user_id == bindparam("user_id"),
+            Ledger.is_active == True,
+            or_(Ledger.ledger_group_id.in_(group_ids), TransactionItem.ledger_id.in_(ledger_ids)),
+        )
+        .cte("history_items")
+    )
+
+    branches = []
+    if group_ids:
+        branches.append(
+            select(
+                items.c.ledger_group_id,
+                null().label("ledger_id"),
+                items.c.bucket,
+                cents_expression(
+                    func.sum(func.sum(items.c.amount)).over(partition_by=items.c.ledger_group_id, order_by=items.c.bucket)
+                ),
+            )
+            .where(items.c.ledger_group_id.in_(group_ids))
+            .group_by(items.c.ledger_group_id, items.c.bucket)
+        )
+    if ledger_ids:
+        branches.append(
+            select(
+                null().label("ledger_group_id"),
+                items.c.ledger_id,
+                items.c.bucket,
+                cents_expression(
+                    func.sum(func.sum(items.c.amount)).over(partition_by=items.c.ledger_id, order_by=items.c.bucket)
+                ),
+            )
+            .where(items.c.ledger_id.in_(ledger_ids))
+            .group_by(items.c.ledger_id, items.c.bucket)
+        )
+    return union_all(*branches) if len(branches) > 1 else branches[0]
+
+
+def _forward_fill(changes: Dict[date, int], buckets: List[date]) -> List[int]:
+    """Balance at every bucket, carrying the last known balance through quiet buckets."""
+    balance = 0
+    filled = []
+    for bucket in buckets:
+        balance = changes.get(bucket, balance)
+        filled.append(balance)
+    return filled
+
+
+def _history_balances(
+    db: Session,
+    user_id: int,
+    start_date: date,
+    end_date: date,
+    interval: Interval,
+    buckets: List[date],
+    group_ids: Sequence[int],
+    ledger_ids: Sequence[int],
+):
+    """Debit - credit in cents at every bucket per group and per ledger, from one windowed query."""
+    group_changes: Dict[int, Dict[date, int]] = {group_id: {} for group_id in group_ids}
+    ledger_changes: Dict[int, Dict[date, int]] = {ledger_id: {} for ledger_id in ledger_ids}
+    if group_ids or ledger_ids:
+        stmt = _history_statement(interval, group_ids, ledger_ids)
+        params = {
+            "user_id": user_id,
+            "start_date": start_date,
+            "end_date": end_date,
+            "start_bucket": buckets[0],
+        }
+        for ledger_group_id, ledger_id, bucket, balance in db.execute(stmt, params):
+            if ledger_id is None:
+                group_changes[ledger_group_id][bucket] = balance
+            else:
+                ledger_changes[ledger_id][bucket] = balance
+
+    return (
+        {group_id: _forward_fill(changes, buckets) for group_id, changes in group_changes.items()},
+        {ledger_id: _forward_fill(changes, buckets) for ledger_id, changes in ledger_changes.items()},
+    )
+
+
+def _cached_history_balances(
+    db: Session,
+    user_id: int,
+    ledger_version: Optional[int],
+    point_dates: List[date],
+    group_ids: Sequence[int],
+    ledger_ids: Sequence[int],
+):
+    """Same as _history_balances, from the ledger cache."""
+    import numpy as np
+
+    cache = ledger_cache.get(db, user_id, ledger_version)
+    group_ledgers: Dict[int, List[int]] = {group_id: [] for group_id in group_ids}
+    if group_ids:
+        for ledger_id, _, ledger_group_id in db.execute(_ACTIVE_LEDGERS, {"user_id": user_id}):
+            if ledger_group_id in group_ledgers:
+                group_ledgers[ledger_group_id].append(ledger_id)
+
+    all_ledgers = list({*ledger_ids, *(ledger_id for ids in group_ledgers.values() for ledger_id in ids)})
+    cents = cache.balances_at(all_ledgers, point_dates)
+    zeros = np.zeros(len(point_dates), dtype=np.int64)
+    return (
+        {
+            group_id: sum((cents[ledger_id] for ledger_id in members), zeros).tolist()
+            for group_id, members in group_ledgers.items()
+        },
+        {ledger_id: cents[ledger_id].tolist() for ledger_id in ledger_ids},
+    )
+
+
+def balance_history(
+    db: Session,
+    coa: ChartOfAccounts,
+    user_id: int,
+    start_date: date,
+    end_date: date,
+    interval: Interval,
+    ledger_ids: Sequence[int] = (),
+    categories: Sequence[LedgerGroupCategory] = (),
+    net_worth: bool = False,
+    ledger_version: Optional[int] = None,
+) -> Optional[dict]:
+    """
+    End-of-bucket balances (BalanceHistoryResponse shape) for the given ledgers, for
+    the ledgers in each category, and for net worth (assets minus liabilities).
+    Ledger and category balances are shown on their normal side, so a loan's balance
+    is positive. Returns None if any ledger is not an active ledger of the user. An
+    archived year a bucket ends inside is read back from its file.
+    """
+    ledger_ids = list(dict.fromkeys(ledger_ids))
+    categories = list(dict.fromkeys(categories))
+    ledgers = {}
+    if ledger_ids:
+        ledgers = {
+            row.id: row for row in db.execute(_ACTIVE_LEDGERS_BY_ID, {"user_id": user_id, "ledger_ids": ledger_ids})
+        }
+        if len(ledgers) != len(ledger_ids):
+            return None
+        coa = ensure_groups(coa, db, {row.ledger_group_id for row in ledgers.values()})
+
+    category_groups = {
+        category: [group.id for group in coa.groups.values() if group.category == category] for category in categories
+    }
+    net_worth_groups = (
+        [group.id for group in coa.groups.values() if group.parent_ledger_group.is_balance_sheet] if net_worth else []
+    )
+    group_ids = sorted({group_id for ids in category_groups.values() for group_id in ids} | set(net_worth_groups))
+
+    buckets = bucket_starts(start_date, end_date, interval)
+    # Each point is dated at the end of its bucket (or end_date for the last, partial one)
+    point_dates = [min(next_bucket_start(bucket, interval) - timedelta(days=1), end_date) for bucket in buckets]
+    if settings.LEDGER_CACHE_ENABLED:
+        group_balances, ledger_balances = _cached_history_balances(
+            db, user_id, ledger_version, point_dates, group_ids, ledger_ids
+        )
+    else:
+        group_balances, ledger_balances = _history_balances(
+            db, user_id, start_date, end_date, interval, buckets, group_ids, ledger_ids
+        )
+    split = split_archived_years(db, user_id, point_dates)
+    corrections = archived_balance_corrections(split, point_dates) if split else {}
+    if corrections:
+        ledger_groups = {
+            ledger_id: group_id for ledger_id, _, group_id in db.execute(_ACTIVE_LEDGERS, {"user_id": user_id})
+        }
+        for ledger_id, amounts in corrections.items():
+            for balances in (ledger_balances.get(ledger_id), group_balances.get(ledger_groups.get(ledger_id))):
+                if balances is not None:
+                    balances[:] = [balance + amount for balance, amount in zip(balances, amounts)]
+
+    def normal_sign(group_id: int) -> int:
+        return 1 if coa.get_group(group_id).is_debit_normal else -1
+
+    series = []
+    for ledger_id in ledger_ids:
+        ledger = ledgers[ledger_id]
+        sign = normal_sign(ledger.ledger_group_id)
+        series.append(
+            {
+                "kind": "ledger",
+                "key": f"ledger:{ledger_id}",
+                "name": ledger.name,
+                "ledger_id": ledger_id,
+                "category": None,
+                "balances": [sign * balance for balance in ledger_balances[ledger_id]],
+            }
+        )
+    for category in categories:
+        totals = [0] * len(buckets)
+        for group_id in category_groups[category]:
+            sign = normal_sign(group_id)
+            totals = [total + sign * balance for total, balance in zip(totals, group_balances[group_id])]
+        series.append(
+            {
+                "kind": "category",
+                "key": f"category:{category.value}",
+                "name": category.value.replace("_", " ").capitalize(),
+                "ledger_id": None,
+                "category": category,
+                "balances": totals,
+            }
+        )
+    if net_worth:
+        totals = [0] * len(buckets)
+        for group_id in net_worth_groups:
+            # debit - credit is already assets positive, liabilities negative
+            totals = [total + balance for total, balance in zip(totals, group_balances[group_id])]
+        series.append(
+            {"kind": "net_worth", "key": "net_worth", "name": "Net worth", "ledger_id": None, "category": None, "balances": totals}
+        )
+
+    for entry in series:
+        entry["points"] = [
+            {"date": point_date, "balance": to_decimal(balance)}
+            for point_date, balance in zip(point_dates, entry.pop("balances"))
+        ]
+
+    return {"start_date": start_date, "end_date": end_date, "interval": interval, "series": series}
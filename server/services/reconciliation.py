@@ -0,0 +1,291 @@
+"""
+Bank statement reconciliation.
+
+Statement lines (models.reconciliation) are matched to transaction items on the
+statement's bank/cash ledger. A line can only match an item with the same signed
+amount (money in is a debit to the ledger) dated within a window of the line date,
+so candidates are indexed by amount in cents, each bucket sorted by date: finding
+a line's candidates is a dict lookup and a bisect, and only the few nearest items
+in the window are scored (plus any item sharing a reference token with the line,
+found through a token lookup, when the amount is common). Scores favour shared
+reference tokens (receipt numbers, cheque numbers, invoice numbers) and then
+closeness in date. All (line, item) pairs are sorted by score and assigned
+greedily, so the best pairs win and no line or item is used twice. A statement of n lines against m items costs
+O((n + m) log m) instead of the O(n * m) of comparing every pair.
+
+An item is reconciled when a statement line points at it (matched_item_id, which
+is unique). ledger_balances.reconciled_total keeps the net of the reconciled
+items, so the unreconciled balance of a ledger is a single-row lookup.
+"""
+
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, case, select, update
+from sqlalchemy.orm import Session
+
+from core.money import cents_expression, to_decimal
+from models.finance import EntryType, LedgerBalance, Transaction, TransactionItem
+from models.reconciliation import StatementLine
+
+# Candidates scored per line: the nearest items in date with the line's amount
+MAX_CANDIDATES_PER_LINE = 16
+
+# Weight of reference similarity in a score; the rest is closeness in date
+REFERENCE_WEIGHT = 0.7
+
+# Upper-cased runs of at least three letters/digits: receipt numbers, cheque numbers, payee names
+_TOKEN = re.compile(r"[A-Z0-9]{3,}")
+
+# Signed amount of an item as seen from the ledger: debits (money in) positive
+_SIGNED_ITEM_CENTS = cents_expression(
+    case((TransactionItem.entry_type == EntryType.DEBIT, TransactionItem.amount), else_=-TransactionItem.amount)
+)
+
+
+def _unreconciled_items(*columns):
+    """Items on one of the user's ledgers that no statement line is matched to."""
+    return (
+        select(*columns)
+        .join(Transaction, Transaction.id == TransactionItem.transaction_id)
+        .outerjoin(StatementLine, StatementLine.matched_item_id == TransactionItem.id)
+        .where(
+            TransactionItem.ledger_id == bindparam("ledger_id"),
+            Transaction.user_id == bindparam("user_id"),
+            StatementLine.id.is_(None),
+        )
+    )
+
+
+# Matching candidates in a date range
+_CANDIDATE_ITEMS = _unreconciled_items(
+    TransactionItem.id, Transaction.transaction_date, _SIGNED_ITEM_CENTS, Transaction.reference
+).where(
+    Transaction.transaction_date >= bindparam("start_date"),
+    Transaction.transaction_date <= bindparam("end_date"),
+)
+
+_UNRECONCILED_PAGE = (
+    _unreconciled_items(
+        TransactionItem.id,
+        TransactionItem.transaction_id,
+        Transaction.transaction_date,
+        Transaction.reference,
+        _SIGNED_ITEM_CENTS,
+    )
+    .order_by(Transaction.transaction_date, TransactionItem.id)
+    .limit(bindparam("limit"))
+    .offset(bindparam("offset"))
+)
+
+# One of the user's items with the id of the line it is matched to, if any
+_ITEM_FOR_MATCHING = (
+    select(TransactionItem.ledger_id, _SIGNED_ITEM_CENTS, StatementLine.id)
+    .join(Transaction, Transaction.id == TransactionItem.transaction_id)
+    .outerjoin(StatementLine, StatementLine.matched_item_id == TransactionItem.id)
+    .where(TransactionItem.id == bindparam("item_id"), Transaction.user_id == bindparam("user_id"))
+)
+
+_UNMATCHED_LINES = select(
+    StatementLine.id,
+    StatementLine.line_date,
+    cents_expression(StatementLine.amount),
+    StatementLine.reference,
+    StatementLine.description,
+).where(StatementLine.statement_id == bindparam("statement_id"), StatementLine.matched_item_id.is_(None))
+
+# (line or item id, date ordinal, signed cents, reference tokens)
+Entry = Tuple[int, int, int, FrozenSet[str]]
+
+
+def reference_tokens(*texts: Optional[str]) -> FrozenSet[str]:
+    """Tokens compared between statement lines and transaction references."""
+    return frozenset(token for text in texts if text for token in _TOKEN.findall(text.upper()))
+
+
+class CandidateIndex:
+    """Items bucketed by signed cents, each bucket sorted by date, plus a reference token lookup."""
+
+    def __init__(self, items: Iterable[Entry]):
+        buckets: Dict[int, List[Tuple[int, int, FrozenSet[str]]]] = defaultdict(list)
+        self._by_token: Dict[Tuple[str, int], List[Tuple[int, int, FrozenSet[str]]]] = defaultdict(list)
+        for item_id, day, cents, tokens in items:
+            buckets[cents].append((day, item_id, tokens))
+            for token in tokens:
+                self._by_token[(token, cents)].append((day, item_id, tokens))
+        self._buckets = {}
+        for cents, bucket in buckets.items():
+            bucket.sort(key=lambda entry: entry[:2])
+            self._buckets[cents] = ([entry[0] for entry in bucket], bucket)
+
+    def candidates(
+        self, cents: int, day: int, window_days: int, tokens: FrozenSet[str], limit: int = MAX_CANDIDATES_PER_LINE
+    ):
+        """
+        (gap in days, item) pairs with this amount within window_days of day: the
+        limit nearest, and any item sharing a reference token with the line however
+        many same-amount items are closer.
+        """
+        found = {item[1]: (gap, item) for gap, item in self.nearest(cents, day, window_days, limit)}
+        for token in tokens:
+            for item in self._by_token.get((token, cents), ()):
+                gap = abs(item[0] - day)
+                if gap <= window_days:
+                    found[item[1]] = (gap, item)
+        return found.values()
+
+    def nearest(self, cents: int, day: int, window_days: int, limit: int = MAX_CANDIDATES_PER_LINE):
+        """Up to limit items with this amount within window_days of day, nearest first."""
+        found = self._buckets.get(cents)
+        if found is None:
+            return []
+        days, bucket = found
+        right = bisect_left(days, day)
+        left = right - 1
+        nearest = []
+        while len(nearest) < limit:
+            left_gap = day - days[left] if left >= 0 else None
+            right_gap = days[right] - day if right < len(days) else None
+            if right_gap is not None and (left_gap is None or right_gap <= left_gap):
+                if right_gap > window_days:
+                    break
+                nearest.append((right_gap, bucket[right]))
+                right += 1
+            elif left_gap is not None:
+                if left_gap > window_days:
+                    break
+                nearest.append((left_gap, bucket[left]))
+                left -= 1
+            else:
+                break
+        return nearest
+
+
+def score(line_tokens: FrozenSet[str], item_tokens: FrozenSet[str], gap_days: int, window_days: int) -> float:
+    """
+    Match quality in [0, 1]: the share of the item's reference tokens found on the
+    statement line, then how close the dates are.
+    """
+    similarity = len(item_tokens & line_tokens) / len(item_tokens) if item_tokens else 0.0
+    closeness = 1.0 - gap_days / (window_days + 1)
+    return REFERENCE_WEIGHT * similarity + (1.0 - REFERENCE_WEIGHT) * closeness
+
+
+def match_lines(lines: Sequence[Entry], index: CandidateIndex, window_days: int) -> List[Tuple[int, int, int]]:
+    """Best one-to-one (line_id, item_id, cents) assignment of lines to indexed items."""
+    pairs = []
+    for line_id, day, cents, tokens in lines:
+        for gap, (_, item_id, item_tokens) in index.candidates(cents, day, window_days, tokens):
+            # Ties go to the closer date, then the earlier line and item, so runs are repeatable
+            pairs.append((-score(tokens, item_tokens, gap, window_days), gap, line_id, item_id, cents))
+    pairs.sort()
+
+    used_lines = set()
+    used_items = set()
+    matches = []
+    for _, _, line_id, item_id, cents in pairs:
+        if line_id in used_lines or item_id in used_items:
+            continue
+        used_lines.add(line_id)
+        used_items.add(item_id)
+        matches.append((line_id, item_id, cents))
+    return matches
+
+
+def apply_reconciled_deltas(db: Session, deltas: Dict[int, Decimal]) -> None:
+    """Add net reconciled amount changes to ledger_balances.reconciled_total."""
+    rows = [
+        {"b_ledger_id": ledger_id, "b_delta": delta} for ledger_id, delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return
+    balances = LedgerBalance.__table__
+    db.execute(
+        update(balances)
+        .where(balances.c.ledger_id == bindparam("b_ledger_id"))
+        .values(reconciled_total=balances.c.reconciled_total + bindparam("b_delta")),
+        rows,
+    )
+
+
+def auto_match(db: Session, user_id: int, statement_id: int, ledger_id: int, window_days: int) -> int:
+    """Match the statement's unmatched lines to unreconciled items; returns the number matched."""
+    lines = [
+        (line_id, line_date.toordinal(), cents, reference_tokens(reference, description))
+        for line_id, line_date, cents, reference, description in db.execute(
+            _UNMATCHED_LINES, {"statement_id": statement_id}
+        )
+    ]
+    if not lines:
+        return 0
+
+    window = timedelta(days=window_days)
+    first_day = date.fromordinal(min(line[1] for line in lines))
+    last_day = date.fromordinal(max(line[1] for line in lines))
+    index = CandidateIndex(
+        (item_id, transaction_date.toordinal(), cents, reference_tokens(reference))
+        for item_id, transaction_date, cents, reference in db.execute(
+            _CANDIDATE_ITEMS,
+            {
+                "ledger_id": ledger_id,
+                "user_id": user_id,
+                "start_date": first_day - window,
+                "end_date": last_day + window,
+            },
+        )
+    )
+
+    matches = match_lines(lines, index, window_days)
+    if not matches:
+        return 0
+    # Bulk UPDATE by primary key, one executemany
+    db.execute(update(StatementLine), [{"id": line_id, "matched_item_id": item_id} for line_id, item_id, _ in matches])
+    apply_reconciled_deltas(db, {ledger_id: to_decimal(sum(cents for _, _, cents in matches))})
+    return len(matches)
+
+
+def item_for_matching(db: Session, user_id: int, item_id: int):
+    """(ledger_id, signed cents, matched line id or None) of one of the user's items, or None."""
+    return db.execute(_ITEM_FOR_MATCHING, {"item_id": item_id, "user_id": user_id}).first()
+
+
+def unreconciled_items(db: Session, user_id: int, ledger_id: int, limit: int, offset: int) -> List[dict]:
+    """A page of the ledger's unreconciled items, oldest first."""
+    return [
+        {
+            "transaction_item_id": item_id,
+            "transaction_id": transaction_id,
+            "transaction_date": transaction_date,
+            "reference": reference,
+            "amount": to_decimal(cents),
+        }
+        for item_id, transaction_id, transaction_date, reference, cents in db.execute(
+            _UNRECONCILED_PAGE, {"ledger_id": ledger_id, "user_id": user_id, "limit": limit, "offset": offset}
+        )
+    ]
+
+
+def release_transaction_items(db: Session, transaction_id: int, item_ids: Optional[Sequence[int]] = None) -> None:
+    """
+    Unmatch statement lines from a transaction's items (or only item_ids of them) before
+    the items are deleted; the lines go back to unmatched and the ledgers' reconciled
+    totals drop accordingly.
+    """
+    items = select(TransactionItem.id).where(TransactionItem.transaction_id == transaction_id)
+    if item_ids is not None:
+        items = items.where(TransactionItem.id.in_(item_ids))
+    released = db.execute(
+        update(StatementLine)
+        .where(StatementLine.matched_item_id.in_(items))
+        .values(matched_item_id=None)
+        .returning(StatementLine.ledger_id, StatementLine.amount),
+        execution_options={"synchronize_session": False},
+    ).all()
+    deltas: Dict[int, Decimal] = {}
+    for ledger_id, amount in released:
+        deltas[ledger_id] = deltas.get(ledger_id, Decimal("0")) - amount
+    apply_reconciled_deltas(db, deltas)
@@ -0,0 +1,153 @@
+"""
+Report jobs run on the background job queue.
+
+Each job opens its own database session (on the read replica when that is safe),
+computes the same payload as the synchronous endpoint (or a CSV export) and writes
+it to the job's result file.
+"""
+
+import csv
+import heapq
+import io
+import os
+import tempfile
+from datetime import date
+from operator import itemgetter
+from typing import BinaryIO, Dict, Iterator, List, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.database import read_session
+from core.jobs import Job, JobError, JobQueue, JobStore
+from core.responses import dumps
+from models.finance import Ledger, Transaction, TransactionItem
+from services import read_models
+from services.archive import ArchiveError, archived_transaction_rows, archived_years_between
+from services.chart_of_accounts import ChartOfAccounts, get_chart_of_accounts
+
+TRIAL_BALANCE = "trial_balance"
+LEDGER_REPORT = "ledger_report"
+EXPORT = "export"
+
+# Rows fetched per round trip when streaming an export
+_EXPORT_BATCH_SIZE = 5000
+
+report_jobs = JobQueue(
+    JobStore(settings.REPORT_JOB_DIR or os.path.join(tempfile.gettempdir(), "pesa-plan-report-jobs")),
+    max_workers=settings.REPORT_JOB_WORKERS,
+    max_pending=settings.REPORT_JOB_MAX_PENDING,
+    max_pending_per_user=settings.REPORT_JOB_MAX_PENDING_PER_USER,
+    result_ttl_seconds=settings.REPORT_JOB_RESULT_TTL_SECONDS,
+)
+
+
+def _trial_balance(db: Session, coa: ChartOfAccounts, user_id: int, params: Dict, out: BinaryIO) -> Tuple[str, str]:
+    start_date, end_date = date.fromisoformat(params["start_date"]), date.fromisoformat(params["end_date"])
+    out.write(dumps(read_models.trial_balance(db, coa, user_id, start_date, end_date)))
+    return "application/json", f"trial-balance-{start_date}-{end_date}.json"
+
+
+def _ledger_report(db: Session, coa: ChartOfAccounts, user_id: int, params: Dict, out: BinaryIO) -> Tuple[str, str]:
+    start_date, end_date = date.fromisoformat(params["start_date"]), date.fromisoformat(params["end_date"])
+    report = read_models.ledger_report(db, coa, user_id, params["ledger_id"], start_date, end_date)
+    if report is None:
+        # Ledger was deactivated between submission and run
+        raise JobError(f"Ledger {params['ledger_id']} is no longer available")
+    out.write(dumps(report))
+    return "application/json", f"ledger-{params['ledger_id']}-{start_date}-{end_date}.json"
+
+
+def _archived_export_rows(
+    db: Session, user_id: int, start_date: date, end_date: date
+) -> Tuple[List[Iterator[tuple]], Set[int]]:
+    """
+    The export rows of the archived years in the range, one date-ordered iterator per
+    year, and the ids of those years' summary journals, which stand in for them in the
+    database and are left out of the export.
+    """
+    years = archived_years_between(db, user_id, start_date.year, end_date.year)
+    if not years:
+        return [], set()
+    ledger_names = dict(db.execute(select(Ledger.id, Ledger.name).where(Ledger.user_id == user_id)).all())
+    per_year = []
+    for _, file_name, _ in years:
+        rows = []
+        for row in archived_transaction_rows(file_name):
+            ledger_id, entry_type, amount = row[7:10]
+            if ledger_id is not None and start_date <= row[1] <= end_date:
+                # (transaction_id, transaction_date, reference, transaction_type) + item, as queried below
+                rows.append(row[:4] + (ledger_id, ledger_names[ledger_id], entry_type, amount))
+        # Stable, so items stay in transaction and item order within a day
+        rows.sort(key=itemgetter(1, 0))
+        per_year.append(iter(rows))
+    return per_year, {summary_id for _, _, summary_id in years}
+
+
+def _export(db: Session, coa: ChartOfAccounts, user_id: int, params: Dict, out: BinaryIO) -> Tuple[str, str]:
+    """
+    Every transaction item in the date range as CSV, streamed from a server-side cursor.
+    Archived years are read back from their files, entry by entry.
+    """
+    start_date, end_date = date.fromisoformat(params["start_date"]), date.fromisoformat(params["end_date"])
+    archived, summary_ids = _archived_export_rows(db, user_id, start_date, end_date)
+    query = (
+        db.query(
+            Transaction.id,
+            Transaction.transaction_date,
+            Transaction.reference,
+            Transaction.transaction_type,
+            TransactionItem.ledger_id,
+            Ledger.name,
+            TransactionItem.entry_type,
+            TransactionItem.amount,
+        )
+        .join(TransactionItem, TransactionItem.transaction_id == Transaction.id)
+        .join(Ledger, Ledger.id == TransactionItem.ledger_id)
+        .filter(Transaction.user_id == user_id)
+        .filter(Transaction.transaction_date >= start_date, Transaction.transaction_date <= end_date)
+        .order_by(Transaction.transaction_date, Transaction.id, TransactionItem.id)
+        .execution_options(yield_per=_EXPORT_BATCH_SIZE)
+    )
+    if summary_ids:
+        query = query.filter(Transaction.id.notin_(summary_ids))
+    rows = heapq.merge(query, *archived, key=itemgetter(1, 0)) if archived else query
+
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(
+        ["transaction_id", "transaction_date", "reference", "transaction_type", "ledger_id", "ledger_name", "entry_type", "amount"]
+    )
+    for transaction_id, transaction_date, reference, transaction_type, ledger_id, ledger_name, entry_type, amount in rows:
+        writer.writerow(
+            [transaction_id, transaction_date, reference or "", transaction_type.value, ledger_id, ledger_name, entry_type.value, amount]
+        )
+    text.flush()
+    # Leave closing the file to the job queue
+    text.detach()
+    return "text/csv", f"transactions-{start_date}-{end_date}.csv"
+
+
+RUNNERS = {
+    TRIAL_BALANCE: _trial_balance,
+    LEDGER_REPORT: _ledger_report,
+    EXPORT: _export,
+}
+
+
+def submit_report_job(user_id: int, kind: str, params: Dict) -> Job:
+    """Queue a report job. Raises JobQueueFull when the queue is at capacity."""
+    compute = RUNNERS[kind]
+
+    def runner(out: BinaryIO) -> Tuple[str, str]:
+        db = read_session(user_id)
+        try:
+            return compute(db, get_chart_of_accounts(db), user_id, params, out)
+        except ArchiveError as e:
+            # A year in the range was archived or restored after the job was accepted
+            raise JobError(str(e)) from e
+        finally:
+            db.close()
+
+    return report_jobs.submit(user_id, kind, params, runner)
@@ -0,0 +1,405 @@
+"""
+Full export and import of one user's data, for moving between instances and for
+per-user backups.
+
+The archive is gzip-compressed NDJSON, one record per line:
+
+    {"type": "header", "format": "pesa-plan-export", "version": 1, ...}
+    {"type": "spending_type", "id": ..., "name": ..., ...}
+    {"type": "ledger", "id": ..., "ledger_group": ..., "parent_ledger_group": ..., ...}
+    {"type": "transaction", "id": ..., "transaction_date": ..., "items": [...]}
+    {"type": "end", "spending_types": ..., "ledgers": ..., "transactions": ..., "items": ...}
+
+Ledger groups are shared between users, so ledgers refer to them by name (with the
+parent group and category, so a missing group can be created on import). Ids in the
+file are the exporting instance's; the importer maps them to the new rows' ids.
+Transactions are read with a server-side cursor and written in batches on both
+sides, so memory stays flat however many rows a user has. Archived years
+(services.archive) are exported entry by entry from their files, in place of their
+summary journals, so an export holds every entry whether or not years are archived;
+each file is re-sorted into transaction order in memory, one year at a time. They
+are imported as ordinary transactions.
+"""
+
+import zlib
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import exists, insert, select
+from sqlalchemy.orm import Session
+
+from core.money import to_cents, to_decimal
+from core.responses import dumps
+from models.finance import (
+    EntryType,
+    Ledger,
+    LedgerGroup,
+    LedgerGroupCategory,
+    ParentLedgerGroup,
+    SpendingType,
+    Transaction,
+    TransactionItem,
+    TransactionType,
+)
+from services.archive import archived_transaction_rows, archived_years_between
+from services.fingerprints import transaction_fingerprint
+from services.ledger_balances import rebuild_ledger_balances
+
+FORMAT = "pesa-plan-export"
+VERSION = 1
+
+# Rows fetched per round trip from the server-side cursor
+STREAM_BATCH = 5000
+
+# Transactions inserted per statement on import
+IMPORT_BATCH = 1000
+
+# Uncompressed bytes buffered before each gzip chunk is emitted
+_CHUNK_BYTES = 256 * 1024
+
+_SPENDING_TYPES = select(SpendingType.id, SpendingType.name, SpendingType.is_active, SpendingType.created_at)
+_LEDGERS = (
+    select(
+        Ledger.id,
+        Ledger.name,
+        LedgerGroup.name,
+        LedgerGroup.category,
+        ParentLedgerGroup.name,
+        ParentLedgerGroup.sort_order,
+        Ledger.spending_type_id,
+        Ledger.is_active,
+        Ledger.created_at,
+    )
+    .join(LedgerGroup, LedgerGroup.id == Ledger.ledger_group_id)
+    .join(ParentLedgerGroup, ParentLedgerGroup.id == LedgerGroup.parent_ledger_group_id)
+)
+_TRANSACTION_ITEMS = (
+    select(
+        Transaction.id,
+        Transaction.transaction_date,
+        Transaction.reference,
+        Transaction.transaction_type,
+        Transaction.total_amount,
+        Transaction.created_at,
+        Transaction.updated_at,
+        TransactionItem.ledger_id,
+        TransactionItem.entry_type,
+        TransactionItem.amount,
+        TransactionItem.created_at,
+    )
+    # Outer join: a transaction without items is exported too
+    .outerjoin(TransactionItem, TransactionItem.transaction_id == Transaction.id)
+)
+
+
+class ExportFormatError(ValueError):
+    """The file is not a readable export, or does not fit the account it is imported into."""
+
+
+def _transaction_records(rows: Iterable[tuple], counts: Dict[str, int]) -> Iterator[dict]:
+    """Rows of _TRANSACTION_ITEMS, one per item in transaction order, as one record per transaction."""
+    current: Optional[dict] = None
+    for row in rows:
+        if current is None or current["id"] != row[0]:
+            if current is not None:
+                yield current
+            counts["transactions"] += 1
+            current = {
+                "type": "transaction",
+                "id": row[0],
+                "transaction_date": row[1],
+                "reference": row[2],
+                "transaction_type": row[3].value,
+                "total_amount": row[4],
+                "created_at": row[5],
+                "updated_at": row[6],
+                "items": [],
+            }
+        if row[7] is not None:
+            counts["items"] += 1
+            current["items"].append(
+                {"ledger_id": row[7], "entry_type": row[8].value, "amount": row[9], "created_at": row[10]}
+            )
+    if current is not None:
+        yield current
+
+
+def export_records(db: Session, user_id: int) -> Iterator[dict]:
+    """The user's data as export records, in file order."""
+    yield {
+        "type": "header",
+        "format": FORMAT,
+        "version": VERSION,
+        "exported_at": datetime.now(timezone.utc),
+        "user_id": user_id,
+    }
+
+    counts = {"spending_types": 0, "ledgers": 0, "transactions": 0, "items": 0}
+    for spending_type_id, name, is_active, created_at in db.execute(
+        _SPENDING_TYPES.where(SpendingType.user_id == user_id).order_by(SpendingType.id)
+    ):
+        counts["spending_types"] += 1
+        yield {"type": "spending_type", "id": spending_type_id, "name": name, "is_active": is_active, "created_at": created_at}
+
+    for row in db.execute(_LEDGERS.where(Ledger.user_id == user_id).order_by(Ledger.id)):
+        counts["ledgers"] += 1
+        yield {
+            "type": "ledger",
+            "id": row[0],
+            "name": row[1],
+            "ledger_group": row[2],
+            "category": row[3].value,
+            "parent_ledger_group": row[4],
+            "parent_sort_order": row[5],
+            "spending_type_id": row[6],
+            "is_active": row[7],
+            "created_at": row[8],
+        }
+
+    # Archived years come from their files, and their summary journals are left out
+    archived = archived_years_between(db, user_id, date.min.year, date.max.year)
+    for year in archived:
+        yield from _transaction_records(archived_transaction_rows(year.file_name), counts)
+    transactions = _TRANSACTION_ITEMS.where(Transaction.user_id == user_id)
+    summary_ids = [year.summary_transaction_id for year in archived if year.summary_transaction_id is not None]
+    if summary_ids:
+        transactions = transactions.where(Transaction.id.not_in(summary_ids))
+    stream = db.execute(
+        transactions.order_by(Transaction.id, TransactionItem.id),
+        execution_options={"stream_results": True, "yield_per": STREAM_BATCH},
+    )
+    yield from _transaction_records(stream, counts)
+
+    yield {"type": "end", **counts}
+
+
+def export_user(db: Session, user_id: int) -> Iterator[bytes]:
+    """The user's export as gzip-compressed NDJSON, in chunks for a streaming response or a file."""
+    # wbits=31 writes a gzip header and trailer
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    pending: List[bytes] = []
+    size = 0
+    for record in export_records(db, user_id):
+        line = dumps(record) + b"\n"
+        pending.append(line)
+        size += len(line)
+        if size >= _CHUNK_BYTES:
+            chunk = compressor.compress(b"".join(pending))
+            pending, size = [], 0
+            if chunk:
+                yield chunk
+    yield compressor.compress(b"".join(pending)) + compressor.flush()
+
+
+def _datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _insert_returning_ids(db: Session, table, rows: List[dict]) -> List[int]:
+    """Insert rows in one statement; returns their new ids in the order of the rows."""
+    if not rows:
+        return []
+    return db.scalars(insert(table).returning(table.id, sort_by_parameter_order=True), rows).all()
+
+
+class _Importer:
+    """
+    Validates and maps each record as it is read (the file's ids to the new rows' ids)
+    and inserts them in batches. Spending types and ledgers are written when the first
+    record of the next section arrives, so the records after them can refer to them.
+    """
+
+    def __init__(self, db: Session, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        # File id -> new id
+        self.spending_types: Dict[int, int] = {}
+        self.ledgers: Dict[int, int] = {}
+        # name -> id of the shared ledger groups, loaded on first use
+        self.groups: Optional[Dict[str, int]] = None
+        self.parent_groups: Optional[Dict[str, int]] = None
+        self.groups_created = 0
+        self.counts = {"spending_types": 0, "ledgers": 0, "transactions": 0, "items": 0}
+        # Validated rows waiting to be inserted, with the file's id (or the items) they go with
+        self.pending_spending_types: List[Tuple[int, dict]] = []
+        self.pending_ledgers: List[Tuple[int, dict]] = []
+        self.pending_transactions: List[Tuple[dict, list]] = []
+
+    def spending_type(self, record: dict) -> None:
+        self.pending_spending_types.append(
+            (
+                record["id"],
+                {
+                    "user_id": self.user_id,
+                    "name": record["name"],
+                    "is_active": record["is_active"],
+                    "created_at": _datetime(record["created_at"]),
+                },
+            )
+        )
+
+    def ledger(self, record: dict) -> None:
+        self._flush_spending_types()
+        spending_type_id = record["spending_type_id"]
+        self.pending_ledgers.append(
+            (
+                record["id"],
+                {
+                    "user_id": self.user_id,
+                    "name": record["name"],
+                    "ledger_group_id": self._group_id(record),
+                    "spending_type_id": self.spending_types[spending_type_id] if spending_type_id is not None else None,
+                    "is_active": record["is_active"],
+                    "created_at": _datetime(record["created_at"]),
+                },
+            )
+        )
+
+    def transaction(self, record: dict) -> None:
+        self._flush_ledgers()
+        lines = [
+            (self.ledgers[item["ledger_id"]], EntryType(item["entry_type"]), Decimal(item["amount"]), _datetime(item["created_at"]))
+            for item in record["items"]
+        ]
+        debits = sum(to_cents(amount) for _, entry_type, amount, _ in lines if entry_type == EntryType.DEBIT)
+        credits = sum(to_cents(amount) for _, entry_type, amount, _ in lines if entry_type == EntryType.CREDIT)
+        if debits != credits:
+            raise ExportFormatError(f"Transaction {record['id']} does not balance")
+        transaction_date = date.fromisoformat(record["transaction_date"])
+        row = {
+            "user_id": self.user_id,
+            "transaction_date": transaction_date,
+            "reference": record["reference"],
+            "transaction_type": TransactionType(record["transaction_type"]),
+            # Recomputed, as the API does, rather than taken from the file
+            "total_amount": to_decimal(debits),
+            "fingerprint": transaction_fingerprint(
+                self.user_id, transaction_date, record["reference"], [line[:3] for line in lines]
+            ),
+            "created_at": _datetime(record["created_at"]),
+            "updated_at": _datetime(record["updated_at"]),
+        }
+        self.pending_transactions.append((row, lines))
+        if len(self.pending_transactions) >= IMPORT_BATCH:
+            self._flush_transactions()
+
+    def finish(self) -> None:
+        self._flush_ledgers()
+        self._flush_transactions()
+
+    def _flush_spending_types(self) -> None:
+        pending, self.pending_spending_types = self.pending_spending_types, []
+        new_ids = _insert_returning_ids(self.db, SpendingType, [row for _, row in pending])
+        self.spending_types.update(zip((file_id for file_id, _ in pending), new_ids))
+        self.counts["spending_types"] += len(new_ids)
+
+    def _group_id(self, record: dict) -> int:
+        if self.groups is None:
+            self.groups = dict(self.db.execute(select(LedgerGroup.name, LedgerGroup.id)).all())
+            self.parent_groups = dict(self.db.execute(select(ParentLedgerGroup.name, ParentLedgerGroup.id)).all())
+        group_id = self.groups.get(record["ledger_group"])
+        if group_id is not None:
+            return group_id
+
+        # Not on this instance yet: create it, as POST /accounts/groups would
+        parent_id = self.parent_groups.get(record["parent_ledger_group"])
+        if parent_id is None:
+            parent_id = self.db.scalar(
+                insert(ParentLedgerGroup).returning(ParentLedgerGroup.id),
+                {"name": record["parent_ledger_group"], "sort_order": record.get("parent_sort_order")},
+            )
+            self.parent_groups[record["parent_ledger_group"]] = parent_id
+        group_id = self.db.scalar(
+            insert(LedgerGroup).returning(LedgerGroup.id),
+            {
+                "name": record["ledger_group"],
+                "parent_ledger_group_id": parent_id,
+                "category": LedgerGroupCategory(record["category"]),
+            },
+        )
+        self.groups[record["ledger_group"]] = group_id
+        self.groups_created += 1
+        return group_id
+
+    def _flush_ledgers(self) -> None:
+        self._flush_spending_types()
+        pending, self.pending_ledgers = self.pending_ledgers, []
+        new_ids = _insert_returning_ids(self.db, Ledger, [row for _, row in pending])
+        self.ledgers.update(zip((file_id for file_id, _ in pending), new_ids))
+        self.counts["ledgers"] += len(new_ids)
+
+    def _flush_transactions(self) -> None:
+        pending, self.pending_transactions = self.pending_transactions, []
+        new_ids = _insert_returning_ids(self.db, Transaction, [row for row, _ in pending])
+        item_rows = [
+            {
+                "transaction_id": transaction_id,
+                "ledger_id": ledger_id,
+                "entry_type": entry_type,
+                "amount": amount,
+                "created_at": created_at,
+            }
+            for transaction_id, (_, lines) in zip(new_ids, pending)
+            for ledger_id, entry_type, amount, created_at in lines
+        ]
+        if item_rows:
+            self.db.execute(insert(TransactionItem), item_rows)
+        self.counts["transactions"] += len(new_ids)
+        self.counts["items"] += len(item_rows)
+
+
+def import_user(db: Session, user_id: int, lines: Iterable[bytes]) -> dict:
+    """
+    Load an export into a user account with no ledgers or transactions yet. Reads the
+    NDJSON lines one at a time and inserts in batches; ledger balances are rebuilt at
+    the end. Raises ExportFormatError for an unreadable or inconsistent file, with
+    the session left for the caller to roll back; the caller commits on success.
+    Returns the number of rows created of each kind.
+    """
+    has_ledgers, has_transactions = db.execute(
+        select(exists().where(Ledger.user_id == user_id), exists().where(Transaction.user_id == user_id))
+    ).one()
+    if has_ledgers or has_transactions:
+        raise ExportFormatError("Imports go into an account without ledgers or transactions")
+
+    importer = _Importer(db, user_id)
+    handlers = {
+        "spending_type": importer.spending_type,
+        "ledger": importer.ledger,
+        "transaction": importer.transaction,
+    }
+    expected = None
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = orjson.loads(line)
+            kind = record["type"]
+            if line_number == 1:
+                if kind != "header" or record.get("format") != FORMAT:
+                    raise ExportFormatError("Not a pesa-plan export")
+                if record.get("version") != VERSION:
+                    raise ExportFormatError(f"Unsupported export version {record.get('version')}")
+                continue
+            if expected is not None:
+                raise ExportFormatError("Data after the end record")
+            if kind == "end":
+                expected = record
+                continue
+            handlers[kind](record)
+        except ExportFormatError as e:
+            raise ExportFormatError(f"Line {line_number}: {e}") from None
+        except (orjson.JSONDecodeError, KeyError, TypeError, ValueError, ArithmeticError) as e:
+            raise ExportFormatError(f"Line {line_number}: invalid record ({type(e).__name__}: {e})") from None
+    importer.finish()
+
+    if expected is None:
+        raise ExportFormatError("The file is truncated (no end record)")
+    mismatched = [kind for kind, count in importer.counts.items() if expected.get(kind) != count]
+    if mismatched:
+        raise ExportFormatError(f"Record counts do not match the end record: {', '.join(mismatched)}")
+
+    rebuild_ledger_balances(db, [user_id])
+    return {**importer.counts, "ledger_groups_created": importer.groups_created}
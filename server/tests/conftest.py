@@ -0,0 +1,127 @@
+"""
+Shared fixtures. Tests run against a clone of a migrated and seeded Postgres template
+(tests/database.py), made once per session next to PESA_PLAN_DATABASE_URL; each test
+runs inside a transaction that is rolled back afterwards, so tests are isolated and
+the suite needs no per-test setup or teardown.
+
+Endpoints that exceed their query budget fail the request (PESA_PLAN_QUERY_BUDGET_MODE
+defaults to "raise" here, see core.query_budget). Without a reachable Postgres server
+the database tests are skipped.
+"""
+
+import os
+import sys
+
+# Add server and scripts directories to path
+_server_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _server_dir)
+sys.path.insert(0, os.path.join(os.path.dirname(_server_dir), "scripts"))
+
+os.environ.setdefault("PESA_PLAN_QUERY_BUDGET_MODE", "raise")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.query_budget import install_query_tracking
+from core.security import create_access_token
+from create_default_ledger_groups import create_default_ledger_groups
+from main import app
+from models.finance import LedgerGroup, LedgerGroupCategory
+from models.user import User
+from services.chart_of_accounts import refresh_chart_of_accounts
+from tests.database import TemplateDatabase, override_get_db, savepoint_session
+
+template = TemplateDatabase(settings.DATABASE_URL, seeds=[create_default_ledger_groups])
+
+
+@pytest.fixture(scope="session")
+def engine():
+    try:
+        url = template.clone()
+    except OperationalError as e:
+        pytest.skip(f"Postgres is not reachable: {e.orig}")
+    engine = create_engine(url)
+    install_query_tracking(engine)
+    # Like the worker warm-up, so first requests are not charged for loading the registry
+    with Session(engine) as session:
+        refresh_chart_of_accounts(session)
+    yield engine
+    engine.dispose()
+    template.drop(url)
+
+
+@pytest.fixture
+def db(engine):
+    with savepoint_session(engine) as session, override_get_db(app, session):
+        yield session
+
+
+@pytest.fixture
+def user(db) -> User:
+    user = User(email="test@example.com", first_name="Test", hashed_password="!")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def client(db, user) -> TestClient:
+    """A client authenticated as user. Not entered as a context manager, so no warm-up runs."""
+    client = TestClient(app)
+    token = create_access_token(data={"sub": str(user.id), "email": user.email})
+    client.headers["Authorization"] = f"Bearer {token}"
+    return client
+
+
+@pytest.fixture
+def ledger_ids(client, db):
+    """Bank, Cash, Rent, Food and Fuel ledgers of the client's user."""
+    groups = dict(db.execute(select(LedgerGroup.category, LedgerGroup.id)).all())
+    ids = []
+    for name, category in [
+        ("Bank", LedgerGroupCategory.BANK_ACCOUNTS),
+        ("Cash", LedgerGroupCategory.CASH_ACCOUNTS),
+        ("Rent", LedgerGroupCategory.EXPENSES),
+        ("Food", LedgerGroupCategory.EXPENSES),
+        ("Fuel", LedgerGroupCategory.EXPENSES),
+    ]:
+        response = client.post("/api/v1/accounts/", json={"name": name, "ledger_group_id": groups[category]})
+        assert response.status_code == 201, response.text
+        ids.append(response.json()["id"])
+    return ids
+
+
+@pytest.fixture
+def matched_payment(client, ledger_ids):
+    """
+    A payment of 30.00 from Bank for Rent and Food on 2024-03-01, its bank item matched to
+    a statement line. Returns (transaction, bank item, statement id).
+    """
+    bank, _, rent, food, _ = ledger_ids
+    items = [(rent, "DEBIT", "10.00"), (food, "DEBIT", "20.00"), (bank, "CREDIT", "30.00")]
+    items = [{"ledger_id": ledger_id, "entry_type": side, "amount": amount} for ledger_id, side, amount in items]
+    response = client.post(
+        "/api/v1/transactions/",
+        json={"transaction_date": "2024-03-01", "transaction_type": "JOURNAL", "total_amount": "0", "items": items},
+    )
+    assert response.status_code == 201, response.text
+    transaction = client.get(f"/api/v1/transactions/{response.json()['id']}").json()
+    bank_item = next(entry for entry in transaction["items"] if entry["ledger_id"] == bank)
+
+    response = client.post(
+        "/api/v1/reconciliation/statements",
+        json={"ledger_id": bank, "name": "March", "lines": [{"line_date": "2024-03-01", "amount": "-30.00"}]},
+    )
+    assert response.status_code == 201, response.text
+    statement_id = response.json()["id"]
+    line_id = client.get(f"/api/v1/reconciliation/statements/{statement_id}").json()["lines"][0]["id"]
+    response = client.put(
+        f"/api/v1/reconciliation/statements/{statement_id}/lines/{line_id}/match",
+        json={"transaction_item_id": bank_item["id"]},
+    )
+    assert response.status_code == 200, response.text
+    return transaction, bank_item, statement_id
@@ -0,0 +1,206 @@
+"""
+Fast, isolated test databases.
+
+Migrating and seeding a fresh database for every test run is slow, so the schema is
+built once into a Postgres template database and cloned per test session with
+CREATE DATABASE ... TEMPLATE (a file-level copy that takes well under a second, even
+with benchmark datasets baked in). Each test then runs inside a transaction whose
+session commits become SAVEPOINTs; rolling back the outer transaction at the end of
+the test leaves the clone untouched for the next one.
+
+The template is rebuilt automatically when the migration head or the seed key
+changes. tests/conftest.py wires these into the engine and db fixtures; the
+benchmark scripts run in a scratch_database cloned from an empty template.
+"""
+
+import hashlib
+import os
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Sequence
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.orm import Session
+
+from core.database import get_db, set_session_factory
+
+_SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_COMMENT_PREFIX = "pesa-plan-template:"
+
+
+def _alembic_config(database_url: str) -> Config:
+    config = Config(os.path.join(_SERVER_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(_SERVER_DIR, "alembic"))
+    config.attributes["sqlalchemy.url"] = database_url
+    return config
+
+
+class TemplateDatabase:
+    """
+    A migrated and seeded Postgres template that test databases are cloned from.
+
+    seeds are called with a Session on the template after migrating; include anything
+    every test needs (default ledger groups, benchmark datasets). Change seed_key when
+    the seed data changes so existing templates are rebuilt.
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        template_name: Optional[str] = None,
+        seeds: Sequence[Callable[[Session], None]] = (),
+        seed_key: str = "",
+    ):
+        self.url = make_url(database_url)
+        self.template_name = template_name or f"{self.url.database}_template"
+        self.seeds = list(seeds)
+        self.seed_key = seed_key
+
+    def _admin_engine(self) -> Engine:
+        return create_engine(self.url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+
+    def fingerprint(self) -> str:
+        heads = ScriptDirectory.from_config(_alembic_config(str(self.url))).get_heads()
+        seeds = ",".join(f"{seed.__module__}.{seed.__qualname__}" for seed in self.seeds)
+        return hashlib.sha256(f"{sorted(heads)}|{seeds}|{self.seed_key}".encode()).hexdigest()[:16]
+
+    def _current_fingerprint(self, conn) -> Optional[str]:
+        comment = conn.execute(
+            text(
+                "SELECT shobj_description(oid, 'pg_database') FROM pg_database WHERE datname = :name"
+            ),
+            {"name": self.template_name},
+        ).scalar()
+        if comment and comment.startswith(_COMMENT_PREFIX):
+            return comment[len(_COMMENT_PREFIX) :]
+        return None
+
+    def ensure(self, rebuild: bool = False) -> None:
+        """Build the template unless an up-to-date one already exists."""
+        fingerprint = self.fingerprint()
+        admin = self._admin_engine()
+        try:
+            with admin.connect() as conn:
+                if not rebuild and self._current_fingerprint(conn) == fingerprint:
+                    return
+                _drop_database(conn, self.template_name)
+                conn.execute(text(f'CREATE DATABASE "{self.template_name}"'))
+
+            template_url = self.url.set(database=self.template_name)
+            command.upgrade(_alembic_config(template_url.render_as_string(hide_password=False)), "head")
+            self._seed(template_url)
+
+            with admin.connect() as conn:
+                conn.execute(text(f"COMMENT ON DATABASE \"{self.template_name}\" IS '{_COMMENT_PREFIX}{fingerprint}'"))
+        finally:
+            admin.dispose()
+
+    def _seed(self, template_url: URL) -> None:
+        if not self.seeds:
+            return
+        engine = create_engine(template_url)
+        try:
+            with Session(engine) as session:
+                for seed in self.seeds:
+                    seed(session)
+                session.commit()
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                # Clones inherit planner statistics, so gather them once here
+                conn.execute(text("VACUUM ANALYZE"))
+        finally:
+            engine.dispose()
+
+    def clone(self, name: Optional[str] = None) -> str:
+        """Create a database from the template (building it if needed) and return its URL."""
+        self.ensure()
+        name = name or f"{self.url.database}_test_{os.getpid()}_{uuid.uuid4().hex[:6]}"
+        admin = self._admin_engine()
+        try:
+            with admin.connect() as conn:
+                _drop_database(conn, name)
+                conn.execute(text(f'CREATE DATABASE "{name}" TEMPLATE "{self.template_name}"'))
+        finally:
+            admin.dispose()
+        return self.url.set(database=name).render_as_string(hide_password=False)
+
+    def drop(self, database_url: str) -> None:
+        admin = self._admin_engine()
+        try:
+            with admin.connect() as conn:
+                _drop_database(conn, make_url(database_url).database)
+        finally:
+            admin.dispose()
+
+
+@contextmanager
+def scratch_database(database_url: str) -> Iterator[Engine]:
+    """
+    An engine on a fresh database next to database_url, migrated but empty, that is
+    dropped when the block exits. For benchmarks that load their own data with fixed ids.
+    """
+    url = make_url(database_url)
+    template = TemplateDatabase(database_url, template_name=f"{url.database}_empty_template")
+    scratch_url = template.clone(f"{url.database}_scratch_{os.getpid()}_{uuid.uuid4().hex[:6]}")
+    engine = create_engine(scratch_url)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        template.drop(scratch_url)
+
+
+def _drop_database(conn, name: str) -> None:
+    conn.execute(
+        text("SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = :name AND pid <> pg_backend_pid()"),
+        {"name": name},
+    )
+    conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+
+
+@contextmanager
+def savepoint_session(engine: Engine) -> Iterator[Session]:
+    """
+    A Session whose work is rolled back when the block exits. Commits inside the block
+    (including those made by endpoints) only release SAVEPOINTs of an outer transaction.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+
+
+@contextmanager
+def override_get_db(app: FastAPI, session: Session) -> Iterator[Session]:
+    """
+    Make every endpoint in app use session instead of opening its own. Sessions the app
+    opens itself (core.database.new_session/read_session: report jobs, the replica
+    fallback in get_current_user) join session's transaction on the same connection.
+    """
+
+    def _get_db():
+        yield session
+
+    def _new_session() -> Session:
+        return Session(bind=session.bind, join_transaction_mode="create_savepoint")
+
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = _get_db
+    previous_factory = set_session_factory(_new_session)
+    try:
+        yield session
+    finally:
+        set_session_factory(previous_factory)
+        if previous is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = previous
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from core.admission import AdmissionController, admission, parse_costs
+from core.metrics import REGISTRY
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    """Builds controllers whose gauges do not replace the app's in the metrics registry."""
+    monkeypatch.setattr(REGISTRY, "_metrics", dict(REGISTRY._metrics))
+
+    def build(**overrides) -> AdmissionController:
+        options = dict(capacity=4, per_user_capacity=3, max_queue=2, queue_timeout_seconds=0.2)
+        options.update(overrides)
+        return AdmissionController(**options)
+
+    return build
+
+
+async def hold(admission: AdmissionController, user_id: int, cost: int, release: asyncio.Event, log: list):
+    async with admission.admit(user_id, cost):
+        log.append(user_id)
+        await release.wait()
+
+
+def test_parse_costs():
+    assert parse_costs(" get /api/v1/reports/pivot=8, POST /api/v1/data/import=2,") == {
+        ("GET", "/api/v1/reports/pivot"): 8,
+        ("POST", "/api/v1/data/import"): 2,
+    }
+
+
+def test_user_over_their_share_is_rejected_at_once(controller):
+    async def scenario():
+        admission, release, log = controller(), asyncio.Event(), []
+        running = asyncio.create_task(hold(admission, 1, 3, release, log))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as rejected:
+            async with admission.admit(1, 1):
+                pass
+        # Another user still gets the remaining capacity
+        async with admission.admit(2, 1):
+            assert admission.in_use == 4
+        release.set()
+        await running
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 429 and rejected.headers["Retry-After"]
+
+
+def test_waiters_are_admitted_in_order_as_capacity_frees(controller):
+    async def scenario():
+        admission, release, log = controller(), asyncio.Event(), []
+        tasks = [asyncio.create_task(hold(admission, 1, 3, release, log))]
+        await asyncio.sleep(0)
+        # The head of the queue needs 3 units; the smaller request behind it must not overtake it
+        tasks.append(asyncio.create_task(hold(admission, 2, 3, release, log)))
+        tasks.append(asyncio.create_task(hold(admission, 3, 1, release, log)))
+        await asyncio.sleep(0)
+        assert log == [1] and admission.in_use == 3
+        release.set()
+        await asyncio.gather(*tasks)
+        return log, admission
+
+    log, admission = asyncio.run(scenario())
+    assert log == [1, 2, 3]
+    assert admission.in_use == 0 and not admission._per_user
+
+
+@pytest.mark.parametrize("max_queue", [0, 2])
+def test_full_queue_or_timeout_is_503(controller, max_queue):
+    async def scenario():
+        admission, release, log = controller(max_queue=max_queue), asyncio.Event(), []
+        running = [asyncio.create_task(hold(admission, user_id, 2, release, log)) for user_id in (1, 2)]
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as rejected:
+            async with admission.admit(3, 1):
+                pass
+        release.set()
+        await asyncio.gather(*running)
+        return rejected.value, admission
+
+    rejected, admission = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert admission.in_use == 0 and not admission._per_user
+
+
+def test_endpoint_over_the_user_limit_is_429(client, monkeypatch):
+    monkeypatch.setattr(admission, "per_user_capacity", 0)
+    response = client.get("/api/v1/reports/trial-balance?start_date=2024-01-01&end_date=2024-12-31")
+    assert response.status_code == 429
@@ -0,0 +1,140 @@
+import csv
+import io
+from datetime import date
+
+import pytest
+
+from core.config import settings
+from core.responses import dumps
+from models.user import User
+from services import archive, read_models
+from services.archive import archive_year
+from services.chart_of_accounts import get_chart_of_accounts
+from services.report_jobs import EXPORT, RUNNERS
+from services.user_export import export_records, import_user
+
+
+@pytest.fixture
+def archive_2022(client, db, user, ledger_ids, monkeypatch, tmp_path):
+    """A payment in each of 2022 and 2023; returns a function archiving 2022."""
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path))
+    bank, _, rent, food, _ = ledger_ids
+    for transaction_date, expense in [("2022-03-01", rent), ("2022-08-01", food), ("2023-02-01", rent)]:
+        response = client.post(
+            "/api/v1/transactions/",
+            json={
+                "transaction_date": transaction_date,
+                "transaction_type": "MONEY_PAID",
+                "total_amount": "0",
+                "items": [
+                    {"ledger_id": expense, "entry_type": "DEBIT", "amount": "25.00"},
+                    {"ledger_id": bank, "entry_type": "CREDIT", "amount": "25.00"},
+                ],
+            },
+        )
+        assert response.status_code == 201, response.text
+
+    def archive():
+        archive_year(db, user.id, 2022)
+        db.commit()
+
+    return archive
+
+
+@pytest.fixture
+def archived_2022(client, archive_2022):
+    """archive_2022, archived; returns the trial balance over both years from before archiving."""
+    before = client.get("/api/v1/reports/trial-balance?start_date=2022-01-01&end_date=2023-12-31").json()
+    archive_2022()
+    return before
+
+
+def report(client, query):
+    response = client.get(f"/api/v1/reports/{query}")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.parametrize("cache", [False, True], ids=["sql", "cache"])
+@pytest.mark.parametrize(
+    "query",
+    [
+        # Whole years, answered by the summary journal
+        "trial-balance?start_date=2022-01-01&end_date=2023-12-31",
+        "trial-balance?start_date=2023-01-01&end_date=2023-06-30",
+        "trial-balance/tree?start_date=2022-01-01&end_date=2022-12-31",
+        "balance-history?start_date=2021-01-01&end_date=2023-12-31&interval=year&net_worth=true",
+        "pivot?start_date=2022-01-01&end_date=2023-12-31&dimensions=ledger",
+        # Splitting 2022, or telling its entries apart, so read back from its file
+        "trial-balance?start_date=2022-06-01&end_date=2023-12-31",
+        "trial-balance?start_date=2021-01-01&end_date=2022-06-30",
+        "trial-balance?start_date=2022-04-01&end_date=2022-09-30",
+        "trial-balance/tree?start_date=2022-06-01&end_date=2022-12-31",
+        "balance-history?start_date=2022-01-01&end_date=2023-12-31&interval=month&net_worth=true&categories=expenses",
+        "pivot?start_date=2022-01-01&end_date=2022-09-30&dimensions=ledger",
+        "pivot?start_date=2022-06-01&end_date=2023-12-31&dimensions=ledger&dimensions=period&interval=week",
+        "pivot?start_date=2022-01-01&end_date=2023-12-31&dimensions=transaction_type&measures=debit&measures=count",
+        "pivot?start_date=2022-01-01&end_date=2023-12-31&measures=count&transaction_types=JOURNAL",
+    ],
+)
+def test_reports_are_unchanged_by_archiving(client, archive_2022, monkeypatch, cache, query):
+    monkeypatch.setattr(settings, "LEDGER_CACHE_ENABLED", cache)
+    before = report(client, query)
+    archive_2022()
+    assert report(client, query) == before
+
+
+def test_reports_over_a_restored_year_conflict(client, db, user, archived_2022, tmp_path):
+    # The year is still archived in the database, but its file is gone
+    (tmp_path / f"user_{user.id}" / "2022.parquet").unlink()
+    response = client.get("/api/v1/reports/trial-balance?start_date=2022-06-01&end_date=2023-12-31")
+    assert response.status_code == 409 and "try again" in response.json()["detail"]
+
+
+def test_failed_archive_leaves_no_file(db, user, archive_2022, monkeypatch, tmp_path):
+    def fail(db, user_id):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(archive, "bump_ledger_version", fail)
+    with pytest.raises(RuntimeError):
+        archive_2022()
+    db.rollback()
+    assert list(tmp_path.rglob("*.parquet*")) == []
+
+
+def test_export_has_archived_entries_not_summaries(db, user, archived_2022):
+    records = list(export_records(db, user.id))
+    transactions = [record for record in records if record["type"] == "transaction"]
+    assert sorted(record["transaction_date"].isoformat() for record in transactions) == [
+        "2022-03-01",
+        "2022-08-01",
+        "2023-02-01",
+    ]
+    assert records[-1]["transactions"] == 3 and records[-1]["items"] == 6
+
+    other = User(email="copy@example.com", first_name="Copy", hashed_password="!")
+    db.add(other)
+    db.flush()
+    import_user(db, other.id, [dumps(record) for record in records])
+    coa = get_chart_of_accounts(db)
+    year_range = (date(2022, 1, 1), date(2023, 12, 31))
+    copied = read_models.trial_balance(db, coa, other.id, *year_range)["items"]
+    original = read_models.trial_balance(db, coa, user.id, *year_range)["items"]
+    assert [item["closing_debit"] for item in copied] == [item["closing_debit"] for item in original]
+    # The copy has the entries themselves, so it can split 2022
+    assert read_models.trial_balance(db, coa, other.id, date(2022, 6, 1), date(2022, 12, 31))["total_period_debit"] == 25
+
+
+def test_export_job_has_archived_entries_not_summaries(db, user, archived_2022):
+    out = io.BytesIO()
+    media_type, _ = RUNNERS[EXPORT](
+        db, get_chart_of_accounts(db), user.id, {"start_date": "2022-06-01", "end_date": "2023-12-31"}, out
+    )
+    rows = list(csv.DictReader(io.StringIO(out.getvalue().decode())))
+    assert media_type == "text/csv"
+    assert [(row["transaction_date"], row["ledger_name"], row["entry_type"]) for row in rows] == [
+        ("2022-08-01", "Food", "DEBIT"),
+        ("2022-08-01", "Bank", "CREDIT"),
+        ("2023-02-01", "Rent", "DEBIT"),
+        ("2023-02-01", "Bank", "CREDIT"),
+    ]
@@ -0,0 +1,89 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from core.config import settings
+from services.date_buckets import Interval, bucket_count, bucket_starts
+
+
+def post(client, transaction_date, debit_ledger_id, credit_ledger_id, amount):
+    response = client.post(
+        "/api/v1/transactions/",
+        json={
+            "transaction_date": transaction_date,
+            "transaction_type": "JOURNAL",
+            "total_amount": "0",
+            "items": [
+                {"ledger_id": debit_ledger_id, "entry_type": "DEBIT", "amount": amount},
+                {"ledger_id": credit_ledger_id, "entry_type": "CREDIT", "amount": amount},
+            ],
+        },
+    )
+    assert response.status_code == 201, response.text
+
+
+@pytest.fixture(params=[False, True], ids=["sql", "ledger-cache"])
+def history(request, client, ledger_ids, monkeypatch):
+    """
+    Rent paid from Bank before the range, Food paid from Bank in January and a transfer
+    from Cash to Bank in March. Returns a function fetching {series key: [(date, balance)]}.
+    """
+    monkeypatch.setattr(settings, "LEDGER_CACHE_ENABLED", request.param)
+    bank, cash, rent, food, _ = ledger_ids
+    post(client, "2023-12-15", rent, bank, "100.00")
+    post(client, "2024-01-10", food, bank, "20.00")
+    post(client, "2024-03-05", bank, cash, "50.00")
+
+    def fetch(start_date, end_date, interval, **params):
+        response = client.get(
+            "/api/v1/reports/balance-history",
+            params={"start_date": start_date, "end_date": end_date, "interval": interval, **params},
+        )
+        assert response.status_code == 200, response.text
+        return {
+            series["key"]: [(point["date"], Decimal(point["balance"])) for point in series["points"]]
+            for series in response.json()["series"]
+        }
+
+    return fetch
+
+
+def test_monthly_history_starts_from_the_opening_balance(history, ledger_ids):
+    bank, cash = ledger_ids[:2]
+    series = history(
+        "2024-01-01", "2024-03-15", "month", ledger_ids=[bank, cash], categories=["expenses"], net_worth=True
+    )
+    dates = ["2024-01-31", "2024-02-29", "2024-03-15"]
+    assert series[f"ledger:{bank}"] == list(zip(dates, map(Decimal, ["-120", "-120", "-70"])))
+    assert series[f"ledger:{cash}"] == list(zip(dates, map(Decimal, ["0", "0", "-50"])))
+    assert series["category:expenses"] == list(zip(dates, map(Decimal, ["120", "120", "120"])))
+    # The transfer moves money between assets, so net worth does not change
+    assert series["net_worth"] == list(zip(dates, map(Decimal, ["-120", "-120", "-120"])))
+
+
+def test_weekly_and_yearly_points_end_their_buckets(history, ledger_ids):
+    bank = ledger_ids[0]
+    weekly = history("2024-01-03", "2024-01-16", "week", ledger_ids=[bank])
+    assert weekly[f"ledger:{bank}"] == [
+        ("2024-01-07", Decimal("-100")),
+        ("2024-01-14", Decimal("-120")),
+        ("2024-01-16", Decimal("-120")),
+    ]
+    yearly = history("2023-06-01", "2024-12-31", "year", net_worth=True)
+    assert yearly["net_worth"] == [("2023-12-31", Decimal("-100")), ("2024-12-31", Decimal("-120"))]
+
+
+@pytest.mark.parametrize(
+    "interval, first, count",
+    [
+        (Interval.DAY, date(2023, 12, 30), 35),
+        (Interval.WEEK, date(2023, 12, 25), 6),
+        (Interval.MONTH, date(2023, 12, 1), 3),
+        (Interval.YEAR, date(2023, 1, 1), 2),
+    ],
+)
+def test_bucket_starts(interval, first, count):
+    starts = bucket_starts(date(2023, 12, 30), date(2024, 2, 2), interval)
+    assert starts[0] == first and len(starts) == count
+    assert bucket_count(date(2023, 12, 30), date(2024, 2, 2), interval) == count
@@ -0,0 +1,20 @@
+import pytest
+
+
+@pytest.mark.parametrize(
+    "if_none_match, status_code",
+    [
+        ("{etag}", 304),
+        ("W/{etag}", 304),
+        ('"stale", W/{etag}', 304),
+        ('"a,b",, {etag}', 304),
+        ("*", 304),
+        ('"stale"', 200),
+        ('"stale" {etag}', 200),
+    ],
+)
+def test_if_none_match(client, if_none_match, status_code):
+    etag = client.get("/api/v1/accounts/groups").headers["ETag"]
+    response = client.get("/api/v1/accounts/groups", headers={"If-None-Match": if_none_match.format(etag=etag)})
+    assert response.status_code == status_code
+    assert response.headers["ETag"] == etag
@@ -0,0 +1,20 @@
+from sqlalchemy import func, select
+
+from core.database import new_session, read_session
+from models.finance import LedgerGroup
+from models.user import User
+
+
+def test_template_is_seeded(db):
+    assert db.scalar(select(func.count()).select_from(LedgerGroup)) > 0
+
+
+def test_writes_are_rolled_back_between_tests(db, user):
+    # The user fixture commits a user in every test; none survive from earlier tests
+    assert db.scalars(select(User.email)).all() == ["test@example.com"]
+
+
+def test_sessions_opened_by_the_app_join_the_test_transaction(db, user):
+    with new_session() as primary, read_session(user.id) as reads:
+        assert primary.get(User, user.id) is not None
+        assert reads.get(User, user.id) is not None
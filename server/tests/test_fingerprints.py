@@ -0,0 +1,90 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select, update
+
+from core.config import settings
+from models.finance import EntryType, Transaction
+from services.fingerprints import backfill_fingerprints, transaction_fingerprint
+
+
+def payment(debit_ledger_id, credit_ledger_id, transaction_type="MONEY_PAID", reference="INV-001"):
+    return {
+        "transaction_date": "2024-03-01",
+        "transaction_type": transaction_type,
+        "total_amount": "0",
+        "reference": reference,
+        "items": [
+            {"ledger_id": debit_ledger_id, "entry_type": "DEBIT", "amount": "12.50"},
+            {"ledger_id": credit_ledger_id, "entry_type": "CREDIT", "amount": "12.50"},
+        ],
+    }
+
+
+def test_fingerprint_ignores_type_order_splits_and_reference_noise():
+    one = transaction_fingerprint(
+        1, date(2024, 3, 1), "INV-001", [(3, EntryType.DEBIT, "12.50"), (1, EntryType.CREDIT, "12.50")]
+    )
+    same = transaction_fingerprint(
+        1,
+        date(2024, 3, 1),
+        "inv 001",
+        [(1, "CREDIT", "12.50"), (3, "DEBIT", "10.00"), (3, "DEBIT", "2.50")],
+    )
+    assert one == same
+    for changed in [
+        (2, date(2024, 3, 1), "INV-001", [(3, "DEBIT", "12.50"), (1, "CREDIT", "12.50")]),
+        (1, date(2024, 3, 2), "INV-001", [(3, "DEBIT", "12.50"), (1, "CREDIT", "12.50")]),
+        (1, date(2024, 3, 1), "INV-002", [(3, "DEBIT", "12.50"), (1, "CREDIT", "12.50")]),
+        (1, date(2024, 3, 1), "INV-001", [(3, "DEBIT", "12.51"), (1, "CREDIT", "12.51")]),
+        (1, date(2024, 3, 1), "INV-001", [(3, "CREDIT", "12.50"), (1, "DEBIT", "12.50")]),
+    ]:
+        assert transaction_fingerprint(*changed) != one
+
+
+def test_flag_policy_posts_and_reports_the_original(client, ledger_ids, monkeypatch):
+    monkeypatch.setattr(settings, "DUPLICATE_POLICY", "flag")
+    bank, _, rent, _, _ = ledger_ids
+    first = client.post("/api/v1/transactions/", json=payment(rent, bank)).json()
+    assert first["duplicate_of"] is None
+    # Same entry again as a journal, with the reference typed differently
+    response = client.post("/api/v1/transactions/", json=payment(rent, bank, "JOURNAL", "inv 001"))
+    assert response.status_code == 201 and response.json()["duplicate_of"] == first["id"]
+
+    groups = client.get("/api/v1/transactions/duplicates").json()
+    assert [[entry["id"] for entry in group["transactions"]] for group in groups] == [[first["id"], response.json()["id"]]]
+    assert groups[0]["total_amount"] == "12.50"
+
+
+def test_reject_policy_needs_allow_duplicate(client, ledger_ids, monkeypatch):
+    monkeypatch.setattr(settings, "DUPLICATE_POLICY", "reject")
+    bank, _, rent, _, _ = ledger_ids
+    first = client.post("/api/v1/transactions/", json=payment(rent, bank)).json()
+    response = client.post("/api/v1/transactions/", json=payment(rent, bank))
+    assert response.status_code == 409 and str(first["id"]) in response.json()["detail"]
+
+    response = client.post("/api/v1/transactions/?allow_duplicate=true", json=payment(rent, bank))
+    assert response.status_code == 201 and response.json()["duplicate_of"] == first["id"]
+
+
+def test_off_policy_skips_the_check(client, ledger_ids, monkeypatch):
+    monkeypatch.setattr(settings, "DUPLICATE_POLICY", "off")
+    bank, _, rent, _, _ = ledger_ids
+    client.post("/api/v1/transactions/", json=payment(rent, bank))
+    response = client.post("/api/v1/transactions/", json=payment(rent, bank))
+    assert response.status_code == 201 and response.json()["duplicate_of"] is None
+    # Still fingerprinted, so the duplicates report finds them
+    assert len(client.get("/api/v1/transactions/duplicates").json()) == 1
+
+
+@pytest.mark.parametrize("recompute", [False, True])
+def test_backfill_fills_missing_fingerprints(client, db, user, ledger_ids, recompute):
+    bank, _, rent, _, _ = ledger_ids
+    posted = client.post("/api/v1/transactions/", json=payment(rent, bank)).json()["id"]
+    expected = db.scalar(select(Transaction.fingerprint).where(Transaction.id == posted))
+    db.execute(update(Transaction).values(fingerprint=None))
+    db.commit()
+
+    assert backfill_fingerprints(db, [user.id], recompute=recompute, batch_size=1) == 1
+    assert db.scalar(select(Transaction.fingerprint).where(Transaction.id == posted)) == expected
+    assert backfill_fingerprints(db, [user.id], recompute=recompute) == (1 if recompute else 0)
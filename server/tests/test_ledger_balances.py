@@ -0,0 +1,90 @@
+from decimal import Decimal
+
+from sqlalchemy import select, update
+
+from models.finance import LedgerBalance
+from models.user import User
+from services.ledger_balances import _totals_query, rebuild_ledger_balances
+
+
+def payment(client, debit_ledger_id, credit_ledger_id, amount, transaction_date="2024-03-01"):
+    response = client.post(
+        "/api/v1/transactions/",
+        json={
+            "transaction_date": transaction_date,
+            "transaction_type": "MONEY_PAID",
+            "total_amount": "0",
+            "items": [
+                {"ledger_id": debit_ledger_id, "entry_type": "DEBIT", "amount": amount},
+                {"ledger_id": credit_ledger_id, "entry_type": "CREDIT", "amount": amount},
+            ],
+        },
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def listed_balances(client):
+    ledgers = client.get("/api/v1/accounts/?with_balances=true").json()
+    return {
+        ledger["id"]: (Decimal(ledger["balance"]["debit"]), Decimal(ledger["balance"]["credit"])) for ledger in ledgers
+    }
+
+
+def aggregated_balances(db, user_id):
+    return {ledger_id: (debit, credit) for ledger_id, _, debit, credit in db.execute(_totals_query([user_id]))}
+
+
+def stored(db, user_id):
+    rows = db.execute(
+        select(
+            LedgerBalance.ledger_id,
+            LedgerBalance.debit_total,
+            LedgerBalance.credit_total,
+            LedgerBalance.reconciled_total,
+        )
+        .where(LedgerBalance.user_id == user_id)
+        .order_by(LedgerBalance.ledger_id)
+    )
+    return [tuple(row) for row in rows]
+
+
+def test_postings_keep_balances_in_step_with_the_items(client, db, user, ledger_ids):
+    bank, cash, rent, food, _ = ledger_ids
+    first = payment(client, rent, bank, "10.00")
+    payment(client, food, bank, "2.50")
+    payment(client, rent, cash, "1.25")
+
+    response = client.put(
+        f"/api/v1/transactions/{first}",
+        json={
+            "items": [
+                {"ledger_id": food, "entry_type": "DEBIT", "amount": "4.00"},
+                {"ledger_id": bank, "entry_type": "CREDIT", "amount": "4.00"},
+            ]
+        },
+    )
+    assert response.status_code == 200, response.text
+    assert client.delete(f"/api/v1/transactions/{payment(client, rent, bank, '99.99')}").status_code == 204
+
+    balances = listed_balances(client)
+    posted_to = {ledger_id: totals for ledger_id, totals in balances.items() if any(totals)}
+    assert posted_to == aggregated_balances(db, user.id)
+    # Updates and deletes take amounts back out rather than dropping rows
+    assert balances[bank] == (Decimal("0"), Decimal("6.50"))
+    assert balances[rent] == (Decimal("1.25"), Decimal("0"))
+
+
+def test_rebuild_repairs_drifted_balances(db, user, ledger_ids, matched_payment):
+    expected = stored(db, user.id)
+    version = db.scalar(select(User.ledger_version).where(User.id == user.id))
+
+    db.execute(update(LedgerBalance).values(debit_total=999, credit_total=0, reconciled_total=0))
+    db.commit()
+    rebuild_ledger_balances(db, [user.id])
+    db.commit()
+
+    assert stored(db, user.id) == expected
+    bank = ledger_ids[0]
+    assert [row[3] for row in expected if row[0] == bank] == [Decimal("-30.00")]
+    assert db.scalar(select(User.ledger_version).where(User.id == user.id)) == version + 1
@@ -0,0 +1,81 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from core.config import settings
+from models.finance import EntryType
+from models.user import User
+from services.ledger_cache import ledger_cache
+
+
+def payment(client, debit_ledger_id, credit_ledger_id, amount):
+    response = client.post(
+        "/api/v1/transactions/",
+        json={
+            "transaction_date": "2024-03-01",
+            "transaction_type": "MONEY_PAID",
+            "total_amount": "0",
+            "items": [
+                {"ledger_id": debit_ledger_id, "entry_type": "DEBIT", "amount": amount},
+                {"ledger_id": credit_ledger_id, "entry_type": "CREDIT", "amount": amount},
+            ],
+        },
+    )
+    assert response.status_code == 201, response.text
+
+
+def version(db, user):
+    return db.scalar(select(User.ledger_version).where(User.id == user.id))
+
+
+def rent_cents(entry, rent):
+    return int(entry.balances_at([rent], [date(2024, 12, 31)])[rent][0])
+
+
+@pytest.fixture
+def cache(user, monkeypatch):
+    monkeypatch.setattr(settings, "LEDGER_CACHE_ENABLED", True)
+    yield ledger_cache
+    ledger_cache.invalidate(user.id)
+
+
+def test_build_racing_a_posting_counts_it_once(client, db, user, ledger_ids, cache):
+    bank, _, rent, _, _ = ledger_ids
+    payment(client, rent, bank, "10.00")
+    # A request read this version, then a posting committed before its cache build
+    seen = version(db, user)
+    payment(client, rent, bank, "5.00")
+
+    entry = cache.get(db, user.id, seen)
+    assert entry.version == seen + 1
+    assert rent_cents(entry, rent) == 1500
+
+    # The posting's own process reports it after the build; it is already included
+    cache.record_posting(
+        user.id,
+        seen + 1,
+        [
+            (date(2024, 3, 1), rent, EntryType.DEBIT, Decimal("5.00")),
+            (date(2024, 3, 1), bank, EntryType.CREDIT, Decimal("5.00")),
+        ],
+    )
+    assert cache.get(db, user.id, seen + 1) is entry
+    assert rent_cents(entry, rent) == 1500
+
+
+def test_posting_updates_the_cached_entry(client, db, user, ledger_ids, cache):
+    bank, _, rent, _, _ = ledger_ids
+    payment(client, rent, bank, "10.00")
+    built = cache.get(db, user.id, version(db, user))
+
+    payment(client, rent, bank, "2.50")
+    entry = cache.get(db, user.id, version(db, user))
+    assert entry is not built and entry.version == built.version + 1
+    assert rent_cents(entry, rent) == 1250
+
+    response = client.get("/api/v1/reports/trial-balance?start_date=2024-01-01&end_date=2024-12-31")
+    assert response.status_code == 200, response.text
+    rent_row = next(item for item in response.json()["items"] if item["ledger_id"] == rent)
+    assert Decimal(rent_row["closing_debit"]) == Decimal("12.50")
@@ -0,0 +1,38 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from core import metrics
+from core.config import settings
+from main import app
+
+
+@pytest.mark.parametrize("token, headers", [("", {}), ("s3cret", {}), ("s3cret", {"Authorization": "Bearer x"})])
+def test_metrics_need_the_token(monkeypatch, token, headers):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", token)
+    assert TestClient(app).get("/metrics", headers=headers).status_code == 404
+
+
+def test_metrics_with_the_token(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "s3cret")
+    response = TestClient(app).get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert "# TYPE db_pool_wait_seconds histogram" in response.text
+
+
+def test_pool_wait_is_recorded_per_engine(engine, monkeypatch):
+    monkeypatch.setattr(metrics, "_engines", {})
+    instrumented = create_engine(engine.url, pool_size=1, max_overflow=0)
+    metrics.instrument_engine(instrumented, "pool-test")
+    try:
+        for _ in range(2):
+            with instrumented.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        # A new pool after dispose() is still timed and sampled
+        instrumented.dispose()
+        with instrumented.connect() as connection:
+            rendered = metrics.render_metrics()
+    finally:
+        instrumented.dispose()
+    assert 'db_pool_wait_seconds_count{engine="pool-test"} 3' in rendered
+    assert 'db_pool_connections{engine="pool-test",state="checkedout"} 1' in rendered
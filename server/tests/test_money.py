@@ -0,0 +1,42 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from sqlalchemy import Numeric, literal, select
+
+from core.money import cents_expression, to_cents, to_decimal
+
+
+@pytest.mark.parametrize(
+    "amount, cents",
+    [
+        (None, 0),
+        (0, 0),
+        (12, 1200),
+        ("0.29", 29),
+        (Decimal("-1234567890123.45"), -123456789012345),
+        (0.1, 10),
+        (19.99, 1999),
+        # Sub-cent input rounds half away from zero, like a Numeric(15, 2) column
+        ("0.005", 1),
+        ("-0.005", -1),
+        ("2.344", 234),
+    ],
+)
+def test_to_cents(amount, cents):
+    assert to_cents(amount) == cents
+
+
+@pytest.mark.parametrize("cents", [0, 1, -1, 29, 1999, -123456789012345, np.int64(1050)])
+def test_to_decimal_round_trips(cents):
+    amount = to_decimal(cents)
+    assert amount.as_tuple().exponent == -2
+    assert to_cents(amount) == cents
+
+
+def test_cents_expression(db):
+    amounts = ["0.29", "19.99", "-0.01", "9999999999999.99"]
+    values = [literal(Decimal(amount), Numeric(15, 2)) for amount in amounts]
+    row = db.execute(select(*(cents_expression(value) for value in values), cents_expression(sum(values)))).one()
+    assert list(row) == [29, 1999, -1, 999999999999999, 1000000000002026]
+    assert all(type(cents) is int for cents in row)
@@ -0,0 +1,93 @@
+from decimal import Decimal
+
+import pytest
+
+from core.config import settings
+
+
+def post(client, transaction_date, transaction_type, debit_ledger_id, credit_ledger_id, amount):
+    response = client.post(
+        "/api/v1/transactions/",
+        json={
+            "transaction_date": transaction_date,
+            "transaction_type": transaction_type,
+            "total_amount": "0",
+            "items": [
+                {"ledger_id": debit_ledger_id, "entry_type": "DEBIT", "amount": amount},
+                {"ledger_id": credit_ledger_id, "entry_type": "CREDIT", "amount": amount},
+            ],
+        },
+    )
+    assert response.status_code == 201, response.text
+
+
+@pytest.fixture
+def pivot(client, ledger_ids):
+    """
+    Rent and Food paid from Bank in January and February, Fuel paid in cash in February
+    and a transfer from Cash to Bank in March. Returns a function fetching the pivot.
+    """
+    bank, cash, rent, food, fuel = ledger_ids
+    post(client, "2024-01-05", "MONEY_PAID", rent, bank, "100.00")
+    post(client, "2024-01-20", "MONEY_PAID", food, bank, "12.50")
+    post(client, "2024-02-05", "MONEY_PAID", rent, bank, "100.00")
+    post(client, "2024-02-11", "MONEY_PAID", fuel, cash, "40.00")
+    post(client, "2024-03-01", "JOURNAL", bank, cash, "60.00")
+
+    def fetch(start_date="2024-01-01", end_date="2024-03-31", **params):
+        response = client.get(
+            "/api/v1/reports/pivot", params={"start_date": start_date, "end_date": end_date, **params}
+        )
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return fetch
+
+
+def amounts(row, *measures):
+    return tuple(Decimal(str(row[measure])) for measure in measures)
+
+
+def test_ledger_by_month(pivot, ledger_ids):
+    bank, _, rent, _, _ = ledger_ids
+    result = pivot(dimensions=["ledger", "period"], measures=["debit", "credit", "net"], ledger_ids=[bank, rent])
+    rows = {(row["ledger_id"], row["period"]): amounts(row, "debit", "credit", "net") for row in result["rows"]}
+    assert rows == {
+        (bank, "2024-01-01"): (Decimal("0"), Decimal("112.50"), Decimal("-112.50")),
+        (bank, "2024-02-01"): (Decimal("0"), Decimal("100.00"), Decimal("-100.00")),
+        (bank, "2024-03-01"): (Decimal("60.00"), Decimal("0"), Decimal("60.00")),
+        (rent, "2024-01-01"): (Decimal("100.00"), Decimal("0"), Decimal("100.00")),
+        (rent, "2024-02-01"): (Decimal("100.00"), Decimal("0"), Decimal("100.00")),
+    }
+    assert result["interval"] == "month" and not result["truncated"]
+    # Ordered by the dimensions
+    assert [(row["ledger_id"], row["period"]) for row in result["rows"]] == sorted(rows)
+
+
+def test_category_and_group_names(pivot):
+    result = pivot(dimensions=["category", "ledger_group"], measures=["net", "count"], categories=["expenses"])
+    assert [(row["category"], row["ledger_group_name"]) for row in result["rows"]] == [("expenses", "Expenditure")]
+    assert amounts(result["rows"][0], "net", "count") == (Decimal("252.50"), Decimal("4"))
+    assert result["interval"] is None
+
+    parents = pivot(dimensions=["parent_group"], measures=["net"])
+    assert {row["parent_group_name"]: amounts(row, "net") for row in parents["rows"]} == {
+        "Current Assets": (Decimal("-252.50"),),
+        "Expenditure": (Decimal("252.50"),),
+    }
+
+
+def test_transaction_type_filter_and_yearly_period(pivot):
+    result = pivot(dimensions=["transaction_type", "period"], measures=["debit"], interval="year")
+    assert {(row["transaction_type"], row["period"], *amounts(row, "debit")) for row in result["rows"]} == {
+        ("JOURNAL", "2024-01-01", Decimal("60.00")),
+        ("MONEY_PAID", "2024-01-01", Decimal("252.50")),
+    }
+    journals = pivot(measures=["count"], transaction_types=["JOURNAL"])
+    assert journals["rows"] == [{"count": 2}]
+
+
+def test_truncated_at_the_row_limit(pivot, monkeypatch):
+    monkeypatch.setattr(settings, "PIVOT_MAX_ROWS", 2)
+    result = pivot(dimensions=["ledger"], measures=["net"])
+    assert len(result["rows"]) == 2 and result["truncated"]
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import select
+
+from core.query_budget import QueryBudgetExceeded, assert_max_queries, untracked
+from main import app
+from models.finance import Ledger
+
+
+def declared_budget(method: str, path: str) -> int:
+    """The max_queries an endpoint declares with @query_budget."""
+    for route in app.routes:
+        if getattr(route, "path", None) == path and method in route.methods:
+            return route.endpoint.__query_budget__[0]
+    raise LookupError(f"No route {method} {path}")
+
+
+def transaction(ledger_ids, transaction_date="2024-03-01"):
+    """A journal crediting the first ledger and debiting every other one."""
+    items = [{"ledger_id": ledger_id, "entry_type": "DEBIT", "amount": "10.00"} for ledger_id in ledger_ids[1:]]
+    items.append({"ledger_id": ledger_ids[0], "entry_type": "CREDIT", "amount": f"{10 * len(items)}.00"})
+    return {"transaction_date": transaction_date, "transaction_type": "JOURNAL", "total_amount": "0", "items": items}
+
+
+def test_create_transaction_has_no_per_item_statements(client, ledger_ids):
+    budget = declared_budget("POST", "/api/v1/transactions/")
+    # Any statement run once per item would repeat; none may
+    with assert_max_queries(budget, repeat_threshold=2) as tracker:
+        response = client.post("/api/v1/transactions/", json=transaction(ledger_ids))
+    assert response.status_code == 201, response.text
+    assert tracker.count <= budget
+
+
+@pytest.mark.parametrize(
+    "path, query",
+    [
+        ("/api/v1/accounts/", ""),
+        ("/api/v1/transactions/", ""),
+        ("/api/v1/reports/trial-balance", "start_date=2024-01-01&end_date=2024-12-31"),
+        ("/api/v1/reports/ledger", "ledger_id={ledger_id}&start_date=2024-01-01&end_date=2024-12-31"),
+    ],
+)
+def test_reads_stay_within_declared_budget(client, ledger_ids, path, query):
+    for day in range(1, 6):
+        client.post("/api/v1/transactions/", json=transaction(ledger_ids, f"2024-03-0{day}"))
+
+    with assert_max_queries(declared_budget("GET", path), repeat_threshold=2):
+        response = client.get(f"{path}?{query.format(ledger_id=ledger_ids[0])}")
+    assert response.status_code == 200, response.text
+
+
+def test_middleware_enforces_declared_budget(client, ledger_ids, monkeypatch):
+    endpoint = next(route.endpoint for route in app.routes if getattr(route, "path", None) == "/api/v1/accounts/{ledger_id}")
+    monkeypatch.setattr(endpoint, "__query_budget__", (1, None))
+    with pytest.raises(QueryBudgetExceeded, match="query budget of 1 exceeded"):
+        client.get(f"/api/v1/accounts/{ledger_ids[0]}")
+
+
+def test_repeated_statement_is_detected(db, ledger_ids):
+    with pytest.raises(QueryBudgetExceeded, match="possible N\\+1"):
+        with assert_max_queries(100, repeat_threshold=3):
+            # One query per ledger: the N+1 pattern the endpoints avoid
+            for ledger_id in ledger_ids:
+                db.execute(select(Ledger.name).where(Ledger.id == ledger_id)).scalar_one()
+
+
+def test_untracked_statements_are_not_counted(db, ledger_ids):
+    with assert_max_queries(1) as tracker:
+        db.execute(select(Ledger.name).where(Ledger.id == ledger_ids[0])).scalar_one()
+        with untracked():
+            db.execute(select(Ledger.name).where(Ledger.id == ledger_ids[1])).scalar_one()
+    assert tracker.count == 1
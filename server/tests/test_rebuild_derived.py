@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import select, update
+
+import rebuild_derived
+from models.finance import LedgerBalance, Transaction
+from models.user import User
+
+
+def post(client, debit_ledger_id, credit_ledger_id, amount, reference=None):
+    response = client.post(
+        "/api/v1/transactions/",
+        json={
+            "transaction_date": "2024-04-01",
+            "transaction_type": "JOURNAL",
+            "total_amount": "0",
+            "reference": reference,
+            "items": [
+                {"ledger_id": debit_ledger_id, "entry_type": "DEBIT", "amount": amount},
+                {"ledger_id": credit_ledger_id, "entry_type": "CREDIT", "amount": amount},
+            ],
+        },
+    )
+    assert response.status_code == 201, response.text
+
+
+def derived(db, user_id):
+    balances = db.execute(
+        select(
+            LedgerBalance.ledger_id,
+            LedgerBalance.debit_total,
+            LedgerBalance.credit_total,
+            LedgerBalance.reconciled_total,
+        )
+        .where(LedgerBalance.user_id == user_id)
+        .order_by(LedgerBalance.ledger_id)
+    ).all()
+    fingerprints = db.execute(
+        select(Transaction.id, Transaction.fingerprint).where(Transaction.user_id == user_id).order_by(Transaction.id)
+    ).all()
+    return [tuple(row) for row in balances], [tuple(row) for row in fingerprints]
+
+
+@pytest.fixture
+def shard_engine(db, monkeypatch):
+    """Runs rebuild_shard on the test's connection, so it sees and rolls back with the test's data."""
+    monkeypatch.setattr(rebuild_derived, "_engine", db.get_bind())
+
+
+@pytest.fixture(params=[True, False], ids=["copy", "executemany"])
+def copy(request, monkeypatch):
+    if not request.param:
+        init = rebuild_derived._Copier.__init__
+
+        def executemany_only(self, db):
+            init(self, db)
+            self.copy = False
+
+        monkeypatch.setattr(rebuild_derived._Copier, "__init__", executemany_only)
+    return request.param
+
+
+def test_rebuild_shard_restores_derived_data(client, db, user, ledger_ids, matched_payment, shard_engine, copy):
+    bank, cash, rent, _, fuel = ledger_ids
+    post(client, fuel, cash, "7.25", reference="Receipt 88")
+    post(client, cash, bank, "50.00")
+    expected = derived(db, user.id)
+    version = db.scalar(select(User.ledger_version).where(User.id == user.id))
+
+    db.execute(update(LedgerBalance).values(debit_total=1, credit_total=2, reconciled_total=3))
+    db.execute(update(Transaction).values(fingerprint=None))
+    db.commit()
+
+    users, transactions, items, _ = rebuild_derived.rebuild_shard([user.id], rebuild_derived.DERIVED)
+    assert (users, transactions, items) == (1, 3, 7)
+    assert derived(db, user.id) == expected
+    assert db.scalar(select(User.ledger_version).where(User.id == user.id)) == version + 1
+
+
+def test_rebuild_only_balances_leaves_fingerprints(client, db, user, ledger_ids, shard_engine):
+    bank, _, rent, _, _ = ledger_ids
+    post(client, rent, bank, "10.00")
+    balances, _ = derived(db, user.id)
+    db.execute(update(LedgerBalance).values(debit_total=0))
+    db.execute(update(Transaction).values(fingerprint="stale"))
+    db.commit()
+
+    rebuild_derived.rebuild_shard([user.id], ("balances",))
+    assert derived(db, user.id)[0] == balances
+    assert set(db.scalars(select(Transaction.fingerprint).where(Transaction.user_id == user.id))) == {"stale"}
+
+
+def test_plan_shards_balances_transaction_counts(db):
+    users = [User(email=f"user{n}@example.com", first_name="User", hashed_password="!") for n in range(4)]
+    db.add_all(users)
+    db.flush()
+    counts = dict(zip([u.id for u in users], [6, 1, 1, 0]))
+    db.add_all(
+        Transaction(user_id=user_id, transaction_date="2024-01-01", transaction_type="JOURNAL", total_amount=0)
+        for user_id, count in counts.items()
+        for _ in range(count)
+    )
+    db.flush()
+
+    # 8 transactions over 1 worker: shards of at least 2, heaviest user first
+    shards = rebuild_derived.plan_shards(db, list(counts), workers=1)
+    assert shards == [[users[0].id], [users[1].id, users[2].id], [users[3].id]]
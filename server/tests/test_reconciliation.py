@@ -0,0 +1,131 @@
+from datetime import date
+from decimal import Decimal
+
+from services.reconciliation import CandidateIndex, match_lines, reference_tokens
+
+
+def day(text):
+    return date.fromisoformat(text).toordinal()
+
+
+def test_references_win_over_closer_dates():
+    index = CandidateIndex(
+        [
+            (1, day("2024-03-01"), -5000, reference_tokens("CHQ 100234")),
+            (2, day("2024-03-04"), -5000, reference_tokens("CHQ 100235")),
+            (3, day("2024-03-02"), -5000, frozenset()),
+        ]
+    )
+    lines = [
+        (10, day("2024-03-02"), -5000, reference_tokens("Cheque 100235")),
+        (11, day("2024-03-02"), -5000, frozenset()),
+        (12, day("2024-03-02"), -5000, frozenset()),
+    ]
+    # Line 10 takes the item with its cheque number; the others go by date, one item each
+    assert match_lines(lines, index, window_days=3) == [(10, 2, -5000), (11, 3, -5000), (12, 1, -5000)]
+
+
+def test_amounts_and_window_must_match():
+    index = CandidateIndex([(1, day("2024-03-01"), -5000, frozenset()), (2, day("2024-03-20"), -4999, frozenset())])
+    lines = [(10, day("2024-03-05"), -5000, frozenset()), (11, day("2024-03-20"), -5000, frozenset())]
+    assert match_lines(lines, index, window_days=4) == [(10, 1, -5000)]
+    assert match_lines(lines, index, window_days=3) == []
+
+
+def test_shared_reference_found_beyond_the_nearest_candidates():
+    items = [(item_id, day("2024-03-01"), -100, frozenset()) for item_id in range(1, 21)]
+    items.append((99, day("2024-03-05"), -100, reference_tokens("INV-7781")))
+    lines = [(10, day("2024-03-01"), -100, reference_tokens("Invoice 7781"))]
+    assert match_lines(lines, CandidateIndex(items), window_days=7) == [(10, 99, -100)]
+
+
+def post(client, transaction_date, debit_ledger_id, credit_ledger_id, amount, reference=None):
+    response = client.post(
+        "/api/v1/transactions/",
+        json={
+            "transaction_date": transaction_date,
+            "transaction_type": "JOURNAL",
+            "total_amount": "0",
+            "reference": reference,
+            "items": [
+                {"ledger_id": debit_ledger_id, "entry_type": "DEBIT", "amount": amount},
+                {"ledger_id": credit_ledger_id, "entry_type": "CREDIT", "amount": amount},
+            ],
+        },
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def summary(client, ledger_id):
+    response = client.get(f"/api/v1/reconciliation/ledgers/{ledger_id}/summary")
+    assert response.status_code == 200, response.text
+    return {key: value for key, value in response.json().items() if key != "ledger_id"}
+
+
+def test_auto_match_updates_the_reconciled_balance(client, ledger_ids):
+    bank, cash, rent, food, _ = ledger_ids
+    post(client, "2024-03-01", rent, bank, "50.00", reference="CHQ 100234")
+    post(client, "2024-03-03", food, bank, "50.00", reference="CHQ 100235")
+    post(client, "2024-03-05", bank, cash, "20.00")
+    response = client.post(
+        "/api/v1/reconciliation/statements",
+        json={
+            "ledger_id": bank,
+            "name": "March",
+            "lines": [
+                {"line_date": "2024-03-04", "amount": "-50.00", "reference": "100234"},
+                {"line_date": "2024-03-04", "amount": "-50.00"},
+                {"line_date": "2024-03-30", "amount": "20.00"},
+            ],
+        },
+    )
+    assert response.status_code == 201, response.text
+    statement_id = response.json()["id"]
+
+    response = client.post(f"/api/v1/reconciliation/statements/{statement_id}/auto-match?date_window_days=5")
+    assert response.status_code == 200, response.text
+    assert response.json() == {"statement_id": statement_id, "matched": 2, "unmatched": 1}
+    assert summary(client, bank) == {
+        "book_balance": "-80.00",
+        "reconciled_balance": "-100.00",
+        "unreconciled_balance": "20.00",
+        "unmatched_lines": 1,
+        "unmatched_lines_total": "20.00",
+    }
+    unreconciled = client.get(f"/api/v1/reconciliation/ledgers/{bank}/unreconciled").json()
+    assert [(item["transaction_date"], item["amount"]) for item in unreconciled] == [("2024-03-05", "20.00")]
+
+
+def test_replacing_or_deleting_matched_items_releases_their_lines(client, ledger_ids, matched_payment):
+    bank, cash, rent, food, _ = ledger_ids
+    transaction, _, statement_id = matched_payment
+    assert Decimal(summary(client, bank)["reconciled_balance"]) == Decimal("-30.00")
+
+    # Only the bank item is replaced (paid from Cash instead), so only its line is released
+    response = client.put(
+        f"/api/v1/transactions/{transaction['id']}",
+        json={
+            "items": [
+                {"ledger_id": rent, "entry_type": "DEBIT", "amount": "10.00"},
+                {"ledger_id": food, "entry_type": "DEBIT", "amount": "20.00"},
+                {"ledger_id": cash, "entry_type": "CREDIT", "amount": "30.00"},
+            ]
+        },
+    )
+    assert response.status_code == 200, response.text
+    assert summary(client, bank) == {
+        "book_balance": "0.00",
+        "reconciled_balance": "0.00",
+        "unreconciled_balance": "0.00",
+        "unmatched_lines": 1,
+        "unmatched_lines_total": "-30.00",
+    }
+
+    other = post(client, "2024-03-01", rent, bank, "30.00")
+    response = client.post(f"/api/v1/reconciliation/statements/{statement_id}/auto-match")
+    assert response.json()["matched"] == 1
+    assert client.delete(f"/api/v1/transactions/{other}").status_code == 204
+    assert summary(client, bank)["reconciled_balance"] == "0.00"
+    lines = client.get(f"/api/v1/reconciliation/statements/{statement_id}").json()["lines"]
+    assert [line["matched_item_id"] for line in lines] == [None]
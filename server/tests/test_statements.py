@@ -0,0 +1,79 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, update
+from sqlalchemy.engine.default import CACHE_HIT
+
+from core.database import _connect_args
+from models.finance import Ledger
+from models.user import User
+
+
+@contextmanager
+def cache_misses(engine):
+    """Collects the SQL of statements that had to be compiled (not found in the compiled cache)."""
+    misses = []
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context.cache_hit is not CACHE_HIT and not statement.lstrip().upper().startswith(("SAVEPOINT", "RELEASE")):
+            misses.append(statement)
+
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    try:
+        yield misses
+    finally:
+        event.remove(engine, "after_cursor_execute", after_cursor_execute)
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/api/v1/accounts/",
+        "/api/v1/transactions/",
+        "/api/v1/reports/trial-balance?start_date=2024-01-01&end_date=2024-12-31",
+    ],
+)
+def test_hot_paths_reuse_compiled_statements(client, engine, ledger_ids, path):
+    client.get(path)
+    with cache_misses(engine) as misses:
+        assert client.get(path).status_code == 200
+    assert misses == []
+
+
+def journal(debit_ledger_id, credit_ledger_id):
+    return {
+        "transaction_date": "2024-03-01",
+        "transaction_type": "JOURNAL",
+        "total_amount": "0",
+        "items": [
+            {"ledger_id": debit_ledger_id, "entry_type": "DEBIT", "amount": "10.00"},
+            {"ledger_id": credit_ledger_id, "entry_type": "CREDIT", "amount": "10.00"},
+        ],
+    }
+
+
+def test_posting_checks_ledger_ownership(client, db, ledger_ids):
+    bank, cash, rent, _, _ = ledger_ids
+    assert client.post("/api/v1/transactions/", json=journal(rent, bank)).status_code == 201
+
+    other = User(email="other@example.com", first_name="Other", hashed_password="!")
+    db.add(other)
+    db.flush()
+    db.execute(update(Ledger).where(Ledger.id == cash).values(user_id=other.id))
+    db.commit()
+    assert client.post("/api/v1/transactions/", json=journal(rent, cash)).status_code == 404
+
+    db.execute(update(Ledger).where(Ledger.id == rent).values(is_active=False))
+    db.commit()
+    assert client.post("/api/v1/transactions/", json=journal(rent, bank)).status_code == 404
+
+
+@pytest.mark.parametrize(
+    "url, connect_args",
+    [
+        ("postgresql+psycopg://u@localhost/pesa", {"prepare_threshold": 5}),
+        ("postgresql://u@localhost/pesa", {}),
+    ],
+)
+def test_prepare_threshold_only_for_psycopg3(url, connect_args):
+    assert _connect_args(url) == connect_args
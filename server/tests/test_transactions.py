@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+
+def post_journal(client, items, transaction_date="2024-03-01"):
+    response = client.post(
+        "/api/v1/transactions/",
+        json={"transaction_date": transaction_date, "transaction_type": "JOURNAL", "total_amount": "0", "items": items},
+    )
+    assert response.status_code == 201, response.text
+    return client.get(f"/api/v1/transactions/{response.json()['id']}").json()
+
+
+def item(ledger_id, entry_type, amount):
+    return {"ledger_id": ledger_id, "entry_type": entry_type, "amount": amount}
+
+
+def matched_item_ids(client, statement_id):
+    lines = client.get(f"/api/v1/reconciliation/statements/{statement_id}").json()["lines"]
+    return [line["matched_item_id"] for line in lines]
+
+
+def test_update_keeps_matches_of_unchanged_items(client, ledger_ids, matched_payment):
+    bank, _, rent, food, fuel = ledger_ids
+    transaction, bank_item, statement_id = matched_payment
+
+    response = client.put(
+        f"/api/v1/transactions/{transaction['id']}",
+        json={"items": [item(rent, "DEBIT", "5.00"), item(fuel, "DEBIT", "25.00"), item(bank, "CREDIT", "30.00")]},
+    )
+    assert response.status_code == 200, response.text
+    assert bank_item["id"] in [entry["id"] for entry in response.json()["items"]]
+    assert matched_item_ids(client, statement_id) == [bank_item["id"]]
+
+    report = client.get("/api/v1/reports/trial-balance?start_date=2024-01-01&end_date=2024-12-31").json()
+    closing = {
+        row["ledger_id"]: Decimal(row["closing_debit"]) - Decimal(row["closing_credit"]) for row in report["items"]
+    }
+    assert closing.get(food, 0) == 0
+    assert (closing[rent], closing[fuel], closing[bank]) == (Decimal("5"), Decimal("25"), Decimal("-30"))
+
+
+def test_update_releases_matches_of_changed_items(client, ledger_ids, matched_payment):
+    bank, cash, rent, food, _ = ledger_ids
+    transaction, bank_item, statement_id = matched_payment
+
+    response = client.put(
+        f"/api/v1/transactions/{transaction['id']}",
+        json={"items": [item(rent, "DEBIT", "10.00"), item(food, "DEBIT", "20.00"), item(cash, "CREDIT", "30.00")]},
+    )
+    assert response.status_code == 200, response.text
+    assert matched_item_ids(client, statement_id) == [None]
@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from models.finance import Ledger
+
+_COLUMNS = ("opening_debit", "opening_credit", "period_debit", "period_credit", "closing_debit", "closing_credit")
+
+
+def post(client, transaction_date, debit_ledger_id, credit_ledger_id, amount):
+    response = client.post(
+        "/api/v1/transactions/",
+        json={
+            "transaction_date": transaction_date,
+            "transaction_type": "JOURNAL",
+            "total_amount": "0",
+            "items": [
+                {"ledger_id": debit_ledger_id, "entry_type": "DEBIT", "amount": amount},
+                {"ledger_id": credit_ledger_id, "entry_type": "CREDIT", "amount": amount},
+            ],
+        },
+    )
+    assert response.status_code == 201, response.text
+
+
+def amounts(node):
+    return tuple(Decimal(node[column]) for column in _COLUMNS)
+
+
+@pytest.fixture
+def tree(client, ledger_ids):
+    """Rent paid from Bank before 2024, Food from Bank and Fuel from Cash during it."""
+    bank, cash, rent, food, fuel = ledger_ids
+    post(client, "2023-12-15", rent, bank, "100.00")
+    post(client, "2024-02-10", food, bank, "20.00")
+    post(client, "2024-03-05", fuel, cash, "40.00")
+
+    def fetch(**expand):
+        response = client.get(
+            "/api/v1/reports/trial-balance/tree",
+            params={"start_date": "2024-01-01", "end_date": "2024-12-31", **expand},
+        )
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return fetch
+
+
+def test_collapsed_tree_has_parent_subtotals(tree):
+    report = tree()
+    nodes = {node["name"]: node for node in report["nodes"]}
+    assert all(node["level"] == "parent_group" and node["children"] is None for node in nodes.values())
+    assert amounts(nodes["Current Assets"]) == tuple(map(Decimal, ("0", "100", "0", "60", "0", "160")))
+    assert amounts(nodes["Expenditure"]) == tuple(map(Decimal, ("100", "0", "60", "0", "160", "0")))
+    assert Decimal(report["total_closing_debit"]) == Decimal(report["total_closing_credit"]) == Decimal("160")
+    assert report["is_balanced"]
+
+
+def test_expanding_a_ledger_group_expands_its_parent(tree, db, ledger_ids):
+    rent = ledger_ids[2]
+    expenses_group = db.scalar(select(Ledger.ledger_group_id).where(Ledger.id == rent))
+    report = tree(expand_ledger_groups=[expenses_group])
+
+    expanded = [node for node in report["nodes"] if node["children"] is not None]
+    assert [node["name"] for node in expanded] == ["Expenditure"]
+    (group,) = expanded[0]["children"]
+    assert group["key"] == f"ledger_group:{expenses_group}" and amounts(group) == amounts(expanded[0])
+    # Ledgers in report order, with their own subtotals
+    assert [(ledger["name"], Decimal(ledger["closing_debit"])) for ledger in group["children"]] == [
+        ("Food", Decimal("20.00")),
+        ("Fuel", Decimal("40.00")),
+        ("Rent", Decimal("100.00")),
+    ]
+
+
+def test_ledger_subtotals_match_the_flat_trial_balance(tree, client, db, ledger_ids):
+    groups = set(db.scalars(select(Ledger.ledger_group_id).where(Ledger.id.in_(ledger_ids))))
+    report = tree(expand_ledger_groups=sorted(groups))
+    ledgers = {
+        ledger["id"]: amounts(ledger)
+        for parent in report["nodes"]
+        for group in parent["children"]
+        for ledger in group["children"]
+    }
+    flat = client.get("/api/v1/reports/trial-balance?start_date=2024-01-01&end_date=2024-12-31").json()
+    assert ledgers == {item["ledger_id"]: amounts(item) for item in flat["items"]}
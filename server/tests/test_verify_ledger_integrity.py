@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import update
+
+import verify_ledger_integrity
+from models.finance import EntryType, Ledger, Transaction, TransactionItem
+from models.user import User
+
+
+def post(client, debit_ledger_id, credit_ledger_id, amount):
+    response = client.post(
+        "/api/v1/transactions/",
+        json={
+            "transaction_date": "2024-04-01",
+            "transaction_type": "JOURNAL",
+            "total_amount": "0",
+            "items": [
+                {"ledger_id": debit_ledger_id, "entry_type": "DEBIT", "amount": amount},
+                {"ledger_id": credit_ledger_id, "entry_type": "CREDIT", "amount": amount},
+            ],
+        },
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+@pytest.fixture
+def verify(db, monkeypatch):
+    """verify_shard on the test's connection, so it sees the test's uncommitted data."""
+    monkeypatch.setattr(verify_ledger_integrity, "_engine", db.get_bind())
+    return verify_ledger_integrity.verify_shard
+
+
+def test_consistent_ledgers_pass(client, user, ledger_ids, matched_payment, verify):
+    _, cash, _, _, fuel = ledger_ids
+    post(client, fuel, cash, "5.00")
+    assert verify([user.id]) == []
+
+
+def test_each_broken_invariant_is_reported(client, db, user, ledger_ids, verify):
+    bank, cash, rent, food, fuel = ledger_ids
+    unbalanced = post(client, rent, bank, "10.00")
+    mismatched = post(client, food, bank, "20.00")
+    on_fuel = post(client, fuel, cash, "5.00")
+    empty = Transaction(user_id=user.id, transaction_date="2024-04-02", transaction_type="JOURNAL", total_amount=0)
+    other = User(email="other@example.com", first_name="Other", hashed_password="!")
+    db.add_all([empty, other])
+    db.flush()
+
+    db.execute(
+        update(TransactionItem)
+        .where(TransactionItem.transaction_id == unbalanced, TransactionItem.entry_type == EntryType.CREDIT)
+        .values(amount="9.00")
+    )
+    db.execute(update(Transaction).where(Transaction.id == mismatched).values(total_amount="21.00"))
+    db.execute(update(Ledger).where(Ledger.id == fuel).values(is_active=False))
+    db.execute(update(Ledger).where(Ledger.id == cash).values(user_id=other.id))
+    db.commit()
+
+    violations = {(v.pop("check"), v.get("transaction_id"), v.get("ledger_id")): v for v in verify([user.id])}
+    assert set(violations) == {
+        ("unbalanced_transaction", unbalanced, None),
+        ("total_amount_mismatch", mismatched, None),
+        ("empty_transaction", empty.id, None),
+        ("inactive_ledger_item", on_fuel, fuel),
+        ("foreign_ledger_item", on_fuel, cash),
+        ("trial_balance_not_zero", None, None),
+        ("ledger_balance_drift", None, bank),
+    }
+    assert violations[("unbalanced_transaction", unbalanced, None)]["credit"] == "9.00"
+    assert violations[("total_amount_mismatch", mismatched, None)] == {
+        "user_id": user.id,
+        "transaction_id": mismatched,
+        "total_amount": "21.00",
+        "debit": "20.00",
+    }
+    assert violations[("foreign_ledger_item", on_fuel, cash)]["ledger_user_id"] == other.id
+    assert violations[("trial_balance_not_zero", None, None)] == {"user_id": user.id, "debit": "35.00", "credit": "34.00"}
+    drift = violations[("ledger_balance_drift", None, bank)]
+    assert (drift["expected"]["credit"], drift["stored"]["credit"]) == ("29.00", "30.00")
@@ -0,0 +1,52 @@
+import os
+import runpy
+
+from sqlalchemy import create_engine
+
+from core import warmup
+from services import chart_of_accounts
+
+_GUNICORN_CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py")
+
+
+def test_gunicorn_config(monkeypatch):
+    monkeypatch.setenv("PESA_PLAN_WORKERS", "3")
+    conf = runpy.run_path(_GUNICORN_CONF)
+    assert conf["preload_app"] is True
+    assert conf["workers"] == 3
+    assert conf["wsgi_app"] == "main:app"
+
+    module, _, name = conf["worker_class"].rpartition(".")
+    worker = getattr(__import__(module, fromlist=[name]), name)
+    assert worker.CONFIG_KWARGS["lifespan"] == "on"
+
+
+def test_post_fork_drops_inherited_connections():
+    from core.database import engine
+
+    inherited = engine.pool
+    runpy.run_path(_GUNICORN_CONF)["post_fork"](None, None)
+    assert engine.pool is not inherited
+
+
+def test_warm_process_runs_once(monkeypatch):
+    monkeypatch.setattr(warmup, "_process_warmed", False)
+    warmup.warm_process()
+    first = warmup.startup_timings["warm_process"]
+    warmup.warm_process()
+    assert warmup.startup_timings["warm_process"] == first
+
+
+def test_warm_connections_fills_the_pool_and_loads_the_registry(engine, db, monkeypatch):
+    worker_engine = create_engine(engine.url, pool_size=3)
+    monkeypatch.setattr(warmup, "engine", worker_engine)
+    monkeypatch.setattr(warmup.settings, "DB_POOL_WARM_CONNECTIONS", 5)
+    monkeypatch.setattr(chart_of_accounts, "_registry", None)
+    try:
+        warmup.warm_connections()
+        # Capped at the pool size, and all returned to the pool
+        assert (worker_engine.pool.checkedin(), worker_engine.pool.checkedout()) == (3, 0)
+    finally:
+        worker_engine.dispose()
+    assert chart_of_accounts._registry is not None
+    assert "warm_connections" in warmup.startup_timings